@@ -0,0 +1,74 @@
+"""
+Binary WebSocket framing for live analysis and video streaming
+
+Negotiated with the WebSocket subprotocol BINARY_SUBPROTOCOL; clients that
+don't offer it keep the JSON/base64 text protocol.
+
+Message layout (network byte order):
+
+    +---------+------+------------+-------------------+-----------------+
+    | version | type | meta_len   | meta (JSON utf-8) | payload (bytes) |
+    | 1 byte  | 1 B  | 4 bytes    | meta_len bytes    | rest of message |
+    +---------+------+------------+-------------------+-----------------+
+
+Clients may also send a bare JPEG (starts with FF D8) as a frame.
+"""
+
+import json
+import struct
+from typing import Any, Dict, Optional, Tuple
+
+BINARY_SUBPROTOCOL = "bako.binary.v1"
+PROTOCOL_VERSION = 1
+
+# Message types
+MSG_FRAME = 1    # JPEG frame (client -> server input, server -> client preview)
+MSG_RESULT = 2   # Analysis result; payload is the annotated JPEG (may be empty)
+MSG_CONTROL = 3  # Control/status message, meta only
+MSG_CHUNK = 4    # Encoded media chunk (MediaRecorder WebM/fMP4) for stream ingest
+
+_HEADER = struct.Struct("!BBI")
+_JPEG_MAGIC = b"\xff\xd8"
+
+
+class ProtocolError(ValueError):
+    """Malformed binary message"""
+
+
+def wants_binary(websocket) -> bool:
+    """True if the client offered the binary subprotocol"""
+    return BINARY_SUBPROTOCOL in (websocket.scope.get("subprotocols") or [])
+
+
+def pack_message(msg_type: int, meta: Optional[Dict[str, Any]] = None, payload: bytes = b"") -> bytes:
+    """Build a binary message"""
+    meta_bytes = json.dumps(meta or {}, separators=(",", ":")).encode("utf-8")
+    return b"".join((_HEADER.pack(PROTOCOL_VERSION, msg_type, len(meta_bytes)), meta_bytes, payload))
+
+
+def unpack_message(data: bytes) -> Tuple[int, Dict[str, Any], memoryview]:
+    """
+    Parse a binary message
+
+    Returns:
+        (message type, meta dict, payload) - a bare JPEG is returned as MSG_FRAME
+        with empty meta. The payload is a zero-copy view into data.
+    """
+    view = memoryview(data)
+    if bytes(view[:2]) == _JPEG_MAGIC:
+        return MSG_FRAME, {}, view
+
+    if len(view) < _HEADER.size:
+        raise ProtocolError("Message shorter than header")
+    version, msg_type, meta_len = _HEADER.unpack_from(view)
+    if version != PROTOCOL_VERSION:
+        raise ProtocolError(f"Unsupported protocol version: {version}")
+
+    meta_end = _HEADER.size + meta_len
+    if meta_end > len(view):
+        raise ProtocolError("Truncated meta section")
+    try:
+        meta = json.loads(bytes(view[_HEADER.size:meta_end])) if meta_len else {}
+    except ValueError as e:
+        raise ProtocolError(f"Invalid meta JSON: {e}")
+    return msg_type, meta, view[meta_end:]
@@ -1,91 +1,297 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 import logging
-import cv2
 import numpy as np
 import base64
-import json
-from typing import List
-from app.services.video_processor import VideoProcessor
+import time
+import asyncio
+from typing import Callable, List, Optional, Tuple
+from app.core.config import settings
+from app.services.video_processor import LIVE_FPS, VideoProcessor
+from app.services.live_frame_cache import LiveFrameCache
+from app.services.live_scheduler import LiveFrame, LiveFrameScheduler
+from app.services.stream_decoder import StreamDecoder
+from app.services.jpeg_decode import decode_jpeg
+from app.api.binary_protocol import (
+    BINARY_SUBPROTOCOL, MSG_CHUNK, MSG_CONTROL, MSG_FRAME, MSG_RESULT, ProtocolError,
+    pack_message, unpack_message, wants_binary
+)
 from starlette.websockets import WebSocketState
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Seconds a stream chunk may wait for the decoder to catch up before ingest is stopped
+STREAM_FEED_TIMEOUT = 5.0
+
+
+def _encoded_bytes(data) -> bytes:
+    """JPEG bytes of a received frame (binary payload, or base64/data-URL text in JSON mode)"""
+    if isinstance(data, str):
+        # Remove header if present (data:image/jpeg;base64,...)
+        if "base64," in data:
+            data = data.split("base64,")[1]
+        return base64.b64decode(data)
+    return data
+
+
+def _decode_frame(data) -> Tuple[Optional[np.ndarray], Optional[bytes]]:
+    """
+    Encoded frame -> BGR frame at analysis resolution
+
+    Returns:
+        (frame, encoded bytes if the frame was decoded at reduced scale, else None)
+    """
+    encoded = _encoded_bytes(data)
+    frame, reduction = decode_jpeg(encoded, settings.LIVE_DECODE_MIN_SIDE)
+    return frame, (encoded if reduction > 1 else None)
+
+
+def _full_frame_loader(encoded) -> Callable[[], Optional[np.ndarray]]:
+    """Full-resolution decode, for crops that need more detail than the reduced frame"""
+    return lambda: decode_jpeg(encoded)[0]
+
+
+def _decode_window(window: List[LiveFrame]) -> Tuple[List[np.ndarray], List[int], List]:
+    """
+    Decode a window's frames (runs in a worker thread, off the event loop)
+
+    Returns:
+        (frames, frame ids, full-resolution loaders or None per frame)
+    """
+    frames: List[np.ndarray] = []
+    frame_ids: List[int] = []
+    full_frame_loaders = []
+    for item in window:
+        # Decode lazily: frames dropped before reaching a window are never decoded
+        if item.data is not None:
+            try:
+                item.frame, item.full_data = _decode_frame(item.data)
+            except Exception as e:
+                logger.error(f"Error decoding frame: {e}")
+            item.data = None
+        if item.frame is not None:
+            frames.append(item.frame)
+            frame_ids.append(item.frame_id)
+            full_frame_loaders.append(
+                _full_frame_loader(item.full_data) if item.full_data is not None else None
+            )
+    return frames, frame_ids, full_frame_loaders
+
+
+def _format_response(result_dict: dict) -> dict:
+    """Format response to match frontend expectations"""
+    return {
+        "action": {
+            "label": result_dict.get("action", {}).get("label", "unknown"),
+            "confidence": result_dict.get("action", {}).get("confidence", 0.0)
+        },
+        "metrics": {
+            "jump_height": result_dict.get("metrics", {}).get("jump_height", 0.0),
+            "movement_speed": result_dict.get("metrics", {}).get("movement_speed", 0.0),
+            "form_score": result_dict.get("metrics", {}).get("form_score", 0.0),
+            "pose_stability": result_dict.get("metrics", {}).get("pose_stability", 0.0),
+            "reaction_time": result_dict.get("metrics", {}).get("reaction_time", 0.0),
+            "energy_efficiency": result_dict.get("metrics", {}).get("energy_efficiency", 0.0)
+        },
+        "annotated_frame": result_dict.get("annotated_frame")
+    }
+
+
+def _format_keypoints_response(result_dict: dict) -> dict:
+    """Keypoint-only live mode: label, probabilities, metrics and pose - no frame"""
+    response = _format_response(result_dict)
+    del response["annotated_frame"]
+    response["action"]["probabilities"] = result_dict.get("action", {}).get("probabilities", {})
+    response["pose"] = result_dict.get("live_pose")
+    return response
+
+
 @router.websocket("/ws/analyze")
 async def websocket_endpoint(websocket: WebSocket):
-    await websocket.accept()
-    logger.info("🔌 WebSocket connected")
+    """
+    Live analysis over WebSocket
+
+    JSON mode (default): frames in as base64 data-URL text, results out as JSON
+    with a base64 annotated_frame.
+    Binary mode (subprotocol "bako.binary.v1"): frames in as JPEG bytes, results
+    out as MSG_RESULT messages with the annotated JPEG as payload.
+    Stream ingest (binary mode): instead of frames, the client may send its
+    MediaRecorder output (WebM / fragmented MP4) as MSG_CHUNK messages; the first
+    chunk's meta carries "mime" and "start_ts" (capture start, ms). The stream is
+    decoded incrementally and enters the same pipeline at the live frame rate.
+
+    Frames are scheduled latest-wins: if analysis falls behind, stale frames are
+    dropped and the client receives "backpressure" control messages.
     
+    "?mode=keypoints" skips server-side drawing: results carry the player box and
+    normalized pose landmarks ("pose") instead of an annotated frame, and the
+    client draws them over its own camera preview.
+    """
+    binary = wants_binary(websocket)
+    keypoints_only = websocket.query_params.get("mode") == "keypoints"
+    await websocket.accept(subprotocol=BINARY_SUBPROTOCOL if binary else None)
+    logger.info(f"🔌 WebSocket connected ({'binary' if binary else 'json'} mode"
+                f"{', keypoints only' if keypoints_only else ''})")
+
     # Get video processor from app state
     video_processor: VideoProcessor = websocket.app.state.video_processor
-    
+
     if not video_processor:
         logger.error("❌ Video processor not initialized")
         await websocket.close(code=1011)
         return
-    
-    buffer: List[np.ndarray] = []
+
     BUFFER_SIZE = 16
-    
-    try:
+    STRIDE = 8
+    scheduler = LiveFrameScheduler(BUFFER_SIZE, STRIDE, target_lag_ms=settings.LIVE_MAX_LAG_MS)
+    # Detection/pose results shared by overlapping windows
+    frame_cache = LiveFrameCache(max_entries=BUFFER_SIZE * 2)
+    # Smoothing/metrics state for this session only (the models are shared)
+    context = video_processor.create_context(LIVE_FPS)
+    session_id = f"live-{id(websocket):x}"
+    window_ready = asyncio.Event()
+
+    async def send_control(message: dict):
+        if binary:
+            await websocket.send_bytes(pack_message(MSG_CONTROL, message))
+        else:
+            await websocket.send_json(message)
+
+    async def analyze_windows():
+        """Analyze the most recent window whenever enough new frames have arrived"""
         while True:
-            # Receive frame (base64 string)
-            data = await websocket.receive_text()
-            
-            # Decode base64 to image
+            await window_ready.wait()
+            window_ready.clear()
+            if not scheduler.ready:
+                continue
+
+            window = scheduler.take_window()
+            # JPEG decoding would stall every other socket if it ran on the event loop
+            frames, frame_ids, full_frame_loaders = await asyncio.to_thread(_decode_window, window)
+
+            started = time.monotonic()
             try:
-                # Remove header if present (data:image/jpeg;base64,...)
-                if "base64," in data:
-                    data = data.split("base64,")[1]
-                
-                image_bytes = base64.b64decode(data)
-                nparr = np.frombuffer(image_bytes, np.uint8)
-                frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-                
-                if frame is None:
-                    continue
-                    
-                buffer.append(frame)
-                
-                # Process when buffer is full (or every few frames for faster response)
-                if len(buffer) >= BUFFER_SIZE:
-                    # Process sequence
-                    result = await video_processor.process_sequence(buffer)
-                    
-                    if result:
-                        # Convert to dict and ensure JSON serializable
-                        result_dict = result.model_dump(mode='json') if hasattr(result, 'model_dump') else result.dict()
-                        
-                        # Format response to match frontend expectations
-                        response = {
-                            "action": {
-                                "label": result_dict.get("action", {}).get("label", "unknown"),
-                                "confidence": result_dict.get("action", {}).get("confidence", 0.0)
-                            },
-                            "metrics": {
-                                "jump_height": result_dict.get("metrics", {}).get("jump_height", 0.0),
-                                "movement_speed": result_dict.get("metrics", {}).get("movement_speed", 0.0),
-                                "form_score": result_dict.get("metrics", {}).get("form_score", 0.0),
-                                "pose_stability": result_dict.get("metrics", {}).get("pose_stability", 0.0),
-                                "reaction_time": result_dict.get("metrics", {}).get("reaction_time", 0.0),
-                                "energy_efficiency": result_dict.get("metrics", {}).get("energy_efficiency", 0.0)
-                            },
-                            "annotated_frame": result_dict.get("annotated_frame")
-                        }
-                        
-                        # Send result back
+                # Process sequence
+                result = await video_processor.process_sequence(
+                    frames,
+                    frame_encoding="jpeg" if binary else "base64",
+                    frame_ids=frame_ids,
+                    full_frame_loaders=full_frame_loaders,
+                    frame_cache=frame_cache,
+                    context=context,
+                    output="keypoints" if keypoints_only else "frame",
+                    session_id=session_id
+                )
+                timing = scheduler.record_result(window, (time.monotonic() - started) * 1000.0)
+
+                if result:
+                    # Convert to dict and ensure JSON serializable
+                    result_dict = result.model_dump(mode='json') if hasattr(result, 'model_dump') else result.dict()
+                    if keypoints_only:
+                        response = _format_keypoints_response(result_dict)
+                    else:
+                        response = _format_response(result_dict)
+                    response["timing"] = timing
+
+                    # Send result back
+                    if binary:
+                        response.pop("annotated_frame", None)
+                        await websocket.send_bytes(
+                            pack_message(MSG_RESULT, response, result.annotated_jpeg or b"")
+                        )
+                    else:
                         await websocket.send_json(response)
-                    
-                    # Slide window (keep last 8 frames for overlap)
-                    buffer = buffer[8:]
-                    
+
+                hint = scheduler.backpressure_hint()
+                if hint:
+                    await send_control(hint)
             except Exception as e:
                 logger.error(f"Error processing frame: {e}")
                 # Continue loop
-                
+
+            # Frames that arrived during analysis may already fill the next window
+            if scheduler.ready:
+                window_ready.set()
+
+    analyzer = asyncio.create_task(analyze_windows())
+    next_frame_id = 0
+    loop = asyncio.get_running_loop()
+    decoder: Optional[StreamDecoder] = None
+    stream_rejected = False
+    stream_start_ts: Optional[float] = None
+
+    def push_frame(data, client_ts: Optional[float], frame: Optional[np.ndarray] = None):
+        nonlocal next_frame_id
+        # Receiving never waits for analysis; the scheduler drops stale frames
+        scheduler.push(LiveFrame(next_frame_id, data, time.monotonic(), client_ts, frame))
+        next_frame_id += 1
+        if scheduler.ready:
+            window_ready.set()
+
+    def on_stream_frame(frame: np.ndarray, pts: Optional[float]):
+        """Decoder thread -> event loop; stream time is mapped onto the client clock"""
+        client_ts = stream_start_ts + pts * 1000.0 if stream_start_ts is not None and pts is not None else None
+        loop.call_soon_threadsafe(push_frame, None, client_ts, frame)
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+
+            client_ts = None
+            try:
+                if message.get("bytes") is not None:
+                    msg_type, meta, payload = unpack_message(message["bytes"])
+                    if msg_type == MSG_CHUNK:
+                        if stream_rejected:
+                            continue
+                        if decoder is None:
+                            try:
+                                decoder = StreamDecoder(meta.get("mime", "video/webm"), on_stream_frame,
+                                                        max_fps=LIVE_FPS)
+                                decoder.start()
+                            except (ImportError, ValueError) as e:
+                                logger.warning(f"⚠️  Rejecting live stream: {e}")
+                                stream_rejected, decoder = True, None
+                                await send_control({"type": "error", "message": f"Stream ingest unavailable: {e}"})
+                                continue
+                            stream_start_ts = meta.get("start_ts")
+                            logger.info(f"📼 Live stream ingest started ({decoder.format})")
+                        chunk = bytes(payload)
+                        # Decoder behind: stop reading the socket (backpressure on the client)
+                        # until it has room, off the event loop
+                        if not decoder.feed(chunk, timeout=0) and \
+                                not await asyncio.to_thread(decoder.feed, chunk, STREAM_FEED_TIMEOUT):
+                            logger.warning(f"⚠️  Stream decoder can't keep up "
+                                           f"({decoder.pipe.buffered / 1024:.0f} KB buffered), stopping ingest")
+                            stream_rejected = True
+                            await asyncio.to_thread(decoder.close)
+                            decoder = None
+                            await send_control({"type": "error", "message": "Stream ingest stopped: decoding can't keep up"})
+                        continue
+                    if msg_type != MSG_FRAME:
+                        continue
+                    data = payload
+                    client_ts = meta.get("ts")
+                elif message.get("text") is not None:
+                    data = message["text"]
+                else:
+                    continue
+            except ProtocolError as e:
+                logger.warning(f"⚠️  Ignoring malformed binary message: {e}")
+                continue
+
+            push_frame(data, client_ts)
+
     except WebSocketDisconnect:
-        logger.info("🔌 WebSocket disconnected")
+        logger.info(f"🔌 WebSocket disconnected (frame cache hit rate: {frame_cache.hit_rate:.0%}, "
+                    f"session: {scheduler.stats()})")
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
         if websocket.client_state == WebSocketState.CONNECTED:
             await websocket.close()
+    finally:
+        analyzer.cancel()
+        if decoder is not None:
+            await asyncio.to_thread(decoder.close)
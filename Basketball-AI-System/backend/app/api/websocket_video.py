@@ -1,35 +1,132 @@
 """
 WebSocket endpoint for streaming annotated video frames during upload processing
+
+The worker analyzing a video and the process holding the client's socket are
+connected through the frame bus (app.services.frame_bus), so previews keep
+working with several workers or hosts.
 """
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+import asyncio
 import logging
-import cv2
+import time
 import numpy as np
 import base64
 from typing import Optional
 from starlette.websockets import WebSocketState
+from app.api.binary_protocol import (
+    BINARY_SUBPROTOCOL, MSG_CONTROL, MSG_FRAME, ProtocolError, pack_message, unpack_message, wants_binary
+)
+from app.services.frame_bus import Subscription, get_frame_bus
+from app.services.frame_sender import LatestFrameSender
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-# Store active WebSocket connections for video processing
-active_connections: dict[str, WebSocket] = {}
+
+def _feedback_topic(video_id: str) -> str:
+    """Topic on which socket holders report delivery times back to the publisher"""
+    return f"{video_id}/feedback"
+
+
+class _FramePublisher:
+    """
+    Analysis-side stream of one video: latest-frame sender publishing on the bus,
+    adapting to the delivery times the socket holders report back
+    """
+
+    def __init__(self, video_id: str):
+        self.video_id = video_id
+        bus = get_frame_bus()
+
+        async def send(jpeg: bytes):
+            await bus.publish(video_id, pack_message(MSG_FRAME, {"format": "jpg"}, jpeg))
+
+        self.sender = LatestFrameSender(send, measure_send=False)
+        self.sender.start()
+        self._feedback: Optional[Subscription] = None
+        self._feedback_task = asyncio.create_task(self._read_feedback())
+
+    async def _read_feedback(self):
+        self._feedback = await get_frame_bus().subscribe(_feedback_topic(self.video_id))
+        while True:
+            message = await self._feedback.get()
+            if message is None:
+                return
+            try:
+                _, meta, _ = unpack_message(message)
+                self.sender.record_delivery(int(meta["bytes"]), float(meta["seconds"]))
+            except (ProtocolError, KeyError, TypeError, ValueError) as e:
+                logger.debug(f"Ignoring malformed stream feedback: {e}")
+
+    async def close(self):
+        await self.sender.close()
+        self._feedback_task.cancel()
+        try:
+            await self._feedback_task
+        except asyncio.CancelledError:
+            pass
+        if self._feedback is not None:
+            await self._feedback.close()
+        logger.info(f"📡 Frame stream for {self.video_id} ended: {self.sender.stats()}")
+
+
+# Videos being analyzed (and streamed) by this process
+frame_publishers: dict[str, _FramePublisher] = {}
+
+
+async def _forward(websocket: WebSocket, subscription: Subscription, video_id: str, binary: bool):
+    """Forward bus messages to the client, reporting frame delivery times back"""
+    bus = get_frame_bus()
+    while True:
+        message = await subscription.get()
+        if message is None:
+            return
+        try:
+            msg_type, meta, payload = unpack_message(message)
+        except ProtocolError as e:
+            logger.warning(f"⚠️  Dropping malformed stream message for {video_id}: {e}")
+            continue
+
+        started = time.monotonic()
+        if binary:
+            await websocket.send_bytes(message)
+        elif msg_type == MSG_FRAME:
+            await websocket.send_json({
+                "type": "frame",
+                "data": base64.b64encode(payload).decode('utf-8'),
+                "format": meta.get("format", "jpg")
+            })
+        else:
+            await websocket.send_json(meta)
+
+        if msg_type == MSG_FRAME:
+            await bus.publish(_feedback_topic(video_id), pack_message(MSG_CONTROL, {
+                "bytes": len(payload),
+                "seconds": time.monotonic() - started
+            }))
 
 
 @router.websocket("/ws/video-stream/{video_id}")
 async def video_stream_websocket(websocket: WebSocket, video_id: str):
     """
     WebSocket endpoint for streaming annotated video frames during processing
-    
-    Client connects with video_id, and backend sends annotated frames as they're processed
+
+    Client connects with video_id, and backend sends annotated frames as they're processed.
+    Clients offering the "bako.binary.v1" subprotocol get raw JPEG MSG_FRAME messages
+    instead of base64 JSON.
+
+    Frames reach this socket through the frame bus from whichever worker analyzes
+    the video. Slow clients get fewer / lower-quality frames rather than slowing
+    down the analysis.
     """
-    await websocket.accept()
-    logger.info(f"🔌 Video stream WebSocket connected: {video_id}")
-    
+    binary = wants_binary(websocket)
+    await websocket.accept(subprotocol=BINARY_SUBPROTOCOL if binary else None)
+    logger.info(f"🔌 Video stream WebSocket connected: {video_id} ({'binary' if binary else 'json'} mode)")
+
+    subscription = await get_frame_bus().subscribe(video_id)
+    forwarder = asyncio.create_task(_forward(websocket, subscription, video_id, binary))
+
     try:
-        # Store connection
-        active_connections[video_id] = websocket
-        
         # Keep connection alive and wait for frames
         while True:
             # Wait for ping or close message
@@ -40,56 +137,67 @@ async def video_stream_websocket(websocket: WebSocket, video_id: str):
             except:
                 # Connection closed
                 break
-                
+
     except WebSocketDisconnect:
         logger.info(f"🔌 Video stream WebSocket disconnected: {video_id}")
     except Exception as e:
         logger.error(f"WebSocket error for {video_id}: {e}")
     finally:
         # Clean up
-        if video_id in active_connections:
-            del active_connections[video_id]
+        forwarder.cancel()
+        await subscription.close()
+        if subscription.dropped:
+            logger.info(f"📡 {subscription.dropped} stream messages dropped for slow client {video_id}")
         if websocket.client_state == WebSocketState.CONNECTED:
             await websocket.close()
 
 
-async def send_annotated_frame_async(video_id: str, frame: np.ndarray) -> bool:
+def publish_frame(video_id: str, frame: np.ndarray) -> bool:
     """
-    Send an annotated frame to the connected WebSocket client (async version)
-    
+    Offer an annotated frame to the video's stream (non-blocking)
+
+    Only the latest frame is kept; encoding and publishing happen in the
+    stream's sender task. Call end_stream() when the video is done.
+
     Args:
-        video_id: Video ID to identify the connection
-        frame: Annotated frame (BGR format from OpenCV)
-    
+        video_id: Video ID to identify the stream
+        frame: Annotated frame (BGR format from OpenCV), not modified afterwards
+
     Returns:
-        True if sent successfully, False otherwise
+        True once the frame is queued
+    """
+    publisher = frame_publishers.get(video_id)
+    if publisher is None:
+        publisher = frame_publishers[video_id] = _FramePublisher(video_id)
+    publisher.sender.offer(frame)
+    return True
+
+
+async def end_stream(video_id: str):
+    """Stop streaming a video (analysis finished or failed)"""
+    publisher = frame_publishers.pop(video_id, None)
+    if publisher is not None:
+        await publisher.close()
+
+
+async def send_message_async(video_id: str, message: dict) -> bool:
+    """
+    Send a JSON control message (e.g. video_ready) to the video's clients
+
+    Returns:
+        True if at least one subscriber received it, False otherwise
     """
-    if video_id not in active_connections:
-        return False
-    
-    websocket = active_connections[video_id]
-    
     try:
-        # Encode frame to JPEG
-        _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-        
-        # Convert to base64
-        frame_base64 = base64.b64encode(buffer).decode('utf-8')
-        
-        # Send as JSON
-        await websocket.send_json({
-            "type": "frame",
-            "data": frame_base64,
-            "format": "jpg"
-        })
-        
-        return True
+        return await get_frame_bus().publish(video_id, pack_message(MSG_CONTROL, message)) > 0
     except Exception as e:
-        logger.error(f"Failed to send frame for {video_id}: {e}")
+        logger.error(f"Failed to send message for {video_id}: {e}")
         return False
 
 
-def has_connection(video_id: str) -> bool:
-    """Check if there's an active connection for this video_id"""
-    return video_id in active_connections
-
+async def has_connection(video_id: str) -> bool:
+    """Check if any worker holds a client connection for this video_id"""
+    try:
+        return await get_frame_bus().has_subscribers(video_id)
+    except Exception as e:
+        logger.error(f"Frame bus unavailable: {e}")
+        return False
@@ -27,6 +27,10 @@ class Settings(BaseSettings):
     MAX_UPLOAD_SIZE: int = 500 * 1024 * 1024  # 500MB
     ALLOWED_VIDEO_EXTENSIONS: List[str] = [".mp4", ".mov", ".avi", ".mkv"]
     UPLOAD_DIR: str = "uploads"
+    # UPLOAD_DIR quota / eviction (0 = off): LRU beyond the quota, TTL by last access
+    UPLOAD_QUOTA_MB: int = 20 * 1024
+    UPLOAD_TTL_HOURS: float = 72
+    UPLOAD_MIN_FREE_MB: int = 1024  # Free disk space kept in reserve
     RESULTS_DIR: str = "results"
     
     # Model Paths
@@ -38,6 +42,52 @@ class Settings(BaseSettings):
     TARGET_FPS: int = 10  # Process 10 frames per second
     FRAME_SIZE: int = 224  # Model input size
     SEQUENCE_LENGTH: int = 16  # Number of frames for action classification
+    # Long uploads are cut into time shards analyzed by this many worker processes
+    # (each loads its own models; 0 or 1 = off), at least this many seconds per shard
+    ANALYSIS_SHARD_WORKERS: int = 0
+    ANALYSIS_SHARD_MIN_SECONDS: float = 120.0
+    
+    # Annotation renderer: "cached" (default) or "none" to switch drawing off
+    ANNOTATION_RENDERER: str = "cached"
+    # Default for /api/analyze "annotate": False = overlay track only (client-side drawing)
+    ANNOTATE_VIDEO: bool = True
+    
+    # Live analysis: end-to-end lag above which clients are asked to back off
+    LIVE_MAX_LAG_MS: float = 1000.0
+    # Live JPEG frames are decoded at 1/2, 1/4 or 1/8 scale while the long side stays >= this (0 = full decode)
+    LIVE_DECODE_MIN_SIDE: int = 640
+    
+    # Video-stream fan-out between workers: "" = in-process, "redis://host:6379/0" = Redis pub/sub
+    FRAME_BUS_URL: str = ""
+    FRAME_BUS_BUFFER: int = 8  # Messages buffered per subscriber before the oldest are dropped
+    
+    # Local analysis history (SQLite, in RESULTS_DIR): retention by count and age (0 = unlimited)
+    HISTORY_MAX_RECORDS: int = 1000
+    HISTORY_MAX_AGE_DAYS: float = 0
+    HISTORY_CACHE_TTL: float = 10.0  # Seconds a /api/history page is served from memory (0 = no cache)
+    # Supabase inserts are batched: flush at this many rows or when the oldest has waited this long (s)
+    HISTORY_WRITE_BATCH: int = 50
+    HISTORY_WRITE_DELAY: float = 2.0
+    
+    # Per-window timeline summaries: points in the analysis response, cap per /api/timelines
+    # request, and coalesced segments beyond which compact responses only carry the summary
+    TIMELINE_SUMMARY_POINTS: int = 300
+    TIMELINE_MAX_POINTS: int = 5000
+    TIMELINE_MAX_SEGMENTS: int = 500
+    # Stored timelines (RESULTS_DIR/timelines, 0 = off): LRU beyond the quota, TTL by last read
+    TIMELINE_QUOTA_MB: int = 1024
+    TIMELINE_TTL_DAYS: float = 30
+    
+    # Background video uploads: S3-compatible storage (e.g. MinIO, host:port) for parallel
+    # multipart uploads; without it videos go to Supabase Storage when Supabase is enabled
+    STORAGE_S3_ENDPOINT: str = ""
+    STORAGE_S3_ACCESS_KEY: str = ""
+    STORAGE_S3_SECRET_KEY: str = ""
+    STORAGE_S3_SECURE: bool = True
+    STORAGE_PUBLIC_URL: str = ""  # Base of public object URLs (default: the endpoint)
+    UPLOAD_PART_SIZE_MB: int = 8
+    UPLOAD_PARALLEL_PARTS: int = 4
+    UPLOAD_MAX_ATTEMPTS: int = 8
     
     # Performance Thresholds
     CONFIDENCE_THRESHOLD: float = 0.5
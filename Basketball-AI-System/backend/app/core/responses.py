@@ -0,0 +1,121 @@
+"""
+Response Serialization
+Views, field selection and fast JSON encoding for analysis results.
+
+A full VideoAnalysisResult repeats itself: every action embeds its raw
+per-window segments next to the timeline that already covers them, and unset
+optional metrics are sent as nulls. For long videos that grows to megabytes
+of JSON. Views trim it:
+
+- full: everything, as stored.
+- compact (default): actions point into `timeline` through
+  `segment_indices` instead of embedding segments, and null fields are
+  omitted. Past TIMELINE_MAX_SEGMENTS coalesced segments (long game
+  footage) the timeline is left out too; `timeline_summary` stays bounded
+  and /api/timelines serves any range at full resolution.
+- summary: compact without the timeline and keypoints.
+
+`fields=` further limits the response to the named top-level fields.
+Bodies are encoded with orjson when it's installed and gzip-compressed when
+the client accepts it.
+"""
+
+import gzip
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional, Set
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from app.core.config import settings
+from app.core.schemas import VideoAnalysisResult
+
+try:
+    import orjson
+except ImportError:  # Optional: falls back to the standard library encoder
+    orjson = None
+
+VIEWS = ("compact", "summary", "full")
+DEFAULT_VIEW = "compact"
+
+# Bodies smaller than this aren't worth compressing
+GZIP_MIN_SIZE = 1024
+GZIP_LEVEL = 5
+
+_VIEW_EXCLUDES: Dict[str, Optional[dict]] = {
+    "full": None,
+    "compact": {
+        "actions": {"__all__": {"segments"}},
+    },
+    "summary": {
+        "timeline": True,
+        "keypoints": True,
+        "actions": {"__all__": {"segments"}},
+    },
+}
+_LONG_TIMELINE_EXCLUDES = {
+    "timeline": True,
+    "actions": {"__all__": {"segments", "segment_indices"}},
+}
+
+
+def parse_view(view: str = DEFAULT_VIEW, fields: Optional[str] = None) -> Optional[Set[str]]:
+    """
+    Validate the view/fields query options
+
+    Args:
+        view: "compact", "summary" or "full"
+        fields: Comma-separated top-level fields, or None for all
+
+    Returns:
+        Fields to include (always with video_id), or None for all
+
+    Raises:
+        ValueError: Unknown view or field
+    """
+    if view not in VIEWS:
+        raise ValueError(f"Unknown view '{view}'. Use one of: {', '.join(VIEWS)}")
+    if not fields:
+        return None
+    include = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = include - set(VideoAnalysisResult.model_fields)
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(sorted(unknown))}")
+    return include | {"video_id"}
+
+
+def analysis_payload(result: VideoAnalysisResult, view: str = DEFAULT_VIEW,
+                     include: Optional[Set[str]] = None) -> Dict[str, Any]:
+    """Plain dict of an analysis result for a view (see parse_view for include)"""
+    exclude = _VIEW_EXCLUDES[view]
+    if view == "compact" and result.timeline and len(result.timeline) > settings.TIMELINE_MAX_SEGMENTS:
+        exclude = _LONG_TIMELINE_EXCLUDES
+    return result.model_dump(
+        mode="python", include=include, exclude=exclude, exclude_none=view != "full"
+    )
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """JSON-encode content (datetimes as ISO strings)"""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def json_response(content: Any, request: Optional[Request] = None, status_code: int = 200) -> Response:
+    """JSON response, gzip-compressed when the request accepts it and the body is large enough"""
+    body = dumps(content)
+    headers = {}
+    if request is not None and len(body) >= GZIP_MIN_SIZE \
+            and "gzip" in request.headers.get("accept-encoding", "").lower():
+        body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+    return Response(content=body, status_code=status_code, headers=headers, media_type="application/json")
@@ -4,7 +4,7 @@ Skill-Based System: Each action is individually analyzed and validated
 """
 
 from pydantic import BaseModel, Field
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional
 from datetime import datetime
 
 
@@ -130,7 +130,45 @@ class IndividualActionAnalysis(BaseModel):
     shot_outcome: Optional[ShotOutcome] = None
     
     # Timeline segments for this action
-    segments: List[TimelineSegment] = Field(default_factory=list, description="All timeline segments for this action")
+    segments: List[TimelineSegment] = Field(default_factory=list, description="All timeline segments for this action (full view only)")
+    segment_indices: List[int] = Field(default_factory=list, description="Indices of this action's segments in the result timeline")
+
+
+class TimelineRun(BaseModel):
+    """Stretch of the timeline with one (dominant) action"""
+    start_time: float
+    end_time: float
+    label: str
+    confidence: float
+    mix: Optional[Dict[str, float]] = Field(default=None, description="Share of each label when bins were merged")
+
+
+class MetricSeries(BaseModel):
+    """Downsampled metric line: window mid-times and values"""
+    t: List[float]
+    v: List[float]
+
+
+class TimelineSummary(BaseModel):
+    """
+    Bounded summary of the per-window timeline
+    Full resolution and zoomed ranges: GET /api/timelines/{video_id}
+    """
+    start_time: float
+    end_time: float
+    windows: int = Field(description="Per-window segments in the range")
+    resolution: str = Field(description="full, lttb or minmax")
+    runs: List[TimelineRun] = Field(default_factory=list)
+    series: Dict[str, MetricSeries] = Field(default_factory=dict)
+
+
+class LivePose(BaseModel):
+    """
+    Player pose for client-side drawing in keypoint-only live mode
+    Coordinates are normalized (0-1) to the analyzed frame
+    """
+    bbox: List[float] = Field(description="Player box [x1, y1, x2, y2]")
+    landmarks: List[float] = Field(description="33 pose landmarks, flattened [x, y, z, visibility] * 33")
 
 
 class VideoAnalysisResult(BaseModel):
@@ -151,10 +189,17 @@ class VideoAnalysisResult(BaseModel):
     
     # Complete timeline (all segments)
     timeline: Optional[List[TimelineSegment]] = Field(default=None, description="Complete timeline of all actions")
+    timeline_summary: Optional[TimelineSummary] = Field(default=None, description="Label runs and metric series within a point budget")
+    timeline_url: Optional[str] = Field(default=None, description="Per-window timeline at any range/resolution")
     
     # Video output
     annotated_video_url: Optional[str] = None
+    render_url: Optional[str] = Field(default=None, description="POST here to render the annotated video (analysis-only runs)")
+    overlay_url: Optional[str] = Field(default=None, description="Per-frame overlay track (gzipped JSON lines) for client-side drawing")
+    source_video_url: Optional[str] = Field(default=None, description="Original, unannotated video to draw the overlay on")
     annotated_frame: Optional[str] = None  # Base64 string for live analysis
+    annotated_jpeg: Optional[bytes] = Field(default=None, exclude=True)  # Raw JPEG for the binary WebSocket protocol
+    live_pose: Optional[LivePose] = None  # Keypoint-only live mode (drawn by the client)
     keypoints: Optional[List] = None
     
     timestamp: datetime = Field(default_factory=datetime.now)
@@ -180,3 +225,5 @@ class HealthResponse(BaseModel):
     version: str
     models_loaded: bool
     gpu_available: bool
+    inference: Optional[Dict[str, Dict[str, float]]] = Field(default=None, description="Inference queue depth and wait times (ms) per priority class")
+    history_writer: Optional[Dict[str, Any]] = Field(default=None, description="Supabase batch writer queue depth and counters")
@@ -3,9 +3,9 @@ BakoAI - FastAPI Backend
 Main application with video upload and analysis endpoints
 """
 
-from fastapi import FastAPI, File, UploadFile, HTTPException, status, BackgroundTasks, Form
+from fastapi import FastAPI, File, UploadFile, HTTPException, status, BackgroundTasks, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
 import logging
 import torch
@@ -15,12 +15,23 @@ import uuid
 import shutil
 from datetime import datetime
 from typing import Optional
+import asyncio
 import os
 
 from app.core.config import settings
 from app.core.schemas import VideoAnalysisResult, HealthResponse, AnalysisStatus
 from app.services.video_processor import VideoProcessor
 from app.services.supabase_service import supabase_service
+from app.services.overlay_track import is_valid_video_id, track_path
+from app.services.timeline_summary import load_timeline, summarize_timeline, get_timeline_storage
+from app.services.history_store import make_cursor
+from app.services.video_encoder import is_encoding
+from app.services.growing_file import parse_byte_range, read_file_range, tail_growing_file
+from app.services.frame_bus import close_frame_bus
+from app.core.responses import analysis_payload, json_response, parse_view, DEFAULT_VIEW
+from app.services.upload_queue import get_upload_queue, close_upload_queue
+from app.services.video_shards import close_shard_pool
+from app.services.storage_manager import get_storage_manager, InsufficientStorageError
 from app.api import chat, websocket, websocket_video
 
 # Suppress noisy warnings (optional - doesn't affect functionality)
@@ -63,8 +74,17 @@ app.include_router(websocket_video.router)
 # Mount static file serving for annotated videos
 # This allows serving processed videos when Supabase is not available
 @app.get("/api/videos/{filename:path}")
-async def serve_video(filename: str):
-    """Serve annotated videos from uploads directory"""
+async def serve_video(filename: str, request: Request):
+    """
+    Serve annotated videos from uploads directory
+    
+    Finished videos support range requests. A video that is still being encoded
+    (fragmented MP4) is streamed as it grows, so playback can start during analysis;
+    ranges within the bytes written so far are served as 206 with an unknown
+    total length (see growing_file). Neither is cacheable until encoding ends.
+    Once a video has been uploaded to object storage and its local copy is gone,
+    this redirects to the uploaded copy.
+    """
     # Security: Only allow files from uploads directory
     video_path = os.path.join(settings.UPLOAD_DIR, filename)
     
@@ -72,7 +92,44 @@ async def serve_video(filename: str):
     if not os.path.abspath(video_path).startswith(os.path.abspath(settings.UPLOAD_DIR)):
         raise HTTPException(status_code=403, detail="Access denied")
     
-    if not os.path.exists(video_path):
+    if is_encoding(video_path):
+        headers = {"Accept-Ranges": "bytes", "Cache-Control": "no-store"}
+        range_header = request.headers.get("range")
+        if range_header:
+            written = os.path.getsize(video_path) if os.path.exists(video_path) else 0
+            try:
+                byte_range = parse_byte_range(range_header, written)
+            except ValueError:
+                raise HTTPException(
+                    status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                    detail="Range not encoded yet",
+                    headers=headers
+                )
+            if byte_range:
+                start, end = byte_range
+                return StreamingResponse(
+                    read_file_range(video_path, start, end),
+                    status_code=status.HTTP_206_PARTIAL_CONTENT,
+                    media_type="video/mp4",
+                    headers={
+                        **headers,
+                        "Content-Range": f"bytes {start}-{end}/*",
+                        "Content-Length": str(end - start + 1),
+                    }
+                )
+        return StreamingResponse(
+            tail_growing_file(video_path),
+            media_type="video/mp4",
+            headers=headers
+        )
+    
+    if os.path.exists(video_path):
+        get_storage_manager().touch(os.path.basename(video_path))
+    else:
+        upload_queue = get_upload_queue()
+        uploaded_url = upload_queue.uploaded_url(filename) if upload_queue else None
+        if uploaded_url:
+            return RedirectResponse(uploaded_url)
         raise HTTPException(status_code=404, detail="Video not found")
     
     return FileResponse(
@@ -108,12 +165,24 @@ async def startup_event():
         logger.error(f"❌ Failed to initialize video processor: {e}")
         video_processor = None
         app.state.video_processor = None
+    
+    # Resume uploads left pending by the previous run
+    get_upload_queue()
+    # Apply upload-dir and timeline TTL/quota to what the previous run left behind
+    await asyncio.to_thread(get_storage_manager().sweep)
+    await asyncio.to_thread(get_timeline_storage().sweep)
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
     logger.info("🛑 Shutting down Bako Backend...")
+    await close_frame_bus()
+    close_upload_queue()
+    close_shard_pool()
+    supabase_service.close()
+    if video_processor:
+        video_processor.inference.shutdown()
 
 
 @app.get("/")
@@ -134,32 +203,48 @@ async def health_check():
         status="healthy",
         version=settings.APP_VERSION,
         models_loaded=video_processor is not None,
-        gpu_available=torch.cuda.is_available()
+        gpu_available=torch.cuda.is_available(),
+        inference=video_processor.inference.stats() if video_processor else None,
+        history_writer=supabase_service.writer.stats() if supabase_service.writer else None
     )
 
 
-def handle_supabase_upload(file_path: str, filename: str, result: dict):
-    """Background task to upload to Supabase and clean up"""
+def handle_supabase_upload(file_path: str, filename: str, result: dict, keep_file: bool = False,
+                           player_id: Optional[str] = None):
+    """Background task to queue the input video for upload, save the result and clean up
+    
+    keep_file: keep the local upload (analysis-only runs render from it later)
+    """
+    delete_now = not keep_file
     try:
-        # Upload video
-        video_url = supabase_service.upload_video(file_path, filename)
+        # Queue the upload; the queue removes the temp file once it's uploaded
+        video_url = None
+        upload_queue = get_upload_queue()
+        if upload_queue and os.path.exists(file_path):
+            video_url = upload_queue.enqueue(file_path, filename, delete_after=not keep_file)
+            delete_now = False
         
         # Save result
-        supabase_service.save_analysis(result, video_url)
+        supabase_service.save_analysis(result, video_url, player_id=player_id)
         
     except Exception as e:
         logger.error(f"Background Supabase task failed: {e}")
     finally:
         # Clean up temp file
-        if os.path.exists(file_path):
+        if delete_now and os.path.exists(file_path):
             os.remove(file_path)
             logger.info(f"Deleted temp file: {file_path}")
 
 
 @app.post("/api/analyze", response_model=VideoAnalysisResult)
 async def analyze_video(
+    request: Request,
     video: UploadFile = File(...),
     video_id: Optional[str] = Form(None),
+    annotate: Optional[bool] = Form(None),
+    player_id: Optional[str] = Form(None),
+    view: str = DEFAULT_VIEW,
+    fields: Optional[str] = None,
     background_tasks: BackgroundTasks = None
 ):
     """
@@ -169,6 +254,17 @@ async def analyze_video(
     - Action classification (shooting, dribbling, etc.)
     - Performance metrics (jump height, speed, form)
     - AI recommendations
+    
+    With annotate=false no video is burned in: the result links the original
+    video and an overlay track for client-side drawing, and the annotated video
+    can be rendered later via POST /api/videos/{video_id}/render.
+    Defaults to settings.ANNOTATE_VIDEO.
+    
+    player_id groups the saved analysis for GET /api/progress.
+    
+    Query options: view=compact (default; actions reference timeline entries
+    by index), summary (no timeline) or full; fields=a,b limits the response
+    to those top-level fields.
     """
     global video_processor
     if video_processor is None:
@@ -205,9 +301,39 @@ async def analyze_video(
             detail=f"File too large. Max size: {settings.MAX_UPLOAD_SIZE / (1024*1024):.2f}MB"
         )
     
+    if annotate is None:
+        annotate = settings.ANNOTATE_VIDEO
+    
+    # Validate the response shape before doing any work
+    try:
+        include_fields = parse_view(view, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    if not annotate and video_id and not is_valid_video_id(video_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid video_id"
+        )
+    
     # Create temp file
     temp_filename = f"{uuid.uuid4()}{ext}"
     temp_path = os.path.join(settings.UPLOAD_DIR, temp_filename)
+    processed_path = os.path.join(settings.UPLOAD_DIR, f"processed_{temp_filename}")
+    
+    # Room for the upload and its annotated output, held (and both files pinned)
+    # until the request finishes, or fail before writing anything
+    storage = get_storage_manager()
+    try:
+        reservation = await asyncio.to_thread(
+            storage.reserve, len(file_content) * 2, [temp_path, processed_path]
+        )
+    except InsufficientStorageError as e:
+        logger.error(f"❌ Upload storage full: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_507_INSUFFICIENT_STORAGE,
+            detail="Server storage is full. Please try again later."
+        )
     
     try:
         # Save uploaded file
@@ -221,22 +347,28 @@ async def analyze_video(
             video_id = str(uuid.uuid4())
         logger.info(f"📹 Video ID for streaming: {video_id}")
         logger.info(f"   💡 Frontend should connect to: ws://localhost:8000/ws/video-stream/{video_id}")
+        storage.register(temp_path, owner=video_id)
 
         # Process video
         try:
-            result = await video_processor.process_video(temp_path, video_id=video_id)
+            result = await video_processor.process_video(temp_path, video_id=video_id, annotate=annotate)
+            storage.register(processed_path, owner=video_id)
             
             # Upload to Supabase (Background Task)
             if background_tasks:
                 # Convert Pydantic model to dict with JSON-serializable values
                 result_dict = result.model_dump(mode='json') if hasattr(result, 'model_dump') else result.dict()
-                background_tasks.add_task(handle_supabase_upload, temp_path, temp_filename, result_dict)
+                background_tasks.add_task(
+                    handle_supabase_upload, temp_path, temp_filename, result_dict, keep_file=not annotate,
+                    player_id=player_id
+                )
             else:
                 # If no background tasks, clean up immediately
-                if os.path.exists(temp_path):
+                if annotate and os.path.exists(temp_path):
                     os.remove(temp_path)
             
-            return result
+            payload = analysis_payload(result, view, include_fields)
+            return await asyncio.to_thread(json_response, payload, request)
             
         except ValueError as e:
             # Handle specific errors from video processor
@@ -281,6 +413,14 @@ async def analyze_video(
         if os.path.exists(temp_path):
             os.remove(temp_path)
         raise
+    except InsufficientStorageError as e:
+        logger.error(f"❌ Upload storage full: {e}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise HTTPException(
+            status_code=status.HTTP_507_INSUFFICIENT_STORAGE,
+            detail="Server storage is full. Please try again later."
+        )
     except Exception as e:
         logger.error(f"❌ Analysis failed: {e}")
         # Cleanup
@@ -290,6 +430,122 @@ async def analyze_video(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Video analysis failed: {str(e)}"
         )
+    finally:
+        reservation.release()
+
+
+@app.get("/api/storage")
+async def storage_usage():
+    """Upload directory usage, quota and eviction counters"""
+    return await asyncio.to_thread(get_storage_manager().usage)
+
+
+@app.post("/api/videos/{video_id}/render")
+async def render_video(video_id: str):
+    """
+    Render the annotated video for an analysis-only run (annotate=false)
+    from its stored overlay track
+    """
+    if video_processor is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Video processor not initialized. Please try again later."
+        )
+    
+    if not is_valid_video_id(video_id):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid video_id")
+    
+    try:
+        annotated_video_url = await asyncio.to_thread(video_processor.render_annotated_video, video_id)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except InsufficientStorageError as e:
+        logger.error(f"❌ Upload storage full, can't render {video_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_507_INSUFFICIENT_STORAGE,
+            detail="Server storage is full. Please try again later."
+        )
+    except Exception as e:
+        logger.error(f"❌ Render failed for {video_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Video rendering failed: {str(e)}"
+        )
+    
+    if not annotated_video_url:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Annotated video could not be published"
+        )
+    
+    return {"video_id": video_id, "annotated_video_url": annotated_video_url}
+
+
+@app.get("/api/overlays/{video_id}")
+async def get_overlay_track(video_id: str):
+    """
+    Overlay track for client-side drawing over the original video
+    
+    Gzipped JSON lines, sent with Content-Encoding: gzip so browsers decompress it.
+    """
+    if not is_valid_video_id(video_id):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid video_id")
+    
+    path = track_path(video_id)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Overlay track not found")
+    
+    return FileResponse(
+        path,
+        media_type="application/x-ndjson",
+        headers={
+            "Content-Encoding": "gzip",
+            "Cache-Control": "public, max-age=3600"
+        }
+    )
+
+
+@app.get("/api/timelines/{video_id}")
+async def get_timeline(
+    video_id: str,
+    request: Request,
+    points: int = settings.TIMELINE_SUMMARY_POINTS,
+    method: str = "lttb",
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    series: Optional[str] = None
+):
+    """
+    Per-window timeline of an analysis: label runs and metric series
+    
+    points: budget per series and for runs (capped at TIMELINE_MAX_POINTS);
+    0 returns every window. method: lttb or minmax. start/end (seconds)
+    zoom into a range at the same budget. series=a,b limits the metrics.
+    """
+    if not is_valid_video_id(video_id):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid video_id")
+    if points < 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="points must be >= 0")
+    if points:
+        points = min(points, settings.TIMELINE_MAX_POINTS)
+    
+    def build():
+        columns = load_timeline(video_id)
+        if columns is None:
+            return None
+        names = [name.strip() for name in series.split(",") if name.strip()] if series else None
+        return summarize_timeline(columns, points=points, method=method, start=start, end=end, series=names)
+    
+    try:
+        summary = await asyncio.to_thread(build)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if summary is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Timeline not found")
+    
+    response = json_response(summary, request)
+    response.headers["Cache-Control"] = "public, max-age=3600"
+    return response
 
 
 @app.get("/api/results/{video_id}", response_model=VideoAnalysisResult)
@@ -305,25 +561,31 @@ async def get_result(video_id: str):
 
 
 @app.get("/api/history")
-async def get_history(limit: int = 50):
+async def get_history(limit: int = 50, before: Optional[str] = None):
     """
     Get historical analysis results from Supabase database
+    
+    Newest first. For the next page, pass the last item's `cursor` as `before`
+    (a bare `date` still works, but skips records sharing that timestamp).
     """
     try:
         from app.services.supabase_service import supabase_service
         
-        # Get raw data from Supabase
-        raw_history = supabase_service.get_history(limit=limit)
+        # Summary columns only, served from a short-lived cache
+        limit = max(1, min(limit, 200))
+        raw_history = await asyncio.to_thread(supabase_service.get_history, limit, before)
         
         # Transform to match frontend HistoricalData type
         formatted_history = []
         for record in raw_history:
             try:
-                # Extract metrics from raw_result or metrics field
-                metrics_data = record.get('metrics') or record.get('raw_result', {}).get('metrics', {})
+                # Metrics column (summary projection, no raw_result)
+                metrics_data = record.get('metrics') or {}
                 
+                created_at = record.get('created_at', datetime.now().isoformat())
                 formatted_history.append({
-                    "date": record.get('created_at', datetime.now().isoformat()),
+                    "date": created_at,
+                    "cursor": make_cursor(created_at, record.get('id')) if record.get('id') is not None else created_at,
                     "action": record.get('action', 'unknown'),
                     "metrics": {
                         "jump_height": metrics_data.get('jump_height', 0.0),
@@ -347,6 +609,23 @@ async def get_history(limit: int = 50):
         return []
 
 
+@app.get("/api/progress")
+async def get_progress(player_id: Optional[str] = None, action: Optional[str] = None,
+                       days: int = 30, weeks: int = 12):
+    """
+    Get precomputed progress rollups for a player
+    
+    All-time mean/std/min/max, percentiles and trend per week for each metric,
+    plus daily and weekly means for the last `days` / `weeks`. Action defaults
+    to all actions. The response size doesn't grow with history.
+    """
+    days = max(1, min(days, 366))
+    weeks = max(1, min(weeks, 104))
+    return await asyncio.to_thread(
+        supabase_service.progress.summary, player_id, action, days, weeks
+    )
+
+
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,146 @@
+"""
+Action Stats
+Running per-action aggregates over an analysis timeline.
+
+The per-action analysis (average metrics, confidence, duration, form issues
+and strengths) used to be computed at the end of process_video from every
+window of each action. These accumulators keep the same figures as running
+statistics, so the windows themselves can go to a WindowSpill:
+
+- metrics and confidence: running sums
+- form issues: one entry per distinct issue, most frequent first
+- segments: an evenly thinned sample of at most max_segments windows (used
+  for recommendations and the full view). It is every window when the
+  action has fewer than that.
+"""
+
+import logging
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.core.schemas import FormQualityAssessment, FormQualityIssue, PerformanceMetrics, TimelineSegment
+
+logger = logging.getLogger(__name__)
+
+_CORE_METRICS = ("jump_height", "movement_speed", "form_score", "reaction_time", "pose_stability", "energy_efficiency")
+
+
+class ActionAccumulator:
+    """
+    Running aggregates for one action label
+
+    Args:
+        max_segments: Windows kept as a sample (thinned evenly beyond this)
+    """
+
+    def __init__(self, max_segments: int = 100):
+        self.max_segments = max_segments
+        self.count = 0
+        self.total_duration = 0.0
+        self.first_start: Optional[float] = None
+        self._confidence = 0.0
+        self._metrics = dict.fromkeys(_CORE_METRICS, 0.0)
+        self._form_scores = 0.0
+        self._form_count = 0
+        self._issues: Dict[Tuple[str, str], FormQualityIssue] = {}
+        self._issue_counts: Dict[Tuple[str, str], int] = {}
+        self._strengths: Dict[str, None] = {}
+        self._segments: List[TimelineSegment] = []
+        self._stride = 1
+
+    def add(self, segment: TimelineSegment):
+        if self.first_start is None:
+            self.first_start = segment.start_time
+        if self.count % self._stride == 0:
+            self._segments.append(segment)
+            if len(self._segments) >= 2 * self.max_segments:
+                self._segments = self._segments[::2]
+                self._stride *= 2
+        self.count += 1
+        self.total_duration += segment.end_time - segment.start_time
+        self._confidence += segment.action.confidence
+        for name in _CORE_METRICS:
+            self._metrics[name] += getattr(segment.metrics, name)
+        if segment.form_quality:
+            self._form_scores += segment.form_quality.overall_score
+            self._form_count += 1
+            for issue in segment.form_quality.issues:
+                key = (issue.issue_type, issue.severity)
+                self._issues.setdefault(key, issue)
+                self._issue_counts[key] = self._issue_counts.get(key, 0) + 1
+            self._strengths.update(dict.fromkeys(segment.form_quality.strengths))
+
+    @property
+    def confidence(self) -> float:
+        return self._confidence / self.count if self.count else 0.0
+
+    @property
+    def form_score(self) -> Optional[float]:
+        """Average form quality score, or None if no window was assessed"""
+        return self._form_scores / self._form_count if self._form_count else None
+
+    @property
+    def segments(self) -> List[TimelineSegment]:
+        return self._segments
+
+    def metrics(self) -> PerformanceMetrics:
+        """Average of the core metrics (same as VideoProcessor._aggregate_metrics)"""
+        if not self.count:
+            return PerformanceMetrics(**dict.fromkeys(_CORE_METRICS, 0.0))
+        return PerformanceMetrics(**{name: total / self.count for name, total in self._metrics.items()})
+
+    def form_issues(self) -> List[FormQualityIssue]:
+        """Distinct issues, most frequent first"""
+        keys = sorted(self._issues, key=lambda key: -self._issue_counts[key])
+        return [self._issues[key] for key in keys]
+
+    def form_strengths(self) -> List[str]:
+        return list(self._strengths)
+
+    def form_quality(self, fallback_score: float) -> Optional[FormQualityAssessment]:
+        """Aggregate assessment (None if no window had issues or strengths)"""
+        issues, strengths = self.form_issues(), self.form_strengths()
+        if not issues and not strengths:
+            return None
+        score = self.form_score if self.form_score is not None else fallback_score
+        if score >= 0.85:
+            rating = "excellent"
+        elif score >= 0.70:
+            rating = "good"
+        elif score >= 0.50:
+            rating = "needs_improvement"
+        else:
+            rating = "poor"
+        return FormQualityAssessment(overall_score=score, quality_rating=rating, issues=issues, strengths=strengths)
+
+
+class ActionStats:
+    """
+    Running aggregates per action label, in order of first appearance
+
+    Args:
+        ignore: Labels not aggregated (not skills)
+        max_segments: Sample size per action (see ActionAccumulator)
+    """
+
+    def __init__(self, ignore: Tuple[str, ...] = ("idle",), max_segments: int = 100):
+        self.ignore = {label.lower() for label in ignore}
+        self.max_segments = max_segments
+        self._actions: Dict[str, ActionAccumulator] = {}
+
+    def add(self, segment: TimelineSegment):
+        label = segment.action.label
+        if label.lower() in self.ignore:
+            return
+        accumulator = self._actions.get(label)
+        if accumulator is None:
+            accumulator = self._actions[label] = ActionAccumulator(self.max_segments)
+        accumulator.add(segment)
+
+    def items(self) -> Iterator[Tuple[str, ActionAccumulator]]:
+        return iter(self._actions.items())
+
+    def __len__(self) -> int:
+        return len(self._actions)
+
+    def __getitem__(self, label: str) -> ActionAccumulator:
+        return self._actions[label]
@@ -0,0 +1,441 @@
+"""
+Annotation Renderer
+Draws detections, pose, court/hoop overlays and the action banner onto frames.
+
+The cached renderer prepares court/hoop overlays and banner text sprites once per
+state change and only touches the pixels they cover, instead of re-filtering the
+court lines and blending full-frame copies on every frame.
+"""
+
+import cv2
+import numpy as np
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from app.core.schemas import FormQualityAssessment
+
+logger = logging.getLogger(__name__)
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+BANNER_PADDING = 10
+BANNER_DIM_ALPHA = 0.4  # Frame weight inside the semi-transparent black banner boxes
+
+
+class _Sprite:
+    """
+    Pre-rendered overlay placed at a frame offset
+
+    Only the covered pixels are stored: their coordinates, the coverage (alpha)
+    and the color as rendered on black (i.e. premultiplied by alpha), so blitting
+    blends exactly the pixels the drawing primitives would have touched.
+    """
+
+    __slots__ = ("x", "y", "h", "w", "ys", "xs", "alpha", "premultiplied")
+
+    def __init__(self, x: int, y: int, pixels: np.ndarray, coverage: np.ndarray):
+        self.x = x
+        self.y = y
+        self.h, self.w = coverage.shape[:2]
+        self.ys, self.xs = np.nonzero(coverage)
+        self.alpha = coverage[self.ys, self.xs].astype(np.uint16)[:, None]
+        self.premultiplied = pixels[self.ys, self.xs].astype(np.uint16)
+
+    def blit(self, frame: np.ndarray, x: Optional[int] = None, y: Optional[int] = None):
+        """Alpha-blend the sprite into the frame in place (clipped to frame bounds)"""
+        x = self.x if x is None else x
+        y = self.y if y is None else y
+        if len(self.ys) == 0:
+            return
+
+        fh, fw = frame.shape[:2]
+        ys, xs = self.ys + y, self.xs + x
+        alpha, premultiplied = self.alpha, self.premultiplied
+        if x < 0 or y < 0 or x + self.w > fw or y + self.h > fh:
+            inside = (ys >= 0) & (ys < fh) & (xs >= 0) & (xs < fw)
+            ys, xs, alpha, premultiplied = ys[inside], xs[inside], alpha[inside], premultiplied[inside]
+
+        background = frame[ys, xs].astype(np.uint16)
+        blended = (background * (255 - alpha) + 127) // 255 + premultiplied
+        frame[ys, xs] = np.minimum(blended, 255).astype(np.uint8)
+
+
+def _dim_region(frame: np.ndarray, x1: int, y1: int, x2: int, y2: int):
+    """Darken an (inclusive) box in place - same result as blending a black box at 60% opacity"""
+    fh, fw = frame.shape[:2]
+    x1, y1 = max(x1, 0), max(y1, 0)
+    x2, y2 = min(x2 + 1, fw), min(y2 + 1, fh)
+    if x1 >= x2 or y1 >= y2:
+        return
+    frame[y1:y2, x1:x2] = cv2.convertScaleAbs(frame[y1:y2, x1:x2], alpha=BANNER_DIM_ALPHA)
+
+
+def filter_court_lines(line_list: List, min_length: float = 150, max_count: int = 8) -> List:
+    """Filter lines by length and keep the longest `max_count`"""
+    filtered = []
+    for line in line_list:
+        x1, y1, x2, y2 = line
+        length = ((x2 - x1) ** 2 + (y2 - y1) ** 2) ** 0.5
+        if length >= min_length:
+            filtered.append((line, length))
+    filtered.sort(key=lambda x: x[1], reverse=True)
+    return [line for line, _ in filtered[:max_count]]
+
+
+def court_line_primitives(court_info: Optional[Dict]) -> List[Tuple[Tuple[int, int, int, int], Tuple[int, int, int], int]]:
+    """
+    Select the court lines worth drawing
+
+    Returns:
+        List of ((x1, y1, x2, y2), color, thickness)
+    """
+    if not court_info or not court_info.get("lines"):
+        return []
+
+    lines = court_info["lines"]
+    primitives = []
+
+    # Horizontal lines (court boundaries, center line, free throw line) - yellow
+    for line in filter_court_lines(lines.get("horizontal", []), min_length=200, max_count=5):
+        x1, y1, x2, y2 = map(int, line)
+        if abs(y2 - y1) < 20:  # Nearly horizontal
+            primitives.append(((x1, y1, x2, y2), (0, 255, 255), 2))
+
+    # Vertical lines (sidelines) - cyan
+    for line in filter_court_lines(lines.get("vertical", []), min_length=150, max_count=4):
+        x1, y1, x2, y2 = map(int, line)
+        if abs(x2 - x1) < 20:  # Nearly vertical
+            primitives.append(((x1, y1, x2, y2), (255, 255, 0), 2))
+
+    # Diagonal lines (3-point arc, free throw arc) - green, thinner
+    for line in filter_court_lines(lines.get("diagonal", []), min_length=100, max_count=6):
+        x1, y1, x2, y2 = map(int, line)
+        primitives.append(((x1, y1, x2, y2), (0, 255, 0), 1))
+
+    return primitives
+
+
+def action_color(action: str) -> Tuple[int, int, int]:
+    """Banner text color for an action label"""
+    action_lower = action.lower()
+    if 'shot' in action_lower or 'free_throw' in action_lower or 'layup' in action_lower or 'dunk' in action_lower:
+        return (255, 100, 100)  # Red for shooting
+    elif 'dribbl' in action_lower:
+        return (100, 255, 100)  # Green for dribbling
+    elif 'pass' in action_lower:
+        return (100, 100, 255)  # Blue for passing
+    elif 'defense' in action_lower:
+        return (255, 255, 100)  # Yellow for defense
+    return (200, 200, 200)  # Gray for other actions
+
+
+def form_quality_badge(quality_rating: str) -> Tuple[str, Tuple[int, int, int]]:
+    """Banner text and color for a form quality rating"""
+    if quality_rating == "excellent":
+        return "✓ Excellent Form", (0, 255, 0)
+    elif quality_rating == "good":
+        return "✓ Good Form", (0, 255, 255)
+    elif quality_rating == "needs_improvement":
+        return "⚠ Needs Improvement", (0, 165, 255)
+    return "✗ Poor Form", (0, 0, 255)
+
+
+class AnnotationRenderer:
+    """
+    Base renderer interface
+
+    Subclasses draw onto the frame; `render` returns the annotated frame.
+    """
+
+    enabled = True
+
+    def render(
+        self,
+        frame: np.ndarray,
+        detections: List[Dict],
+        pose_landmarks,
+        basketball_detections: Optional[List[Dict]] = None,
+        court_info: Optional[Dict] = None,
+        hoop_info: Optional[Dict] = None,
+        current_action: Optional[str] = None,
+        action_confidence: float = 0.0,
+        form_quality: Optional[FormQualityAssessment] = None,
+        in_place: bool = False
+    ) -> np.ndarray:
+        raise NotImplementedError
+
+
+class NullAnnotationRenderer(AnnotationRenderer):
+    """Renderer used when annotation is switched off - returns frames untouched"""
+
+    enabled = False
+
+    def render(self, frame: np.ndarray, *args, **kwargs) -> np.ndarray:
+        return frame
+
+
+class CachedAnnotationRenderer(AnnotationRenderer):
+    """
+    Renderer that caches everything that only changes on state updates:
+    - court line selection + overlay sprite (rebuilt when court_info changes)
+    - hoop overlay sprite (rebuilt when hoop_info changes)
+    - banner text sprites (LRU by text/style)
+    Per-frame work is limited to boxes, pose and in-place ROI blends.
+    """
+
+    def __init__(self, mp_drawing=None, mp_pose=None, landmark_style=None, max_text_sprites: int = 256):
+        self.mp_drawing = mp_drawing
+        self.mp_pose = mp_pose
+        self.landmark_style = landmark_style
+        self.max_text_sprites = max_text_sprites
+
+        self._court_key = None
+        self._court_info_ref: Optional[Dict] = None
+        self._court_sprite: Optional[_Sprite] = None
+        self._hoop_key = None
+        self._hoop_info_ref: Optional[Dict] = None
+        self._hoop_sprite: Optional[_Sprite] = None
+        self._text_sprites: "OrderedDict[Tuple, Tuple[_Sprite, int, int, int]]" = OrderedDict()
+
+    # ------------------------------------------------------------------
+    # Cached overlays
+    # ------------------------------------------------------------------
+
+    def _get_court_sprite(self, court_info: Dict, frame_shape: Tuple[int, ...]) -> Optional[_Sprite]:
+        # court_info is replaced (new dict) whenever the detector refreshes it,
+        # so identity + frame size is a sufficient cache key
+        key = (id(court_info), frame_shape[:2])
+        if self._court_key == key and self._court_info_ref is court_info:
+            return self._court_sprite
+
+        primitives = court_line_primitives(court_info)
+        sprite = None
+        if primitives:
+            fh, fw = frame_shape[:2]
+            xs = [p for (x1, _, x2, _), _, t in primitives for p in (x1 - t, x2 + t)]
+            ys = [p for (_, y1, _, y2), _, t in primitives for p in (y1 - t, y2 + t)]
+            ox, oy = max(min(xs), 0), max(min(ys), 0)
+            ex, ey = min(max(xs) + 1, fw), min(max(ys) + 1, fh)
+            if ex > ox and ey > oy:
+                pixels = np.zeros((ey - oy, ex - ox, 3), dtype=np.uint8)
+                mask = np.zeros((ey - oy, ex - ox), dtype=np.uint8)
+                for (x1, y1, x2, y2), color, thickness in primitives:
+                    p1, p2 = (x1 - ox, y1 - oy), (x2 - ox, y2 - oy)
+                    cv2.line(pixels, p1, p2, color, thickness)
+                    cv2.line(mask, p1, p2, 255, thickness)
+                sprite = _Sprite(ox, oy, pixels, mask)
+
+        self._court_key = key
+        self._court_info_ref = court_info
+        self._court_sprite = sprite
+        return sprite
+
+    def _get_hoop_sprite(self, hoop_info: Dict, frame_shape: Tuple[int, ...]) -> Optional[_Sprite]:
+        key = (id(hoop_info), frame_shape[:2])
+        if self._hoop_key == key and self._hoop_info_ref is hoop_info:
+            return self._hoop_sprite
+
+        center = hoop_info["center"]
+        x1, y1, x2, y2 = hoop_info["bbox"]
+        cx, cy = int(center[0]), int(center[1])
+        radius = int(max((x2 - x1), (y2 - y1)) // 2)
+
+        (label_w, label_h), label_base = cv2.getTextSize("HOOP", FONT, 0.6, 2)
+        label_org = (cx - 20, cy - radius - 10)
+
+        # Sprite bounds cover the circle (+ stroke) and the label
+        ox = min(cx - radius - 3, label_org[0] - 2)
+        oy = min(cy - radius - 3, label_org[1] - label_h - 2)
+        ex = max(cx + radius + 4, label_org[0] + label_w + 3)
+        ey = max(cy + radius + 4, label_org[1] + label_base + 3)
+
+        pixels = np.zeros((ey - oy, ex - ox, 3), dtype=np.uint8)
+        mask = np.zeros((ey - oy, ex - ox), dtype=np.uint8)
+        for canvas, color in ((pixels, (0, 255, 255)), (mask, 255)):
+            cv2.circle(canvas, (cx - ox, cy - oy), radius, color, 3)
+            cv2.putText(canvas, "HOOP", (label_org[0] - ox, label_org[1] - oy), FONT, 0.6, color, 2)
+
+        self._hoop_key = key
+        self._hoop_info_ref = hoop_info
+        self._hoop_sprite = _Sprite(ox, oy, pixels, mask)
+        return self._hoop_sprite
+
+    def _get_text_sprite(self, text: str, font_scale: float, color: Tuple[int, int, int], thickness: int):
+        """
+        Returns:
+            (sprite, text_width, text_height, baseline) - sprite x/y are offsets from the text origin
+        """
+        key = (text, font_scale, color, thickness)
+        cached = self._text_sprites.get(key)
+        if cached is not None:
+            self._text_sprites.move_to_end(key)
+            return cached
+
+        (text_w, text_h), baseline = cv2.getTextSize(text, FONT, font_scale, thickness)
+        # Margin so strokes that spill past the nominal text box are kept
+        margin = thickness + 1
+        h = text_h + baseline + 2 * margin
+        w = text_w + 2 * margin
+        pixels = np.zeros((h, w, 3), dtype=np.uint8)
+        mask = np.zeros((h, w), dtype=np.uint8)
+        origin = (margin, text_h + margin)
+        cv2.putText(pixels, text, origin, FONT, font_scale, color, thickness)
+        cv2.putText(mask, text, origin, FONT, font_scale, 255, thickness)
+
+        entry = (_Sprite(-origin[0], -origin[1], pixels, mask), text_w, text_h, baseline)
+        self._text_sprites[key] = entry
+        if len(self._text_sprites) > self.max_text_sprites:
+            self._text_sprites.popitem(last=False)
+        return entry
+
+    def reset(self):
+        """Drop cached overlays (e.g. between videos)"""
+        self._court_key = None
+        self._court_info_ref = None
+        self._court_sprite = None
+        self._hoop_key = None
+        self._hoop_info_ref = None
+        self._hoop_sprite = None
+
+    # ------------------------------------------------------------------
+    # Drawing
+    # ------------------------------------------------------------------
+
+    def _draw_banner(
+        self,
+        frame: np.ndarray,
+        current_action: str,
+        action_confidence: float,
+        form_quality: Optional[FormQualityAssessment]
+    ):
+        """Draw action label + form quality indicator in the top-left corner"""
+        padding = BANNER_PADDING
+
+        label_text = current_action.replace('_', ' ').title()
+        if action_confidence > 0:
+            label_text += f" ({action_confidence:.0%})"
+
+        sprite, text_width, text_height, _ = self._get_text_sprite(label_text, 0.8, action_color(current_action), 2)
+
+        box_x1 = padding
+        box_y1 = padding
+        box_x2 = box_x1 + text_width + padding * 2
+        box_y2 = box_y1 + text_height + padding * 2
+
+        _dim_region(frame, box_x1, box_y1, box_x2, box_y2)
+        text_y = box_y1 + text_height + padding
+        sprite.blit(frame, box_x1 + padding + sprite.x, text_y + sprite.y)
+
+        if not form_quality:
+            return
+
+        quality_rating = form_quality.quality_rating
+        quality_text, quality_color = form_quality_badge(quality_rating)
+        q_sprite, quality_width, quality_height, _ = self._get_text_sprite(quality_text, 0.6, quality_color, 1)
+
+        quality_y = box_y2 + padding + text_height
+        quality_box_x2 = box_x1 + quality_width + padding * 2
+        quality_box_y2 = quality_y + quality_height + padding
+
+        _dim_region(frame, box_x1, box_y2 + padding, quality_box_x2, quality_box_y2)
+        q_sprite.blit(frame, box_x1 + padding + q_sprite.x, quality_y + quality_height + q_sprite.y)
+
+        # Show top issue if form needs improvement
+        if form_quality.issues and quality_rating in ["needs_improvement", "poor"]:
+            top_issue = form_quality.issues[0]
+            issue_text = f"Fix: {top_issue.issue_type.replace('_', ' ').title()}"
+            i_sprite, issue_width, issue_height, _ = self._get_text_sprite(issue_text, 0.5, quality_color, 1)
+
+            issue_y = quality_box_y2 + padding + quality_height
+            issue_box_x2 = box_x1 + issue_width + padding * 2
+            issue_box_y2 = issue_y + issue_height + padding
+
+            _dim_region(frame, box_x1, quality_box_y2 + padding, issue_box_x2, issue_box_y2)
+            i_sprite.blit(frame, box_x1 + padding + i_sprite.x, issue_y + issue_height + i_sprite.y)
+
+    def render(
+        self,
+        frame: np.ndarray,
+        detections: List[Dict],
+        pose_landmarks,
+        basketball_detections: Optional[List[Dict]] = None,
+        court_info: Optional[Dict] = None,
+        hoop_info: Optional[Dict] = None,
+        current_action: Optional[str] = None,
+        action_confidence: float = 0.0,
+        form_quality: Optional[FormQualityAssessment] = None,
+        in_place: bool = False
+    ) -> np.ndarray:
+        """Draw bounding boxes, pose landmarks, court/hoop overlays and action labels"""
+        annotated_frame = frame if in_place else frame.copy()
+
+        # Pose landmarks
+        if pose_landmarks and self.mp_drawing is not None:
+            self.mp_drawing.draw_landmarks(
+                annotated_frame,
+                pose_landmarks,
+                self.mp_pose.POSE_CONNECTIONS,
+                landmark_drawing_spec=self.landmark_style
+            )
+
+        # Player bounding boxes (green)
+        for det in detections or []:
+            x1, y1, x2, y2 = map(int, det['bbox'])
+            cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+            cv2.putText(annotated_frame, f"{det['class']} {det['confidence']:.2f}", (x1, y1 - 10),
+                        FONT, 0.5, (0, 255, 0), 2)
+
+        # Basketball bounding boxes (orange, lighter when predicted)
+        for det in basketball_detections or []:
+            is_predicted = det.get('predicted', False)
+            x1, y1, x2, y2 = map(int, det['bbox'])
+            color, thickness = ((0, 200, 255), 2) if is_predicted else ((0, 165, 255), 3)
+
+            cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), color, thickness)
+            label = f"{det['class']} {det['confidence']:.2f}"
+            if is_predicted:
+                label += " (pred)"
+            cv2.putText(annotated_frame, label, (x1, y1 - 10), FONT, 0.5, color, 2)
+
+            radius = max(5, min((x2 - x1), (y2 - y1)) // 4)
+            cv2.circle(annotated_frame, ((x1 + x2) // 2, (y1 + y2) // 2), radius, color, 2 if is_predicted else 3)
+
+            if det.get('shot_zone'):
+                zone_label = det['shot_zone'].replace('_', ' ').title()
+                cv2.putText(annotated_frame, zone_label, (x1, y2 + 20), FONT, 0.5, color, 2)
+
+        # Court lines and hoop (prepared once per detection refresh)
+        if court_info and court_info.get("lines"):
+            sprite = self._get_court_sprite(court_info, annotated_frame.shape)
+            if sprite is not None:
+                sprite.blit(annotated_frame)
+
+        if hoop_info:
+            self._get_hoop_sprite(hoop_info, annotated_frame.shape).blit(annotated_frame)
+
+        # Current action + form quality banner
+        if current_action:
+            self._draw_banner(annotated_frame, current_action, action_confidence, form_quality)
+
+        return annotated_frame
+
+
+def create_annotation_renderer(
+    name: str,
+    mp_drawing=None,
+    mp_pose=None,
+    landmark_style=None
+) -> AnnotationRenderer:
+    """
+    Build the renderer selected in settings
+
+    Args:
+        name: "cached" (default) or "none" to switch annotation off
+    """
+    name = (name or "cached").lower()
+    if name in ("none", "off", "disabled"):
+        logger.info("🎨 Annotation rendering disabled")
+        return NullAnnotationRenderer()
+    if name != "cached":
+        logger.warning(f"⚠️  Unknown annotation renderer '{name}', using 'cached'")
+    return CachedAnnotationRenderer(mp_drawing, mp_pose, landmark_style)
@@ -0,0 +1,248 @@
+"""
+Batch Writer
+Coalesces analysis rows into multi-row inserts off the caller's thread.
+
+save_analysis used to run a table-existence probe and then a single-row
+insert per analysis, on the caller's thread. Rows now go into a durable
+outbox table in the local SQLite database. A writer thread drains the outbox
+in batches: it flushes when batch_size rows are waiting or the oldest row is
+max_delay seconds old. When the backend is unreachable, rows simply stay in
+the outbox. The writer backs off and replays the backlog, oldest first, once
+inserts succeed again. Pending rows survive restarts.
+
+A failed batch is bisected down to the rows that fail on their own, so one
+bad row neither holds back nor uses up the attempts of the rows around it.
+Only the failing rows accrue attempts and back off individually; the whole
+writer backs off only when nothing in the batch got through. Halves of a
+batch can therefore be sent more than once, so insert_rows must be
+idempotent (e.g. an upsert on a client-generated id).
+"""
+
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    row TEXT NOT NULL,
+    queued_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    retry_at REAL NOT NULL DEFAULT 0
+);
+"""
+
+
+class BatchWriter:
+    """
+    Durable, batching row writer in front of a remote insert
+
+    Args:
+        insert_rows: Inserts a list of rows in one request; raises on failure.
+            Must be idempotent: rows of a partly failed batch are sent again
+        db_path: SQLite file holding the outbox
+        batch_size: Rows per insert; a full batch flushes immediately
+        max_delay: Seconds a row may wait for its batch to fill
+        retry_delay: First back-off after a failed insert (doubles per failure)
+        max_retry_delay: Back-off cap in seconds
+        max_attempts: Failed inserts after which a row is dropped (it stays in local history)
+        max_backlog: Oldest rows beyond this many are dropped while the backend is down
+        on_written: Called after each successful batch (e.g. to invalidate read caches)
+    """
+
+    def __init__(self, insert_rows: Callable[[List[Dict[str, Any]]], None], db_path: str,
+                 batch_size: int = 50, max_delay: float = 2.0, retry_delay: float = 5.0,
+                 max_retry_delay: float = 300.0, max_attempts: int = 20, max_backlog: int = 10000,
+                 on_written: Optional[Callable[[], None]] = None):
+        self.insert_rows = insert_rows
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.max_attempts = max_attempts
+        self.max_backlog = max_backlog
+        self.on_written = on_written
+
+        self._cond = threading.Condition()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(outbox)")}
+        if "retry_at" not in columns:  # Outboxes created before per-row back-off
+            self._conn.execute("ALTER TABLE outbox ADD COLUMN retry_at REAL NOT NULL DEFAULT 0")
+        self._failures = 0
+        self._retry_at = 0.0
+        self._flush_requested = False
+        self._written = 0
+        self._batches = 0
+        self._dropped = 0
+        self._last_error: Optional[str] = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="batch-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, row: Dict[str, Any]):
+        """Queue a row; returns once it's durable in the outbox"""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Batch writer is closed")
+            self._conn.execute("INSERT INTO outbox (row, queued_at) VALUES (?, ?)",
+                               (json.dumps(row, ensure_ascii=False), time.time()))
+            self._cond.notify()
+
+    def depth(self) -> int:
+        """Rows waiting in the outbox (buffered or backlogged)"""
+        with self._cond:
+            return self._depth()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "queued": self._depth(),
+                "written": self._written,
+                "batches": self._batches,
+                "dropped": self._dropped,
+                "failures": self._failures,
+                "last_error": self._last_error,
+            }
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Write everything now (ignoring batch size and delay, not back-off); True once empty"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify_all()
+            while self._depth():
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def close(self, timeout: float = 5.0):
+        """Flush what the backend accepts within timeout; the rest stays for the next start"""
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        if not self._thread.is_alive():
+            self._conn.close()
+
+    def _depth(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def _wait_time(self) -> Optional[float]:
+        """Seconds until the next batch is due (0 = now, None = nothing queued); caller holds the lock"""
+        if not self._depth():
+            return None
+        now = time.time()
+        if now < self._retry_at:
+            return self._retry_at - now
+        due, oldest = self._conn.execute(
+            "SELECT COUNT(*), MIN(queued_at) FROM outbox WHERE retry_at <= ?", (now,)
+        ).fetchone()
+        if not due:
+            # Only rows backing off on their own are left
+            next_retry = self._conn.execute("SELECT MIN(retry_at) FROM outbox").fetchone()[0]
+            return max(0.0, next_retry - now)
+        if due >= self.batch_size or self._flush_requested:
+            return 0.0
+        return max(0.0, oldest + self.max_delay - now)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed:
+                    wait = self._wait_time()
+                    if wait == 0.0:
+                        break
+                    self._cond.wait(wait)
+                if self._closed:
+                    return
+                rows = self._conn.execute(
+                    "SELECT id, row FROM outbox WHERE retry_at <= ? ORDER BY id LIMIT ?",
+                    (time.time(), self.batch_size)
+                ).fetchall()
+
+            ids, failed, error = self._insert([(row_id, json.loads(data)) for row_id, data in rows])
+            if failed:
+                self._on_failure(failed, error, outage=not ids)
+            if not ids:
+                continue
+
+            with self._cond:
+                self._conn.execute(f"DELETE FROM outbox WHERE id IN ({','.join('?' * len(ids))})", ids)
+                if self._failures:
+                    logger.info(f"✅ Backend reachable again, replaying {self._depth()} queued row(s)")
+                self._failures = 0
+                self._retry_at = 0.0
+                self._written += len(ids)
+                self._batches += 1
+                if not self._depth():
+                    self._flush_requested = False
+                self._cond.notify_all()
+            if self.on_written:
+                self.on_written()
+
+    def _insert(self, rows: List[Tuple[int, Dict[str, Any]]]) -> Tuple[List[int], List[int], Optional[Exception]]:
+        """
+        Insert rows, bisecting a failed batch
+
+        Returns:
+            (written outbox ids, ids of rows that failed on their own, last error)
+        """
+        try:
+            self.insert_rows([row for _, row in rows])
+            return [row_id for row_id, _ in rows], [], None
+        except Exception as e:
+            if len(rows) == 1:
+                return [], [rows[0][0]], e
+        middle = len(rows) // 2
+        written, failed, error = self._insert(rows[:middle])
+        written_rest, failed_rest, error_rest = self._insert(rows[middle:])
+        return written + written_rest, failed + failed_rest, error_rest or error
+
+    def _on_failure(self, ids: List[int], error: Exception, outage: bool):
+        """Count an attempt for rows that failed on their own; back off entirely on an outage"""
+        with self._cond:
+            now = time.time()
+            self._last_error = str(error)
+            placeholders = ",".join("?" * len(ids))
+            if outage:
+                self._failures += 1
+                delay = min(self.retry_delay * (2 ** (self._failures - 1)), self.max_retry_delay)
+                self._retry_at = now + delay
+                self._conn.execute(f"UPDATE outbox SET attempts = attempts + 1 WHERE id IN ({placeholders})", ids)
+            else:
+                # Per-row back-off: retry_delay, doubling per attempt the row has already failed
+                self._conn.execute(
+                    f"UPDATE outbox SET attempts = attempts + 1, "
+                    f"retry_at = ? + MIN(?, ? * (1 << attempts)) WHERE id IN ({placeholders})",
+                    (now, self.max_retry_delay, self.retry_delay, *ids),
+                )
+                delay = self._conn.execute(
+                    f"SELECT MIN(retry_at) FROM outbox WHERE id IN ({placeholders})", ids
+                ).fetchone()[0] - now
+            dropped = self._conn.execute("DELETE FROM outbox WHERE attempts >= ?", (self.max_attempts,)).rowcount
+            dropped += self._conn.execute(
+                "DELETE FROM outbox WHERE id <= (SELECT id FROM outbox ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                (self.max_backlog,),
+            ).rowcount
+            self._dropped += dropped
+            depth = self._depth()
+            self._cond.notify_all()
+        if outage:
+            logger.warning(f"⚠️  Batch insert of {len(ids)} row(s) failed, {depth} queued, "
+                           f"retrying in {delay:.0f}s: {error}")
+        else:
+            logger.warning(f"⚠️  {len(ids)} row(s) rejected by the backend, {depth} queued, "
+                           f"retrying them in {delay:.0f}s: {error}")
+        if dropped:
+            logger.warning(f"⚠️  Dropped {dropped} row(s) from the outbox (kept in local history)")
@@ -0,0 +1,260 @@
+"""
+Frame Bus
+Pub/sub between analysis workers and the processes holding video-stream
+WebSockets.
+
+The worker analyzing a video is usually not the one holding the client's
+/ws/video-stream/{video_id} socket (several uvicorn workers, several hosts).
+Workers publish packed binary-protocol messages on the video's topic; socket
+holders subscribe and forward them.
+
+Every subscription has a bounded buffer. A slow subscriber loses its oldest
+messages instead of stalling publishers or growing memory.
+
+Backends:
+- InProcessFrameBus: single process (default, no extra services)
+- RedisFrameBus: Redis pub/sub (FRAME_BUS_URL=redis://...), or any client
+  object exposing the redis.asyncio publish/pubsub/pubsub_numsub API
+"""
+
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Set
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+TOPIC_PREFIX = "bako:video-stream:"
+
+
+class Subscription:
+    """
+    Bounded, drop-oldest message buffer for one subscriber of one topic
+
+    Args:
+        topic: Subscribed topic
+        maxlen: Messages buffered before the oldest are dropped
+    """
+
+    def __init__(self, topic: str, maxlen: int):
+        self.topic = topic
+        self._buffer: Deque[bytes] = deque(maxlen=maxlen)
+        self._available = asyncio.Event()
+        self._bus: Optional["FrameBus"] = None
+        self.closed = False
+        self.dropped = 0
+
+    def deliver(self, message: bytes):
+        if self.closed:
+            return
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+        self._buffer.append(message)
+        self._available.set()
+
+    async def get(self) -> Optional[bytes]:
+        """Next message, oldest first; None once the subscription is closed"""
+        while not self._buffer:
+            if self.closed:
+                return None
+            self._available.clear()
+            await self._available.wait()
+        return self._buffer.popleft()
+
+    async def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._available.set()
+        if self._bus is not None:
+            await self._bus._unsubscribe(self)
+
+
+class FrameBus:
+    """
+    Base class for frame bus backends
+
+    Args:
+        buffer_size: Default per-subscription buffer length
+    """
+
+    def __init__(self, buffer_size: int = 8):
+        self.buffer_size = buffer_size
+        self._subscriptions: Dict[str, Set[Subscription]] = {}
+
+    async def publish(self, topic: str, message: bytes) -> int:
+        """Publish a message; returns the number of subscribers that received it"""
+        raise NotImplementedError
+
+    async def has_subscribers(self, topic: str) -> bool:
+        """Whether anyone (in any process) listens on the topic"""
+        raise NotImplementedError
+
+    async def subscribe(self, topic: str, maxlen: Optional[int] = None) -> Subscription:
+        subscription = Subscription(topic, maxlen or self.buffer_size)
+        subscription._bus = self
+        subscribers = self._subscriptions.setdefault(topic, set())
+        subscribers.add(subscription)
+        if len(subscribers) == 1:
+            await self._on_first_subscriber(topic)
+        return subscription
+
+    async def close(self):
+        for subscribers in list(self._subscriptions.values()):
+            for subscription in list(subscribers):
+                await subscription.close()
+
+    def _dispatch(self, topic: str, message: bytes) -> int:
+        subscribers = self._subscriptions.get(topic, ())
+        for subscription in subscribers:
+            subscription.deliver(message)
+        return len(subscribers)
+
+    async def _unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscriptions.get(subscription.topic)
+        if not subscribers or subscription not in subscribers:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscriptions[subscription.topic]
+            await self._on_last_unsubscribe(subscription.topic)
+
+    async def _on_first_subscriber(self, topic: str):
+        pass
+
+    async def _on_last_unsubscribe(self, topic: str):
+        pass
+
+
+class InProcessFrameBus(FrameBus):
+    """Frame bus for a single process"""
+
+    async def publish(self, topic: str, message: bytes) -> int:
+        return self._dispatch(topic, message)
+
+    async def has_subscribers(self, topic: str) -> bool:
+        return bool(self._subscriptions.get(topic))
+
+
+class RedisFrameBus(FrameBus):
+    """
+    Frame bus over Redis pub/sub
+
+    One pub/sub connection per process carries all of its subscribed topics;
+    a reader task fans incoming messages out to the local subscriptions.
+
+    Args:
+        client: redis.asyncio.Redis (or compatible) client
+        buffer_size: Default per-subscription buffer length
+        prefix: Channel name prefix
+    """
+
+    def __init__(self, client: Any, buffer_size: int = 8, prefix: str = TOPIC_PREFIX):
+        super().__init__(buffer_size)
+        self.client = client
+        self.prefix = prefix
+        self._pubsub = None
+        self._reader: Optional[asyncio.Task] = None
+
+    def _channel(self, topic: str) -> str:
+        return self.prefix + topic
+
+    async def publish(self, topic: str, message: bytes) -> int:
+        return await self.client.publish(self._channel(topic), message)
+
+    async def has_subscribers(self, topic: str) -> bool:
+        counts = await self.client.pubsub_numsub(self._channel(topic))
+        return any(count > 0 for _, count in counts)
+
+    async def _on_first_subscriber(self, topic: str):
+        if self._pubsub is None:
+            self._pubsub = self.client.pubsub()
+        await self._pubsub.subscribe(self._channel(topic))
+        if self._reader is None:
+            self._reader = asyncio.create_task(self._read())
+
+    async def _on_last_unsubscribe(self, topic: str):
+        if self._pubsub is not None:
+            await self._pubsub.unsubscribe(self._channel(topic))
+
+    async def _read(self):
+        """Fan messages from the shared pub/sub connection out to local subscriptions"""
+        while True:
+            try:
+                if not self._subscriptions:
+                    await asyncio.sleep(0.1)
+                    continue
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Frame bus read failed: {e}")
+                await asyncio.sleep(1.0)
+                continue
+            if not message or message.get("type") != "message":
+                continue
+            channel = message["channel"]
+            if isinstance(channel, bytes):
+                channel = channel.decode()
+            if channel.startswith(self.prefix):
+                self._dispatch(channel[len(self.prefix):], message["data"])
+
+    async def close(self):
+        await super().close()
+        if self._reader is not None:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except asyncio.CancelledError:
+                pass
+            self._reader = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+
+
+def create_frame_bus(url: Optional[str] = None, buffer_size: Optional[int] = None) -> FrameBus:
+    """
+    Frame bus for the configured backend
+
+    Args:
+        url: FRAME_BUS_URL; "redis://..." selects Redis, empty means in-process
+        buffer_size: Per-subscription buffer length (FRAME_BUS_BUFFER)
+    """
+    url = settings.FRAME_BUS_URL if url is None else url
+    buffer_size = buffer_size or settings.FRAME_BUS_BUFFER
+
+    if url and url.startswith(("redis://", "rediss://", "unix://")):
+        try:
+            import redis.asyncio as redis_asyncio
+        except ImportError as e:
+            raise RuntimeError("FRAME_BUS_URL points to Redis but the 'redis' package is not installed") from e
+        logger.info(f"📡 Frame bus: Redis ({url.split('@')[-1]})")
+        return RedisFrameBus(redis_asyncio.from_url(url), buffer_size)
+
+    if url:
+        raise ValueError(f"Unsupported FRAME_BUS_URL: {url}")
+    if settings.WORKERS > 1:
+        logger.warning("⚠️  In-process frame bus with several workers: live previews only reach "
+                       "clients connected to the analyzing worker (set FRAME_BUS_URL)")
+    return InProcessFrameBus(buffer_size)
+
+
+_frame_bus: Optional[FrameBus] = None
+
+
+def get_frame_bus() -> FrameBus:
+    """Process-wide frame bus, created on first use"""
+    global _frame_bus
+    if _frame_bus is None:
+        _frame_bus = create_frame_bus()
+    return _frame_bus
+
+
+async def close_frame_bus():
+    global _frame_bus
+    if _frame_bus is not None:
+        await _frame_bus.close()
+        _frame_bus = None
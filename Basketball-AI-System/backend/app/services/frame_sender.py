@@ -0,0 +1,168 @@
+"""
+Latest Frame Sender
+Decoupled, adaptive delivery of annotated frames to one streaming client.
+
+The analysis loop only drops its newest annotated frame into a single-slot
+mailbox (never blocks, never encodes). A per-connection task takes the latest
+frame, JPEG-encodes it in a worker thread and sends it. Frames produced while a
+send is in flight simply replace each other, so a slow client gets fewer,
+fresher frames instead of slowing the analysis down.
+
+Send rate and JPEG quality follow the client's measured throughput: measured
+around each send, or reported via record_delivery() when the client is reached
+through the frame bus.
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Smoothing factor for throughput / frame size averages
+_EWMA_ALPHA = 0.3
+
+
+def encode_jpeg(frame: np.ndarray, quality: int) -> bytes:
+    """BGR frame -> JPEG bytes"""
+    ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+    if not ok:
+        raise ValueError("JPEG encoding failed")
+    return buffer.tobytes()
+
+
+class LatestFrameSender:
+    """
+    Single-slot mailbox plus sender task for one connection
+
+    Args:
+        send: Coroutine delivering one JPEG to the client
+        max_fps: Upper bound on frames sent per second
+        min_fps: Lower bound on frames sent per second, however slow the client
+        max_quality: JPEG quality used while the client keeps up
+        min_quality: Lowest JPEG quality used for slow clients
+        measure_send: Derive throughput from send() duration; False when
+            deliveries are reported through record_delivery()
+    """
+
+    def __init__(self, send: Callable[[bytes], Awaitable[None]], max_fps: float = 10.0,
+                 min_fps: float = 2.0, max_quality: int = 85, min_quality: int = 50,
+                 measure_send: bool = True):
+        self._send = send
+        self.measure_send = measure_send
+        self.min_interval = 1.0 / max_fps
+        self.max_interval = 1.0 / min_fps
+        self.max_quality = max_quality
+        self.min_quality = min_quality
+
+        self.quality = max_quality
+        self.interval = self.min_interval
+
+        self._pending: Optional[np.ndarray] = None
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+
+        self.offered = 0
+        self.sent = 0
+        self.replaced = 0   # Frames overwritten in the mailbox before being sent
+        self.failed = 0
+        self.deliveries = 0
+        self.throughput_bps = 0.0   # Measured client throughput (bytes/s)
+        self.avg_frame_bytes = 0.0
+
+    def start(self):
+        """Start the sender task (requires a running event loop)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def offer(self, frame: np.ndarray):
+        """
+        Hand over the newest annotated frame (non-blocking)
+
+        The frame must not be modified by the caller afterwards.
+        """
+        if self._closed:
+            return
+        if self._pending is not None:
+            self.replaced += 1
+        self._pending = frame
+        self.offered += 1
+        self._wakeup.set()
+
+    async def close(self):
+        """Stop the sender task; a frame still in the mailbox is discarded"""
+        self._closed = True
+        self._pending = None
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while not self._closed:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            frame, self._pending = self._pending, None
+            if frame is None:
+                continue
+
+            started = loop.time()
+            try:
+                jpeg = await asyncio.to_thread(encode_jpeg, frame, self.quality)
+                send_started = loop.time()
+                await self._send(jpeg)
+                self.sent += 1
+                if self.measure_send:
+                    self.record_delivery(len(jpeg), loop.time() - send_started)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                logger.debug(f"Frame send failed: {e}")
+
+            # Pace to the adapted rate; newer frames keep replacing the mailbox meanwhile
+            remaining = self.interval - (loop.time() - started)
+            if remaining > 0:
+                await asyncio.sleep(remaining)
+
+    def record_delivery(self, size: int, seconds: float):
+        """Update throughput estimate from one delivered frame and adapt interval / quality"""
+        bps = size / max(seconds, 1e-4)
+        self.deliveries += 1
+        if self.deliveries == 1:
+            self.throughput_bps, self.avg_frame_bytes = bps, float(size)
+        else:
+            self.throughput_bps += _EWMA_ALPHA * (bps - self.throughput_bps)
+            self.avg_frame_bytes += _EWMA_ALPHA * (size - self.avg_frame_bytes)
+
+        # Time the client needs per frame at the current size
+        needed = self.avg_frame_bytes / max(self.throughput_bps, 1.0)
+        if needed > self.min_interval:
+            # Client can't take max_fps: send smaller frames first, then fewer
+            if self.quality > self.min_quality:
+                self.quality = max(self.min_quality, self.quality - 10)
+            self.interval = min(self.max_interval, max(self.min_interval, needed * 1.2))
+        elif needed < self.min_interval / 2:
+            # Plenty of headroom: recover quality, then rate
+            if self.quality < self.max_quality:
+                self.quality = min(self.max_quality, self.quality + 5)
+            self.interval = max(self.min_interval, self.interval * 0.8)
+
+    def stats(self) -> dict:
+        return {
+            "offered": self.offered,
+            "sent": self.sent,
+            "replaced": self.replaced,
+            "failed": self.failed,
+            "quality": self.quality,
+            "fps": round(1.0 / self.interval, 1),
+            "throughput_kbps": round(self.throughput_bps * 8 / 1000, 1),
+        }
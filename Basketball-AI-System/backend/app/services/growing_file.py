@@ -0,0 +1,89 @@
+"""
+Growing File
+Serving an annotated video while its encoder is still appending to it.
+
+A fragmented MP4 that is still being encoded has no final length yet. Without
+a Range header it is streamed as it grows, until the encoder finishes. With
+one, the bytes already written are served as a 206 with an unknown complete
+length (Content-Range: bytes a-b/*), so players can seek and probe during
+analysis. A range that starts past what's written is unsatisfiable for now.
+"""
+
+import os
+import asyncio
+from typing import AsyncIterator, Optional, Tuple
+
+import aiofiles
+
+from app.services.video_encoder import is_encoding
+
+CHUNK_SIZE = 256 * 1024
+
+
+def parse_byte_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    (first, last) byte of a single Range header, clamped to size bytes
+
+    Returns:
+        None when the header isn't a single byte range (serve the whole file)
+
+    Raises:
+        ValueError: If the range starts at or past size (416)
+    """
+    unit, _, spec = header.strip().partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, dash, last = (part.strip() for part in spec.partition("-"))
+    if not dash or not (first or last) or any(part and not part.isdigit() for part in (first, last)):
+        return None
+    if not first:
+        # Suffix range: the last n bytes
+        length = int(last)
+        if length == 0 or size <= 0:
+            raise ValueError(f"Unsatisfiable range: {header}")
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = int(last) if last else None
+    if end is not None and end < start:
+        return None
+    if start >= size:
+        raise ValueError(f"Unsatisfiable range: {header}")
+    return start, size - 1 if end is None else min(end, size - 1)
+
+
+async def read_file_range(path: str, start: int, end: int, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Bytes start..end (inclusive) of a file"""
+    async with aiofiles.open(path, "rb") as f:
+        await f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await f.read(min(chunk_size, remaining))
+            if not chunk:
+                return
+            remaining -= len(chunk)
+            yield chunk
+
+
+async def tail_growing_file(path: str, chunk_size: int = CHUNK_SIZE,
+                            poll_interval: float = 0.25) -> AsyncIterator[bytes]:
+    """Stream a file that is still being written, until its encoder finishes"""
+    # ffmpeg may not have created the file yet
+    while not os.path.exists(path):
+        if not is_encoding(path):
+            return
+        await asyncio.sleep(poll_interval)
+
+    async with aiofiles.open(path, "rb") as f:
+        while True:
+            chunk = await f.read(chunk_size)
+            if chunk:
+                yield chunk
+                continue
+            if not is_encoding(path):
+                # Encoder finished - drain anything written since the last read
+                while True:
+                    chunk = await f.read(chunk_size)
+                    if not chunk:
+                        return
+                    yield chunk
+            await asyncio.sleep(poll_interval)
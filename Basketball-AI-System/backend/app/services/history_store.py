@@ -0,0 +1,184 @@
+"""
+History Store
+Embedded local store for analysis history.
+
+Local history used to live in a single results/history.json that was loaded,
+prepended to, truncated and rewritten (and fsynced) on every save, and parsed
+in full on every read. This keeps it in SQLite in WAL mode instead: a save is
+one indexed INSERT, reads walk the primary key newest-first with LIMIT, and
+retention (by record count and/or age) is an indexed DELETE. SQLite's journal
+handles crash safety, so there is no corruption-recovery path to maintain.
+"""
+
+import os
+import json
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_CURSOR_SEPARATOR = "|"
+
+
+def make_cursor(created_at: str, record_id: Any) -> str:
+    """Keyset cursor of a history record: "created_at|id" (id breaks timestamp ties)"""
+    return f"{created_at}{_CURSOR_SEPARATOR}{record_id}"
+
+
+def parse_cursor(cursor: str) -> Tuple[str, Optional[str]]:
+    """
+    (created_at, id) of a cursor from make_cursor
+
+    A bare timestamp (older clients) gives id None: strictly-before paging.
+    """
+    created_at, _, record_id = cursor.rpartition(_CURSOR_SEPARATOR)
+    if not created_at:
+        return cursor, None
+    return created_at, record_id or None
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT NOT NULL,
+    action TEXT,
+    metrics TEXT,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS history_created_at ON history (created_at);
+"""
+
+
+class HistoryStore:
+    """
+    Append-only analysis history in a local SQLite database
+
+    Args:
+        path: Database file
+        max_records: Keep at most this many records (0 = no count limit)
+        max_age_days: Drop records older than this (0 = no age limit)
+        legacy_json_path: Old history.json to import once, if present
+    """
+
+    def __init__(self, path: str, max_records: int = 1000, max_age_days: float = 0,
+                 legacy_json_path: Optional[str] = None):
+        self.path = path
+        self.max_records = max_records
+        self.max_age_days = max_age_days
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # One connection shared by request handlers and worker threads, serialized by the lock
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+        if legacy_json_path and os.path.exists(legacy_json_path):
+            self._import_legacy(legacy_json_path)
+
+    def append(self, record: Dict[str, Any]) -> int:
+        """Store a record (newest) and apply retention; returns its id"""
+        with self._lock:
+            row_id = self._insert(record)
+            self._prune()
+            return row_id
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Newest-first records, each with its store id"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, record FROM history ORDER BY id DESC LIMIT ?", (limit,)
+            ).fetchall()
+        records = []
+        for row_id, data in rows:
+            record = json.loads(data)
+            record["id"] = row_id
+            records.append(record)
+        return records
+
+    def summaries(self, limit: int = 50, before: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Newest-first (id, created_at, action, metrics) rows without the full record
+
+        Args:
+            limit: Page size
+            before: Keyset cursor (make_cursor of the last record of the previous
+                page); only records after it in (created_at, id) order
+        """
+        query = "SELECT id, created_at, action, metrics FROM history"
+        params: list = []
+        if before:
+            created_at, record_id = parse_cursor(before)
+            if record_id is not None and record_id.isdigit():
+                query += " WHERE created_at < ? OR (created_at = ? AND id < ?)"
+                params += [created_at, created_at, int(record_id)]
+            else:
+                query += " WHERE created_at < ?"
+                params.append(created_at)
+        query += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [
+            {"id": row_id, "created_at": created_at, "action": action,
+             "metrics": json.loads(metrics) if metrics else None}
+            for row_id, created_at, action, metrics in rows
+        ]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _insert(self, record: Dict[str, Any]) -> int:
+        """Insert one record; caller holds the lock"""
+        metrics = record.get("metrics")
+        cursor = self._conn.execute(
+            "INSERT INTO history (created_at, action, metrics, record) VALUES (?, ?, ?, ?)",
+            (record.get("created_at") or datetime.now().isoformat(), record.get("action"),
+             json.dumps(metrics, ensure_ascii=False) if metrics is not None else None,
+             json.dumps(record, ensure_ascii=False)),
+        )
+        return cursor.lastrowid
+
+    def _prune(self):
+        """Apply count/age retention; caller holds the lock"""
+        if self.max_records > 0:
+            self._conn.execute(
+                "DELETE FROM history WHERE id <= "
+                "(SELECT id FROM history ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                (self.max_records,),
+            )
+        if self.max_age_days > 0:
+            cutoff = (datetime.now() - timedelta(days=self.max_age_days)).isoformat()
+            self._conn.execute("DELETE FROM history WHERE created_at < ?", (cutoff,))
+
+    def _import_legacy(self, json_path: str):
+        """One-time import of the old newest-first history.json"""
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                history = json.load(f)
+            if not isinstance(history, list):
+                history = []
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️  Could not import legacy history {json_path}: {e}")
+            history = []
+
+        records = [record for record in reversed(history) if isinstance(record, dict)]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            for record in records:
+                self._insert(record)
+            self._prune()
+            self._conn.execute("COMMIT")
+        os.replace(json_path, json_path + ".migrated")
+        logger.info(f"✅ Imported {len(records)} records from {json_path} into {self.path}")
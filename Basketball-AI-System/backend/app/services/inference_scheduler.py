@@ -0,0 +1,200 @@
+"""
+Inference Scheduler
+Single owner of model execution, with priority between live and batch work.
+
+Live /ws/analyze windows and /api/analyze uploads share the same detector,
+pose and classifier instances. All model calls are submitted here as work
+items tagged with a priority class and a session id, and run one at a time on
+a dedicated inference thread (the models are not thread-safe). Live items are
+served before batch items; within a class, sessions take turns so one busy
+session (a long upload, a fast camera) can't monopolize the models. Batch
+work still gets a slot after a burst of live items, so it never starves.
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_LIVE = "live"
+PRIORITY_BATCH = "batch"
+PRIORITY_CLASSES = (PRIORITY_LIVE, PRIORITY_BATCH)
+
+# Smoothing factor for queue-wait / run-time averages
+_EWMA_ALPHA = 0.1
+
+
+class _WorkItem:
+    __slots__ = ("fn", "args", "kwargs", "future", "enqueued_at")
+
+    def __init__(self, fn: Callable, args: tuple, kwargs: dict):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future: Future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+class _ClassStats:
+    __slots__ = ("completed", "avg_wait_ms", "max_wait_ms", "avg_run_ms")
+
+    def __init__(self):
+        self.completed = 0
+        self.avg_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.avg_run_ms = 0.0
+
+    def record(self, wait_ms: float, run_ms: float):
+        self.completed += 1
+        if self.completed == 1:
+            self.avg_wait_ms, self.avg_run_ms = wait_ms, run_ms
+        else:
+            self.avg_wait_ms += _EWMA_ALPHA * (wait_ms - self.avg_wait_ms)
+            self.avg_run_ms += _EWMA_ALPHA * (run_ms - self.avg_run_ms)
+        self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+
+
+class InferenceScheduler:
+    """
+    Priority + per-session round-robin queue in front of one inference thread
+
+    Args:
+        max_live_burst: Live items served back to back before a waiting batch
+            item gets a turn
+    """
+
+    def __init__(self, max_live_burst: int = 8):
+        self.max_live_burst = max_live_burst
+        # Per class: session id -> pending items, in round-robin order
+        self._queues: Dict[str, "OrderedDict[str, Deque[_WorkItem]]"] = {
+            priority: OrderedDict() for priority in PRIORITY_CLASSES
+        }
+        self._stats = {priority: _ClassStats() for priority in PRIORITY_CLASSES}
+        self._cond = threading.Condition()
+        self._live_burst = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="inference", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn: Callable, *args, priority: str = PRIORITY_BATCH, session_id: str = "default",
+               **kwargs) -> Future:
+        """Queue fn(*args, **kwargs) for the inference thread"""
+        if priority not in self._queues:
+            raise ValueError(f"Unknown priority class: {priority}")
+        item = _WorkItem(fn, args, kwargs)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Inference scheduler is shut down")
+            self._queues[priority].setdefault(session_id, deque()).append(item)
+            self._cond.notify()
+        return item.future
+
+    async def run(self, fn: Callable, *args, priority: str = PRIORITY_BATCH, session_id: str = "default",
+                  **kwargs) -> Any:
+        """Run fn on the inference thread and await its result"""
+        return await asyncio.wrap_future(
+            self.submit(fn, *args, priority=priority, session_id=session_id, **kwargs)
+        )
+
+    def queued(self, priority: str) -> int:
+        with self._cond:
+            return sum(len(items) for items in self._queues[priority].values())
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Queue depth, completed items and queue-wait / run time (ms) per priority class"""
+        with self._cond:
+            return {
+                priority: {
+                    "queued": sum(len(items) for items in self._queues[priority].values()),
+                    "sessions": len(self._queues[priority]),
+                    "completed": stats.completed,
+                    "avg_wait_ms": round(stats.avg_wait_ms, 1),
+                    "max_wait_ms": round(stats.max_wait_ms, 1),
+                    "avg_run_ms": round(stats.avg_run_ms, 1),
+                }
+                for priority, stats in self._stats.items()
+            }
+
+    def shutdown(self, timeout: float = 5.0):
+        """Stop accepting work, cancel what's queued and stop the thread"""
+        with self._cond:
+            self._closed = True
+            for sessions in self._queues.values():
+                for items in sessions.values():
+                    for item in items:
+                        item.future.cancel()
+                sessions.clear()
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def _next_item(self):
+        """Pick the next (priority, item); caller holds the lock"""
+        live = self._queues[PRIORITY_LIVE]
+        batch = self._queues[PRIORITY_BATCH]
+        if live and not (batch and self._live_burst >= self.max_live_burst):
+            priority, sessions = PRIORITY_LIVE, live
+            self._live_burst += 1
+        elif batch:
+            priority, sessions = PRIORITY_BATCH, batch
+            self._live_burst = 0
+        else:
+            return None, None
+
+        # Round-robin: take from the first session, then move it to the back
+        session_id, items = next(iter(sessions.items()))
+        item = items.popleft()
+        if items:
+            sessions.move_to_end(session_id)
+        else:
+            del sessions[session_id]
+        return priority, item
+
+    def _run(self):
+        while True:
+            with self._cond:
+                priority, item = self._next_item()
+                while item is None:
+                    if self._closed:
+                        return
+                    self._cond.wait()
+                    priority, item = self._next_item()
+
+            if not item.future.set_running_or_notify_cancel():
+                continue
+            started = time.monotonic()
+            try:
+                result = item.fn(*item.args, **item.kwargs)
+            except BaseException as e:
+                item.future.set_exception(e)
+            else:
+                item.future.set_result(result)
+            finished = time.monotonic()
+            with self._cond:
+                self._stats[priority].record((started - item.enqueued_at) * 1000.0,
+                                             (finished - started) * 1000.0)
+
+
+class InlineInference:
+    """
+    InferenceScheduler's interface, running each call directly on the caller's thread
+
+    For processes where one analysis owns the models (shard workers): there is
+    nothing to schedule, so no queue and no inference thread.
+    """
+
+    async def run(self, fn: Callable, *args, priority: str = PRIORITY_BATCH, session_id: str = "default",
+                  **kwargs) -> Any:
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"Unknown priority class: {priority}")
+        return fn(*args, **kwargs)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {}
+
+    def shutdown(self, timeout: float = 5.0):
+        pass
@@ -0,0 +1,87 @@
+"""
+JPEG Decode
+Reduced-resolution decoding for live frames.
+
+libjpeg(-turbo) can decode a JPEG directly at 1/2, 1/4 or 1/8 scale by
+skipping DCT coefficients (cv2.IMREAD_REDUCED_COLOR_*), which is several times
+cheaper than a full decode followed by a resize. Live analysis only needs the
+detector's input resolution, so frames are decoded at the smallest scale that
+keeps the long side at or above a target; a full decode remains available for
+high-resolution crops.
+"""
+
+import logging
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+# Start-of-frame markers carrying the image size (baseline, progressive, ...)
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def jpeg_dimensions(data) -> Optional[Tuple[int, int]]:
+    """(width, height) from the JPEG header, or None if data isn't a parseable JPEG"""
+    view = memoryview(data)
+    if len(view) < 4 or view[0] != 0xFF or view[1] != 0xD8:
+        return None
+    pos = 2
+    while pos + 4 <= len(view):
+        if view[pos] != 0xFF:
+            return None
+        marker = view[pos + 1]
+        if marker == 0xFF:  # Fill byte
+            pos += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:  # Standalone markers
+            pos += 2
+            continue
+        length = (view[pos + 2] << 8) | view[pos + 3]
+        if marker in _SOF_MARKERS:
+            if pos + 9 > len(view):
+                return None
+            height = (view[pos + 5] << 8) | view[pos + 6]
+            width = (view[pos + 7] << 8) | view[pos + 8]
+            return width, height
+        pos += 2 + length
+    return None
+
+
+def choose_reduction(width: int, height: int, min_long_side: int) -> int:
+    """Largest decode reduction (1, 2, 4, 8) keeping the long side >= min_long_side"""
+    if min_long_side <= 0:
+        return 1
+    long_side = max(width, height)
+    for factor in (8, 4, 2):
+        if long_side // factor >= min_long_side:
+            return factor
+    return 1
+
+
+def decode_jpeg(data, min_long_side: int = 0) -> Tuple[Optional[np.ndarray], int]:
+    """
+    Decode an encoded frame, reduced in the DCT domain where possible
+
+    Args:
+        data: Encoded image bytes (JPEG; other formats are decoded in full)
+        min_long_side: Smallest acceptable long side; 0 decodes at full resolution
+
+    Returns:
+        (BGR frame or None, reduction factor applied)
+    """
+    buffer = np.frombuffer(data, np.uint8)
+    factor = 1
+    if min_long_side > 0:
+        dimensions = jpeg_dimensions(data)
+        if dimensions:
+            factor = choose_reduction(dimensions[0], dimensions[1], min_long_side)
+    return cv2.imdecode(buffer, _REDUCED_FLAGS[factor]), factor
@@ -0,0 +1,67 @@
+"""
+Live Frame Cache
+Per-session cache of per-frame detection + pose results for live analysis.
+
+Live windows overlap (16 frames, sliding by 8), so without a cache every frame
+is detected and posed twice. Results are keyed by the frame's sequence number
+within the session; a frame with no player detected is cached as None.
+"""
+
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class LiveFrameCache:
+    """
+    Per-frame results for one live session, keyed by frame sequence number
+
+    Args:
+        max_entries: Upper bound on cached frames (oldest evicted first)
+    """
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, seq: int) -> bool:
+        return seq in self._entries
+
+    def get_or_compute(self, seq: int, compute: Callable[[], Optional[Any]]) -> Optional[Any]:
+        """Return the cached result for seq, computing (and caching) it on first use"""
+        value = self._entries.get(seq, _MISSING)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = compute()
+        self._entries[seq] = value
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return value
+
+    def prune(self, before_seq: int):
+        """Drop results for frames older than before_seq (no longer in any window)"""
+        while self._entries:
+            oldest = next(iter(self._entries))
+            if oldest >= before_seq:
+                break
+            del self._entries[oldest]
+
+    def clear(self):
+        self._entries.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
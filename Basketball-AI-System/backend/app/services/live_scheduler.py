@@ -0,0 +1,167 @@
+"""
+Live Frame Scheduler
+Latest-wins frame scheduling and backpressure for one live analysis session.
+
+Received frames go into a bounded window (one analysis window long). When
+analysis is slower than the client's send rate, the oldest frames that were
+never analyzed are dropped, so every window reflects the most recent moment.
+Frames are kept encoded until a window actually needs them, so dropped frames
+cost no decode time.
+
+The scheduler also tracks end-to-end lag (frame received -> result sent) and
+produces hints asking the client to lower its capture rate / resolution.
+"""
+
+import time
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Smoothing factor for processing time / lag averages
+_EWMA_ALPHA = 0.3
+
+
+class LiveFrame:
+    """A received frame, decoded lazily"""
+
+    __slots__ = ("frame_id", "data", "received_at", "client_ts", "frame", "full_data")
+
+    def __init__(self, frame_id: int, data: Any, received_at: float, client_ts: Optional[float] = None,
+                 frame: Any = None):
+        self.frame_id = frame_id
+        self.data = data              # Encoded frame (bytes or base64 text), None if already decoded
+        self.received_at = received_at
+        self.client_ts = client_ts    # Client capture timestamp, echoed back in results
+        self.frame = frame            # Decoded BGR frame, once needed
+        self.full_data = None         # Encoded bytes kept when frame was decoded at reduced scale
+
+
+class LiveFrameScheduler:
+    """
+    Bounded, latest-wins window of frames for one live session
+
+    Args:
+        window_size: Frames per analysis window
+        stride: New frames required before the next window is analyzed
+        target_lag_ms: Lag above which the client is asked to back off
+        hint_interval_s: Minimum time between repeated backpressure hints
+    """
+
+    def __init__(self, window_size: int = 16, stride: int = 8, target_lag_ms: float = 1000.0,
+                 hint_interval_s: float = 2.0):
+        self.window_size = window_size
+        self.stride = stride
+        self.target_lag_ms = target_lag_ms
+        self.hint_interval_s = hint_interval_s
+
+        self._frames: Deque[LiveFrame] = deque(maxlen=window_size)
+        self._unprocessed = 0  # Frames in the window not yet part of an analyzed window
+        self._first_window_done = False
+
+        self.received = 0
+        self.dropped = 0
+        self.windows = 0
+        self.avg_processing_ms = 0.0
+        self.avg_lag_ms = 0.0
+        self.last_lag_ms = 0.0
+
+        self._last_hint_at = 0.0
+        self._throttled = False
+        self._dropped_at_last_hint = 0
+
+    def push(self, frame: LiveFrame):
+        """Add a received frame; drops the oldest unanalyzed frame if the window is full"""
+        if len(self._frames) == self._frames.maxlen and self._unprocessed >= self._frames.maxlen:
+            self.dropped += 1
+        self._frames.append(frame)
+        self._unprocessed = min(self._unprocessed + 1, self.window_size)
+        self.received += 1
+
+    @property
+    def ready(self) -> bool:
+        """A full window with at least `stride` new frames (any new frame for the first window)"""
+        if len(self._frames) < self.window_size:
+            return False
+        return self._unprocessed >= (self.stride if self._first_window_done else 1)
+
+    def take_window(self) -> List[LiveFrame]:
+        """Most recent window_size frames, oldest first"""
+        self._unprocessed = 0
+        self._first_window_done = True
+        return list(self._frames)
+
+    def record_result(self, window: List[LiveFrame], processing_ms: float) -> Dict[str, Any]:
+        """
+        Record a finished window
+
+        Returns:
+            Timing info to send with the result
+        """
+        newest = window[-1]
+        lag_ms = (time.monotonic() - newest.received_at) * 1000.0
+        self.windows += 1
+        self.last_lag_ms = lag_ms
+        if self.windows == 1:
+            self.avg_processing_ms, self.avg_lag_ms = processing_ms, lag_ms
+        else:
+            self.avg_processing_ms += _EWMA_ALPHA * (processing_ms - self.avg_processing_ms)
+            self.avg_lag_ms += _EWMA_ALPHA * (lag_ms - self.avg_lag_ms)
+        return {
+            "frame_id": newest.frame_id,
+            "frame_ts": newest.client_ts,
+            "server_lag_ms": round(lag_ms, 1),
+            "processing_ms": round(processing_ms, 1),
+            "dropped_frames": self.dropped,
+        }
+
+    def suggested_interval_ms(self) -> float:
+        """Send interval the server can keep up with (stride frames per analysis)"""
+        return self.avg_processing_ms / max(1, self.stride)
+
+    def backpressure_hint(self) -> Optional[Dict[str, Any]]:
+        """
+        Control message for the client, or None if nothing changed
+
+        "reduce" when lag exceeds the target or frames are being dropped,
+        "ok" once the session has recovered.
+        """
+        now = time.monotonic()
+        dropping = self.dropped > self._dropped_at_last_hint
+        overloaded = self.avg_lag_ms > self.target_lag_ms or dropping
+
+        if overloaded and (not self._throttled or now - self._last_hint_at >= self.hint_interval_s):
+            self._throttled = True
+            self._last_hint_at = now
+            self._dropped_at_last_hint = self.dropped
+            interval_ms = self.suggested_interval_ms()
+            hint = {
+                "type": "backpressure",
+                "status": "reduce",
+                "lag_ms": round(self.avg_lag_ms, 1),
+                "dropped_frames": self.dropped,
+                "suggested_interval_ms": round(interval_ms),
+            }
+            # Analysis this slow is dominated by per-frame cost - smaller frames help
+            if interval_ms > 200:
+                hint["suggested_max_width"] = 480
+            logger.info(f"⚠️  Live session overloaded: lag {self.avg_lag_ms:.0f}ms, "
+                        f"{self.dropped} frames dropped")
+            return hint
+
+        if not overloaded and self._throttled and self.avg_lag_ms < self.target_lag_ms / 2:
+            self._throttled = False
+            self._last_hint_at = now
+            return {"type": "backpressure", "status": "ok", "lag_ms": round(self.avg_lag_ms, 1)}
+
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "received": self.received,
+            "dropped": self.dropped,
+            "windows": self.windows,
+            "avg_processing_ms": round(self.avg_processing_ms, 1),
+            "avg_lag_ms": round(self.avg_lag_ms, 1),
+        }
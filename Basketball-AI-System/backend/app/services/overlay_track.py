@@ -0,0 +1,302 @@
+"""
+Overlay Track
+Compact per-frame record of everything the annotation renderer draws
+(detections, pose landmarks, ball track, court/hoop, current action).
+
+Stored as gzipped JSON lines next to the analysis results. The frontend draws
+it over the untouched original video (served at /api/overlays/{video_id}), and
+an annotated video can still be rendered from it on request.
+
+Line types:
+    {"k": "header", ...}                       - first line, video properties
+    {"k": "court", "f": 12, "v": {...}}         - court lines changed at frame 12
+    {"k": "hoop", "f": 12, "v": {...}}          - hoop changed at frame 12
+    {"k": "action", "f": 16, "v": [...]}        - current action/form changed
+    {"k": "frame", "f": 17, "t": 0.567, ...}    - per-frame detections/landmarks
+                                                  at timestamp t (seconds)
+"""
+
+import gzip
+import json
+import os
+import re
+import shutil
+import logging
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.schemas import FormQualityAssessment, FormQualityIssue
+
+logger = logging.getLogger(__name__)
+
+TRACK_VERSION = 2  # v2: frame records carry their timestamp
+TRACKS_DIR = os.path.join(settings.RESULTS_DIR, "tracks")
+_VIDEO_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def is_valid_video_id(video_id: str) -> bool:
+    """Video IDs become file names - only allow simple identifiers"""
+    return bool(video_id) and bool(_VIDEO_ID_PATTERN.match(video_id))
+
+
+def track_path(video_id: str) -> str:
+    """Path of the overlay track for a video"""
+    if not is_valid_video_id(video_id):
+        raise ValueError(f"Invalid video id: {video_id!r}")
+    return os.path.join(TRACKS_DIR, f"{video_id}.jsonl.gz")
+
+
+def shard_track_path(video_id: str, shard_index: int) -> str:
+    """Path of one shard's part of an overlay track (see merge_overlay_tracks)"""
+    return track_path(video_id)[:-len(".jsonl.gz")] + f".shard{shard_index:03d}.jsonl.gz"
+
+
+def merge_overlay_tracks(paths: List[str], out_path: str):
+    """
+    Concatenate the tracks of consecutive time shards into one track
+
+    The first header is kept. Each shard's track starts with its own court,
+    hoop and action state, so the records can simply follow each other.
+    """
+    tmp_path = out_path + ".tmp"
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    try:
+        with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=5) as out:
+            for i, path in enumerate(paths):
+                with gzip.open(path, "rt", encoding="utf-8") as f:
+                    header = f.readline()
+                    if i == 0:
+                        out.write(header)
+                    shutil.copyfileobj(f, out)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, out_path)
+
+
+def _round_list(values, digits: int) -> List[float]:
+    return [round(float(v), digits) for v in values]
+
+
+def _encode_court(court_info: Dict) -> Dict:
+    lines = court_info.get("lines") or {}
+    return {"lines": {kind: [_round_list(line, 1) for line in lines.get(kind, [])]
+                      for kind in ("horizontal", "vertical", "diagonal")}}
+
+
+def _encode_hoop(hoop_info: Dict) -> Dict:
+    return {"center": _round_list(hoop_info["center"], 1), "bbox": _round_list(hoop_info["bbox"], 1)}
+
+
+def _encode_form(form_quality: Optional[FormQualityAssessment]) -> Optional[List]:
+    """Only what the banner shows: rating + top issue type"""
+    if not form_quality:
+        return None
+    top_issue = form_quality.issues[0].issue_type if form_quality.issues else None
+    return [form_quality.quality_rating, round(float(form_quality.overall_score), 3), top_issue]
+
+
+def _decode_form(encoded: Optional[List]) -> Optional[FormQualityAssessment]:
+    if not encoded:
+        return None
+    rating, score, top_issue = encoded
+    issues = []
+    if top_issue:
+        issues.append(FormQualityIssue(
+            issue_type=top_issue, severity="moderate", description="", recommendation=""
+        ))
+    return FormQualityAssessment(overall_score=score, quality_rating=rating, issues=issues, strengths=[])
+
+
+def landmarks_to_array(pose_landmarks) -> Optional[np.ndarray]:
+    """MediaPipe NormalizedLandmarkList -> (33, 4) array of x, y, z, visibility"""
+    if pose_landmarks is None:
+        return None
+    return np.array(
+        [[lm.x, lm.y, lm.z, lm.visibility] for lm in pose_landmarks.landmark],
+        dtype=np.float32
+    )
+
+
+def array_to_landmarks(landmarks: Optional[np.ndarray]):
+    """(33, 4) array -> MediaPipe NormalizedLandmarkList (for mp drawing utils)"""
+    if landmarks is None:
+        return None
+    from mediapipe.framework.formats import landmark_pb2
+
+    landmark_list = landmark_pb2.NormalizedLandmarkList()
+    for x, y, z, visibility in landmarks:
+        landmark_list.landmark.add(x=float(x), y=float(y), z=float(z), visibility=float(visibility))
+    return landmark_list
+
+
+class OverlayFrame:
+    """Everything needed to annotate one frame"""
+
+    __slots__ = (
+        "index", "timestamp", "detections", "landmarks", "basketball_detections",
+        "court_info", "hoop_info", "action", "action_confidence", "form_quality"
+    )
+
+    def __init__(self, index: int, detections: List[Dict], landmarks: Optional[np.ndarray],
+                 basketball_detections: List[Dict], court_info: Optional[Dict], hoop_info: Optional[Dict],
+                 action: Optional[str], action_confidence: float, form_quality: Optional[FormQualityAssessment],
+                 timestamp: float = 0.0):
+        self.index = index
+        self.timestamp = timestamp
+        self.detections = detections
+        self.landmarks = landmarks
+        self.basketball_detections = basketball_detections
+        self.court_info = court_info
+        self.hoop_info = hoop_info
+        self.action = action
+        self.action_confidence = action_confidence
+        self.form_quality = form_quality
+
+
+class OverlayTrackWriter:
+    """
+    Streams overlay records to a gzipped JSON-lines file
+
+    State that changes rarely (court, hoop, action banner) is written only on change.
+    """
+
+    def __init__(self, path: str, video_id: str, fps: float, width: int, height: int,
+                 source: Optional[str] = None):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.fps = fps or 30.0
+        self._tmp_path = path + ".tmp"
+        self._file = gzip.open(self._tmp_path, "wt", encoding="utf-8", compresslevel=5)
+        self._court_ref = None
+        self._hoop_ref = None
+        self._action_state = None
+        self.frame_count = 0
+        self._write({
+            "k": "header", "version": TRACK_VERSION, "video_id": video_id,
+            "fps": fps, "width": width, "height": height, "source": source
+        })
+
+    def _write(self, record: Dict):
+        self._file.write(json.dumps(record, separators=(",", ":"), ensure_ascii=False))
+        self._file.write("\n")
+
+    def set_court(self, frame_index: int, court_info: Optional[Dict]):
+        if court_info is None or court_info is self._court_ref:
+            return
+        self._court_ref = court_info
+        self._write({"k": "court", "f": frame_index, "v": _encode_court(court_info)})
+
+    def set_hoop(self, frame_index: int, hoop_info: Optional[Dict]):
+        if hoop_info is None or hoop_info is self._hoop_ref:
+            return
+        self._hoop_ref = hoop_info
+        self._write({"k": "hoop", "f": frame_index, "v": _encode_hoop(hoop_info)})
+
+    def set_action(self, frame_index: int, label: Optional[str], confidence: float,
+                   form_quality: Optional[FormQualityAssessment]):
+        state = [label, round(float(confidence), 3), _encode_form(form_quality)]
+        if state == self._action_state:
+            return
+        self._action_state = state
+        self._write({"k": "action", "f": frame_index, "v": state})
+
+    def add_frame(self, frame_index: int, detections: List[Dict], pose_landmarks,
+                  basketball_detections: Optional[List[Dict]] = None):
+        record = {"k": "frame", "f": frame_index, "t": round(frame_index / self.fps, 3)}
+        if detections:
+            record["p"] = [_round_list(d["bbox"], 1) + [round(float(d["confidence"]), 3)] for d in detections]
+        if basketball_detections:
+            record["b"] = [
+                _round_list(d["bbox"], 1) + [round(float(d["confidence"]), 3),
+                                             1 if d.get("predicted") else 0, d.get("shot_zone")]
+                for d in basketball_detections
+            ]
+        landmarks = pose_landmarks if isinstance(pose_landmarks, np.ndarray) else landmarks_to_array(pose_landmarks)
+        if landmarks is not None:
+            record["l"] = _round_list(landmarks.reshape(-1), 4)
+        self._write(record)
+        self.frame_count += 1
+
+    def close(self):
+        """Finish the file; it only appears under its final name once complete"""
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        os.replace(self._tmp_path, self.path)
+        logger.info(f"🗂️  Overlay track saved: {self.path} ({self.frame_count} frames, "
+                    f"{os.path.getsize(self.path) / 1024:.1f}KB)")
+
+    def abort(self):
+        """Discard a partially written track"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+class OverlayTrackReader:
+    """Reads an overlay track back as OverlayFrame objects"""
+
+    def __init__(self, path: str):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Overlay track not found: {path}")
+        self.path = path
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+        if header.get("k") != "header":
+            raise ValueError(f"Invalid overlay track (missing header): {path}")
+        self.header = header
+        self.fps = header.get("fps") or 30.0
+
+    def __iter__(self) -> Iterator[OverlayFrame]:
+        court_info = hoop_info = None
+        action, confidence, form_quality = None, 0.0, None
+
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            f.readline()  # header
+            for line in f:
+                record = json.loads(line)
+                kind = record["k"]
+                if kind == "court":
+                    court_info = record["v"]
+                elif kind == "hoop":
+                    hoop_info = record["v"]
+                elif kind == "action":
+                    action, confidence, encoded_form = record["v"]
+                    form_quality = _decode_form(encoded_form)
+                elif kind == "frame":
+                    landmarks = None
+                    if "l" in record:
+                        landmarks = np.asarray(record["l"], dtype=np.float32).reshape(-1, 4)
+                    detections = [
+                        {"bbox": p[:4], "confidence": p[4], "class": "player"} for p in record.get("p", [])
+                    ]
+                    basketball_detections = []
+                    for b in record.get("b", []):
+                        det = {"bbox": b[:4], "confidence": b[4], "class": "basketball", "shot_zone": b[6]}
+                        if b[5]:
+                            det["predicted"] = True
+                        basketball_detections.append(det)
+                    # v1 tracks have no timestamps; derive them from fps
+                    timestamp = record.get("t", record["f"] / self.fps)
+                    yield OverlayFrame(
+                        record["f"], detections, landmarks, basketball_detections,
+                        court_info, hoop_info, action, confidence, form_quality,
+                        timestamp=timestamp
+                    )
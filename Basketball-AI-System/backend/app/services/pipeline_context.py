@@ -0,0 +1,49 @@
+"""
+Pipeline Context
+Per-request / per-session mutable state for the analysis pipeline.
+
+VideoProcessor owns the shared model handles (detector, pose, classifier, ...).
+Everything that accumulates across frames or depends on the stream's fps lives
+here instead, so concurrent analyses don't corrupt each other's smoothing and
+metrics.
+"""
+
+import logging
+from typing import List
+
+from app.models.metrics_engine import PerformanceMetricsEngine
+from app.models.pose_normalizer import PoseSmoother
+from app.models.biomechanics_engine import BiomechanicsEngine
+
+logger = logging.getLogger(__name__)
+
+
+class PipelineContext:
+    """
+    State for one video analysis or one live session
+
+    Args:
+        fps: Frame rate of the stream being analyzed
+        frame_buffer_size: Recent frame predictions kept for action smoothing
+    """
+
+    def __init__(self, fps: float, frame_buffer_size: int = 15):
+        self.fps = fps
+
+        # Frame-level action tracking for temporal smoothing
+        self.frame_action_buffer: List[str] = []  # Store recent frame predictions
+        self.frame_buffer_size = frame_buffer_size  # ~0.5 seconds at 30fps for smoothing
+
+        # Stateful per-stream components
+        self.pose_smoother = PoseSmoother(method='one_euro', beta=0.1)
+        self.biomechanics_engine = BiomechanicsEngine(fps=fps)
+        self.biomechanics_engine.dt = 1.0 / fps
+        self.metrics_engine = PerformanceMetricsEngine()
+        self.metrics_engine.fps = fps
+
+    def push_action(self, action_label: str) -> List[str]:
+        """Record a frame prediction; returns the (bounded) recent predictions"""
+        self.frame_action_buffer.append(action_label)
+        if len(self.frame_action_buffer) > self.frame_buffer_size:
+            self.frame_action_buffer.pop(0)
+        return self.frame_action_buffer
@@ -0,0 +1,252 @@
+"""
+Progress Rollups
+Incrementally maintained per-player, per-action metric summaries.
+
+The dashboard's progress and comparison views used to pull raw history and
+aggregate it in the browser, so their payload grew with every analysis. Each
+saved analysis now updates a fixed set of rollup rows instead, keyed by
+(player, action, period, bucket, metric) with period "day", "week" or "all".
+A row holds running count/sum/sum-of-squares/min/max, least-squares sums for
+a trend slope over time and, for the all-time row, a fixed-bin histogram
+for percentiles. Serving a player's progress reads a bounded number of rows,
+however long their history is.
+"""
+
+import json
+import math
+import sqlite3
+import logging
+import threading
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Rolled-up metrics and the (low, high) range of their percentile histograms
+ROLLUP_METRICS = {
+    "jump_height": (0.0, 2.0),
+    "movement_speed": (0.0, 10.0),
+    "form_score": (0.0, 1.0),
+    "reaction_time": (0.0, 2.0),
+    "pose_stability": (0.0, 1.0),
+    "energy_efficiency": (0.0, 1.0),
+}
+HISTOGRAM_BINS = 100
+PERCENTILES = (25, 50, 75, 90)
+
+ALL_ACTIONS = "all"
+DEFAULT_PLAYER = "default"
+
+# Time axis for trend slopes: days since this date (keeps the sums small)
+_EPOCH = datetime(2024, 1, 1)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollups (
+    player_id TEXT NOT NULL,
+    action TEXT NOT NULL,
+    period TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    total REAL NOT NULL,
+    total_sq REAL NOT NULL,
+    min REAL NOT NULL,
+    max REAL NOT NULL,
+    st REAL NOT NULL,
+    stt REAL NOT NULL,
+    sty REAL NOT NULL,
+    hist TEXT,
+    PRIMARY KEY (player_id, action, period, bucket, metric)
+) WITHOUT ROWID;
+"""
+
+
+def _parse_time(value: Any) -> datetime:
+    """Naive local datetime from an ISO timestamp (aware values are converted)"""
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        try:
+            parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except (TypeError, ValueError):
+            return datetime.now()
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+
+def _week_start(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+class ProgressRollups:
+    """
+    Rollup rows in a local SQLite database, updated on every saved analysis
+
+    Args:
+        path: Database file (may be shared with the history store)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def record(self, player_id: Optional[str], action: Optional[str], metrics: Optional[Dict[str, Any]],
+               created_at: Any = None):
+        """Fold one analysis into its day, week and all-time rollups"""
+        values = {
+            name: float(metrics[name]) for name in ROLLUP_METRICS
+            if metrics and isinstance(metrics.get(name), (int, float)) and math.isfinite(metrics[name])
+        }
+        if not values:
+            return
+        when = _parse_time(created_at or datetime.now())
+        t = (when - _EPOCH).total_seconds() / 86400.0
+        buckets = [("day", when.date().isoformat()),
+                   ("week", _week_start(when.date()).isoformat()),
+                   ("all", "")]
+        actions = {ALL_ACTIONS, action or "unknown"}
+        player = player_id or DEFAULT_PLAYER
+
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for action_key in actions:
+                    for period, bucket in buckets:
+                        for metric, value in values.items():
+                            self._update_row((player, action_key, period, bucket, metric), value, t)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def rebuild(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Fold existing history records (e.g. on first start); returns how many were folded"""
+        folded = 0
+        for record in records:
+            self.record(record.get("player_id"), record.get("action"), record.get("metrics"),
+                        record.get("created_at"))
+            folded += 1
+        return folded
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM rollups LIMIT 1").fetchone() is None
+
+    def summary(self, player_id: Optional[str] = None, action: Optional[str] = None, days: int = 30,
+                weeks: int = 12, today: Optional[date] = None) -> Dict[str, Any]:
+        """
+        Progress for one player and action (or all actions)
+
+        Returns:
+            {"player_id", "action", "metrics": {metric: all-time stats incl. percentiles
+            and trend_per_week}, "daily": [...], "weekly": [...]}, with at most `days`
+            daily and `weeks` weekly buckets
+        """
+        player = player_id or DEFAULT_PLAYER
+        action_key = action or ALL_ACTIONS
+        today = today or date.today()
+        day_from = (today - timedelta(days=days - 1)).isoformat()
+        week_from = (_week_start(today) - timedelta(weeks=weeks - 1)).isoformat()
+
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT period, bucket, metric, n, total, total_sq, min, max, st, stt, sty, hist "
+                "FROM rollups WHERE player_id = ? AND action = ? AND ("
+                "period = 'all' OR (period = 'day' AND bucket >= ?) OR (period = 'week' AND bucket >= ?))",
+                (player, action_key, day_from, week_from),
+            ).fetchall()
+
+        overall: Dict[str, Any] = {}
+        series: Dict[str, Dict[str, Dict[str, Any]]] = {"day": {}, "week": {}}
+        for period, bucket, metric, n, total, total_sq, lo, hi, st, stt, sty, hist in rows:
+            if period == "all":
+                overall[metric] = self._overall_stats(metric, n, total, total_sq, lo, hi, st, stt, sty, hist)
+                continue
+            entry = series[period].setdefault(bucket, {"bucket": bucket, "count": 0, "metrics": {}})
+            entry["count"] = max(entry["count"], n)
+            entry["metrics"][metric] = {"mean": round(total / n, 4), "min": round(lo, 4), "max": round(hi, 4)}
+
+        return {
+            "player_id": player,
+            "action": action_key,
+            "metrics": overall,
+            "daily": [series["day"][bucket] for bucket in sorted(series["day"])],
+            "weekly": [series["week"][bucket] for bucket in sorted(series["week"])],
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _update_row(self, key: tuple, value: float, t: float):
+        """Read-modify-write one rollup row; caller holds the lock inside a transaction"""
+        row = self._conn.execute(
+            "SELECT n, total, total_sq, min, max, st, stt, sty, hist FROM rollups "
+            "WHERE player_id = ? AND action = ? AND period = ? AND bucket = ? AND metric = ?",
+            key,
+        ).fetchone()
+        period, metric = key[2], key[4]
+        if row:
+            n, total, total_sq, lo, hi, st, stt, sty, hist = row
+            hist = json.loads(hist) if hist else None
+        else:
+            n, total, total_sq, lo, hi, st, stt, sty = 0, 0.0, 0.0, value, value, 0.0, 0.0, 0.0
+            hist = [0] * HISTOGRAM_BINS if period == "all" else None
+
+        n += 1
+        total += value
+        total_sq += value * value
+        lo, hi = min(lo, value), max(hi, value)
+        st += t
+        stt += t * t
+        sty += t * value
+        if hist is not None:
+            low, high = ROLLUP_METRICS[metric]
+            index = int((value - low) / (high - low) * HISTOGRAM_BINS)
+            hist[min(max(index, 0), HISTOGRAM_BINS - 1)] += 1
+
+        self._conn.execute(
+            "INSERT OR REPLACE INTO rollups (player_id, action, period, bucket, metric, "
+            "n, total, total_sq, min, max, st, stt, sty, hist) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            key + (n, total, total_sq, lo, hi, st, stt, sty, json.dumps(hist) if hist is not None else None),
+        )
+
+    @staticmethod
+    def _overall_stats(metric: str, n: int, total: float, total_sq: float, lo: float, hi: float,
+                       st: float, stt: float, sty: float, hist: Optional[str]) -> Dict[str, Any]:
+        mean = total / n
+        variance = max(total_sq / n - mean * mean, 0.0)
+        stats = {
+            "count": n,
+            "mean": round(mean, 4),
+            "std": round(math.sqrt(variance), 4),
+            "min": round(lo, 4),
+            "max": round(hi, 4),
+        }
+
+        # Least-squares slope of value over time (per day -> per week)
+        denominator = n * stt - st * st
+        sy = total
+        slope = (n * sty - st * sy) / denominator if n > 1 and denominator > 1e-9 else 0.0
+        stats["trend_per_week"] = round(slope * 7.0, 4)
+
+        if hist:
+            counts = json.loads(hist)
+            low, high = ROLLUP_METRICS[metric]
+            width = (high - low) / HISTOGRAM_BINS
+            for p in PERCENTILES:
+                target = n * p / 100.0
+                cumulative = 0
+                for index, count in enumerate(counts):
+                    if count and cumulative + count >= target:
+                        # Interpolate inside the bin, clamped to the observed range
+                        estimate = low + (index + (target - cumulative) / count) * width
+                        stats[f"p{p}"] = round(min(max(estimate, lo), hi), 4)
+                        break
+                    cumulative += count
+        return stats
@@ -0,0 +1,350 @@
+"""
+Storage Manager
+Disk quota and eviction for UPLOAD_DIR.
+
+Uploaded inputs, processed_* annotated outputs and temp files whose cleanup
+failed used to pile up in UPLOAD_DIR forever. The manager tracks each file's
+size, last access and owning analysis, and keeps the directory within a quota.
+
+- Files not accessed for the TTL are evicted.
+- When space is needed, files are evicted least recently used first.
+  Files already offloaded to object storage go first (a pluggable check),
+  then stray files, then annotated outputs, then uploaded inputs.
+- Files being encoded, pinned by a running request, or touched within a
+  grace period are never evicted.
+
+reserve() runs before an analysis writes anything, so a full disk fails the
+request up front instead of failing mid-analysis. The reserved bytes count
+against the quota until the request releases them, so concurrent requests
+can't all pass the check on the same free space. Files the request pins
+(its upload, its output) count towards its reservation as they grow.
+"""
+
+import os
+import time
+import shutil
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+KIND_ANNOTATED = "annotated"
+KIND_UPLOAD = "upload"
+KIND_OTHER = "other"
+
+_VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".webm")
+
+
+class InsufficientStorageError(Exception):
+    """Not enough space even after evicting everything evictable"""
+
+
+class Reservation:
+    """
+    Space held for one request, and the files it pins (see StorageManager.reserve)
+
+    Use as a context manager, or call release() when the request finishes.
+    """
+
+    __slots__ = ("manager", "nbytes", "names", "released")
+
+    def __init__(self, manager: "StorageManager", nbytes: int):
+        self.manager = manager
+        self.nbytes = nbytes
+        self.names: List[str] = []
+        self.released = False
+
+    def pin(self, path: str):
+        """Never evict this file while the reservation is held (it may not exist yet)"""
+        self.manager._pin(self, os.path.basename(path))
+
+    def release(self):
+        """Return the space and unpin the files; safe to call twice"""
+        self.manager._release(self)
+
+    def __enter__(self) -> "Reservation":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class _Artefact:
+    __slots__ = ("size", "last_access", "owner")
+
+    def __init__(self, size: int, last_access: float, owner: Optional[str] = None):
+        self.size = size
+        self.last_access = last_access
+        self.owner = owner
+
+
+def artefact_kind(name: str) -> str:
+    if name.startswith("processed_"):
+        return KIND_ANNOTATED
+    if name.lower().endswith(_VIDEO_EXTENSIONS):
+        return KIND_UPLOAD
+    return KIND_OTHER
+
+
+class StorageManager:
+    """
+    Quota, TTL and LRU eviction for one directory
+
+    Args:
+        root: Managed directory
+        quota_bytes: Max total size of the directory (0 = no quota)
+        ttl_seconds: Evict files not accessed for this long (0 = no TTL)
+        min_free_bytes: Keep at least this much free on the disk
+        grace_seconds: Files touched this recently are never evicted
+        is_offloaded: name -> True if a copy exists in object storage
+        is_busy: path -> True while the file is being written
+    """
+
+    def __init__(self, root: str, quota_bytes: int = 0, ttl_seconds: float = 0, min_free_bytes: int = 0,
+                 grace_seconds: float = 600.0, is_offloaded: Optional[Callable[[str], bool]] = None,
+                 is_busy: Optional[Callable[[str], bool]] = None):
+        self.root = root
+        self.quota_bytes = quota_bytes
+        self.ttl_seconds = ttl_seconds
+        self.min_free_bytes = min_free_bytes
+        self.grace_seconds = grace_seconds
+        self.is_offloaded = is_offloaded or (lambda name: False)
+        self.is_busy = is_busy or (lambda path: False)
+        self._lock = threading.Lock()
+        self._index: Dict[str, _Artefact] = {}
+        self._reservations: List[Reservation] = []
+        self._pins: Dict[str, int] = {}
+        self._evicted_files = 0
+        self._evicted_bytes = 0
+        os.makedirs(root, exist_ok=True)
+
+    def register(self, path: str, owner: Optional[str] = None):
+        """Record a new file (and which analysis owns it)"""
+        name = os.path.basename(path)
+        try:
+            size = os.path.getsize(os.path.join(self.root, name))
+        except OSError:
+            return
+        with self._lock:
+            self._index[name] = _Artefact(size, time.time(), owner)
+
+    def touch(self, name: str):
+        """Mark a file as just used (e.g. served)"""
+        with self._lock:
+            artefact = self._index.get(name)
+            if artefact:
+                artefact.last_access = time.time()
+
+    def reserve(self, nbytes: int, pin: Sequence[str] = ()) -> Reservation:
+        """
+        ensure_space(nbytes), then hold nbytes against the quota until released
+
+        Args:
+            nbytes: Bytes the request will write
+            pin: Files to pin for the request (before anything is evicted)
+
+        Raises:
+            InsufficientStorageError: If the space can't be made
+        """
+        reservation = Reservation(self, nbytes)
+        for path in pin:
+            reservation.pin(path)
+        try:
+            with self._lock:
+                self._make_space(nbytes)
+                self._reservations.append(reservation)
+        except InsufficientStorageError:
+            reservation.release()
+            raise
+        return reservation
+
+    def ensure_space(self, nbytes: int):
+        """
+        Evict until nbytes more fit in the quota and on the disk (next to what's reserved)
+
+        Raises:
+            InsufficientStorageError: If that's impossible
+        """
+        with self._lock:
+            self._make_space(nbytes)
+
+    def sweep(self) -> int:
+        """Apply TTL and quota now; returns the number of files evicted"""
+        before = self._evicted_files
+        try:
+            self.ensure_space(0)
+        except InsufficientStorageError as e:
+            logger.warning(f"⚠️  Upload storage over quota: {e}")
+        return self._evicted_files - before
+
+    def usage(self) -> Dict[str, Any]:
+        """Usage per kind, quota and disk headroom"""
+        with self._lock:
+            self._scan()
+            by_kind: Dict[str, Dict[str, int]] = {}
+            offloaded = 0
+            for name, artefact in self._index.items():
+                kind = by_kind.setdefault(artefact_kind(name), {"files": 0, "bytes": 0})
+                kind["files"] += 1
+                kind["bytes"] += artefact.size
+                if self.is_offloaded(name):
+                    offloaded += artefact.size
+            disk = shutil.disk_usage(self.root)
+            return {
+                "used_bytes": self._used(),
+                "reserved_bytes": self._reserved(),
+                "quota_bytes": self.quota_bytes,
+                "files": len(self._index),
+                "offloaded_bytes": offloaded,
+                "by_kind": by_kind,
+                "disk_free_bytes": disk.free,
+                "min_free_bytes": self.min_free_bytes,
+                "evicted_files": self._evicted_files,
+                "evicted_bytes": self._evicted_bytes,
+            }
+
+    def _make_space(self, nbytes: int):
+        """Caller holds the lock"""
+        self._scan()
+        self._evict_expired()
+        shortfall = self._shortfall(nbytes)
+        if shortfall > 0:
+            for name in self._eviction_order():
+                self._evict(name)
+                shortfall = self._shortfall(nbytes)
+                if shortfall <= 0:
+                    break
+        if shortfall > 0:
+            raise InsufficientStorageError(
+                f"Need {nbytes / 1e6:.1f}MB, {shortfall / 1e6:.1f}MB short after eviction"
+            )
+
+    def _scan(self):
+        """Sync the index with the directory; caller holds the lock"""
+        seen = set()
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+                seen.add(entry.name)
+                stat = entry.stat()
+                artefact = self._index.get(entry.name)
+                if artefact is None:
+                    # Unknown file (previous run, or written outside the app): last access = mtime
+                    self._index[entry.name] = _Artefact(stat.st_size, stat.st_mtime)
+                else:
+                    artefact.size = stat.st_size
+        for name in list(self._index):
+            if name not in seen:
+                del self._index[name]
+
+    def _used(self) -> int:
+        return sum(artefact.size for artefact in self._index.values())
+
+    def _reserved(self) -> int:
+        """Reserved bytes not yet taken up by the reservations' own files"""
+        reserved = 0
+        for reservation in self._reservations:
+            pinned = sum(self._index[name].size for name in reservation.names if name in self._index)
+            reserved += max(0, reservation.nbytes - pinned)
+        return reserved
+
+    def _pin(self, reservation: Reservation, name: str):
+        with self._lock:
+            if reservation.released or name in reservation.names:
+                return
+            reservation.names.append(name)
+            self._pins[name] = self._pins.get(name, 0) + 1
+
+    def _release(self, reservation: Reservation):
+        with self._lock:
+            if reservation.released:
+                return
+            reservation.released = True
+            if reservation in self._reservations:
+                self._reservations.remove(reservation)
+            for name in reservation.names:
+                self._pins[name] -= 1
+                if not self._pins[name]:
+                    del self._pins[name]
+
+    def _shortfall(self, nbytes: int) -> int:
+        nbytes += self._reserved()
+        shortfall = 0
+        if self.quota_bytes > 0:
+            shortfall = self._used() + nbytes - self.quota_bytes
+        if self.min_free_bytes > 0:
+            free = shutil.disk_usage(self.root).free
+            shortfall = max(shortfall, self.min_free_bytes + nbytes - free)
+        return shortfall
+
+    def _evictable(self, name: str, now: float) -> bool:
+        if name in self._pins:
+            return False
+        artefact = self._index[name]
+        if now - artefact.last_access < self.grace_seconds:
+            return False
+        return not self.is_busy(os.path.join(self.root, name))
+
+    def _evict_expired(self):
+        if self.ttl_seconds <= 0:
+            return
+        now = time.time()
+        for name in list(self._index):
+            if now - self._index[name].last_access > self.ttl_seconds and self._evictable(name, now):
+                self._evict(name)
+
+    def _eviction_order(self) -> List[str]:
+        """Evictable files: offloaded first, then strays, annotated outputs, inputs; each LRU"""
+        now = time.time()
+        rank = {KIND_OTHER: 1, KIND_ANNOTATED: 2, KIND_UPLOAD: 3}
+        candidates = [name for name in self._index if self._evictable(name, now)]
+        return sorted(candidates, key=lambda name: (
+            0 if self.is_offloaded(name) else rank[artefact_kind(name)],
+            self._index[name].last_access,
+        ))
+
+    def _evict(self, name: str):
+        artefact = self._index.pop(name)
+        try:
+            os.remove(os.path.join(self.root, name))
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            logger.warning(f"⚠️  Failed to evict {name}: {e}")
+            return
+        self._evicted_files += 1
+        self._evicted_bytes += artefact.size
+        owner = f" (owner {artefact.owner})" if artefact.owner else ""
+        logger.info(f"🧹 Evicted {name}{owner}, {artefact.size / 1e6:.1f}MB")
+
+
+_storage_manager: Optional[StorageManager] = None
+_storage_manager_lock = threading.Lock()
+
+
+def _uploaded(name: str) -> bool:
+    from app.services.upload_queue import get_upload_queue
+
+    upload_queue = get_upload_queue()
+    return bool(upload_queue and upload_queue.uploaded_url(name))
+
+
+def get_storage_manager() -> StorageManager:
+    """Process-wide manager for UPLOAD_DIR"""
+    global _storage_manager
+    with _storage_manager_lock:
+        if _storage_manager is None:
+            from app.core.config import settings
+            from app.services.video_encoder import is_encoding_file
+
+            _storage_manager = StorageManager(
+                settings.UPLOAD_DIR,
+                quota_bytes=settings.UPLOAD_QUOTA_MB * 1024 * 1024,
+                ttl_seconds=settings.UPLOAD_TTL_HOURS * 3600,
+                min_free_bytes=settings.UPLOAD_MIN_FREE_MB * 1024 * 1024,
+                is_offloaded=_uploaded,
+                is_busy=is_encoding_file,
+            )
+        return _storage_manager
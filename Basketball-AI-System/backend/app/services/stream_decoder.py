@@ -0,0 +1,179 @@
+"""
+Stream Decoder
+Incremental decoding of a live MediaRecorder stream (WebM or fragmented MP4).
+
+Browsers can send their camera as one continuous compressed stream (chunks of
+MediaRecorder output) instead of a JPEG per frame, which keeps inter-frame
+compression on the uplink. The chunks are fed into a pipe that PyAV demuxes
+and decodes in a worker thread as bytes arrive. Decoded frames, with their
+stream timestamps, go to a callback at (at most) the analysis frame rate.
+
+The pipe holds at most MAX_BUFFERED_BYTES of undecoded stream. Beyond that,
+feed() waits for the decoder to catch up, so the sender is slowed down
+instead of memory growing without bound.
+"""
+
+import logging
+import threading
+from typing import Callable, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Undecoded bytes buffered per stream before feed() applies backpressure
+MAX_BUFFERED_BYTES = 8 * 1024 * 1024
+
+# MediaRecorder MIME type -> FFmpeg demuxer name
+_CONTAINER_FORMATS = {
+    "video/webm": "webm",
+    "video/x-matroska": "matroska",
+    "video/mp4": "mp4",
+}
+
+
+def container_format(mime_type: str) -> str:
+    """Demuxer for a MediaRecorder MIME type ("video/webm;codecs=vp8" -> "webm")"""
+    base = (mime_type or "").split(";")[0].strip().lower()
+    if base not in _CONTAINER_FORMATS:
+        raise ValueError(f"Unsupported stream type: {mime_type}")
+    return _CONTAINER_FORMATS[base]
+
+
+class ChunkPipe:
+    """
+    File-like object fed with byte chunks; read() blocks until data arrives
+
+    Not seekable, so the demuxer reads the stream strictly in order.
+
+    Args:
+        max_bytes: Buffered bytes beyond which feed() waits for reads
+    """
+
+    def __init__(self, max_bytes: int = MAX_BUFFERED_BYTES):
+        self.max_bytes = max_bytes
+        self._chunks = bytearray()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.bytes_fed = 0
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def buffered(self) -> int:
+        return len(self._chunks)
+
+    def feed(self, data: bytes, timeout: Optional[float] = None) -> bool:
+        """
+        Append a chunk, waiting while the buffer is full
+
+        Args:
+            timeout: Seconds to wait for room (0 = don't wait, None = forever)
+
+        Returns:
+            False if the chunk wasn't taken because there was no room in time
+            (a chunk larger than max_bytes is taken once the buffer is empty)
+        """
+        with self._cond:
+            has_room = self._cond.wait_for(
+                lambda: self._closed or not self._chunks or len(self._chunks) + len(data) <= self.max_bytes,
+                timeout
+            )
+            if not has_room:
+                return False
+            if self._closed:
+                return True
+            self._chunks += data
+            self.bytes_fed += len(data)
+            self._cond.notify_all()
+            return True
+
+    def close(self):
+        """End of stream: pending reads return what's left, then b"" (EOF)"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def read(self, size: int = -1) -> bytes:
+        with self._cond:
+            while not self._chunks and not self._closed:
+                self._cond.wait()
+            if size is None or size < 0:
+                size = len(self._chunks)
+            data = bytes(self._chunks[:size])
+            del self._chunks[:size]
+            # Wake a feeder waiting for room
+            self._cond.notify_all()
+            return data
+
+
+class StreamDecoder:
+    """
+    Decode a chunked container stream into BGR frames in a worker thread
+
+    Args:
+        mime_type: MediaRecorder MIME type of the stream
+        on_frame: Called from the worker thread with (bgr_frame, pts_seconds)
+        max_fps: Decoded frames closer together than 1/max_fps are skipped
+            (None keeps every frame)
+    """
+
+    def __init__(self, mime_type: str, on_frame: Callable[[np.ndarray, Optional[float]], None],
+                 max_fps: Optional[float] = None):
+        self.format = container_format(mime_type)
+        self.on_frame = on_frame
+        self.min_spacing = 1.0 / max_fps if max_fps else 0.0
+        self.pipe = ChunkPipe()
+        self.decoded = 0
+        self.delivered = 0
+        self.error: Optional[Exception] = None
+        self._last_pts: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        import av  # Optional dependency, only needed for stream ingest
+
+        self._av = av
+        self._thread = threading.Thread(target=self._run, name="stream-decoder", daemon=True)
+        self._thread.start()
+
+    def feed(self, chunk: bytes, timeout: Optional[float] = None) -> bool:
+        """Queue a chunk for decoding (see ChunkPipe.feed for the backpressure)"""
+        return self.pipe.feed(chunk, timeout)
+
+    def close(self, timeout: float = 2.0):
+        self.pipe.close()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        try:
+            with self._av.open(self.pipe, mode="r", format=self.format) as container:
+                stream = container.streams.video[0]
+                stream.thread_type = "AUTO"
+                for frame in container.decode(stream):
+                    self.decoded += 1
+                    pts = float(frame.pts * frame.time_base) if frame.pts is not None else None
+                    if not self._should_deliver(pts):
+                        continue
+                    self.delivered += 1
+                    self.on_frame(frame.to_ndarray(format="bgr24"), pts)
+        except Exception as e:
+            # EOF on a cut-off stream is expected when the client disconnects
+            if not self.pipe.closed:
+                self.error = e
+                logger.error(f"❌ Stream decoding failed: {e}")
+        logger.info(f"📼 Stream decoder finished: {self.decoded} frames decoded, "
+                    f"{self.delivered} delivered, {self.pipe.bytes_fed / 1024:.0f} KB received")
+
+    def _should_deliver(self, pts: Optional[float]) -> bool:
+        """Decimate to max_fps by stream time (frames without pts are always delivered)"""
+        if pts is None or not self.min_spacing:
+            return True
+        if self._last_pts is not None and 0 <= pts - self._last_pts < self.min_spacing * 0.9:
+            return False
+        self._last_pts = pts
+        return True
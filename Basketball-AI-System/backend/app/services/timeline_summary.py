@@ -0,0 +1,278 @@
+"""
+Timeline Summary
+Multi-resolution summaries of the per-window analysis timeline.
+
+The classifier emits one TimelineSegment per stride (8 frames), so an hour of
+game footage has well over ten thousand of them. Nobody can draw or download
+that in one go. The per-window timeline is therefore stored once, as columns,
+next to the analysis results (results/timelines/{video_id}.npz). Summaries are
+cut from it for any time range and any point budget:
+
+- runs: consecutive windows with the same label, run-length encoded. Beyond
+  the budget, the range is split into equal time bins. Each bin takes the
+  label that covers most of it, and keeps the per-label share in `mix`.
+- series: one (time, value) line per metric, downsampled to the budget with
+  LTTB (largest-triangle-three-buckets, keeps the visual shape) or min/max
+  bucketing (keeps every extreme).
+
+Zooming in means asking for a narrower range with the same budget.
+points=0 returns every window at full resolution.
+
+Stored timelines are registered with their own StorageManager (owner = video
+id), which keeps the directory within TIMELINE_QUOTA_MB and expires files
+not read for TIMELINE_TTL_DAYS.
+"""
+
+import os
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.schemas import TimelineSegment
+from app.services.overlay_track import is_valid_video_id
+from app.services.storage_manager import StorageManager
+
+logger = logging.getLogger(__name__)
+
+TIMELINES_DIR = os.path.join(settings.RESULTS_DIR, "timelines")
+
+METHODS = ("lttb", "minmax")
+# Per-window series: action confidence plus the core metrics
+SERIES = ("confidence", "form_score", "jump_height", "movement_speed", "pose_stability", "energy_efficiency")
+
+
+_timeline_storage: Optional[StorageManager] = None
+_timeline_storage_lock = threading.Lock()
+
+
+def get_timeline_storage() -> StorageManager:
+    """Process-wide quota/TTL manager for TIMELINES_DIR"""
+    global _timeline_storage
+    with _timeline_storage_lock:
+        if _timeline_storage is None:
+            _timeline_storage = StorageManager(
+                TIMELINES_DIR,
+                quota_bytes=settings.TIMELINE_QUOTA_MB * 1024 * 1024,
+                ttl_seconds=settings.TIMELINE_TTL_DAYS * 86400,
+            )
+        return _timeline_storage
+
+
+def timeline_path(video_id: str) -> str:
+    """Path of the stored per-window timeline for a video"""
+    if not is_valid_video_id(video_id):
+        raise ValueError(f"Invalid video id: {video_id!r}")
+    return os.path.join(TIMELINES_DIR, f"{video_id}.npz")
+
+
+def timeline_columns(timeline: Sequence[TimelineSegment]) -> Dict[str, np.ndarray]:
+    """Per-window segments as columns (labels as codes into `labels`, missing metrics as NaN)"""
+    labels = sorted({segment.action.label for segment in timeline})
+    codes = {label: i for i, label in enumerate(labels)}
+    columns = {
+        "start": np.array([s.start_time for s in timeline], dtype=np.float64),
+        "end": np.array([s.end_time for s in timeline], dtype=np.float64),
+        "label": np.array([codes[s.action.label] for s in timeline], dtype=np.int16),
+        "labels": np.array(labels, dtype=str),
+        "confidence": np.array([s.action.confidence for s in timeline], dtype=np.float32),
+    }
+    for name in SERIES[1:]:
+        values = [getattr(s.metrics, name) for s in timeline]
+        columns[name] = np.array([np.nan if v is None else v for v in values], dtype=np.float32)
+    return columns
+
+
+def save_timeline(video_id: str, timeline: Sequence[TimelineSegment]) -> Dict[str, np.ndarray]:
+    """Store the per-window timeline; returns its columns"""
+    columns = timeline_columns(timeline)
+    save_columns(video_id, columns)
+    return columns
+
+
+def save_columns(video_id: str, columns: Dict[str, np.ndarray]):
+    """Store per-window columns (from timeline_columns or WindowSpill.columns)"""
+    path = timeline_path(video_id)
+    os.makedirs(TIMELINES_DIR, exist_ok=True)
+    tmp_path = f"{path}.tmp.npz"
+    np.savez_compressed(tmp_path, **columns)
+    os.replace(tmp_path, path)
+    storage = get_timeline_storage()
+    storage.register(path, owner=video_id)
+    storage.sweep()
+
+
+def load_timeline(video_id: str) -> Optional[Dict[str, np.ndarray]]:
+    """Stored columns for a video, or None"""
+    path = timeline_path(video_id)
+    if not os.path.exists(path):
+        return None
+    get_timeline_storage().touch(os.path.basename(path))
+    with np.load(path, allow_pickle=False) as data:
+        return {name: data[name] for name in data.files}
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n: int) -> np.ndarray:
+    """
+    Indices of n points chosen by largest-triangle-three-buckets
+
+    The first and last points are always kept. Every bucket in between keeps
+    the point forming the largest triangle with the previously kept point and
+    the average of the next bucket.
+    """
+    size = len(x)
+    if n >= size:
+        return np.arange(size)
+    if n < 3:
+        return np.array([0, size - 1][:max(n, 0)], dtype=np.int64)
+
+    indices = np.empty(n, dtype=np.int64)
+    indices[0], indices[-1] = 0, size - 1
+    # n - 2 buckets over x[1:size - 1]; at least one point each since size > n
+    edges = np.linspace(1, size - 1, n - 1).astype(np.int64)
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_lo, next_hi = edges[i + 1], edges[i + 2]
+            avg_x, avg_y = x[next_lo:next_hi].mean(), y[next_lo:next_hi].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+        areas = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(areas))
+        indices[i + 1] = a
+    return indices
+
+
+def minmax(y: np.ndarray, n: int) -> np.ndarray:
+    """Indices of the min and max of each of n // 2 equal buckets, in order"""
+    size = len(y)
+    if n >= size:
+        return np.arange(size)
+    buckets = max(n // 2, 1)
+    edges = np.linspace(0, size, buckets + 1).astype(np.int64)
+    picked = []
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        if hi <= lo:
+            continue
+        low, high = lo + int(np.argmin(y[lo:hi])), lo + int(np.argmax(y[lo:hi]))
+        picked.extend(sorted({low, high}))
+    return np.array(picked, dtype=np.int64)
+
+
+def _run_starts(label: np.ndarray) -> np.ndarray:
+    """Index of the first window of every run of equal labels"""
+    return np.concatenate(([0], np.flatnonzero(np.diff(label)) + 1)).astype(np.int64)
+
+
+def _rle_runs(columns: Dict[str, np.ndarray], labels: List[str]) -> List[Dict[str, Any]]:
+    """One run per stretch of consecutive windows with the same label"""
+    label = columns["label"]
+    starts = _run_starts(label)
+    ends = np.append(starts[1:], len(label))
+    return [{
+        "start_time": round(float(columns["start"][i]), 3),
+        "end_time": round(float(columns["end"][j - 1]), 3),
+        "label": labels[label[i]],
+        "confidence": round(float(columns["confidence"][i:j].mean()), 3),
+    } for i, j in zip(starts, ends)]
+
+
+def _binned_runs(columns: Dict[str, np.ndarray], labels: List[str], bins: int,
+                 start: float, end: float) -> List[Dict[str, Any]]:
+    """Runs over equal time bins, each bin taking the label that covers most of it"""
+    mid = (columns["start"] + columns["end"]) / 2
+    duration = np.maximum(columns["end"] - columns["start"], 0.0)
+    width = max(end - start, 1e-9) / bins
+    bin_of = np.clip(((mid - start) / width).astype(np.int64), 0, bins - 1)
+
+    # Seconds (and confidence-weighted seconds) of each label per bin
+    cover = np.zeros((bins, len(labels)))
+    weighted = np.zeros((bins, len(labels)))
+    np.add.at(cover, (bin_of, columns["label"]), duration)
+    np.add.at(weighted, (bin_of, columns["label"]), duration * columns["confidence"])
+    dominant = cover.argmax(axis=1)
+
+    # Merge consecutive non-empty bins with the same dominant label
+    filled = np.flatnonzero(cover.sum(axis=1) > 0)
+    breaks = np.flatnonzero((np.diff(filled) != 1) | (np.diff(dominant[filled]) != 0)) + 1
+    runs = []
+    for group in np.split(filled, breaks):
+        if not len(group):
+            continue
+        code = dominant[group[0]]
+        run_cover = cover[group].sum(axis=0)
+        run_weighted = weighted[group].sum(axis=0)
+        runs.append({
+            "start_time": round(start + int(group[0]) * width, 3),
+            "end_time": round(start + (int(group[-1]) + 1) * width, 3),
+            "label": labels[code],
+            "confidence": round(float(run_weighted[code] / run_cover[code]), 3) if run_cover[code] else 0.0,
+            "mix": {labels[i]: round(float(run_cover[i] / run_cover.sum()), 3) for i in np.flatnonzero(run_cover)},
+        })
+    return runs
+
+
+def summarize_timeline(columns: Dict[str, np.ndarray], points: int = 300, method: str = "lttb",
+                       start: Optional[float] = None, end: Optional[float] = None,
+                       series: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """
+    Summary of a stored timeline
+
+    Args:
+        columns: From timeline_columns / load_timeline
+        points: Point budget per series and run budget (0 = full resolution)
+        method: "lttb" or "minmax"
+        start, end: Time range in seconds (default: everything)
+        series: Metric series to include (default: all of SERIES)
+
+    Raises:
+        ValueError: Unknown method or series
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method '{method}'. Use one of: {', '.join(METHODS)}")
+    series = list(SERIES if series is None else series)
+    unknown = set(series) - set(SERIES)
+    if unknown:
+        raise ValueError(f"Unknown series: {', '.join(sorted(unknown))}")
+
+    labels = [str(label) for label in columns["labels"]]
+    total_start = float(columns["start"][0]) if len(columns["start"]) else 0.0
+    total_end = float(columns["end"].max()) if len(columns["end"]) else 0.0
+    start = total_start if start is None else max(start, total_start)
+    end = total_end if end is None else min(end, total_end)
+
+    mask = (columns["end"] > start) & (columns["start"] < end)
+    window = {name: values[mask] for name, values in columns.items() if name != "labels"}
+    count = int(mask.sum())
+    full = points <= 0 or count <= points
+
+    if not count:
+        runs = []
+    elif full or len(_run_starts(window["label"])) <= points:
+        runs = _rle_runs(window, labels)
+    else:
+        runs = _binned_runs(window, labels, points, start, end)
+
+    mid = (window["start"] + window["end"]) / 2
+    out_series = {}
+    for name in series:
+        values = window[name].astype(np.float64)
+        valid = ~np.isnan(values)
+        x, y = mid[valid], values[valid]
+        if not full:
+            keep = lttb(x, y, points) if method == "lttb" else minmax(y, points)
+            x, y = x[keep], y[keep]
+        out_series[name] = {"t": np.round(x, 3).tolist(), "v": np.round(y, 4).tolist()}
+
+    return {
+        "start_time": round(start, 3),
+        "end_time": round(end, 3),
+        "windows": count,
+        "resolution": "full" if full else method,
+        "runs": runs,
+        "series": out_series,
+    }
+
@@ -0,0 +1,469 @@
+"""
+Upload Queue
+Background, resumable uploads of finished videos to object storage.
+
+Uploads used to run inside the request: a bucket list() round-trip, then a
+single-shot upload with an upsert retry, once for the annotated video and once
+more for the raw input. Now the request only enqueues a job and serves the
+local file; a worker thread uploads it afterwards.
+
+- Jobs are persisted in SQLite, so pending work survives restarts.
+- Failed attempts are retried with exponential backoff and jitter.
+- Bucket existence is checked once and cached (misses are re-checked after
+  a while).
+- On backends with multipart support (S3-compatible storage such as MinIO),
+  large files are sent as parts in parallel. Completed parts are persisted,
+  so a retry or a restart only sends the parts that are missing.
+"""
+
+import os
+import json
+import math
+import mimetypes
+import time
+import random
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKET = "videos"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS upload_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    bucket TEXT NOT NULL,
+    key TEXT NOT NULL,
+    path TEXT NOT NULL,
+    content_type TEXT NOT NULL,
+    delete_after INTEGER NOT NULL DEFAULT 0,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    upload_id TEXT,
+    parts TEXT,
+    url TEXT,
+    error TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS upload_jobs_due ON upload_jobs (state, next_attempt_at);
+CREATE INDEX IF NOT EXISTS upload_jobs_key ON upload_jobs (bucket, key);
+"""
+
+
+class BucketNotFoundError(Exception):
+    """The target bucket doesn't exist"""
+
+
+class StorageBackend:
+    """
+    Object storage used by the upload queue
+
+    Backends that can't do multipart uploads only implement put_file.
+    """
+
+    supports_multipart = False
+
+    def bucket_exists(self, bucket: str) -> bool:
+        raise NotImplementedError
+
+    def put_file(self, bucket: str, key: str, path: str, content_type: str):
+        raise NotImplementedError
+
+    def public_url(self, bucket: str, key: str) -> str:
+        raise NotImplementedError
+
+    def create_multipart(self, bucket: str, key: str, content_type: str) -> str:
+        raise NotImplementedError
+
+    def upload_part(self, bucket: str, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        raise NotImplementedError
+
+    def complete_multipart(self, bucket: str, key: str, upload_id: str, parts: List[Tuple[int, str]]):
+        raise NotImplementedError
+
+    def abort_multipart(self, bucket: str, key: str, upload_id: str):
+        raise NotImplementedError
+
+
+class SupabaseStorageBackend(StorageBackend):
+    """
+    Supabase Storage through the supabase client (single-shot uploads)
+
+    Args:
+        client: supabase.Client
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def bucket_exists(self, bucket: str) -> bool:
+        try:
+            self.client.storage.get_bucket(bucket)
+            return True
+        except Exception as e:
+            if "not found" in str(e).lower() or "404" in str(e):
+                return False
+            raise
+
+    def put_file(self, bucket: str, key: str, path: str, content_type: str):
+        with open(path, "rb") as f:
+            self.client.storage.from_(bucket).upload(
+                path=key, file=f, file_options={"content-type": content_type, "upsert": "true"}
+            )
+
+    def public_url(self, bucket: str, key: str) -> str:
+        return self.client.storage.from_(bucket).get_public_url(key)
+
+
+class S3StorageBackend(StorageBackend):
+    """
+    S3-compatible storage (MinIO, S3, ...) with multipart uploads, through boto3
+
+    The multipart calls map one-to-one onto boto3's public S3 API, so the
+    queue can persist each part's ETag and resume an upload where it stopped.
+
+    Args:
+        endpoint: host[:port]
+        access_key: Access key
+        secret_key: Secret key
+        secure: Use HTTPS
+        public_base_url: Base of public object URLs (default: the endpoint)
+        region: Signing region (MinIO accepts the default)
+    """
+
+    supports_multipart = True
+
+    def __init__(self, endpoint: str, access_key: str, secret_key: str, secure: bool = True,
+                 public_base_url: str = "", region: str = "us-east-1"):
+        import boto3
+        from botocore.config import Config
+
+        scheme = "https" if secure else "http"
+        # Path-style addressing (endpoint/bucket/key) works with MinIO and S3 alike
+        self.client = boto3.client(
+            "s3", endpoint_url=f"{scheme}://{endpoint}", region_name=region,
+            aws_access_key_id=access_key, aws_secret_access_key=secret_key,
+            config=Config(s3={"addressing_style": "path"})
+        )
+        self.public_base_url = (public_base_url or f"{scheme}://{endpoint}").rstrip("/")
+
+    def bucket_exists(self, bucket: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.head_bucket(Bucket=bucket)
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchBucket", "NotFound"):
+                return False
+            raise
+
+    def put_file(self, bucket: str, key: str, path: str, content_type: str):
+        self.client.upload_file(path, bucket, key, ExtraArgs={"ContentType": content_type})
+
+    def public_url(self, bucket: str, key: str) -> str:
+        return f"{self.public_base_url}/{bucket}/{quote(key)}"
+
+    def create_multipart(self, bucket: str, key: str, content_type: str) -> str:
+        return self.client.create_multipart_upload(Bucket=bucket, Key=key, ContentType=content_type)["UploadId"]
+
+    def upload_part(self, bucket: str, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        return self.client.upload_part(
+            Bucket=bucket, Key=key, UploadId=upload_id, PartNumber=part_number, Body=data
+        )["ETag"]
+
+    def complete_multipart(self, bucket: str, key: str, upload_id: str, parts: List[Tuple[int, str]]):
+        self.client.complete_multipart_upload(
+            Bucket=bucket, Key=key, UploadId=upload_id,
+            MultipartUpload={"Parts": [{"PartNumber": number, "ETag": etag} for number, etag in sorted(parts)]}
+        )
+
+    def abort_multipart(self, bucket: str, key: str, upload_id: str):
+        self.client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+
+
+class UploadQueue:
+    """
+    Persistent queue of file uploads, drained by one background thread
+
+    Args:
+        backend: Storage backend
+        db_path: SQLite file for the job table
+        part_size: Multipart part size in bytes (S3 minimum is 5 MiB)
+        parallel_parts: Parts uploaded concurrently per file
+        max_attempts: Attempts before a job is marked failed
+        base_delay: First retry delay in seconds (doubles per attempt)
+        max_delay: Retry delay cap in seconds
+        bucket_check_ttl: Seconds before a missing bucket is checked again
+    """
+
+    def __init__(self, backend: StorageBackend, db_path: str, part_size: int = 8 * 1024 * 1024,
+                 parallel_parts: int = 4, max_attempts: int = 8, base_delay: float = 2.0,
+                 max_delay: float = 300.0, bucket_check_ttl: float = 300.0):
+        self.backend = backend
+        self.part_size = part_size
+        self.parallel_parts = parallel_parts
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.bucket_check_ttl = bucket_check_ttl
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        # bucket -> (exists, checked_at)
+        self._buckets: Dict[str, Tuple[bool, float]] = {}
+        self._wake = threading.Event()
+        self._idle = threading.Event()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="upload-queue", daemon=True)
+            self._thread.start()
+            pending = self.stats().get("pending", 0)
+            if pending:
+                logger.info(f"📤 Resuming {pending} pending upload(s)")
+
+    def enqueue(self, path: str, key: Optional[str] = None, bucket: str = DEFAULT_BUCKET,
+                content_type: Optional[str] = None, delete_after: bool = False) -> str:
+        """
+        Queue a file for upload
+
+        Args:
+            path: Local file
+            key: Object key (default: the file name)
+            bucket: Target bucket
+            content_type: Object content type (default: guessed from the key)
+            delete_after: Remove the local file once it's uploaded
+
+        Returns:
+            The object's public URL (valid once the upload completes)
+        """
+        key = key or os.path.basename(path)
+        content_type = content_type or mimetypes.guess_type(key)[0] or "application/octet-stream"
+        with self._lock:
+            self._idle.clear()
+            self._conn.execute(
+                "INSERT INTO upload_jobs (bucket, key, path, content_type, delete_after, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (bucket, key, path, content_type, int(delete_after), time.time()),
+            )
+        self._wake.set()
+        return self.backend.public_url(bucket, key)
+
+    def uploaded_url(self, key: str, bucket: str = DEFAULT_BUCKET) -> Optional[str]:
+        """Public URL of a completed upload, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url FROM upload_jobs WHERE bucket = ? AND key = ? AND state = 'done' "
+                "ORDER BY id DESC LIMIT 1",
+                (bucket, key),
+            ).fetchone()
+        return row[0] if row else None
+
+    def job(self, key: str, bucket: str = DEFAULT_BUCKET) -> Optional[Dict[str, Any]]:
+        """Latest job for an object"""
+        with self._lock:
+            return self._fetch_job("WHERE bucket = ? AND key = ? ORDER BY id DESC LIMIT 1", (bucket, key))
+
+    def stats(self) -> Dict[str, int]:
+        """Job count per state"""
+        with self._lock:
+            rows = self._conn.execute("SELECT state, COUNT(*) FROM upload_jobs GROUP BY state").fetchall()
+        return dict(rows)
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until no job is due or waiting for a retry"""
+        return self._idle.wait(timeout)
+
+    def close(self, timeout: float = 5.0):
+        """Stop the worker; unfinished jobs stay pending for the next start"""
+        self._closed = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                return  # Mid-upload: the daemon thread still needs the connection
+        with self._lock:
+            self._conn.close()
+
+    def _run(self):
+        while not self._closed:
+            with self._lock:
+                job = self._fetch_job("WHERE state = 'pending' ORDER BY next_attempt_at, id LIMIT 1")
+                if job is None:
+                    self._idle.set()
+            if job is None:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+
+            delay = job["next_attempt_at"] - time.time()
+            if delay > 0:
+                self._wake.wait(delay)
+                self._wake.clear()
+                continue
+
+            self._attempt(job)
+
+    def _attempt(self, job: Dict[str, Any]):
+        if not os.path.exists(job["path"]):
+            logger.warning(f"⚠️  Upload source is gone, dropping job: {job['path']}")
+            self._update(job["id"], state="failed", error="source file missing")
+            return
+        try:
+            if not self._bucket_ready(job["bucket"]):
+                raise BucketNotFoundError(f"Bucket '{job['bucket']}' not found")
+            size = os.path.getsize(job["path"])
+            if self.backend.supports_multipart and size > self.part_size:
+                self._upload_multipart(job, size)
+            else:
+                self.backend.put_file(job["bucket"], job["key"], job["path"], job["content_type"])
+        except Exception as e:
+            attempts = job["attempts"] + 1
+            with self._lock:
+                upload_id = self._fetch_job("WHERE id = ?", (job["id"],))["upload_id"]
+            if attempts >= self.max_attempts:
+                logger.error(f"❌ Upload of {job['key']} failed after {attempts} attempts: {e}")
+                if upload_id:
+                    try:
+                        self.backend.abort_multipart(job["bucket"], job["key"], upload_id)
+                    except Exception:
+                        pass
+                self._update(job["id"], state="failed", attempts=attempts, error=str(e))
+                return
+            if upload_id and "NoSuchUpload" in str(e):
+                # The multipart upload expired or was aborted server-side: start over
+                self._update(job["id"], upload_id=None, parts=None)
+            delay = min(self.base_delay * (2 ** (attempts - 1)), self.max_delay) * random.uniform(0.5, 1.0)
+            logger.warning(f"⚠️  Upload of {job['key']} failed (attempt {attempts}), retrying in {delay:.1f}s: {e}")
+            self._update(job["id"], attempts=attempts, next_attempt_at=time.time() + delay, error=str(e))
+            return
+
+        url = self.backend.public_url(job["bucket"], job["key"])
+        self._update(job["id"], state="done", attempts=job["attempts"] + 1, url=url, error=None)
+        logger.info(f"✅ Uploaded {job['key']} to {url}")
+        if job["delete_after"]:
+            try:
+                os.remove(job["path"])
+            except OSError:
+                pass
+
+    def _upload_multipart(self, job: Dict[str, Any], size: int):
+        bucket, key = job["bucket"], job["key"]
+        upload_id = job["upload_id"]
+        if not upload_id:
+            upload_id = self.backend.create_multipart(bucket, key, job["content_type"])
+            self._update(job["id"], upload_id=upload_id, parts="{}")
+        parts: Dict[str, str] = json.loads(job["parts"] or "{}")
+
+        part_count = math.ceil(size / self.part_size)
+        missing = [number for number in range(1, part_count + 1) if str(number) not in parts]
+        parts_lock = threading.Lock()
+
+        def send(number: int):
+            with open(job["path"], "rb") as f:
+                f.seek((number - 1) * self.part_size)
+                data = f.read(self.part_size)
+            etag = self.backend.upload_part(bucket, key, upload_id, number, data)
+            with parts_lock:
+                parts[str(number)] = etag
+                self._update(job["id"], parts=json.dumps(parts))
+
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(self.parallel_parts, len(missing))) as pool:
+                futures = [pool.submit(send, number) for number in missing]
+            # Every part got its try; a failure leaves only the failed parts for the retry
+            errors = [future.exception() for future in futures if future.exception()]
+            if errors:
+                raise errors[0]
+
+        self.backend.complete_multipart(
+            bucket, key, upload_id, sorted((int(number), etag) for number, etag in parts.items())
+        )
+
+    def _bucket_ready(self, bucket: str) -> bool:
+        cached = self._buckets.get(bucket)
+        if cached and (cached[0] or time.monotonic() - cached[1] < self.bucket_check_ttl):
+            return cached[0]
+        exists = self.backend.bucket_exists(bucket)
+        self._buckets[bucket] = (exists, time.monotonic())
+        if not exists:
+            logger.warning(f"⚠️  Storage bucket '{bucket}' not found; uploads will retry")
+            logger.info(f"   💡 Create the bucket in your storage dashboard: '{bucket}'")
+        return exists
+
+    def _fetch_job(self, clause: str, params: tuple = ()) -> Optional[Dict[str, Any]]:
+        """One job as a dict; caller holds the lock"""
+        cursor = self._conn.execute(f"SELECT * FROM upload_jobs {clause}", params)
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        return dict(zip([column[0] for column in cursor.description], row))
+
+    def _update(self, job_id: int, **fields):
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE upload_jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+
+_upload_queue: Optional[UploadQueue] = None
+_upload_queue_lock = threading.Lock()
+
+
+def create_storage_backend() -> Optional[StorageBackend]:
+    """S3-compatible storage if configured, else Supabase Storage if enabled, else None"""
+    from app.core.config import settings
+
+    if settings.STORAGE_S3_ENDPOINT:
+        return S3StorageBackend(
+            settings.STORAGE_S3_ENDPOINT, settings.STORAGE_S3_ACCESS_KEY, settings.STORAGE_S3_SECRET_KEY,
+            secure=settings.STORAGE_S3_SECURE, public_base_url=settings.STORAGE_PUBLIC_URL,
+        )
+    from app.services.supabase_service import supabase_service
+
+    if supabase_service.enabled and supabase_service.client:
+        return SupabaseStorageBackend(supabase_service.client)
+    return None
+
+
+def get_upload_queue() -> Optional[UploadQueue]:
+    """Process-wide upload queue (started on first use), or None when no storage is configured"""
+    global _upload_queue
+    with _upload_queue_lock:
+        if _upload_queue is None:
+            from app.core.config import settings
+
+            try:
+                backend = create_storage_backend()
+            except Exception as e:
+                logger.error(f"❌ Failed to initialize storage backend: {e}")
+                backend = None
+            if backend is None:
+                return None
+            _upload_queue = UploadQueue(
+                backend,
+                os.path.join(settings.RESULTS_DIR, "uploads.db"),
+                part_size=settings.UPLOAD_PART_SIZE_MB * 1024 * 1024,
+                parallel_parts=settings.UPLOAD_PARALLEL_PARTS,
+                max_attempts=settings.UPLOAD_MAX_ATTEMPTS,
+            )
+            _upload_queue.start()
+        return _upload_queue
+
+
+def close_upload_queue():
+    global _upload_queue
+    with _upload_queue_lock:
+        if _upload_queue is not None:
+            _upload_queue.close()
+            _upload_queue = None
@@ -0,0 +1,528 @@
+"""
+Video Encoder
+Single-pass streaming encoder for annotated videos.
+
+Raw BGR frames are piped to one ffmpeg subprocess (H.264, yuv420p, faststart,
+audio copied from the source) from a background thread, so encoding runs
+concurrently with analysis and no second re-encode pass is needed.
+When ffmpeg (or an H.264 encoder) is unavailable we fall back to
+cv2.VideoWriter with the codec found at startup.
+
+Encoder capabilities are probed once (probe_encoder_capabilities) and cached.
+
+Analysis runs on the event loop, so it writes frames with write_async(): the
+frame is queued without blocking, and only when ffmpeg falls behind (queue
+full) does the wait move to a worker thread. close() joins the writer, waits
+for ffmpeg and remuxes; call it off the loop (asyncio.to_thread).
+
+With fragmented=True the output is written as fragmented MP4 directly under its
+final name, so it can be served (and played) while analysis is still running.
+While it grows, a marker file (output + ".encoding", holding the encoder's
+pid) sits next to it, so every worker process serving UPLOAD_DIR can tell
+(is_encoding) that it isn't final yet. Once encoding finishes the
+file is remuxed (stream copy, no re-encode) into a regular faststart MP4 with a
+single moov index, which ordinary players seek in much better. If the remux
+fails the fragmented file is kept; it still plays.
+"""
+
+import os
+import sys
+import queue
+import asyncio
+import shutil
+import logging
+import tempfile
+import threading
+import subprocess
+from typing import List, Optional
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# H.264 encoders in order of preference (all browser compatible)
+_H264_ENCODERS = ["libx264", "libopenh264"]
+
+# OpenCV fourcc codes in order of preference (fallback path only)
+_FOURCC_OPTIONS = [
+    ('avc1', 'H.264 (avc1)'),  # Best browser support
+    ('H264', 'H.264 (H264)'),  # Alternative H.264
+    ('XVID', 'Xvid'),          # Fallback
+    ('mp4v', 'MPEG-4 Part 2')  # Last resort
+]
+
+# Containers whose audio streams can be copied into MP4 without re-encoding
+_AUDIO_COPY_EXTENSIONS = {".mp4", ".m4v", ".mov"}
+
+# Frames buffered between analysis and the encoder thread (backpressure beyond this)
+_QUEUE_SIZE = 64
+
+
+class EncoderCapabilities:
+    """What this machine can encode with, probed once at startup"""
+
+    def __init__(self, ffmpeg_path: Optional[str] = None, h264_encoder: Optional[str] = None,
+                 opencv_fourcc: Optional[str] = None, opencv_codec_name: Optional[str] = None):
+        self.ffmpeg_path = ffmpeg_path
+        self.h264_encoder = h264_encoder
+        self.opencv_fourcc = opencv_fourcc
+        self.opencv_codec_name = opencv_codec_name
+
+    @property
+    def use_ffmpeg(self) -> bool:
+        return bool(self.ffmpeg_path and self.h264_encoder)
+
+    def __repr__(self):
+        return (f"EncoderCapabilities(ffmpeg={self.ffmpeg_path!r}, h264={self.h264_encoder!r}, "
+                f"opencv_fourcc={self.opencv_fourcc!r})")
+
+
+# Keyframe (and so fragment) interval for progressive output, in seconds
+_FRAGMENT_SECONDS = 2
+
+_capabilities: Optional[EncoderCapabilities] = None
+_capabilities_lock = threading.Lock()
+
+# Marker next to an output a progressive encoder is still appending to
+ENCODING_SUFFIX = ".encoding"
+
+
+def is_encoding(path: str) -> bool:
+    """True while a progressive encoder (in any process on this host) is still appending to this file"""
+    try:
+        with open(path + ENCODING_SUFFIX) as f:
+            pid = int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return False
+    # A marker left behind by a crashed worker doesn't count
+    return _pid_alive(pid)
+
+
+def is_encoding_file(path: str) -> bool:
+    """is_encoding for an output, or for the marker of an output being encoded"""
+    if path.endswith(ENCODING_SUFFIX):
+        return is_encoding(path[:-len(ENCODING_SUFFIX)])
+    return is_encoding(path)
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _set_encoding(path: str, active: bool):
+    marker = path + ENCODING_SUFFIX
+    if active:
+        with open(marker, "w") as f:
+            f.write(str(os.getpid()))
+    else:
+        try:
+            os.remove(marker)
+        except FileNotFoundError:
+            pass
+
+
+def _probe_ffmpeg_encoder(ffmpeg_path: str) -> Optional[str]:
+    """Return the preferred H.264 encoder ffmpeg was built with"""
+    try:
+        result = subprocess.run(
+            [ffmpeg_path, "-hide_banner", "-encoders"],
+            capture_output=True, text=True, timeout=10
+        )
+    except (subprocess.TimeoutExpired, OSError) as e:
+        logger.warning(f"⚠️  Could not query ffmpeg encoders: {e}")
+        return None
+
+    available = set()
+    for line in result.stdout.splitlines():
+        parts = line.split()
+        if len(parts) >= 2 and parts[0].startswith("V"):
+            available.add(parts[1])
+    for encoder in _H264_ENCODERS:
+        if encoder in available:
+            return encoder
+    return None
+
+
+def _probe_opencv_fourcc() -> Optional[tuple]:
+    """Find the first fourcc cv2.VideoWriter can open (writes a tiny temp file)"""
+    # OpenCV/FFMPEG print codec warnings straight to the stderr file descriptor;
+    # silence them for the duration of the probe only
+    devnull_fd = None
+    original_stderr_fd = None
+    probe_dir = tempfile.mkdtemp(prefix="encoder_probe_")
+    probe_path = os.path.join(probe_dir, "probe.mp4")
+    try:
+        try:
+            devnull_fd = os.open(os.devnull, os.O_WRONLY)
+            original_stderr_fd = os.dup(sys.stderr.fileno())
+            os.dup2(devnull_fd, sys.stderr.fileno())
+        except (OSError, ValueError):
+            pass
+
+        for fourcc_code, codec_name in _FOURCC_OPTIONS:
+            writer = None
+            try:
+                writer = cv2.VideoWriter(probe_path, cv2.VideoWriter_fourcc(*fourcc_code), 30, (64, 64))
+                if writer.isOpened():
+                    return fourcc_code, codec_name
+            except Exception as e:
+                logger.debug(f"⚠️  Failed to initialize {codec_name}: {e}")
+            finally:
+                if writer is not None:
+                    writer.release()
+        return None
+    finally:
+        if original_stderr_fd is not None:
+            os.dup2(original_stderr_fd, sys.stderr.fileno())
+            os.close(original_stderr_fd)
+        if devnull_fd is not None:
+            os.close(devnull_fd)
+        shutil.rmtree(probe_dir, ignore_errors=True)
+
+
+def probe_encoder_capabilities(force: bool = False) -> EncoderCapabilities:
+    """
+    Probe ffmpeg / OpenCV encoding support once and cache the result
+
+    Args:
+        force: Re-probe even if a cached result exists
+    """
+    global _capabilities
+    with _capabilities_lock:
+        if _capabilities is not None and not force:
+            return _capabilities
+
+        capabilities = EncoderCapabilities()
+        ffmpeg_path = shutil.which("ffmpeg")
+        if ffmpeg_path:
+            capabilities.ffmpeg_path = ffmpeg_path
+            capabilities.h264_encoder = _probe_ffmpeg_encoder(ffmpeg_path)
+
+        if capabilities.use_ffmpeg:
+            logger.info(f"✅ Video encoder: ffmpeg pipe ({capabilities.h264_encoder})")
+        else:
+            if not ffmpeg_path:
+                logger.warning("⚠️  FFmpeg not found, annotated videos may not play in all browsers")
+            else:
+                logger.warning("⚠️  FFmpeg has no H.264 encoder, falling back to OpenCV VideoWriter")
+            probed = _probe_opencv_fourcc()
+            if probed:
+                capabilities.opencv_fourcc, capabilities.opencv_codec_name = probed
+                logger.info(f"✅ Video encoder: OpenCV VideoWriter ({capabilities.opencv_codec_name})")
+            else:
+                logger.error("❌ No working video encoder found")
+
+        _capabilities = capabilities
+        return capabilities
+
+
+def build_ffmpeg_command(ffmpeg_path: str, h264_encoder: str, output_path: str, fps: float,
+                         width: int, height: int, audio_source: Optional[str] = None,
+                         fragmented: bool = False) -> List[str]:
+    """ffmpeg arguments for encoding raw BGR frames from stdin (+ source audio)"""
+    cmd = [
+        ffmpeg_path, "-hide_banner", "-loglevel", "error",
+        "-f", "rawvideo", "-pix_fmt", "bgr24",
+        "-s", f"{width}x{height}", "-r", str(fps),
+        "-i", "pipe:0",
+    ]
+    if audio_source:
+        cmd += ["-i", audio_source, "-map", "0:v:0", "-map", "1:a:0?"]
+    cmd += ["-c:v", h264_encoder]
+    if h264_encoder == "libx264":
+        cmd += ["-preset", "fast", "-crf", "23"]
+    cmd += ["-pix_fmt", "yuv420p"]
+    if fragmented:
+        # Regular keyframes so each fragment becomes playable soon after it is encoded
+        cmd += ["-g", str(max(1, int(round(fps * _FRAGMENT_SECONDS))))]
+    if audio_source:
+        ext = os.path.splitext(audio_source)[1].lower()
+        # Copy audio where MP4 can hold it as-is; otherwise a (cheap) AAC encode
+        cmd += ["-c:a", "copy"] if ext in _AUDIO_COPY_EXTENSIONS else ["-c:a", "aac"]
+        cmd += ["-shortest"]
+    if fragmented:
+        cmd += ["-movflags", "+frag_keyframe+empty_moov+default_base_moof"]
+    else:
+        cmd += ["-movflags", "+faststart"]
+    cmd += ["-f", "mp4", "-y", output_path]
+    return cmd
+
+
+def build_remux_command(ffmpeg_path: str, input_path: str, output_path: str) -> List[str]:
+    """ffmpeg arguments for rewriting a finished (fragmented) MP4 as faststart MP4"""
+    return [
+        ffmpeg_path, "-hide_banner", "-loglevel", "error",
+        "-i", input_path,
+        "-map", "0", "-c", "copy",
+        "-movflags", "+faststart",
+        "-f", "mp4", "-y", output_path,
+    ]
+
+
+class VideoEncoder:
+    """
+    Base class for annotated video encoders
+
+    Frames passed to write() may be held until encoded - don't modify them afterwards.
+    """
+
+    # True if output_path is playable while encoding is still in progress
+    progressive = False
+
+    def __init__(self, output_path: str, fps: float, width: int, height: int):
+        self.output_path = output_path
+        self.fps = fps
+        self.width = width
+        self.height = height
+        self.frames_written = 0
+
+    def write(self, frame: np.ndarray):
+        raise NotImplementedError
+
+    async def write_async(self, frame: np.ndarray):
+        """write() without blocking the event loop"""
+        await asyncio.to_thread(self.write, frame)
+
+    def close(self) -> bool:
+        """Finish encoding; returns True if the output video is complete (blocks until then)"""
+        raise NotImplementedError
+
+    def abort(self):
+        """Stop encoding and discard the output"""
+        raise NotImplementedError
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+class FFmpegPipeEncoder(VideoEncoder):
+    """Streams raw frames into a single ffmpeg process from a writer thread"""
+
+    def __init__(self, output_path: str, fps: float, width: int, height: int,
+                 capabilities: EncoderCapabilities, audio_source: Optional[str] = None,
+                 fragmented: bool = False):
+        super().__init__(output_path, fps, width, height)
+        self.progressive = fragmented
+        self._ffmpeg_path = capabilities.ffmpeg_path
+        # Fragmented output is written in place so it can be served while growing;
+        # otherwise encode to a temp name and move into place once complete
+        self._tmp_path = output_path if fragmented else output_path + ".part"
+        cmd = build_ffmpeg_command(
+            capabilities.ffmpeg_path, capabilities.h264_encoder, self._tmp_path,
+            fps, width, height, audio_source=audio_source, fragmented=fragmented
+        )
+        # stderr goes to a temp file so a chatty ffmpeg can never block on a full pipe
+        self._stderr = tempfile.TemporaryFile()
+        # Marked before ffmpeg creates the file, so nothing serves it as final
+        if self.progressive:
+            _set_encoding(output_path, True)
+        try:
+            self._process = subprocess.Popen(
+                cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=self._stderr
+            )
+        except OSError:
+            self._stderr.close()
+            self._finish_progressive()
+            raise
+        self._queue: "queue.Queue[Optional[np.ndarray]]" = queue.Queue(maxsize=_QUEUE_SIZE)
+        self._error: Optional[str] = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._pump, name="ffmpeg-encoder", daemon=True)
+        self._thread.start()
+
+    def _pump(self):
+        """Writer thread: feed queued frames to ffmpeg stdin"""
+        stdin = self._process.stdin
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                break
+            if self._error:
+                continue  # drain so producers never block on a dead encoder
+            try:
+                stdin.write(np.ascontiguousarray(frame).data)
+            except (BrokenPipeError, OSError) as e:
+                self._error = f"ffmpeg pipe closed: {e}"
+        try:
+            stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+
+    def write(self, frame: np.ndarray):
+        self._queue.put(self._prepare(frame))
+        self.frames_written += 1
+
+    async def write_async(self, frame: np.ndarray):
+        """Queue a frame; waits (in a worker thread) only while the queue is full"""
+        frame = self._prepare(frame)
+        try:
+            self._queue.put_nowait(frame)
+        except queue.Full:
+            await asyncio.to_thread(self._queue.put, frame)
+        self.frames_written += 1
+
+    def _prepare(self, frame: np.ndarray) -> np.ndarray:
+        if self._closed:
+            raise ValueError("Encoder already closed")
+        if frame.shape[0] != self.height or frame.shape[1] != self.width:
+            frame = cv2.resize(frame, (self.width, self.height))
+        return frame
+
+    def close(self) -> bool:
+        if self._closed:
+            return self._error is None
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+        try:
+            self._process.wait(timeout=300)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+            self._process.wait()
+            self._error = self._error or "ffmpeg timed out"
+
+        if self._process.returncode != 0 and not self._error:
+            self._error = self._read_stderr() or f"ffmpeg exited with {self._process.returncode}"
+        self._stderr.close()
+
+        if self._error or not os.path.exists(self._tmp_path):
+            logger.warning(f"⚠️  FFmpeg encoding failed: {self._error}")
+            self._remove_tmp()
+            self._finish_progressive()
+            return False
+
+        if self._tmp_path != self.output_path:
+            os.replace(self._tmp_path, self.output_path)
+        else:
+            # Still marked as encoding, so nothing treats it as final mid-remux
+            self._remux_faststart()
+        self._finish_progressive()
+        logger.info(f"✅ Encoded {self.frames_written} frames to H.264: {self.output_path}")
+        return True
+
+    def abort(self):
+        if not self._closed:
+            self._closed = True
+            self._error = self._error or "aborted"
+            self._queue.put(None)
+        if self._process.poll() is None:
+            self._process.kill()
+        self._thread.join(timeout=5)
+        try:
+            self._process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            pass
+        self._stderr.close()
+        self._remove_tmp()
+        self._finish_progressive()
+
+    def _remux_faststart(self):
+        """Replace the finished fragmented output with a faststart copy of it"""
+        remux_path = self.output_path + ".remux"
+        cmd = build_remux_command(self._ffmpeg_path, self.output_path, remux_path)
+        try:
+            result = subprocess.run(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                    stderr=subprocess.PIPE, timeout=300)
+            error = result.stderr.decode("utf-8", "replace").strip()[-500:] if result.returncode else None
+        except (subprocess.TimeoutExpired, OSError) as e:
+            error = str(e)
+        if not error and (not os.path.exists(remux_path) or os.path.getsize(remux_path) == 0):
+            error = "no output"
+        if error:
+            logger.warning(f"⚠️  Faststart remux failed, keeping fragmented MP4: {error}")
+            if os.path.exists(remux_path):
+                os.remove(remux_path)
+            return
+        # Readers that already opened the fragmented file keep their copy
+        os.replace(remux_path, self.output_path)
+
+    def _finish_progressive(self):
+        if self.progressive:
+            _set_encoding(self.output_path, False)
+
+    def _read_stderr(self) -> str:
+        self._stderr.seek(0)
+        return self._stderr.read().decode("utf-8", "replace").strip()[-500:]
+
+    def _remove_tmp(self):
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+class OpenCVVideoEncoder(VideoEncoder):
+    """cv2.VideoWriter fallback using the fourcc found at startup (no audio)"""
+
+    def __init__(self, output_path: str, fps: float, width: int, height: int,
+                 capabilities: EncoderCapabilities):
+        super().__init__(output_path, fps, width, height)
+        if not capabilities.opencv_fourcc:
+            raise ValueError("Failed to initialize video writer with any codec")
+        fourcc = cv2.VideoWriter_fourcc(*capabilities.opencv_fourcc)
+        self._writer = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
+        if not self._writer.isOpened():
+            raise ValueError("Failed to initialize video writer with any codec")
+        self._closed = False
+
+    def write(self, frame: np.ndarray):
+        self._writer.write(frame)
+        self.frames_written += 1
+
+    def close(self) -> bool:
+        if not self._closed:
+            self._closed = True
+            self._writer.release()
+        return os.path.exists(self.output_path) and os.path.getsize(self.output_path) > 0
+
+    def abort(self):
+        self.close()
+        if os.path.exists(self.output_path):
+            os.remove(self.output_path)
+
+
+def open_video_encoder(output_path: str, fps: float, width: int, height: int,
+                       audio_source: Optional[str] = None,
+                       capabilities: Optional[EncoderCapabilities] = None,
+                       fragmented: bool = False) -> VideoEncoder:
+    """
+    Open the best available encoder for an annotated video
+
+    Args:
+        output_path: Final MP4 path
+        fps: Output frame rate
+        width, height: Frame size
+        audio_source: Original video whose audio track is carried over (ffmpeg only)
+        capabilities: Probed capabilities (defaults to the cached probe)
+        fragmented: Write fragmented MP4 that is playable while encoding (ffmpeg only;
+            the OpenCV fallback always produces a regular file at the end)
+    """
+    capabilities = capabilities or probe_encoder_capabilities()
+    if capabilities.use_ffmpeg:
+        try:
+            return FFmpegPipeEncoder(
+                output_path, fps, width, height, capabilities,
+                audio_source=audio_source, fragmented=fragmented
+            )
+        except OSError as e:
+            logger.warning(f"⚠️  Could not start ffmpeg ({e}), falling back to OpenCV VideoWriter")
+            if not capabilities.opencv_fourcc:
+                probed = _probe_opencv_fourcc()
+                if probed:
+                    capabilities.opencv_fourcc, capabilities.opencv_codec_name = probed
+    return OpenCVVideoEncoder(output_path, fps, width, height, capabilities)
@@ -9,36 +9,55 @@ import os
 import base64
 import mediapipe as mp
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 import logging
 from datetime import datetime
 import uuid
-import subprocess
-import shutil
 import copy
+import asyncio
 
 from app.core.config import settings
 
 from app.models.yolo_detector import PlayerDetector
 from app.models.pose_extractor import PoseExtractor
 from app.models.action_classifier import ActionClassifier
-from app.models.metrics_engine import PerformanceMetricsEngine
 from app.models.shot_outcome_detector import ShotOutcomeDetector
 from app.models.ai_coach import AICoach
 from app.models.court_detector import CourtDetector
 from app.models.form_quality_analyzer import FormQualityAnalyzer
 from app.models.action_segmenter import ActionSegmenter
-from app.models.pose_normalizer import PoseNormalizer, PoseSmoother
-from app.models.biomechanics_engine import BiomechanicsEngine
+from app.models.pose_normalizer import PoseNormalizer
 from app.models.rule_based_evaluator import RuleBasedEvaluator
+from app.services.annotation_renderer import create_annotation_renderer, CachedAnnotationRenderer
+from app.services.video_encoder import open_video_encoder, probe_encoder_capabilities
+from app.services.live_frame_cache import LiveFrameCache
+from app.services.pipeline_context import PipelineContext
+from app.services.inference_scheduler import InferenceScheduler, InlineInference, PRIORITY_BATCH, PRIORITY_LIVE
+from app.services.storage_manager import get_storage_manager
+from app.api.websocket_video import publish_frame, end_stream, send_message_async, has_connection
+from app.services.overlay_track import (
+    OverlayTrackWriter, OverlayTrackReader, track_path, array_to_landmarks, landmarks_to_array,
+    is_valid_video_id, shard_track_path, merge_overlay_tracks
+)
+from app.services.timeline_summary import save_columns, summarize_timeline
+from app.services.window_spill import WindowSpill
+from app.services.action_stats import ActionStats
+from app.services.video_shards import (
+    Shard, plan_shards, find_keyframes, shard_count, run_shards, discard_shard_result
+)
 from app.core.schemas import (
     VideoAnalysisResult, ActionClassification, PerformanceMetrics, ActionProbabilities, 
     Recommendation, ShotOutcome, TimelineSegment, FormQualityAssessment, FormQualityIssue,
-    IndividualActionAnalysis
+    IndividualActionAnalysis, LivePose, TimelineSummary
 )
 
 logger = logging.getLogger(__name__)
 
+# Assumed frame rate of live sessions (~10 fps based on the client send interval)
+LIVE_FPS = 10.0
+# Live player crops shorter than this (px) are re-cut from the full-resolution frame when available
+LIVE_MIN_POSE_ROI = 256
+
 
 class VideoProcessor:
     """
@@ -49,9 +68,17 @@ class VideoProcessor:
     - Performance metrics (NEW!)
     """
     
-    def __init__(self):
-        """Initialize all AI models"""
-        logger.info("🚀 Initializing Video Processor...")
+    def __init__(self, shard_worker: bool = False):
+        """
+        Initialize all AI models
+        
+        Args:
+            shard_worker: Load only what process_shard needs (detector, pose,
+                classifier and per-window analyzers) and run model calls
+                inline, without the AI coach, encoder probe, annotation
+                renderer or inference thread
+        """
+        logger.info("🚀 Initializing Video Processor..." if not shard_worker else "🧩 Initializing shard worker...")
         
         try:
             self.player_detector = PlayerDetector()
@@ -87,7 +114,6 @@ class VideoProcessor:
                 logger.warning("⚠️  No trained model found, using pre-trained VideoMAE (may have poor accuracy)")
                 self.action_classifier = ActionClassifier()
             
-            self.metrics_engine = PerformanceMetricsEngine()
             self.shot_outcome_detector = ShotOutcomeDetector()
             self.court_detector = CourtDetector()
             self.form_quality_analyzer = FormQualityAnalyzer()
@@ -95,14 +121,32 @@ class VideoProcessor:
             # Enhanced components for coaching pipeline
             self.action_segmenter = ActionSegmenter(window_size=settings.SEQUENCE_LENGTH, stride=8, smoothing_method='median')
             self.pose_normalizer = PoseNormalizer()
-            self.pose_smoother = PoseSmoother(method='one_euro', beta=0.1)
-            self.biomechanics_engine = BiomechanicsEngine(fps=30.0)  # Will be updated with actual fps
-            
-            # Frame-level action tracking for temporal smoothing
-            self.frame_action_buffer = []  # Store recent frame predictions
-            self.frame_buffer_size = 15  # ~0.5 seconds at 30fps for smoothing
+            # Smoothing, biomechanics and metrics state is per analysis (see create_context)
             self.rule_based_evaluator = RuleBasedEvaluator()
             
+            if shard_worker:
+                # One shard at a time per worker process: no scheduling, nothing to annotate or coach
+                self.inference = InlineInference()
+                self.annotation_renderer = None
+                self.encoder_capabilities = None
+                self.ai_coach = None
+                logger.info("✅ Shard worker models loaded")
+                return
+            
+            # All model calls go through one inference thread: live windows before upload frames
+            self.inference = InferenceScheduler()
+            
+            # Annotation renderer (cached overlays; "none" switches drawing off)
+            self.annotation_renderer = create_annotation_renderer(
+                settings.ANNOTATION_RENDERER,
+                mp_drawing=self.mp_drawing,
+                mp_pose=self.mp_pose,
+                landmark_style=self.mp_drawing_styles.get_default_pose_landmarks_style()
+            )
+            
+            # Probe ffmpeg/OpenCV encoders once; every annotated video reuses the result
+            self.encoder_capabilities = probe_encoder_capabilities()
+            
             # Initialize AI Coach
             # LLaMA 3.1 requires Hugging Face authentication for gated models
             # Skip it if not authenticated to avoid errors
@@ -208,242 +252,60 @@ class VideoProcessor:
         hoop_info: Dict = None,
         current_action: Optional[str] = None,
         action_confidence: float = 0.0,
-        form_quality: Optional[FormQualityAssessment] = None
+        form_quality: Optional[FormQualityAssessment] = None,
+        in_place: bool = False
     ) -> np.ndarray:
         """Draw bounding boxes, pose landmarks, and action labels on frame"""
-        annotated_frame = frame.copy()
-        
-        # Draw pose landmarks
-        if pose_landmarks:
-            self.mp_drawing.draw_landmarks(
-                annotated_frame,
-                pose_landmarks,
-                self.mp_pose.POSE_CONNECTIONS,
-                landmark_drawing_spec=self.mp_drawing_styles.get_default_pose_landmarks_style()
-            )
-            
-        # Draw player bounding boxes (green)
-        for det in detections:
-            bbox = det['bbox']
-            conf = det['confidence']
-            cls = det['class']
-            
-            x1, y1, x2, y2 = map(int, bbox)
-            
-            # Draw box (green for players)
-            cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-            
-            # Draw label
-            label = f"{cls} {conf:.2f}"
-            cv2.putText(annotated_frame, label, (x1, y1 - 10), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-        
-        # Draw basketball bounding boxes (orange/red)
-        if basketball_detections:
-            for det in basketball_detections:
-                bbox = det['bbox']
-                conf = det['confidence']
-                cls = det['class']
-                is_predicted = det.get('predicted', False)
-                
-                x1, y1, x2, y2 = map(int, bbox)
-                
-                # Different colors for detected vs predicted
-                if is_predicted:
-                    # Lighter orange for predicted position
-                    color = (0, 200, 255)
-                    thickness = 2
-                else:
-                    # Solid orange for detected
-                    color = (0, 165, 255)
-                    thickness = 3
-                
-                # Draw box
-                cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), color, thickness)
-                
-                # Draw label
-                label = f"{cls} {conf:.2f}"
-                if is_predicted:
-                    label += " (pred)"
-                cv2.putText(annotated_frame, label, (x1, y1 - 10), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
-                
-                # Draw circle in center to highlight basketball
-                center_x = (x1 + x2) // 2
-                center_y = (y1 + y2) // 2
-                radius = max(5, min((x2 - x1), (y2 - y1)) // 4)
-                cv2.circle(annotated_frame, (center_x, center_y), radius, color, 2 if is_predicted else 3)
-                
-                # Draw shot zone label if available
-                if det.get('shot_zone'):
-                    zone_label = det['shot_zone'].replace('_', ' ').title()
-                    cv2.putText(annotated_frame, zone_label, (x1, y2 + 20), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
-        
-        # Draw court lines (filtered and limited for clarity)
-        if court_info and court_info.get("lines"):
-            lines = court_info["lines"]
-            h, w = annotated_frame.shape[:2]
-            
-            # Filter and draw only the longest, most prominent court lines
-            def filter_court_lines(line_list, min_length=150, max_count=8):
-                """Filter lines by length and limit count"""
-                filtered = []
-                for line in line_list:
-                    x1, y1, x2, y2 = line
-                    length = ((x2-x1)**2 + (y2-y1)**2)**0.5  # Use **0.5 instead of np.sqrt
-                    if length >= min_length:
-                        filtered.append((line, length))
-                # Sort by length and take top N
-                filtered.sort(key=lambda x: x[1], reverse=True)
-                return [line for line, _ in filtered[:max_count]]
-            
-            # Draw horizontal lines (court boundaries, center line, free throw line)
-            # Only draw long horizontal lines that are likely court boundaries
-            horizontal_lines = filter_court_lines(lines.get("horizontal", []), min_length=200, max_count=5)
-            for line in horizontal_lines:
-                x1, y1, x2, y2 = map(int, line)
-                # Only draw if line is reasonably horizontal and long enough
-                if abs(y2 - y1) < 20:  # Nearly horizontal
-                    cv2.line(annotated_frame, (x1, y1), (x2, y2), (0, 255, 255), 2)  # Yellow
-            
-            # Draw vertical lines (sidelines) - be more selective
-            vertical_lines = filter_court_lines(lines.get("vertical", []), min_length=150, max_count=4)
-            for line in vertical_lines:
-                x1, y1, x2, y2 = map(int, line)
-                # Only draw if line is reasonably vertical
-                if abs(x2 - x1) < 20:  # Nearly vertical
-                    cv2.line(annotated_frame, (x1, y1), (x2, y2), (255, 255, 0), 2)  # Cyan
-            
-            # Draw diagonal lines (3-point arc segments) - very selective
-            diagonal_lines = filter_court_lines(lines.get("diagonal", []), min_length=100, max_count=6)
-            for line in diagonal_lines:
-                x1, y1, x2, y2 = map(int, line)
-                # Draw diagonal lines (3-point arc, free throw arc)
-                cv2.line(annotated_frame, (x1, y1), (x2, y2), (0, 255, 0), 1)  # Green, thinner
-            
-            # Draw key points (only if they make sense)
-            # Skip key points drawing to reduce clutter - hoop detection is more reliable
-        
-        # Draw hoop
-        if hoop_info:
-            center = hoop_info["center"]
-            bbox = hoop_info["bbox"]
-            center_x, center_y = int(center[0]), int(center[1])
-            
-            # Draw hoop circle
-            x1, y1, x2, y2 = bbox
-            radius = max((x2 - x1), (y2 - y1)) // 2
-            cv2.circle(annotated_frame, (center_x, center_y), radius, (0, 255, 255), 3)
-            
-            # Draw hoop label
-            cv2.putText(annotated_frame, "HOOP", (center_x - 20, center_y - radius - 10),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
-        
-        # Draw current action label (REAL-TIME ACTION DETECTION)
-        if current_action:
-            h, w = annotated_frame.shape[:2]
-            
-            # Format action label (capitalize, replace underscores)
-            action_display = current_action.replace('_', ' ').title()
-            
-            # Choose color based on action type
-            if 'shot' in current_action.lower() or 'free_throw' in current_action.lower() or 'layup' in current_action.lower() or 'dunk' in current_action.lower():
-                action_color = (255, 100, 100)  # Red for shooting
-            elif 'dribbl' in current_action.lower():
-                action_color = (100, 255, 100)  # Green for dribbling
-            elif 'pass' in current_action.lower():
-                action_color = (100, 100, 255)  # Blue for passing
-            elif 'defense' in current_action.lower():
-                action_color = (255, 255, 100)  # Yellow for defense
-            else:
-                action_color = (200, 200, 200)  # Gray for other actions
-            
-            # Draw action label background box
-            label_text = f"{action_display}"
-            if action_confidence > 0:
-                label_text += f" ({action_confidence:.0%})"
-            
-            # Calculate text size
-            font = cv2.FONT_HERSHEY_SIMPLEX
-            font_scale = 0.8
-            thickness = 2
-            (text_width, text_height), baseline = cv2.getTextSize(label_text, font, font_scale, thickness)
-            
-            # Position at top-left corner
-            padding = 10
-            box_x1 = padding
-            box_y1 = padding
-            box_x2 = box_x1 + text_width + padding * 2
-            box_y2 = box_y1 + text_height + padding * 2
-            
-            # Draw semi-transparent background
-            overlay = annotated_frame.copy()
-            cv2.rectangle(overlay, (box_x1, box_y1), (box_x2, box_y2), (0, 0, 0), -1)
-            cv2.addWeighted(overlay, 0.6, annotated_frame, 0.4, 0, annotated_frame)
-            
-            # Draw action label text
-            text_y = box_y1 + text_height + padding
-            cv2.putText(annotated_frame, label_text, (box_x1 + padding, text_y), 
-                       font, font_scale, action_color, thickness)
-            
-            # Draw form quality indicator if available
-            if form_quality:
-                quality_rating = form_quality.quality_rating
-                if quality_rating == "excellent":
-                    quality_color = (0, 255, 0)  # Green
-                    quality_text = "✓ Excellent Form"
-                elif quality_rating == "good":
-                    quality_color = (0, 255, 255)  # Yellow
-                    quality_text = "✓ Good Form"
-                elif quality_rating == "needs_improvement":
-                    quality_color = (0, 165, 255)  # Orange
-                    quality_text = "⚠ Needs Improvement"
-                else:  # poor
-                    quality_color = (0, 0, 255)  # Red
-                    quality_text = "✗ Poor Form"
-                
-                # Draw quality indicator below action label
-                quality_y = box_y2 + padding + text_height
-                (quality_width, quality_height), _ = cv2.getTextSize(quality_text, font, 0.6, 1)
-                quality_box_x2 = box_x1 + quality_width + padding * 2
-                quality_box_y2 = quality_y + quality_height + padding
-                
-                # Draw quality background
-                overlay = annotated_frame.copy()
-                cv2.rectangle(overlay, (box_x1, box_y2 + padding), (quality_box_x2, quality_box_y2), (0, 0, 0), -1)
-                cv2.addWeighted(overlay, 0.6, annotated_frame, 0.4, 0, annotated_frame)
-                
-                # Draw quality text
-                cv2.putText(annotated_frame, quality_text, (box_x1 + padding, quality_y + quality_height), 
-                           font, 0.6, quality_color, 1)
-                
-                # Show top issue if form needs improvement
-                if form_quality.issues and quality_rating in ["needs_improvement", "poor"]:
-                    top_issue = form_quality.issues[0]
-                    issue_text = f"Fix: {top_issue.issue_type.replace('_', ' ').title()}"
-                    issue_y = quality_box_y2 + padding + quality_height
-                    (issue_width, issue_height), _ = cv2.getTextSize(issue_text, font, 0.5, 1)
-                    issue_box_x2 = box_x1 + issue_width + padding * 2
-                    issue_box_y2 = issue_y + issue_height + padding
-                    
-                    # Draw issue background
-                    overlay = annotated_frame.copy()
-                    cv2.rectangle(overlay, (box_x1, quality_box_y2 + padding), (issue_box_x2, issue_box_y2), (0, 0, 0), -1)
-                    cv2.addWeighted(overlay, 0.6, annotated_frame, 0.4, 0, annotated_frame)
-                    
-                    # Draw issue text
-                    cv2.putText(annotated_frame, issue_text, (box_x1 + padding, issue_y + issue_height), 
-                               font, 0.5, quality_color, 1)
-                       
-        return annotated_frame
+        return self.annotation_renderer.render(
+            frame,
+            detections,
+            pose_landmarks,
+            basketball_detections,
+            court_info,
+            hoop_info,
+            current_action=current_action,
+            action_confidence=action_confidence,
+            form_quality=form_quality,
+            in_place=in_place
+        )
 
-    async def process_video(self, video_path: str, video_id: Optional[str] = None) -> VideoAnalysisResult:
+    async def process_video(
+        self,
+        video_path: str,
+        video_id: Optional[str] = None,
+        annotate: bool = True
+    ) -> VideoAnalysisResult:
         """
         Process video file and return analysis results
+        
+        Memory stays flat with video length: completed windows are spilled to
+        disk (WindowSpill) and the result is assembled from the spill. Long
+        videos are analyzed as time shards in parallel worker processes when
+        ANALYSIS_SHARD_WORKERS is set (see video_shards).
+        
+        Args:
+            video_path: Path to the uploaded video
+            video_id: ID used for WebSocket streaming and stored artefacts
+            annotate: If False, skip writing the annotated video and persist an
+                overlay track instead (render later via render_annotated_video)
         """
+        spill = WindowSpill()
+        try:
+            return await self._process_video(video_path, video_id, annotate, spill)
+        finally:
+            spill.close()
+    
+    async def _process_video(
+        self,
+        video_path: str,
+        video_id: Optional[str],
+        annotate: bool,
+        spill: WindowSpill
+    ) -> VideoAnalysisResult:
         if not os.path.exists(video_path):
             raise FileNotFoundError(f"Video file not found: {video_path}")
+        
+        video_id = video_id or str(uuid.uuid4())
             
         cap = cv2.VideoCapture(video_path)
         if not cap.isOpened():
@@ -468,81 +330,77 @@ class VideoProcessor:
             logger.warning(f"⚠️  Invalid or zero FPS detected ({fps}). Using default FPS of 30.")
             fps = 30  # Default to 30 fps for common video formats
         
+        shards = self._plan_video_shards(video_path, video_id, fps, total_frames)
+        if len(shards) > 1:
+            cap.release()
+            return await self._process_sharded(video_path, video_id, annotate, spill, shards)
+        
         # Prepare output video
         output_filename = f"processed_{os.path.basename(video_path)}"
         output_path = os.path.join(os.path.dirname(video_path), output_filename)
         
-        # Use H.264 codec for browser compatibility (avc1/h264)
-        # Try different codecs in order of preference
-        # Note: OpenCV/FFMPEG may print warnings to stderr, but these are non-fatal
-        # The codec selection will automatically fall back to working codecs
-        fourcc_options = [
-            ('avc1', 'H.264 (avc1)'),  # Best browser support
-            ('H264', 'H.264 (H264)'),  # Alternative H.264
-            ('XVID', 'Xvid'),          # Fallback
-            ('mp4v', 'MPEG-4 Part 2')  # Last resort
-        ]
-        
         out = None
-        used_codec = None
-        
-        # Suppress OpenCV/FFMPEG stderr output during codec selection
-        # OpenCV writes directly to file descriptor, so we need FD-level redirection
-        import sys
-        devnull_fd = None
-        original_stderr_fd = None
+        track_writer = None
+        if annotate:
+            # Fragmented MP4 so /api/videos can serve it while analysis is still running
+            out = open_video_encoder(
+                output_path, fps, width, height,
+                audio_source=video_path, capabilities=self.encoder_capabilities,
+                fragmented=True
+            )
+        else:
+            # Analysis-only: persist what would have been drawn, render later on demand
+            track_writer = OverlayTrackWriter(
+                track_path(video_id), video_id, fps, width, height,
+                source=os.path.basename(video_path)
+            )
         
+        action_stats = ActionStats()
         try:
-            # Open /dev/null for writing
-            devnull_fd = os.open(os.devnull, os.O_WRONLY)
-            # Save original stderr file descriptor
-            original_stderr_fd = os.dup(sys.stderr.fileno())
-            # Redirect stderr to /dev/null
-            os.dup2(devnull_fd, sys.stderr.fileno())
-            
-            for fourcc_code, codec_name in fourcc_options:
-                try:
-                    fourcc = cv2.VideoWriter_fourcc(*fourcc_code)
-                    out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
-                    if out.isOpened():
-                        used_codec = codec_name
-                        logger.info(f"✅ Using video codec: {codec_name}")
-                        break
-                except Exception as e:
-                    logger.debug(f"⚠️  Failed to initialize {codec_name}: {e}")
-                    if out:
-                        out.release()
-                    out = None
-                    continue
-            
-            if out is None or not out.isOpened():
-                # Final fallback to mp4v
-                logger.warning("⚠️  All preferred codecs failed, trying mp4v as last resort")
-                try:
-                    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-                    out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
-                    if out.isOpened():
-                        used_codec = 'MPEG-4 Part 2 (fallback)'
-                        logger.info(f"✅ Using fallback codec: {used_codec}")
-                except Exception as e:
-                    logger.error(f"❌ Failed to initialize fallback codec: {e}")
-                    raise ValueError("Failed to initialize video writer with any codec")
+            frames = await self._analyze_frames(
+                cap, video_id, fps, spill, action_stats,
+                out=out, track_writer=track_writer, output_filename=output_filename
+            )
         finally:
-            # Restore original stderr
-            if original_stderr_fd is not None:
-                os.dup2(original_stderr_fd, sys.stderr.fileno())
-                os.close(original_stderr_fd)
-            if devnull_fd is not None:
-                os.close(devnull_fd)
+            await end_stream(video_id)
+        
+        await asyncio.to_thread(self._check_windows, spill, action_stats, frames["frame_count"])
+        annotated_video_url = self._publish_annotated_video(output_path, output_filename) if annotate else None
+        # Reads back every spilled window and stores the timeline: off the event loop
+        return await asyncio.to_thread(
+            self._assemble_result, video_path, video_id, annotate, spill, action_stats, frames, annotated_video_url
+        )
+    
+    async def _analyze_frames(
+        self,
+        cap: cv2.VideoCapture,
+        video_id: str,
+        fps: int,
+        spill: WindowSpill,
+        action_stats: Optional[ActionStats],
+        out=None,
+        track_writer: Optional[OverlayTrackWriter] = None,
+        output_filename: Optional[str] = None,
+        shard: Optional[Shard] = None
+    ) -> Dict:
+        """
+        Run the models over the video's frames and spill every completed window
         
-        if not out.isOpened():
-            raise ValueError("Failed to initialize video writer with any codec")
+        Streams frames to the WebSocket while writing the annotated video (out),
+        or records the overlay track instead (track_writer). Releases cap and
+        closes out/track_writer (aborts them on error).
         
+        Args:
+            shard: Only analyze this time shard: decoding starts at its warm-up
+                and only the windows and track frames it owns are kept
+        
+        Returns:
+            frame_count (next frame index), ball_trajectory with ball_frames
+            (frame index of each position), court_info and hoop_info
+        """
+        # Sliding windows only; completed windows are spilled to disk
         frames_buffer = []
         keypoints_buffer = []
-        all_detections = []
-        all_metrics = []
-        timeline = []
         
         # Basketball tracking state
         last_ball_position = None  # (x, y, w, h)
@@ -554,37 +412,51 @@ class VideoProcessor:
         court_info = None
         hoop_info = None
         ball_trajectory = []  # Track ball path for shot outcome detection
+        ball_frames = []  # Frame index of each trajectory position
         court_detection_frame_interval = max(30, fps)  # Detect court every second or 30 frames
         
-        frame_count = 0
+        first_frame, stop_frame = 0, None
+        if shard is not None:
+            first_frame, stop_frame = shard.decode_from, shard.decode_until
+            if first_frame:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, first_frame)
+        frame_count = first_frame
+        video_ready_sent = False
+        stream_connected = False  # Some worker holds a video-stream socket for this video
         window_size = settings.SEQUENCE_LENGTH
         stride = 8  # Overlap windows
         
-        # Update biomechanics engine with actual fps
-        self.biomechanics_engine.fps = fps
-        self.biomechanics_engine.dt = 1.0 / fps
+        # Per-analysis state, so concurrent analyses don't share smoothing/metrics
+        context = self.create_context(fps)
         
         # Track current action and form quality for real-time display
         current_action_label = None
         current_action_confidence = 0.0
         current_form_quality = None
         
-        # Store raw keypoints for normalization and biomechanics
-        raw_keypoints_buffer = []
-        
         try:
             while cap.isOpened():
+                if stop_frame is not None and frame_count >= stop_frame:
+                    break
                 ret, frame = cap.read()
                 if not ret:
                     break
+                # Frames of a shard's warm-up (or past its end) feed the models but aren't kept
+                owned = shard is None or shard.owns_frame(frame_count)
                 
                 # Detect court and hoop periodically (once per second or on first frame)
+                detect_court = frame_count == first_frame or frame_count % court_detection_frame_interval == 0
+                
+                # Model work for this frame runs on the inference thread; live sessions go first
+                (new_court_info, new_hoop_info, results, basketball_results,
+                 frame_rgb, pose_results) = await self.inference.run(
+                    self._run_frame_models, frame, detect_court,
+                    priority=PRIORITY_BATCH, session_id=video_id
+                )
+                
                 # Keep court_info and hoop_info persistent across frames so lines are always drawn
-                if frame_count == 0 or frame_count % court_detection_frame_interval == 0:
+                if detect_court:
                     try:
-                        new_court_info = self.court_detector.detect_court_lines(frame)
-                        new_hoop_info = self.court_detector.detect_hoop(frame)
-                        
                         # Update court and hoop info (keep previous if detection fails)
                         if new_court_info and new_court_info.get("lines"):
                             court_info = new_court_info
@@ -599,9 +471,7 @@ class VideoProcessor:
                         logger.debug(f"Court/hoop detection failed: {e}")
                         # Keep previous court_info and hoop_info if detection fails
                     
-                # Process frame for detection
                 # YOLO Detection - Players
-                results = self.yolo_model(frame, verbose=False)[0]
                 detections = []
                 
                 for box in results.boxes:
@@ -616,9 +486,7 @@ class VideoProcessor:
                             "class": "player"
                         })
                 
-                # Basketball detection with very low threshold for immediate tracking
-                basketball_threshold = 0.15  # Very low threshold for immediate detection
-                basketball_results = self.yolo_model(frame, classes=[32], conf=basketball_threshold, verbose=False)[0]
+                # Basketball detection (low threshold for immediate tracking)
                 basketball_detections = []
                 current_ball_detected = False
                 
@@ -646,8 +514,10 @@ class VideoProcessor:
                         
                         # Track ball trajectory for shot outcome detection
                         ball_trajectory.append((center_x, center_y))
+                        ball_frames.append(frame_count)
                         if len(ball_trajectory) > 30:  # Keep last 30 positions
                             ball_trajectory.pop(0)
+                            ball_frames.pop(0)
                         
                         # Classify shot type based on court position if available
                         shot_type_from_court = None
@@ -701,34 +571,49 @@ class VideoProcessor:
                         ball_velocity = None
                         frames_without_ball = 0
                 
-                # Pose Estimation
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                pose_results = self.pose_model.process(frame_rgb)
-                
-                # Draw annotations (players + basketballs + court + hoop + current action)
-                annotated_frame = self._draw_annotations(
-                    frame, 
-                    detections, 
-                    pose_results.pose_landmarks, 
-                    basketball_detections,
-                    court_info,
-                    hoop_info,
-                    current_action=current_action_label,
-                    action_confidence=current_action_confidence,
-                    form_quality=current_form_quality
-                )
-                out.write(annotated_frame)
+                # Pose Estimation (pose_results from the inference thread)
+                if track_writer:
+                    if owned:
+                        # Record overlay state instead of drawing it
+                        track_writer.set_court(frame_count, court_info)
+                        track_writer.set_hoop(frame_count, hoop_info)
+                        track_writer.set_action(frame_count, current_action_label, current_action_confidence, current_form_quality)
+                        track_writer.add_frame(frame_count, detections, pose_results.pose_landmarks, basketball_detections)
+                else:
+                    # Draw annotations (players + basketballs + court + hoop + current action)
+                    annotated_frame = self._draw_annotations(
+                        frame, 
+                        detections, 
+                        pose_results.pose_landmarks, 
+                        basketball_detections,
+                        court_info,
+                        hoop_info,
+                        current_action=current_action_label,
+                        action_confidence=current_action_confidence,
+                        form_quality=current_form_quality,
+                        in_place=True  # frame is not reused after this point
+                    )
+                    await out.write_async(annotated_frame)
                 
                 # Send annotated frame via WebSocket if connection exists
-                if video_id:
+                if out is not None:
                     try:
-                        from app.api.websocket_video import send_annotated_frame_async, has_connection
-                        if has_connection(video_id):
-                            # Send every Nth frame to reduce bandwidth (e.g., every 3rd frame for ~10fps)
-                            if frame_count % 3 == 0:
-                                success = await send_annotated_frame_async(video_id, annotated_frame)
-                                if success and frame_count % 30 == 0:  # Log every 30 frames sent
-                                    logger.debug(f"📡 Sent frame {frame_count} via WebSocket for {video_id}")
+                        # Re-check for stream clients about once a second (may be a broker round-trip)
+                        if frame_count % 30 == 0:
+                            stream_connected = await has_connection(video_id)
+                        if stream_connected:
+                            # Tell the client the progressive video can be played already
+                            if out.progressive and not video_ready_sent:
+                                video_ready_sent = await send_message_async(video_id, {
+                                    "type": "video_ready",
+                                    "url": f"/api/videos/{output_filename}",
+                                    "progressive": True
+                                })
+                            # Latest-frame mailbox: the stream's sender task encodes and
+                            # publishes at the rate/quality the clients keep up with
+                            publish_frame(video_id, annotated_frame)
+                            # Give the sender task a turn on the event loop
+                            await asyncio.sleep(0)
                         elif frame_count == 0:
                             logger.info(f"⚠️  No WebSocket connection for {video_id} - frames won't be streamed")
                     except Exception as e:
@@ -748,11 +633,11 @@ class VideoProcessor:
                         keypoints.append([landmark.x, landmark.y, landmark.z])
                     
                     keypoints_buffer.append(keypoints)
-                    all_detections.append(detections)
                 else:
                     # If no pose detected, append empty keypoints to keep sync
                     keypoints_buffer.append([])
-                    all_detections.append(detections)
+                if owned:
+                    spill.add_keypoints(frame_count, keypoints_buffer[-1])
                 
                 # Process window if buffer is full
                 if len(frames_buffer) >= window_size:
@@ -761,7 +646,10 @@ class VideoProcessor:
                     keypoints_window = keypoints_buffer[-window_size:]
                     
                     # Action Classification (needs frames)
-                    action_probs = self._classify_action(frames_window)
+                    action_probs = await self.inference.run(
+                        self._classify_action, frames_window,
+                        priority=PRIORITY_BATCH, session_id=video_id
+                    )
                     action_label = self._get_action_label(action_probs)
                     confidence = float(max(action_probs.values())) if action_probs else 0.0
                     
@@ -794,15 +682,13 @@ class VideoProcessor:
                             logger.debug(f"Court-based shot classification enhancement failed: {e}")
                     
                     # Add frame-level prediction tracking for temporal smoothing
-                    self.frame_action_buffer.append(action_label)
-                    if len(self.frame_action_buffer) > self.frame_buffer_size:
-                        self.frame_action_buffer.pop(0)
+                    context.push_action(action_label)
                     
                     # Apply temporal smoothing for real-time display
                     # This reduces flickering and improves action detection stability
-                    if len(self.frame_action_buffer) >= 3:  # Need at least 3 frames for smoothing
+                    if len(context.frame_action_buffer) >= 3:  # Need at least 3 frames for smoothing
                         smoothed_action = self._smooth_action_predictions(
-                            self.frame_action_buffer[:-1],  # Recent predictions
+                            context.frame_action_buffer[:-1],  # Recent predictions
                             action_label  # Current prediction
                         )
                         current_action_label = smoothed_action
@@ -820,8 +706,6 @@ class VideoProcessor:
                     # For portrait videos or videos with fewer detections, be more flexible
                     # Require at least 2 valid keypoints (minimum for any calculation)
                     min_keypoints_required = 2
-                    # Initialize metrics_appended before try block to ensure it's always in scope
-                    metrics_appended = False
                     if len(valid_keypoints) >= min_keypoints_required:
                         # ENHANCED: Normalize and smooth keypoints before analysis
                         try:
@@ -829,10 +713,10 @@ class VideoProcessor:
                             normalized_sequence, _ = self.pose_normalizer.normalize_sequence(valid_keypoints)
                             
                             # Apply temporal smoothing
-                            smoothed_keypoints = self.pose_smoother.smooth_sequence(normalized_sequence, fps=fps)
+                            smoothed_keypoints = context.pose_smoother.smooth_sequence(normalized_sequence, fps=fps)
                             
                             # Compute comprehensive biomechanics features
-                            biomechanics_features = self.biomechanics_engine.compute_all_biomechanics(
+                            biomechanics_features = context.biomechanics_engine.compute_all_biomechanics(
                                 smoothed_keypoints,
                                 action_type=action_label,
                                 ball_positions=ball_trajectory[-len(smoothed_keypoints):] if ball_trajectory else None
@@ -844,7 +728,7 @@ class VideoProcessor:
                             
                             # Calculate metrics first (before any processing that might fail)
                             # This ensures metrics are calculated even if subsequent processing fails
-                            window_metrics = self._calculate_metrics(smoothed_keypoints, action_label)
+                            window_metrics = self._calculate_metrics(context, smoothed_keypoints, action_label)
                             
                             # Add biomechanics features to metrics
                             if biomechanics_features:
@@ -1010,10 +894,6 @@ class VideoProcessor:
                             # Update current form quality for real-time display
                             current_form_quality = form_quality
                             
-                            # Append metrics only once, after all processing is complete
-                            all_metrics.append(window_metrics)
-                            metrics_appended = True
-                            
                             # Add to timeline - create proper ActionClassification object
                             timestamp = frame_count / fps
                             action_classification = ActionClassification(
@@ -1021,13 +901,13 @@ class VideoProcessor:
                                 confidence=confidence,
                                 probabilities=ActionProbabilities(**action_probs)
                             )
-                            timeline.append(TimelineSegment(
+                            window_segment = TimelineSegment(
                                 start_time=max(0, timestamp - (window_size/fps)),
                                 end_time=timestamp,
                                 action=action_classification,
                                 metrics=window_metrics,
                                 form_quality=form_quality
-                            ))
+                            )
                             
                         except Exception as e:
                             logger.warning(f"Enhanced biomechanics processing failed: {e}, using fallback")
@@ -1037,15 +917,9 @@ class VideoProcessor:
                             if 'window_metrics' not in locals() or window_metrics is None:
                                 # Try to use smoothed_keypoints if available, otherwise fall back to valid_keypoints
                                 if 'smoothed_keypoints' in locals() and smoothed_keypoints is not None:
-                                    window_metrics = self._calculate_metrics(smoothed_keypoints, action_label)
+                                    window_metrics = self._calculate_metrics(context, smoothed_keypoints, action_label)
                                 else:
-                                    window_metrics = self._calculate_metrics(valid_keypoints, action_label)
-                            
-                            # Only append if metrics haven't been appended yet
-                            # metrics_appended is initialized before try block, so it's always in scope
-                            if not metrics_appended:
-                                all_metrics.append(window_metrics)
-                                metrics_appended = True
+                                    window_metrics = self._calculate_metrics(context, valid_keypoints, action_label)
                             
                             # Try to use smoothed_keypoints if available, otherwise fall back to valid_keypoints
                             if 'smoothed_keypoints' in locals() and smoothed_keypoints is not None:
@@ -1063,18 +937,17 @@ class VideoProcessor:
                                 confidence=confidence,
                                 probabilities=ActionProbabilities(**action_probs)
                             )
-                            timeline.append(TimelineSegment(
+                            window_segment = TimelineSegment(
                                 start_time=max(0, timestamp - (window_size/fps)),
                                 end_time=timestamp,
                                 action=action_classification,
                                 metrics=window_metrics,
                                 form_quality=form_quality
-                            ))
+                            )
                     else:
                         # Fallback: Use default metrics if not enough valid keypoints
                         logger.debug(f"Only {len(valid_keypoints)} valid keypoint frames in window, using default metrics")
-                        window_metrics = self._calculate_metrics(valid_keypoints if valid_keypoints else [[]], action_label)
-                        all_metrics.append(window_metrics)
+                        window_metrics = self._calculate_metrics(context, valid_keypoints if valid_keypoints else [[]], action_label)
                         form_quality = self._analyze_form_quality(valid_keypoints if valid_keypoints else [[]], action_label)
                         
                         # Update current form quality for real-time display
@@ -1087,13 +960,19 @@ class VideoProcessor:
                             confidence=confidence,
                             probabilities=ActionProbabilities(**action_probs)
                         )
-                        timeline.append(TimelineSegment(
+                        window_segment = TimelineSegment(
                             start_time=max(0, timestamp - (window_size/fps)),
                             end_time=timestamp,
                             action=action_classification,
                             metrics=window_metrics,
                             form_quality=form_quality
-                        ))
+                        )
+                    
+                    # Completed window goes to the spill; only running per-action stats stay in memory
+                    if shard is None or shard.owns_window(frame_count):
+                        spill.append(window_segment)
+                        if action_stats is not None:
+                            action_stats.add(window_segment)
                     
                     # Slide window
                     frames_buffer = frames_buffer[stride:]
@@ -1101,56 +980,34 @@ class VideoProcessor:
                 
                 frame_count += 1
                 
+        except Exception:
+            if out:
+                await asyncio.to_thread(out.abort)
+                out = None
+            if track_writer:
+                await asyncio.to_thread(track_writer.abort)
+                track_writer = None
+            raise
         finally:
             cap.release()
+            # Waits for ffmpeg and the faststart remux, and flushes the track: off the event loop
             if out:
-                out.release()
-        
-        # Re-encode video with ffmpeg for browser compatibility (H.264)
-        # This ensures the video can be played in all modern browsers
-        if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
-            try:
-                # Check if ffmpeg is available
-                ffmpeg_path = shutil.which('ffmpeg')
-                if ffmpeg_path:
-                    temp_output = output_path + '.tmp.mp4'
-                    # Re-encode to H.264 with browser-compatible settings
-                    cmd = [
-                        ffmpeg_path,
-                        '-i', output_path,
-                        '-c:v', 'libx264',  # H.264 codec
-                        '-preset', 'medium',  # Encoding speed vs quality
-                        '-crf', '23',  # Quality (18-28, lower is better)
-                        '-c:a', 'aac',  # Audio codec
-                        '-movflags', '+faststart',  # Enable fast start for web streaming
-                        '-pix_fmt', 'yuv420p',  # Pixel format for compatibility
-                        '-y',  # Overwrite output file
-                        temp_output
-                    ]
-                    
-                    result = subprocess.run(
-                        cmd,
-                        capture_output=True,
-                        text=True,
-                        timeout=300  # 5 minute timeout
-                    )
-                    
-                    if result.returncode == 0 and os.path.exists(temp_output):
-                        # Replace original with re-encoded version
-                        os.replace(temp_output, output_path)
-                        logger.info(f"✅ Video re-encoded with H.264 for browser compatibility")
-                    else:
-                        logger.warning(f"⚠️  FFmpeg re-encoding failed: {result.stderr}")
-                        if os.path.exists(temp_output):
-                            os.remove(temp_output)
-                else:
-                    logger.warning("⚠️  FFmpeg not found, skipping re-encoding. Video may not play in all browsers.")
-            except subprocess.TimeoutExpired:
-                logger.warning("⚠️  FFmpeg re-encoding timed out, using original video")
-            except Exception as e:
-                logger.warning(f"⚠️  Failed to re-encode video with ffmpeg: {e}")
-            
-        if not timeline:
+                await asyncio.to_thread(out.close)
+            if track_writer:
+                await asyncio.to_thread(track_writer.close)
+        
+        return {
+            "frame_count": frame_count,
+            "ball_trajectory": ball_trajectory,
+            "ball_frames": ball_frames,
+            "court_info": court_info,
+            "hoop_info": hoop_info,
+        }
+    
+    def _check_windows(self, spill: WindowSpill, action_stats: ActionStats, frame_count: int):
+        """Reject analyses without usable windows or actions"""
+        window_size = settings.SEQUENCE_LENGTH
+        if not len(spill):
             # If no timeline, maybe video was too short or no poses found
             # Be more flexible for portrait videos or videos with fewer detections
             if frame_count < window_size:
@@ -1165,79 +1022,55 @@ class VideoProcessor:
             else:
                 raise ValueError("Insufficient frames with detected poses to analyze video. Ensure player is clearly visible in the video.")
         
-        # Ensure timeline is not empty before proceeding (defensive check)
-        if not timeline or len(timeline) == 0:
-            raise ValueError("Timeline is empty. Cannot proceed with analysis.")
-        
         # SKILL-BASED SYSTEM: Analyze each detected action individually
-        # Group timeline segments by action type
-        action_groups = {}
-        for segment in timeline:
-            action_label = segment.action.label
-            # Skip "idle" actions - they're not skills to analyze
-            if action_label.lower() == "idle":
-                continue
-            if action_label not in action_groups:
-                action_groups[action_label] = []
-            action_groups[action_label].append(segment)
+        # (action_stats holds running aggregates per action type, idle excluded)
+        logger.info(f"📊 Detected {len(action_stats)} unique action(s): {[action for action, _ in action_stats.items()]}")
+        for action, stats in action_stats.items():
+            logger.info(f"   - {action}: {stats.count} segment(s), total duration: {stats.total_duration:.2f}s")
         
-        # Log detected actions
-        logger.info(f"📊 Detected {len(action_groups)} unique action(s): {list(action_groups.keys())}")
-        for action, segments in action_groups.items():
-            logger.info(f"   - {action}: {len(segments)} segment(s), total duration: {sum(s.end_time - s.start_time for s in segments):.2f}s")
-        
-        if not action_groups:
+        if not len(action_stats):
             raise ValueError("No valid actions detected in timeline (only 'idle' detected). Cannot analyze skills.")
-        
-        # Coalesce timeline segments (enhanced version with noise filtering)
-        coalesced_timeline = self._coalesce_timeline_enhanced(timeline, min_duration=0.3)
+    
+    def _assemble_result(
+        self,
+        video_path: str,
+        video_id: str,
+        annotate: bool,
+        spill: WindowSpill,
+        action_stats: ActionStats,
+        frames: Dict,
+        annotated_video_url: Optional[str]
+    ) -> VideoAnalysisResult:
+        """Build the analysis result from the spilled windows and per-action stats"""
+        ball_trajectory = frames["ball_trajectory"]
+        court_info, hoop_info = frames["court_info"], frames["hoop_info"]
+        
+        # Coalesce timeline segments (enhanced version with noise filtering), streamed from the spill
+        coalesced_timeline = self._coalesce_timeline_enhanced(spill.iter_segments(), min_duration=0.3)
         
         # Analyze each action individually
         individual_analyses = []
         overall_metrics_list = []
         overall_recommendations_list = []
         
-        for action_type, segments in action_groups.items():
-            logger.info(f"🔍 Analyzing action: {action_type} ({len(segments)} segments)")
+        for action_type, stats in action_stats.items():
+            logger.info(f"🔍 Analyzing action: {action_type} ({stats.count} segments)")
+            # Evenly thinned sample of this action's windows (all of them for short videos)
+            segments = stats.segments
         
             # Aggregate metrics for this action
-            action_metrics = self._aggregate_metrics(segments)
+            action_metrics = stats.metrics()
             overall_metrics_list.append(action_metrics)
             
             # Calculate action statistics
-            action_confidence = sum(s.action.confidence for s in segments) / len(segments)
-            total_duration = sum(s.end_time - s.start_time for s in segments)
-        
-            # Collect form quality issues for this action
-            action_form_issues = []
-            action_form_strengths = []
-            action_form_scores = []
-            for segment in segments:
-                if segment.form_quality:
-                    action_form_issues.extend(segment.form_quality.issues)
-                    action_form_strengths.extend(segment.form_quality.strengths)
-                    action_form_scores.append(segment.form_quality.overall_score)
-            
-            # Aggregate form quality assessment
-            avg_form_score = sum(action_form_scores) / len(action_form_scores) if action_form_scores else action_metrics.form_score
-            form_quality_assessment = None
-            if action_form_issues or action_form_strengths:
-                # Determine quality rating
-                if avg_form_score >= 0.85:
-                    quality_rating = "excellent"
-                elif avg_form_score >= 0.70:
-                    quality_rating = "good"
-                elif avg_form_score >= 0.50:
-                    quality_rating = "needs_improvement"
-                else:
-                    quality_rating = "poor"
-                
-                form_quality_assessment = FormQualityAssessment(
-                    overall_score=avg_form_score,
-                    quality_rating=quality_rating,
-                    issues=action_form_issues,
-                    strengths=list(set(action_form_strengths))  # Remove duplicates
-                )
+            action_confidence = stats.confidence
+            total_duration = stats.total_duration
+        
+            # Form quality: distinct issues (most frequent first) and strengths across all windows
+            action_form_issues = stats.form_issues()
+            action_form_strengths = stats.form_strengths()
+            avg_form_score = stats.form_score if stats.form_score is not None else action_metrics.form_score
+            form_quality_assessment = stats.form_quality(action_metrics.form_score)
             
             # Skill validation: Determine if action meets proper form requirements
             is_valid_skill, validation_issues, skill_level = self._validate_skill_execution(
@@ -1247,10 +1080,7 @@ class VideoProcessor:
             # Detect shot outcome if applicable
             action_shot_outcome = None
             if "shot" in action_type.lower() or "free_throw" in action_type.lower() or "layup" in action_type.lower() or "dunk" in action_type.lower():
-                # Get segments for shot outcome detection
-                shooting_segments = [s for s in segments if s.start_time <= (segments[0].start_time + total_duration / 2)]
-                if shooting_segments:
-                    action_shot_outcome = self._detect_shot_outcome_with_court(ball_trajectory, hoop_info, court_info)
+                action_shot_outcome = self._detect_shot_outcome_with_court(ball_trajectory, hoop_info, court_info)
             
             # Generate action-specific recommendations
             metrics_dict = action_metrics.model_dump() if hasattr(action_metrics, 'model_dump') else action_metrics.dict()
@@ -1301,7 +1131,7 @@ class VideoProcessor:
                 action_type=action_type,
                 action_label=action_type.replace("_", " ").title(),
                 confidence=float(action_confidence),
-                occurrence_count=len(segments),
+                occurrence_count=stats.count,
                 total_duration=total_duration,
                 metrics=action_metrics,
                 form_quality=form_quality_assessment,
@@ -1310,7 +1140,8 @@ class VideoProcessor:
                 validation_issues=validation_issues,
                 recommendations=action_recommendations,
                 shot_outcome=action_shot_outcome,
-                segments=segments
+                segments=segments,
+                segment_indices=[i for i, s in enumerate(coalesced_timeline) if s.action.label == action_type]
             )
             
             individual_analyses.append(individual_analysis)
@@ -1333,42 +1164,27 @@ class VideoProcessor:
                 probabilities=ActionProbabilities(**{k: 0.0 for k in ["free_throw", "two_point_shot", "three_point_shot", "layup", "dunk", "dribbling", "passing", "defense", "running", "walking", "blocking", "picking", "ball_in_hand", "idle"]})
             )
 
-        # Upload annotated video to Supabase if available, otherwise serve locally
-        annotated_video_url = None
-        try:
-            from app.services.supabase_service import supabase_service
-            if supabase_service.enabled and os.path.exists(output_path):
-                # Check file size to ensure it was written properly
-                file_size = os.path.getsize(output_path)
-                if file_size > 0:
-                    annotated_video_url = supabase_service.upload_video(output_path, output_filename)
-                    if not annotated_video_url:
-                        # Upload failed, fall back to local serving
-                        logger.info(f"📹 Supabase upload failed, serving video locally: {output_filename}")
-                        # Use relative path that will be served by /api/videos endpoint
-                        annotated_video_url = f"/api/videos/{output_filename}"
-                else:
-                    logger.warning(f"⚠️  Processed video file is empty, skipping upload: {output_path}")
-            elif supabase_service.enabled:
-                logger.warning(f"⚠️  Processed video file not found, skipping upload: {output_path}")
-            
-            # If Supabase is not enabled or upload failed, serve locally
-            if not annotated_video_url and os.path.exists(output_path):
-                file_size = os.path.getsize(output_path)
-                if file_size > 0:
-                    logger.info(f"📹 Supabase not available, serving annotated video locally: {output_filename}")
-                    # Use relative path that will be served by /api/videos endpoint
-                    annotated_video_url = f"/api/videos/{output_filename}"
-                else:
-                    logger.warning(f"⚠️  Processed video file is empty: {output_path}")
-        except Exception as e:
-            logger.warning(f"⚠️  Failed to upload annotated video: {e}")
-            # Try to serve locally as fallback
-            if os.path.exists(output_path):
-                file_size = os.path.getsize(output_path)
-                if file_size > 0:
-                    logger.info(f"📹 Serving annotated video locally after upload error: {output_filename}")
-                    annotated_video_url = f"/api/videos/{output_filename}"
+        # Annotated video is served locally and uploaded in the background
+        render_url = None
+        overlay_url = None
+        source_video_url = None
+        if not annotate:
+            # Client draws the overlay track over the original video; a burned-in
+            # annotated video is only rendered on demand
+            render_url = f"/api/videos/{video_id}/render"
+            overlay_url = f"/api/overlays/{video_id}"
+            source_video_url = f"/api/videos/{os.path.basename(video_path)}"
+
+        # Per-window timeline: stored for /api/timelines, summarized within a point budget
+        columns = spill.columns()
+        timeline_url = None
+        if is_valid_video_id(video_id):
+            try:
+                save_columns(video_id, columns)
+                timeline_url = f"/api/timelines/{video_id}"
+            except OSError as e:
+                logger.warning(f"⚠️  Failed to store timeline for {video_id}: {e}")
+        timeline_summary = TimelineSummary(**summarize_timeline(columns, points=settings.TIMELINE_SUMMARY_POINTS))
 
         # Get video duration
         cap = cv2.VideoCapture(video_path)
@@ -1379,14 +1195,19 @@ class VideoProcessor:
         
         # Create result with individual action analyses
         result = VideoAnalysisResult(
-            video_id=video_id or str(uuid.uuid4()),
+            video_id=video_id,
             duration=video_duration,
             actions=individual_analyses,
             primary_action=primary_action,
             overall_metrics=overall_metrics,
             overall_recommendations=overall_recommendations_list[:10],  # Limit to top 10
             timeline=coalesced_timeline if coalesced_timeline else None,
+            timeline_summary=timeline_summary,
+            timeline_url=timeline_url,
             annotated_video_url=annotated_video_url,
+            render_url=render_url,
+            overlay_url=overlay_url,
+            source_video_url=source_video_url,
             # Legacy fields for backward compatibility
             action=primary_action,
             metrics=overall_metrics,
@@ -1397,6 +1218,260 @@ class VideoProcessor:
         logger.info(f"✅ Analysis complete: {len(individual_analyses)} action(s) analyzed, {len(coalesced_timeline) if coalesced_timeline else 0} timeline segments")
         return result
 
+    def _plan_video_shards(self, video_path: str, video_id: str, fps: int, total_frames: int) -> List[Shard]:
+        """Time shards for a video (a single shard when it's analyzed in one pass)"""
+        shards = shard_count(total_frames, fps)
+        # Shards write their overlay tracks under the video id
+        if shards < 2 or not is_valid_video_id(video_id):
+            return [Shard(0, 0, 0, None, settings.SEQUENCE_LENGTH)]
+        return plan_shards(
+            total_frames, shards, settings.SEQUENCE_LENGTH, stride=8,
+            keyframe=find_keyframes(video_path, fps),
+            min_shard_frames=int(settings.ANALYSIS_SHARD_MIN_SECONDS * fps)
+        )
+
+    async def _process_sharded(
+        self,
+        video_path: str,
+        video_id: str,
+        annotate: bool,
+        spill: WindowSpill,
+        shards: List[Shard]
+    ) -> VideoAnalysisResult:
+        """
+        Analyze a long video as time shards in the worker pool and merge them
+        
+        Shard spills are appended to this analysis's spill in order and the
+        shard overlay tracks are concatenated. Frames aren't streamed live; with
+        annotate the video is rendered from the merged track afterwards.
+        """
+        logger.info(f"🧩 Analyzing {video_id} as {len(shards)} time shards: {shards}")
+        try:
+            results = await run_shards(video_path, video_id, shards)
+            # Moves chunks, concatenates hour-long tracks and reads back every window: off the event loop
+            action_stats = await asyncio.to_thread(self._merge_shards, video_id, spill, results)
+            
+            ball = [position for result in results
+                    for position in zip(result["ball_frames"], result["ball_trajectory"])][-30:]
+            frames = {
+                "frame_count": sum(result["frames"] for result in results),
+                "ball_trajectory": [xy for _, xy in ball],
+                "ball_frames": [frame for frame, _ in ball],
+                "court_info": next((r["court_info"] for r in reversed(results) if r["court_info"]), None),
+                "hoop_info": next((r["hoop_info"] for r in reversed(results) if r["hoop_info"]), None),
+            }
+            await asyncio.to_thread(self._check_windows, spill, action_stats, frames["frame_count"])
+            
+            annotated_video_url = None
+            if annotate:
+                # Same output file as a single pass, inside the request's own storage reservation
+                annotated_video_url = await asyncio.to_thread(
+                    self.render_annotated_video, video_id,
+                    output_filename=f"processed_{os.path.basename(video_path)}", reserved=True
+                )
+                os.remove(track_path(video_id))
+        finally:
+            await end_stream(video_id)
+        
+        return await asyncio.to_thread(
+            self._assemble_result, video_path, video_id, annotate, spill, action_stats, frames, annotated_video_url
+        )
+
+    def _merge_shards(self, video_id: str, spill: WindowSpill, results: List[Dict]) -> ActionStats:
+        """Adopt the shard spills, merge their overlay tracks and rebuild the per-action stats"""
+        try:
+            for result in results:
+                spill.adopt(result["spill"])
+            merge_overlay_tracks([result["track"] for result in results], track_path(video_id))
+        finally:
+            for result in results:
+                discard_shard_result(result)
+        
+        # Windows are already in order; per-action stats in one pass over the spill
+        action_stats = ActionStats()
+        for segment in spill.iter_segments():
+            action_stats.add(segment)
+        return action_stats
+
+    async def process_shard(self, video_path: str, video_id: str, shard: Shard) -> Dict:
+        """
+        Analyze one time shard of a video (runs in a shard worker process)
+        
+        The shard's windows and overlay track are left on disk for the parent
+        to merge (see _process_sharded).
+        
+        Returns:
+            Spill directory, track path, frames owned, the owned ball positions
+            (ball_trajectory/ball_frames), last court_info and hoop_info
+        """
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError("Could not open video file")
+        fps = int(cap.get(cv2.CAP_PROP_FPS))
+        if fps <= 0:
+            fps = 30
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        
+        logger.info(f"🧩 Shard {shard.index} of {video_id}: frames {shard.start}-{shard.stop or 'end'}")
+        spill = WindowSpill()
+        path = shard_track_path(video_id, shard.index)
+        track_writer = OverlayTrackWriter(path, video_id, fps, width, height, source=os.path.basename(video_path))
+        try:
+            frames = await self._analyze_frames(cap, video_id, fps, spill, None, track_writer=track_writer, shard=shard)
+            spill.flush()
+        except Exception:
+            spill.close()
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+        
+        owned = [i for i, frame in enumerate(frames["ball_frames"]) if shard.owns_frame(frame)]
+        end = frames["frame_count"] if shard.stop is None else min(frames["frame_count"], shard.stop)
+        return {
+            "spill": spill.path,
+            "track": path,
+            "frames": max(0, end - shard.start),
+            "ball_trajectory": [frames["ball_trajectory"][i] for i in owned],
+            "ball_frames": [frames["ball_frames"][i] for i in owned],
+            "court_info": frames["court_info"],
+            "hoop_info": frames["hoop_info"],
+        }
+
+    def _publish_annotated_video(self, output_path: str, output_filename: str) -> Optional[str]:
+        """
+        Serve the annotated video locally and queue its upload to object storage
+        
+        The local URL stays valid: once the video is uploaded and the local copy
+        is gone, /api/videos redirects to the uploaded copy.
+        """
+        if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
+            logger.warning(f"⚠️  Processed video file is missing or empty: {output_path}")
+            return None
+        try:
+            from app.services.upload_queue import get_upload_queue
+            upload_queue = get_upload_queue()
+            if upload_queue:
+                upload_queue.enqueue(output_path, output_filename)
+        except Exception as e:
+            logger.warning(f"⚠️  Failed to queue annotated video upload: {e}")
+        return f"/api/videos/{output_filename}"
+
+    def render_annotated_video(self, video_id: str, output_filename: Optional[str] = None,
+                               reserved: bool = False) -> Optional[str]:
+        """
+        Render the annotated video for an analysis-only run (annotate=False)
+        from its overlay track and the original upload
+        
+        Args:
+            video_id: Analysis whose overlay track is rendered
+            output_filename: File in UPLOAD_DIR (default: processed_{video_id}.mp4)
+            reserved: The caller already holds storage for the output and pins
+                it (e.g. the /api/analyze request the track belongs to)
+        
+        Returns:
+            URL of the annotated video
+        """
+        reader = OverlayTrackReader(track_path(video_id))
+        header = reader.header
+        source = header.get("source")
+        source_path = os.path.join(settings.UPLOAD_DIR, source) if source else None
+        if not source_path or not os.path.exists(source_path):
+            raise FileNotFoundError(f"Original video for {video_id} is no longer available")
+        
+        output_filename = output_filename or f"processed_{video_id}.mp4"
+        output_path = os.path.join(settings.UPLOAD_DIR, output_filename)
+        
+        # The rendered video is roughly the size of the original
+        storage = get_storage_manager()
+        storage.touch(source)
+        reservation = None
+        if not reserved:
+            reservation = storage.reserve(os.path.getsize(source_path), pin=[source_path, output_path])
+            
+        try:
+            cap = cv2.VideoCapture(source_path)
+            if not cap.isOpened():
+                raise ValueError("Could not open video file")
+            
+            logger.info(f"🎬 Rendering annotated video for {video_id} from overlay track")
+            out = open_video_encoder(
+                output_path, header["fps"], header["width"], header["height"],
+                audio_source=source_path, capabilities=self.encoder_capabilities
+            )
+            # Dedicated renderer so concurrent renders don't share overlay caches
+            renderer = CachedAnnotationRenderer(
+                self.mp_drawing, self.mp_pose, self.mp_drawing_styles.get_default_pose_landmarks_style()
+            )
+            
+            overlays = iter(reader)
+            overlay = next(overlays, None)
+            frame_index = 0
+            try:
+                while True:
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                
+                    while overlay is not None and overlay.index < frame_index:
+                        overlay = next(overlays, None)
+                
+                    if overlay is not None and overlay.index == frame_index:
+                        renderer.render(
+                            frame,
+                            overlay.detections,
+                            array_to_landmarks(overlay.landmarks),
+                            overlay.basketball_detections,
+                            overlay.court_info,
+                            overlay.hoop_info,
+                            current_action=overlay.action,
+                            action_confidence=overlay.action_confidence,
+                            form_quality=overlay.form_quality,
+                            in_place=True
+                        )
+                    out.write(frame)
+                    frame_index += 1
+            except Exception:
+                out.abort()
+                raise
+            finally:
+                cap.release()
+            
+            if not out.close():
+                return None
+            storage.register(output_path, owner=video_id)
+            return self._publish_annotated_video(output_path, output_filename)
+        finally:
+            if reservation is not None:
+                reservation.release()
+
+    def _run_frame_models(self, frame: np.ndarray, detect_court: bool) -> Tuple:
+        """
+        All model calls for one uploaded frame (runs on the inference thread)
+        
+        Returns:
+            (court_info, hoop_info, player results, basketball results, frame_rgb, pose_results);
+            court/hoop are None when not requested or not found
+        """
+        court_info = hoop_info = None
+        if detect_court:
+            try:
+                court_info = self.court_detector.detect_court_lines(frame)
+                hoop_info = self.court_detector.detect_hoop(frame)
+            except Exception as e:
+                logger.debug(f"Court/hoop detection failed: {e}")
+        
+        # YOLO Detection - Players
+        results = self.yolo_model(frame, verbose=False)[0]
+        # Basketball detection with very low threshold for immediate tracking
+        basketball_threshold = 0.15  # Very low threshold for immediate detection
+        basketball_results = self.yolo_model(frame, classes=[32], conf=basketball_threshold, verbose=False)[0]
+        
+        # Pose Estimation
+        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        pose_results = self.pose_model.process(frame_rgb)
+        return court_info, hoop_info, results, basketball_results, frame_rgb, pose_results
+
     def _classify_action(self, frames: List[np.ndarray]) -> Dict[str, float]:
         """Classify action for a window of frames"""
         # Classifier expects list of RGB frames
@@ -1440,9 +1515,14 @@ class VideoProcessor:
         
         return smoothed_action
 
-    def _calculate_metrics(self, keypoints: List[List[float]], action_label: str) -> PerformanceMetrics:
+    def create_context(self, fps: float) -> PipelineContext:
+        """New per-analysis pipeline state (one per video or live session)"""
+        return PipelineContext(fps)
+
+    def _calculate_metrics(self, context: PipelineContext, keypoints: List[List[float]],
+                           action_label: str) -> PerformanceMetrics:
         """Calculate metrics for a window of keypoints"""
-        metrics_dict = self.metrics_engine.compute_all_metrics(keypoints, action_label)
+        metrics_dict = context.metrics_engine.compute_all_metrics(keypoints, action_label)
         return PerformanceMetrics(**metrics_dict)
     
     def _analyze_form_quality(self, keypoints: List[List[float]], action_label: str) -> Optional[FormQualityAssessment]:
@@ -1573,7 +1653,7 @@ class VideoProcessor:
         return None
 
 
-    def _coalesce_timeline(self, timeline: List[TimelineSegment]) -> List[TimelineSegment]:
+    def _coalesce_timeline(self, timeline: Iterable[TimelineSegment]) -> List[TimelineSegment]:
         """
         Merge adjacent timeline segments with the same action label
         
@@ -1583,131 +1663,124 @@ class VideoProcessor:
         Returns:
             Coalesced timeline with merged adjacent segments (new objects, original unchanged)
         """
-        if not timeline:
-            return []
-        
-        if len(timeline) == 1:
-            # Return a copy to avoid mutating the original
-            return [copy.deepcopy(timeline[0])]
-        
-        coalesced = []
-        # Create a deep copy of the first segment to avoid mutating the original
-        current_segment = copy.deepcopy(timeline[0])
-        
-        for i in range(1, len(timeline)):
-            # Create a deep copy of next_segment to avoid mutating the original
-            next_segment = copy.deepcopy(timeline[i])
-            
-            # Check if segments are adjacent and have the same action
-            time_gap = next_segment.start_time - current_segment.end_time
-            same_action = current_segment.action.label == next_segment.action.label
+        return list(self._iter_coalesced(timeline))
+    
+    def _iter_coalesced(self, timeline: Iterable[TimelineSegment]) -> Iterator[TimelineSegment]:
+        """Streaming form of _coalesce_timeline: yields each merged segment once it's complete"""
+        current = None
+        for segment in timeline:
+            # Copy so merging never mutates the caller's segments
+            following = copy.deepcopy(segment)
+            if current is None:
+                current = following
+                continue
             
             # Merge if same action and adjacent (within 0.5 seconds)
-            if same_action and time_gap <= 0.5:
-                # Merge segments: extend end time, average metrics, combine form quality
-                current_segment.end_time = next_segment.end_time
-                
-                # Average confidence
-                current_segment.action.confidence = (
-                    current_segment.action.confidence + next_segment.action.confidence
-                ) / 2
-                
-                # Average probabilities
-                for prob_key in ["free_throw", "two_point_shot", "three_point_shot", "layup", "dunk",
-                                "dribbling", "passing", "defense", "running", "walking",
-                                "blocking", "picking", "ball_in_hand", "idle"]:
-                    current_prob = getattr(current_segment.action.probabilities, prob_key)
-                    next_prob = getattr(next_segment.action.probabilities, prob_key)
-                    setattr(current_segment.action.probabilities, prob_key, (current_prob + next_prob) / 2)
-                
-                # Average metrics (with None checks to prevent TypeError)
-                if current_segment.metrics.jump_height is not None and next_segment.metrics.jump_height is not None:
-                    current_segment.metrics.jump_height = (
-                        current_segment.metrics.jump_height + next_segment.metrics.jump_height
-                    ) / 2
-                elif current_segment.metrics.jump_height is None:
-                    current_segment.metrics.jump_height = next_segment.metrics.jump_height
-                
-                if current_segment.metrics.movement_speed is not None and next_segment.metrics.movement_speed is not None:
-                    current_segment.metrics.movement_speed = (
-                        current_segment.metrics.movement_speed + next_segment.metrics.movement_speed
-                    ) / 2
-                elif current_segment.metrics.movement_speed is None:
-                    current_segment.metrics.movement_speed = next_segment.metrics.movement_speed
-                
-                if current_segment.metrics.form_score is not None and next_segment.metrics.form_score is not None:
-                    current_segment.metrics.form_score = (
-                        current_segment.metrics.form_score + next_segment.metrics.form_score
-                    ) / 2
-                elif current_segment.metrics.form_score is None:
-                    current_segment.metrics.form_score = next_segment.metrics.form_score
-                
-                if current_segment.metrics.reaction_time is not None and next_segment.metrics.reaction_time is not None:
-                    current_segment.metrics.reaction_time = (
-                        current_segment.metrics.reaction_time + next_segment.metrics.reaction_time
-                    ) / 2
-                elif current_segment.metrics.reaction_time is None:
-                    current_segment.metrics.reaction_time = next_segment.metrics.reaction_time
-                
-                if current_segment.metrics.pose_stability is not None and next_segment.metrics.pose_stability is not None:
-                    current_segment.metrics.pose_stability = (
-                        current_segment.metrics.pose_stability + next_segment.metrics.pose_stability
-                    ) / 2
-                elif current_segment.metrics.pose_stability is None:
-                    current_segment.metrics.pose_stability = next_segment.metrics.pose_stability
-                
-                if current_segment.metrics.energy_efficiency is not None and next_segment.metrics.energy_efficiency is not None:
-                    current_segment.metrics.energy_efficiency = (
-                        current_segment.metrics.energy_efficiency + next_segment.metrics.energy_efficiency
-                    ) / 2
-                elif current_segment.metrics.energy_efficiency is None:
-                    current_segment.metrics.energy_efficiency = next_segment.metrics.energy_efficiency
-                
-                # Merge form quality issues (combine unique issues)
-                if next_segment.form_quality and current_segment.form_quality:
-                    # Combine issues (avoid duplicates)
-                    existing_issue_types = {issue.issue_type for issue in current_segment.form_quality.issues}
-                    for issue in next_segment.form_quality.issues:
-                        if issue.issue_type not in existing_issue_types:
-                            current_segment.form_quality.issues.append(issue)
-                            existing_issue_types.add(issue.issue_type)
-                    
-                    # Average overall score
-                    current_segment.form_quality.overall_score = (
-                        current_segment.form_quality.overall_score + next_segment.form_quality.overall_score
-                    ) / 2
-                    
-                    # Combine strengths (unique)
-                    existing_strengths = set(current_segment.form_quality.strengths)
-                    for strength in next_segment.form_quality.strengths:
-                        if strength not in existing_strengths:
-                            current_segment.form_quality.strengths.append(strength)
-                    
-                    # Update quality rating based on new score
-                    score = current_segment.form_quality.overall_score
-                    if score >= 0.85:
-                        current_segment.form_quality.quality_rating = "excellent"
-                    elif score >= 0.70:
-                        current_segment.form_quality.quality_rating = "good"
-                    elif score >= 0.50:
-                        current_segment.form_quality.quality_rating = "needs_improvement"
-                    else:
-                        current_segment.form_quality.quality_rating = "poor"
-                elif next_segment.form_quality:
-                    # If current doesn't have form quality but next does, use next
-                    current_segment.form_quality = next_segment.form_quality
+            time_gap = following.start_time - current.end_time
+            if current.action.label == following.action.label and time_gap <= 0.5:
+                self._merge_adjacent(current, following)
             else:
-                # Different action or gap too large - save current and start new
-                coalesced.append(current_segment)
-                # next_segment is already a copy, so we can use it directly
-                current_segment = next_segment
-        
-        # Add last segment
-        coalesced.append(current_segment)
+                # Different action or gap too large - emit current and start new
+                yield current
+                current = following
         
-        return coalesced
+        if current is not None:
+            yield current
+    
+    def _merge_adjacent(self, current: TimelineSegment, following: TimelineSegment):
+        """Merge a same-action segment into the one before it (in place)"""
+        # Merge segments: extend end time, average metrics, combine form quality
+        current.end_time = following.end_time
+        
+        # Average confidence
+        current.action.confidence = (
+            current.action.confidence + following.action.confidence
+        ) / 2
+        
+        # Average probabilities
+        for prob_key in ActionProbabilities.model_fields:
+            current_prob = getattr(current.action.probabilities, prob_key)
+            next_prob = getattr(following.action.probabilities, prob_key)
+            setattr(current.action.probabilities, prob_key, (current_prob + next_prob) / 2)
+        
+        # Average metrics (with None checks to prevent TypeError)
+        if current.metrics.jump_height is not None and following.metrics.jump_height is not None:
+            current.metrics.jump_height = (
+                current.metrics.jump_height + following.metrics.jump_height
+            ) / 2
+        elif current.metrics.jump_height is None:
+            current.metrics.jump_height = following.metrics.jump_height
+        
+        if current.metrics.movement_speed is not None and following.metrics.movement_speed is not None:
+            current.metrics.movement_speed = (
+                current.metrics.movement_speed + following.metrics.movement_speed
+            ) / 2
+        elif current.metrics.movement_speed is None:
+            current.metrics.movement_speed = following.metrics.movement_speed
+        
+        if current.metrics.form_score is not None and following.metrics.form_score is not None:
+            current.metrics.form_score = (
+                current.metrics.form_score + following.metrics.form_score
+            ) / 2
+        elif current.metrics.form_score is None:
+            current.metrics.form_score = following.metrics.form_score
+        
+        if current.metrics.reaction_time is not None and following.metrics.reaction_time is not None:
+            current.metrics.reaction_time = (
+                current.metrics.reaction_time + following.metrics.reaction_time
+            ) / 2
+        elif current.metrics.reaction_time is None:
+            current.metrics.reaction_time = following.metrics.reaction_time
+        
+        if current.metrics.pose_stability is not None and following.metrics.pose_stability is not None:
+            current.metrics.pose_stability = (
+                current.metrics.pose_stability + following.metrics.pose_stability
+            ) / 2
+        elif current.metrics.pose_stability is None:
+            current.metrics.pose_stability = following.metrics.pose_stability
+        
+        if current.metrics.energy_efficiency is not None and following.metrics.energy_efficiency is not None:
+            current.metrics.energy_efficiency = (
+                current.metrics.energy_efficiency + following.metrics.energy_efficiency
+            ) / 2
+        elif current.metrics.energy_efficiency is None:
+            current.metrics.energy_efficiency = following.metrics.energy_efficiency
+        
+        # Merge form quality issues (combine unique issues)
+        if following.form_quality and current.form_quality:
+            # Combine issues (avoid duplicates)
+            existing_issue_types = {issue.issue_type for issue in current.form_quality.issues}
+            for issue in following.form_quality.issues:
+                if issue.issue_type not in existing_issue_types:
+                    current.form_quality.issues.append(issue)
+                    existing_issue_types.add(issue.issue_type)
+            
+            # Average overall score
+            current.form_quality.overall_score = (
+                current.form_quality.overall_score + following.form_quality.overall_score
+            ) / 2
+            
+            # Combine strengths (unique)
+            existing_strengths = set(current.form_quality.strengths)
+            for strength in following.form_quality.strengths:
+                if strength not in existing_strengths:
+                    current.form_quality.strengths.append(strength)
+            
+            # Update quality rating based on new score
+            score = current.form_quality.overall_score
+            if score >= 0.85:
+                current.form_quality.quality_rating = "excellent"
+            elif score >= 0.70:
+                current.form_quality.quality_rating = "good"
+            elif score >= 0.50:
+                current.form_quality.quality_rating = "needs_improvement"
+            else:
+                current.form_quality.quality_rating = "poor"
+        elif following.form_quality:
+            # If current doesn't have form quality but next does, use next
+            current.form_quality = following.form_quality
     
-    def _coalesce_timeline_enhanced(self, timeline: List[TimelineSegment], min_duration: float = 0.3) -> List[TimelineSegment]:
+    def _coalesce_timeline_enhanced(self, timeline: Iterable[TimelineSegment], min_duration: float = 0.3) -> List[TimelineSegment]:
         """Enhanced timeline coalescing with noise filtering.
         
         Performs two-pass coalescing:
@@ -1721,77 +1794,79 @@ class VideoProcessor:
         Returns:
             Enhanced coalesced timeline with noise filtered out
         """
-        if not timeline:
-            return []
-        
-        # First pass: merge adjacent same-action segments
-        coalesced = self._coalesce_timeline(timeline)
-        
-        if not coalesced:
-            return []
+        return list(self._iter_coalesced_enhanced(timeline, min_duration))
+    
+    def _iter_coalesced_enhanced(self, timeline: Iterable[TimelineSegment],
+                                 min_duration: float = 0.3) -> Iterator[TimelineSegment]:
+        """
+        Streaming form of _coalesce_timeline_enhanced
         
-        # Second pass: filter out very short segments (likely noise)
-        filtered = []
-        for i, segment in enumerate(coalesced):
-            duration = segment.end_time - segment.start_time
-            
-            if duration >= min_duration:
+        Both passes run in one go over an iterator (e.g. a WindowSpill), holding
+        only the last kept segment and one segment of lookahead.
+        """
+        coalesced = self._iter_coalesced(timeline)
+        previous = None  # Last segment kept, not yet emitted (short ones still merge into it)
+        segment = next(coalesced, None)
+        while segment is not None:
+            following = next(coalesced, None)
+            if segment.end_time - segment.start_time >= min_duration:
                 # Segment is long enough, keep it
-                filtered.append(segment)
-            else:
-                # Segment is too short (noise), merge with adjacent segment
-                if filtered:
-                    # Merge with previous segment (extend its end time)
-                    filtered[-1].end_time = segment.end_time
-                    
-                    # Average metrics with previous segment
-                    prev = filtered[-1]
-                    
-                    # Average confidence
-                    prev.action.confidence = (prev.action.confidence + segment.action.confidence) / 2
-                    
-                    # Average metrics (with None checks)
-                    if prev.metrics.jump_height is not None and segment.metrics.jump_height is not None:
-                        prev.metrics.jump_height = (prev.metrics.jump_height + segment.metrics.jump_height) / 2
-                    elif prev.metrics.jump_height is None:
-                        prev.metrics.jump_height = segment.metrics.jump_height
-                    
-                    if prev.metrics.movement_speed is not None and segment.metrics.movement_speed is not None:
-                        prev.metrics.movement_speed = (prev.metrics.movement_speed + segment.metrics.movement_speed) / 2
-                    elif prev.metrics.movement_speed is None:
-                        prev.metrics.movement_speed = segment.metrics.movement_speed
-                    
-                    if prev.metrics.form_score is not None and segment.metrics.form_score is not None:
-                        prev.metrics.form_score = (prev.metrics.form_score + segment.metrics.form_score) / 2
-                    elif prev.metrics.form_score is None:
-                        prev.metrics.form_score = segment.metrics.form_score
-                    
-                    # Merge form quality if both have it
-                    if segment.form_quality and prev.form_quality:
-                        # Combine unique issues
-                        existing_issue_types = {issue.issue_type for issue in prev.form_quality.issues}
-                        for issue in segment.form_quality.issues:
-                            if issue.issue_type not in existing_issue_types:
-                                prev.form_quality.issues.append(issue)
-                                existing_issue_types.add(issue.issue_type)
-                        
-                        # Average overall score
-                        prev.form_quality.overall_score = (
-                            prev.form_quality.overall_score + segment.form_quality.overall_score
-                        ) / 2
-                    elif segment.form_quality:
-                        # Previous doesn't have form quality, use segment's
-                        prev.form_quality = segment.form_quality
-                elif i < len(coalesced) - 1:
-                    # No previous segment, merge with next if available
-                    # For now, just skip this segment (it's at the start and too short)
-                    pass
-                else:
-                    # Last segment and too short, but no previous to merge with
-                    # Keep it anyway to avoid losing data
-                    filtered.append(segment)
-        
-        return filtered
+                if previous is not None:
+                    yield previous
+                previous = segment
+            elif previous is not None:
+                # Segment is too short (noise), merge with previous segment
+                self._absorb_short_segment(previous, segment)
+            elif following is None:
+                # Last segment and too short, but no previous to merge with
+                # Keep it anyway to avoid losing data
+                previous = segment
+            # else: too short at the start with nothing to merge into - dropped
+            segment = following
+        
+        if previous is not None:
+            yield previous
+    
+    def _absorb_short_segment(self, previous: TimelineSegment, segment: TimelineSegment):
+        """Merge a too-short (noise) segment into the previous kept segment (in place)"""
+        # Merge with previous segment (extend its end time)
+        previous.end_time = segment.end_time
+        
+        # Average confidence
+        previous.action.confidence = (previous.action.confidence + segment.action.confidence) / 2
+        
+        # Average metrics (with None checks)
+        if previous.metrics.jump_height is not None and segment.metrics.jump_height is not None:
+            previous.metrics.jump_height = (previous.metrics.jump_height + segment.metrics.jump_height) / 2
+        elif previous.metrics.jump_height is None:
+            previous.metrics.jump_height = segment.metrics.jump_height
+        
+        if previous.metrics.movement_speed is not None and segment.metrics.movement_speed is not None:
+            previous.metrics.movement_speed = (previous.metrics.movement_speed + segment.metrics.movement_speed) / 2
+        elif previous.metrics.movement_speed is None:
+            previous.metrics.movement_speed = segment.metrics.movement_speed
+        
+        if previous.metrics.form_score is not None and segment.metrics.form_score is not None:
+            previous.metrics.form_score = (previous.metrics.form_score + segment.metrics.form_score) / 2
+        elif previous.metrics.form_score is None:
+            previous.metrics.form_score = segment.metrics.form_score
+        
+        # Merge form quality if both have it
+        if segment.form_quality and previous.form_quality:
+            # Combine unique issues
+            existing_issue_types = {issue.issue_type for issue in previous.form_quality.issues}
+            for issue in segment.form_quality.issues:
+                if issue.issue_type not in existing_issue_types:
+                    previous.form_quality.issues.append(issue)
+                    existing_issue_types.add(issue.issue_type)
+            
+            # Average overall score
+            previous.form_quality.overall_score = (
+                previous.form_quality.overall_score + segment.form_quality.overall_score
+            ) / 2
+        elif segment.form_quality:
+            # Previous doesn't have form quality, use segment's
+            previous.form_quality = segment.form_quality
 
     def _map_probabilities(self, model_probs: Dict[str, float]) -> Dict[str, float]:
         """Map model class names to schema class names"""
@@ -1922,63 +1997,160 @@ class VideoProcessor:
             energy_efficiency=sum(s.metrics.energy_efficiency for s in segments) / count,
         )
 
-    async def process_sequence(self, frames: List[np.ndarray]) -> Optional[VideoAnalysisResult]:
+    def _analyze_live_frame(self, frame: np.ndarray,
+                            load_full_frame: Optional[Callable[[], np.ndarray]] = None) -> Optional[Dict]:
+        """
+        Detect the player and extract pose for one live frame (None if no player/pose)
+        
+        Args:
+            frame: Frame at analysis resolution (possibly decoded at reduced scale)
+            load_full_frame: Full-resolution decode of the same frame, used when the
+                player crop is too small for reliable pose estimation
+        """
+        detections = self.player_detector.detect_players(frame, return_largest=True)
+        if not detections:
+            return None
+        
+        bbox = detections[0][:4]
+        roi = None
+        roi_box = None
+        if load_full_frame is not None and bbox[3] - bbox[1] < LIVE_MIN_POSE_ROI:
+            full_frame = load_full_frame()
+            if full_frame is not None and full_frame.shape[1] > frame.shape[1]:
+                # Crop the player from the full-resolution frame; roi_box stays in analysis-frame pixels
+                scale = full_frame.shape[1] / frame.shape[1]
+                roi = self.player_detector.extract_roi(full_frame, [v * scale for v in bbox])
+                roi_box = (max(0, int(bbox[0])), max(0, int(bbox[1])),
+                           roi.shape[1] / scale, roi.shape[0] / scale)
+        if roi is None:
+            roi = self.player_detector.extract_roi(frame, bbox)
+            roi_box = (max(0, int(bbox[0])), max(0, int(bbox[1])), roi.shape[1], roi.shape[0])
+        pose_result = self.pose_extractor.extract_keypoints(roi)
+        if not pose_result:
+            return None
+        
+        keypoints_2d, landmarks, _ = pose_result
+        return {
+            # Keypoints are normalized (0-1) relative to ROI
+            'keypoints': keypoints_2d,
+            'landmarks': landmarks,
+            'roi_rgb': cv2.cvtColor(roi, cv2.COLOR_BGR2RGB),
+            # ROI placement in the frame (x, y, w, h), to map landmarks back to frame coordinates
+            'roi_box': roi_box,
+            'detection': {
+                'bbox': bbox,
+                'confidence': detections[0][4] if len(detections[0]) > 4 else 0.9,
+                'class': 'player'
+            }
+        }
+
+    def _live_pose(self, frame_result: Dict, frame_shape: Tuple[int, ...]) -> Optional[LivePose]:
+        """Player box + pose landmarks of one live frame, normalized to the full frame"""
+        landmarks = frame_result['landmarks']
+        if not isinstance(landmarks, np.ndarray):
+            landmarks = landmarks_to_array(landmarks)
+        if landmarks is None:
+            return None
+        
+        frame_h, frame_w = frame_shape[:2]
+        roi_x, roi_y, roi_w, roi_h = frame_result['roi_box']
+        points = np.array(landmarks, dtype=np.float32).reshape(-1, 4).copy()
+        # ROI-relative -> frame-relative
+        points[:, 0] = (roi_x + points[:, 0] * roi_w) / frame_w
+        points[:, 1] = (roi_y + points[:, 1] * roi_h) / frame_h
+        
+        x1, y1, x2, y2 = [float(v) for v in frame_result['detection']['bbox'][:4]]
+        return LivePose(
+            bbox=[round(x1 / frame_w, 4), round(y1 / frame_h, 4), round(x2 / frame_w, 4), round(y2 / frame_h, 4)],
+            landmarks=np.round(points, 4).reshape(-1).tolist()
+        )
+
+    async def process_sequence(
+        self,
+        frames: List[np.ndarray],
+        frame_encoding: str = "base64",
+        frame_ids: Optional[List[int]] = None,
+        frame_cache: Optional[LiveFrameCache] = None,
+        context: Optional[PipelineContext] = None,
+        output: str = "frame",
+        full_frame_loaders: Optional[List[Optional[Callable[[], np.ndarray]]]] = None,
+        session_id: str = "live"
+    ) -> Optional[VideoAnalysisResult]:
         """
         Process a sequence of frames (real-time) for live analysis
         Returns result with annotated frame for display
+        
+        Args:
+            frames: Most recent frames, oldest first
+            frame_encoding: "base64" sets annotated_frame (JSON clients),
+                "jpeg" sets the raw annotated_jpeg bytes (binary clients)
+            output: "frame" returns the annotated last frame, "keypoints" only
+                returns live_pose (box + landmarks) for the client to draw
+            full_frame_loaders: Per frame, a full-resolution decode (or None) for
+                frames that were decoded at reduced scale
+            session_id: Live session, for fair scheduling between sessions
+            frame_ids: Session sequence number of each frame (required with frame_cache)
+            frame_cache: Per-session cache so frames shared by overlapping
+                windows are detected and posed only once
+            context: Per-session pipeline state (a fresh one is used if omitted)
         """
         if not frames:
             return None
             
-        # Use the last frame for annotation (most recent)
-        last_frame = frames[-1].copy()
-        
-        # Estimate FPS for live analysis (assume ~10 fps based on send interval)
-        live_fps = 10.0
-        self.metrics_engine.fps = live_fps
-        self.biomechanics_engine.fps = live_fps
-        self.biomechanics_engine.dt = 1.0 / live_fps
+        if context is None:
+            context = self.create_context(LIVE_FPS)
             
         # Extract keypoints for all frames
         all_keypoints = []
         valid_frames = []
         last_detection = None
         last_pose_landmarks = None
+        last_frame_result = None
+        
+        use_cache = frame_cache is not None and frame_ids is not None
+        if use_cache:
+            frame_cache.prune(frame_ids[0])
+        
+        def analyze_frames() -> List[Optional[Dict]]:
+            frame_results = []
+            for i, frame in enumerate(frames):
+                load_full = full_frame_loaders[i] if full_frame_loaders else None
+                # Detect player + pose (once per frame when a session cache is given)
+                if use_cache:
+                    frame_results.append(frame_cache.get_or_compute(
+                        frame_ids[i], lambda frame=frame, load_full=load_full: self._analyze_live_frame(frame, load_full)
+                    ))
+                else:
+                    frame_results.append(self._analyze_live_frame(frame, load_full))
+            return frame_results
         
-        for frame in frames:
-            # Detect player
-            detections = self.player_detector.detect_players(frame, return_largest=True)
-            if detections:
-                bbox = detections[0][:4]
-                roi = self.player_detector.extract_roi(frame, bbox)
-                pose_result = self.pose_extractor.extract_keypoints(roi)
+        # Detection + pose for the window on the inference thread, ahead of upload work
+        frame_results = await self.inference.run(analyze_frames, priority=PRIORITY_LIVE, session_id=session_id)
+        
+        for frame_result in frame_results:
+            if frame_result:
+                # Metrics engine handles the ROI-normalized keypoints as-is
+                all_keypoints.append(frame_result['keypoints'])
+                valid_frames.append(frame_result['roi_rgb'])
                 
-                if pose_result:
-                    keypoints_2d, landmarks, _ = pose_result
-                    # Keypoints are normalized (0-1) relative to ROI
-                    # For metrics calculation, we can use them as-is since metrics engine
-                    # handles normalized coordinates, but we need to ensure proper scaling
-                    all_keypoints.append(keypoints_2d)
-                    valid_frames.append(cv2.cvtColor(roi, cv2.COLOR_BGR2RGB))
-                    
-                    # Store last detection and pose for annotation
-                    last_detection = {
-                        'bbox': bbox,
-                        'confidence': detections[0][4] if len(detections[0]) > 4 else 0.9,
-                        'class': 'player'
-                    }
-                    last_pose_landmarks = landmarks
+                # Store last detection and pose for annotation
+                last_detection = frame_result['detection']
+                last_pose_landmarks = frame_result['landmarks']
+                last_frame_result = frame_result
         
         if len(valid_frames) < 8: # Minimum frames for valid analysis
             return None
             
         # Classify action (only return enabled actions with sufficient confidence)
-        action_label, confidence, probabilities = self.action_classifier.classify(
+        action_label, confidence, probabilities = await self.inference.run(
+            self.action_classifier.classify,
             valid_frames,
             return_probabilities=True,
             enabled_actions=settings.ENABLED_ACTIONS,
             confidence_thresholds=settings.ACTION_CONFIDENCE_THRESHOLDS,
-            min_confidence=settings.MIN_ACTION_CONFIDENCE
+            min_confidence=settings.MIN_ACTION_CONFIDENCE,
+            priority=PRIORITY_LIVE,
+            session_id=session_id
         )
         
         # Log action detection for debugging (especially free throws)
@@ -2005,7 +2177,7 @@ class VideoProcessor:
             # Log for debugging
             logger.debug(f"Computing metrics for {len(keypoints_array)} frames, action: {action_label}")
             
-            metrics_dict = self.metrics_engine.compute_all_metrics(
+            metrics_dict = context.metrics_engine.compute_all_metrics(
                 keypoints_array,
                 action_label
             )
@@ -2017,33 +2189,28 @@ class VideoProcessor:
         else:
             # Fallback if no keypoints or insufficient frames
             logger.debug(f"Insufficient keypoints for metrics: {len(all_keypoints) if all_keypoints else 0} frames")
-            metrics_dict = self.metrics_engine._default_metrics()
+            metrics_dict = context.metrics_engine._default_metrics()
         
         # Map probabilities
         mapped_probs = self._map_probabilities(probabilities)
         
-        # Draw annotations on last frame
-        annotated_frame = last_frame.copy()
-        if last_detection and last_pose_landmarks:
-            # Draw annotations on full frame
-            annotated_frame = self._draw_annotations(
-                annotated_frame,
-                [last_detection],
-                last_pose_landmarks,
-                basketball_detections=None,
-                court_info=None,
-                hoop_info=None,
-                current_action=action_label,
-                action_confidence=confidence
+        annotated_frame_b64 = None
+        annotated_jpeg = None
+        live_pose = None
+        if output == "keypoints":
+            # Client draws box + skeleton itself: no drawing, no JPEG, a few hundred bytes out
+            if last_frame_result:
+                live_pose = self._live_pose(last_frame_result, frames[-1].shape)
+        else:
+            annotated_frame_b64, annotated_jpeg = self._annotate_live_frame(
+                frames[-1], last_detection, last_pose_landmarks, action_label, confidence, frame_encoding
             )
         
-        # Encode annotated frame to base64
-        _, buffer = cv2.imencode('.jpg', annotated_frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-        annotated_frame_b64 = base64.b64encode(buffer).decode('utf-8')
-        
         # Create result with annotated frame
         result = VideoAnalysisResult(
             video_id="realtime",
+            duration=len(frames) / context.fps,
+            actions=[],
             action=ActionClassification(
                 label=action_label,
                 confidence=confidence,
@@ -2052,7 +2219,34 @@ class VideoProcessor:
             metrics=PerformanceMetrics(**metrics_dict),
             recommendations=[], # Skip recommendations for real-time to save time
             annotated_frame=annotated_frame_b64,  # Add annotated frame for live display
+            annotated_jpeg=annotated_jpeg,
+            live_pose=live_pose,
             timestamp=datetime.now()
         )
         
         return result
+
+    def _annotate_live_frame(self, frame: np.ndarray, detection: Optional[Dict], pose_landmarks,
+                             action_label: str, confidence: float,
+                             frame_encoding: str) -> Tuple[Optional[str], Optional[bytes]]:
+        """Draw the live result on a copy of the frame; returns (base64, jpeg bytes) per encoding"""
+        annotated_frame = frame.copy()
+        if detection and pose_landmarks:
+            # Draw annotations on full frame
+            annotated_frame = self._draw_annotations(
+                annotated_frame,
+                [detection],
+                pose_landmarks,
+                basketball_detections=None,
+                court_info=None,
+                hoop_info=None,
+                current_action=action_label,
+                action_confidence=confidence,
+                in_place=True
+            )
+        
+        # Encode annotated frame (base64 only for the JSON protocol)
+        _, buffer = cv2.imencode('.jpg', annotated_frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
+        if frame_encoding == "jpeg":
+            return None, buffer.tobytes()
+        return base64.b64encode(buffer).decode('utf-8'), None
@@ -0,0 +1,223 @@
+"""
+Video Shards
+Time-sharded parallel analysis of one long video.
+
+A single upload is otherwise analyzed frame by frame on one inference thread,
+so an hour of game footage takes hours however many cores the server has.
+Long videos are instead cut into time shards that worker processes analyze in
+parallel. Models aren't thread-safe, so each worker process loads its own
+detector, pose and classifier models (a shard-worker VideoProcessor, without
+the AI coach, encoder probe or inference thread).
+
+Boundaries follow the sliding-window grid (window_size frames, every stride
+frames), so the merged timeline has the same windows over the same frames as
+a single pass:
+
+- A shard's first decoded frame is a multiple of the stride at (or just after)
+  a keyframe, so seeking there is cheap.
+- It then decodes a warm-up of one window (rounded up to the stride) that it
+  doesn't keep. This fills the frame buffer, ball tracking and smoothing state.
+  Its first owned window starts where the warm-up ends (`start`).
+- The previous shard keeps decoding until its last window that starts before
+  `start` is complete (window_size - 1 frames past it).
+
+Each grid window is therefore owned by exactly one shard, and so is each
+frame of the overlay track: [start, stop).
+"""
+
+import os
+import math
+import shutil
+import asyncio
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Shard:
+    """
+    One time shard of a video (frame indices)
+
+    Args:
+        index: Position of the shard in the video
+        decode_from: First frame decoded (warm-up included)
+        start: First frame owned
+        stop: First frame not owned (None = end of video)
+        window_size: Classifier window length in frames
+    """
+
+    __slots__ = ("index", "decode_from", "start", "stop", "window_size")
+
+    def __init__(self, index: int, decode_from: int, start: int, stop: Optional[int], window_size: int):
+        self.index = index
+        self.decode_from = decode_from
+        self.start = start
+        self.stop = stop
+        self.window_size = window_size
+
+    @property
+    def decode_until(self) -> Optional[int]:
+        """First frame not decoded: the last owned window completes just before it"""
+        return None if self.stop is None else self.stop + self.window_size - 1
+
+    def owns_frame(self, frame_index: int) -> bool:
+        return frame_index >= self.start and (self.stop is None or frame_index < self.stop)
+
+    def owns_window(self, end_frame: int) -> bool:
+        """Whether the window ending at end_frame (inclusive) starts inside this shard"""
+        return self.owns_frame(end_frame - self.window_size + 1)
+
+    def __repr__(self) -> str:
+        return f"Shard({self.index}, decode_from={self.decode_from}, start={self.start}, stop={self.stop})"
+
+
+def plan_shards(total_frames: int, shards: int, window_size: int, stride: int,
+                keyframe: Optional[Callable[[int], int]] = None,
+                min_shard_frames: int = 0) -> List[Shard]:
+    """
+    Cut a video into time shards on the window grid
+
+    Args:
+        total_frames: Frames in the video
+        shards: Shards wanted (fewer when shards would be too short)
+        window_size: Classifier window length in frames
+        stride: Frames between windows
+        keyframe: Maps a frame index to the keyframe at or before it (default: any frame)
+        min_shard_frames: Minimum owned frames per shard
+
+    Returns:
+        Shards in order; a single shard covering everything when the video
+        can't be split
+    """
+    warmup = math.ceil(window_size / stride) * stride
+    min_shard_frames = max(min_shard_frames, warmup + window_size)
+    shards = max(1, min(shards, total_frames // min_shard_frames))
+
+    starts = [(0, 0)]
+    for i in range(1, shards):
+        nominal = round(i * total_frames / shards)
+        key = keyframe(nominal) if keyframe else nominal
+        decode_from = math.ceil(key / stride) * stride
+        start = decode_from + warmup
+        if start - starts[-1][1] < min_shard_frames or total_frames - start < min_shard_frames:
+            continue
+        starts.append((decode_from, start))
+
+    stops = [start for _, start in starts[1:]] + [None]
+    return [Shard(i, decode_from, start, stop, window_size)
+            for i, ((decode_from, start), stop) in enumerate(zip(starts, stops))]
+
+
+def find_keyframes(video_path: str, fps: float) -> Optional[Callable[[int], int]]:
+    """
+    Keyframe lookup for plan_shards, or None without PyAV
+
+    Seeks backwards to the requested frame's timestamp; the first packet
+    demuxed after a seek is the keyframe it landed on.
+    """
+    try:
+        import av  # Optional dependency: without it shards start at arbitrary frames
+    except ImportError:
+        return None
+
+    def keyframe(frame_index: int) -> int:
+        try:
+            with av.open(video_path) as container:
+                stream = container.streams.video[0]
+                if not stream.time_base:
+                    return frame_index
+                container.seek(int(frame_index / fps / stream.time_base), stream=stream, backward=True)
+                for packet in container.demux(stream):
+                    if packet.pts is not None:
+                        return min(frame_index, max(0, int(round(packet.pts * stream.time_base * fps))))
+        except Exception as e:
+            logger.debug(f"Keyframe lookup failed at frame {frame_index}: {e}")
+        return frame_index
+
+    return keyframe
+
+
+def shard_count(total_frames: int, fps: float) -> int:
+    """Shards for a video: 1 (no sharding) below ANALYSIS_SHARD_MIN_SECONDS per shard"""
+    if settings.ANALYSIS_SHARD_WORKERS < 2 or fps <= 0:
+        return 1
+    return max(1, min(settings.ANALYSIS_SHARD_WORKERS,
+                      int(total_frames / fps // settings.ANALYSIS_SHARD_MIN_SECONDS)))
+
+
+def discard_shard_result(result: Dict):
+    """Delete what a shard left on disk (spill directory, overlay track)"""
+    shutil.rmtree(result["spill"], ignore_errors=True)
+    if result.get("track") and os.path.exists(result["track"]):
+        os.remove(result["track"])
+
+
+# Worker side: one shard-worker VideoProcessor (own models) per process
+_worker_processor = None
+
+
+def _init_worker():
+    global _worker_processor
+    from app.services.video_processor import VideoProcessor
+    _worker_processor = VideoProcessor(shard_worker=True)
+
+
+def _run_shard(video_path: str, video_id: str, shard: Shard) -> Dict:
+    return asyncio.run(_worker_processor.process_shard(video_path, video_id, shard))
+
+
+_shard_pool: Optional[ProcessPoolExecutor] = None
+_shard_pool_lock = threading.Lock()
+
+
+def get_shard_pool() -> ProcessPoolExecutor:
+    """Process pool for shard workers (started on first use; models load once per worker)"""
+    global _shard_pool
+    with _shard_pool_lock:
+        if _shard_pool is None:
+            logger.info(f"🧩 Starting {settings.ANALYSIS_SHARD_WORKERS} shard worker process(es)")
+            _shard_pool = ProcessPoolExecutor(
+                max_workers=settings.ANALYSIS_SHARD_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker
+            )
+        return _shard_pool
+
+
+def close_shard_pool():
+    global _shard_pool
+    with _shard_pool_lock:
+        if _shard_pool is not None:
+            _shard_pool.shutdown(wait=False, cancel_futures=True)
+            _shard_pool = None
+
+
+async def run_shards(video_path: str, video_id: str, shards: Sequence[Shard]) -> List[Dict]:
+    """
+    Analyze shards in the worker pool (see VideoProcessor.process_shard)
+
+    Returns:
+        Per-shard results in shard order
+
+    Raises:
+        The first shard failure; what the other shards left on disk is deleted
+    """
+    loop = asyncio.get_running_loop()
+    pool = get_shard_pool()
+    results = await asyncio.gather(
+        *(loop.run_in_executor(pool, _run_shard, video_path, video_id, shard) for shard in shards),
+        return_exceptions=True
+    )
+    errors = [result for result in results if isinstance(result, BaseException)]
+    if errors:
+        for result in results:
+            if not isinstance(result, BaseException):
+                discard_shard_result(result)
+        raise errors[0]
+    return results
@@ -0,0 +1,222 @@
+"""
+Window Spill
+On-disk columnar store for the per-window results of one analysis.
+
+process_video used to keep every TimelineSegment (and the pose keypoints
+behind it) in memory until the end of the video, so memory grew with video
+length. Completed windows are now appended to a spill instead. Every
+chunk_size windows, the buffered rows are written as one compressed .npz
+chunk: times, label, confidence, probabilities, metrics and form quality
+(JSON) as columns. Per-frame pose keypoints go to their own float16 chunks.
+Assembly reads the spill back one chunk at a time. Memory stays at one chunk
+whatever the video length.
+"""
+
+import os
+import glob
+import shutil
+import logging
+import tempfile
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.schemas import (
+    ActionClassification, ActionProbabilities, FormQualityAssessment, PerformanceMetrics,
+    ShotOutcome, TimelineSegment,
+)
+from app.services.timeline_summary import SERIES
+
+logger = logging.getLogger(__name__)
+
+SPILL_DIR = os.path.join(settings.RESULTS_DIR, "spill")
+
+_PROBABILITIES = tuple(ActionProbabilities.model_fields)
+_METRICS = tuple(PerformanceMetrics.model_fields)
+_INT_METRICS = {name for name, field in PerformanceMetrics.model_fields.items()
+                if field.annotation in (int, Optional[int])}
+LANDMARKS = 33
+
+
+class WindowSpill:
+    """
+    Append-only per-window store for one analysis, in a private directory
+
+    Args:
+        directory: Parent directory (a fresh subdirectory is created per spill)
+        chunk_size: Windows (and 8x as many frames) buffered per chunk
+    """
+
+    def __init__(self, directory: str = SPILL_DIR, chunk_size: int = 256):
+        os.makedirs(directory, exist_ok=True)
+        self.path = tempfile.mkdtemp(prefix="spill-", dir=directory)
+        self.chunk_size = chunk_size
+        self._windows: List[TimelineSegment] = []
+        self._frames: List[int] = []
+        self._keypoints: List[Optional[Sequence]] = []
+        self._window_chunks = 0
+        self._frame_chunks = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, segment: TimelineSegment):
+        """Add a completed window"""
+        self._windows.append(segment)
+        self._count += 1
+        if len(self._windows) >= self.chunk_size:
+            self._flush_windows()
+
+    def add_keypoints(self, frame_index: int, keypoints: Optional[Sequence]):
+        """Add a frame's pose keypoints (33 x [x, y, z], or empty/None when no pose)"""
+        self._frames.append(frame_index)
+        self._keypoints.append(keypoints)
+        if len(self._frames) >= self.chunk_size * 8:
+            self._flush_frames()
+
+    def flush(self):
+        """Write whatever is buffered"""
+        self._flush_windows()
+        self._flush_frames()
+
+    def iter_segments(self) -> Iterator[TimelineSegment]:
+        """All windows in order, read back one chunk at a time"""
+        self.flush()
+        for path in self._chunk_paths("windows"):
+            with np.load(path, allow_pickle=False) as chunk:
+                yield from _decode_windows(chunk)
+
+    def iter_keypoints(self) -> Iterator[Tuple[int, np.ndarray]]:
+        """(frame index, 33 x 3 keypoints, NaN without pose) for every frame, in order"""
+        self.flush()
+        for path in self._chunk_paths("frames"):
+            with np.load(path, allow_pickle=False) as chunk:
+                for frame, keypoints in zip(chunk["frame"], chunk["keypoints"]):
+                    yield int(frame), keypoints.astype(np.float32)
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Label and metric columns for timeline_summary (about 40 bytes per window)"""
+        self.flush()
+        parts: Dict[str, List[np.ndarray]] = {name: [] for name in ("start", "end", "label", "confidence", *SERIES[1:])}
+        for path in self._chunk_paths("windows"):
+            with np.load(path, allow_pickle=False) as chunk:
+                names = list(chunk["metric_names"])
+                metrics = chunk["metrics"]  # Each NpzFile lookup decompresses the member again
+                parts["start"].append(chunk["start"])
+                parts["end"].append(chunk["end"])
+                parts["label"].append(chunk["label"])
+                parts["confidence"].append(chunk["confidence"].astype(np.float32))
+                for name in SERIES[1:]:
+                    parts[name].append(metrics[:, names.index(name)].astype(np.float32))
+        if not parts["start"]:
+            return {
+                "start": np.zeros(0), "end": np.zeros(0), "label": np.zeros(0, dtype=np.int16),
+                "labels": np.zeros(0, dtype=str), "confidence": np.zeros(0, dtype=np.float32),
+                **{name: np.zeros(0, dtype=np.float32) for name in SERIES[1:]},
+            }
+        columns = {name: np.concatenate(values) for name, values in parts.items()}
+        labels, codes = np.unique(columns["label"], return_inverse=True)
+        columns["labels"] = labels
+        columns["label"] = codes.astype(np.int16)
+        return columns
+
+    def adopt(self, path: str):
+        """
+        Append the chunks of another spill directory (e.g. a shard's) after this
+        spill's own. The chunk files are moved, not copied.
+        """
+        self.flush()
+        for kind in ("windows", "frames"):
+            for source in sorted(glob.glob(os.path.join(path, f"{kind}_*.npz"))):
+                if kind == "windows":
+                    with np.load(source, allow_pickle=False) as chunk:
+                        self._count += len(chunk["start"])
+                    index, self._window_chunks = self._window_chunks, self._window_chunks + 1
+                else:
+                    index, self._frame_chunks = self._frame_chunks, self._frame_chunks + 1
+                shutil.move(source, os.path.join(self.path, f"{kind}_{index:06d}.npz"))
+
+    def close(self):
+        """Delete the spill"""
+        self._windows.clear()
+        self._keypoints.clear()
+        self._frames.clear()
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def _chunk_paths(self, kind: str) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.path, f"{kind}_*.npz")))
+
+    def _write(self, kind: str, index: int, **columns):
+        path = os.path.join(self.path, f"{kind}_{index:06d}.npz")
+        np.savez_compressed(path, **columns)
+
+    def _flush_windows(self):
+        if not self._windows:
+            return
+        self._write("windows", self._window_chunks, **_encode_windows(self._windows))
+        self._window_chunks += 1
+        self._windows = []
+
+    def _flush_frames(self):
+        if not self._frames:
+            return
+        keypoints = np.full((len(self._frames), LANDMARKS, 3), np.nan, dtype=np.float16)
+        for i, frame_keypoints in enumerate(self._keypoints):
+            if frame_keypoints is not None and len(frame_keypoints):
+                keypoints[i] = np.asarray(frame_keypoints, dtype=np.float32)[:LANDMARKS, :3]
+        self._write("frames", self._frame_chunks, frame=np.array(self._frames, dtype=np.int64), keypoints=keypoints)
+        self._frame_chunks += 1
+        self._frames = []
+        self._keypoints = []
+
+
+def _encode_windows(windows: List[TimelineSegment]) -> Dict[str, np.ndarray]:
+    metrics = np.full((len(windows), len(_METRICS)), np.nan)
+    for i, segment in enumerate(windows):
+        for j, name in enumerate(_METRICS):
+            value = getattr(segment.metrics, name)
+            if value is not None:
+                metrics[i, j] = value
+    return {
+        "start": np.array([s.start_time for s in windows], dtype=np.float64),
+        "end": np.array([s.end_time for s in windows], dtype=np.float64),
+        "label": np.array([s.action.label for s in windows], dtype=str),
+        "confidence": np.array([s.action.confidence for s in windows], dtype=np.float64),
+        "probabilities": np.array([[getattr(s.action.probabilities, name) for name in _PROBABILITIES]
+                                   for s in windows], dtype=np.float64),
+        "probability_names": np.array(_PROBABILITIES, dtype=str),
+        "metrics": metrics,
+        "metric_names": np.array(_METRICS, dtype=str),
+        "form_quality": np.array([s.form_quality.model_dump_json() if s.form_quality else "" for s in windows], dtype=str),
+        "shot_outcome": np.array([s.shot_outcome.model_dump_json() if s.shot_outcome else "" for s in windows], dtype=str),
+    }
+
+
+def _decode_windows(chunk) -> Iterator[TimelineSegment]:
+    # Each NpzFile lookup decompresses the member again: load every column once per chunk
+    chunk = {name: chunk[name] for name in chunk.files}
+    probability_names = [str(name) for name in chunk["probability_names"]]
+    metric_names = [str(name) for name in chunk["metric_names"]]
+    for i in range(len(chunk["start"])):
+        metrics = {}
+        for name, value in zip(metric_names, chunk["metrics"][i]):
+            if not np.isnan(value):
+                metrics[name] = int(value) if name in _INT_METRICS else float(value)
+        form_quality = str(chunk["form_quality"][i])
+        shot_outcome = str(chunk["shot_outcome"][i])
+        yield TimelineSegment(
+            start_time=float(chunk["start"][i]),
+            end_time=float(chunk["end"][i]),
+            action=ActionClassification(
+                label=str(chunk["label"][i]),
+                confidence=float(chunk["confidence"][i]),
+                probabilities=ActionProbabilities(**{
+                    name: float(value) for name, value in zip(probability_names, chunk["probabilities"][i])
+                }),
+            ),
+            metrics=PerformanceMetrics(**metrics),
+            form_quality=FormQualityAssessment.model_validate_json(form_quality) if form_quality else None,
+            shot_outcome=ShotOutcome.model_validate_json(shot_outcome) if shot_outcome else None,
+        )
@@ -14,9 +14,16 @@ CREATE TABLE IF NOT EXISTS analysis_results (
     metrics JSONB,
     recommendations JSONB,
     video_url TEXT,
-    raw_result JSONB
+    raw_result JSONB,
+    player_id TEXT
 );
 
+-- Existing tables: add the player column and the history listing index
+ALTER TABLE analysis_results ADD COLUMN IF NOT EXISTS player_id TEXT;
+CREATE INDEX IF NOT EXISTS analysis_results_created_at ON analysis_results (created_at DESC);
+-- History pages are keyset-paginated on (created_at, id)
+CREATE INDEX IF NOT EXISTS analysis_results_created_at_id ON analysis_results (created_at DESC, id DESC);
+
 -- 2. Enable Row Level Security (Optional - for public access, you may want to disable this)
 -- ALTER TABLE analysis_results ENABLE ROW LEVEL SECURITY;
 
@@ -0,0 +1,69 @@
+"""
+Tests for running per-action aggregates
+"""
+
+import pytest
+
+from app.core.schemas import (
+    ActionClassification, ActionProbabilities, FormQualityAssessment, FormQualityIssue,
+    PerformanceMetrics, TimelineSegment,
+)
+from app.services.action_stats import ActionStats
+
+
+def _segment(i: int, label: str, issue: str = None) -> TimelineSegment:
+    metrics = PerformanceMetrics(jump_height=0.01 * i, movement_speed=1.0, form_score=0.5, reaction_time=0.2,
+                                 pose_stability=0.8, energy_efficiency=0.7)
+    form = FormQualityAssessment(
+        overall_score=0.9 if i % 2 else 0.7, quality_rating="good", strengths=["balance", "arc"],
+        issues=[FormQualityIssue(issue_type=issue, severity="minor", description="", recommendation="")] if issue else [],
+    )
+    return TimelineSegment(
+        start_time=i * 0.27, end_time=i * 0.27 + 0.5, metrics=metrics, form_quality=form,
+        action=ActionClassification(label=label, confidence=0.6 if i % 2 else 0.8, probabilities=ActionProbabilities(
+            jump_shot=0.6, free_throw=0.2, layup=0.1, idle=0.1)),
+    )
+
+
+class TestActionStats:
+    """Running aggregates match the all-windows computation in bounded memory"""
+
+    def test_aggregates(self):
+        stats = ActionStats(max_segments=10)
+        for i in range(1000):
+            stats.add(_segment(i, "idle" if i % 5 == 0 else "jump_shot",
+                               issue="knee_bend" if i % 3 == 0 else ("elbow_angle" if i % 7 == 0 else None)))
+        assert [label for label, _ in stats.items()] == ["jump_shot"]
+
+        shots = stats["jump_shot"]
+        windows = [i for i in range(1000) if i % 5]
+        assert shots.count == 800
+        assert shots.total_duration == pytest.approx(400.0)
+        assert shots.confidence == pytest.approx(sum(0.6 if i % 2 else 0.8 for i in windows) / 800)
+        assert shots.metrics().jump_height == pytest.approx(sum(0.01 * i for i in windows) / 800)
+        assert shots.form_score == pytest.approx(sum(0.9 if i % 2 else 0.7 for i in windows) / 800)
+
+        assert [issue.issue_type for issue in shots.form_issues()] == ["knee_bend", "elbow_angle"]
+        assert shots.form_strengths() == ["balance", "arc"]
+        assert shots.form_quality(0.5).quality_rating == "good"
+
+    def test_segment_sample_is_bounded_and_even(self):
+        stats = ActionStats(max_segments=10)
+        for i in range(1000):
+            stats.add(_segment(i, "layup"))
+        sample = stats["layup"].segments
+        assert 10 <= len(sample) < 20
+        starts = [s.start_time for s in sample]
+        gaps = {round(b - a, 6) for a, b in zip(starts, starts[1:])}
+        assert len(gaps) == 1
+
+    def test_short_actions_keep_every_window(self):
+        stats = ActionStats(max_segments=100)
+        segments = [_segment(i, "layup") for i in range(40)]
+        for segment in segments:
+            stats.add(segment)
+        assert stats["layup"].segments == segments
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,184 @@
+"""
+Unit tests for the cached annotation renderer
+"""
+
+import pytest
+import numpy as np
+import cv2
+
+from app.services.annotation_renderer import (
+    CachedAnnotationRenderer, NullAnnotationRenderer, create_annotation_renderer
+)
+from app.core.schemas import FormQualityAssessment, FormQualityIssue
+
+
+def _legacy_overlays(frame, court_info, hoop_info, current_action, action_confidence, form_quality):
+    """Reference implementation: the original full-frame copy + addWeighted drawing"""
+    annotated_frame = frame.copy()
+
+    def filter_court_lines(line_list, min_length=150, max_count=8):
+        filtered = []
+        for line in line_list:
+            x1, y1, x2, y2 = line
+            length = ((x2 - x1) ** 2 + (y2 - y1) ** 2) ** 0.5
+            if length >= min_length:
+                filtered.append((line, length))
+        filtered.sort(key=lambda x: x[1], reverse=True)
+        return [line for line, _ in filtered[:max_count]]
+
+    if court_info and court_info.get("lines"):
+        lines = court_info["lines"]
+        for line in filter_court_lines(lines.get("horizontal", []), min_length=200, max_count=5):
+            x1, y1, x2, y2 = map(int, line)
+            if abs(y2 - y1) < 20:
+                cv2.line(annotated_frame, (x1, y1), (x2, y2), (0, 255, 255), 2)
+        for line in filter_court_lines(lines.get("vertical", []), min_length=150, max_count=4):
+            x1, y1, x2, y2 = map(int, line)
+            if abs(x2 - x1) < 20:
+                cv2.line(annotated_frame, (x1, y1), (x2, y2), (255, 255, 0), 2)
+        for line in filter_court_lines(lines.get("diagonal", []), min_length=100, max_count=6):
+            x1, y1, x2, y2 = map(int, line)
+            cv2.line(annotated_frame, (x1, y1), (x2, y2), (0, 255, 0), 1)
+
+    if hoop_info:
+        center_x, center_y = int(hoop_info["center"][0]), int(hoop_info["center"][1])
+        x1, y1, x2, y2 = hoop_info["bbox"]
+        radius = max((x2 - x1), (y2 - y1)) // 2
+        cv2.circle(annotated_frame, (center_x, center_y), radius, (0, 255, 255), 3)
+        cv2.putText(annotated_frame, "HOOP", (center_x - 20, center_y - radius - 10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+
+    if current_action:
+        label_text = current_action.replace('_', ' ').title()
+        if action_confidence > 0:
+            label_text += f" ({action_confidence:.0%})"
+        font = cv2.FONT_HERSHEY_SIMPLEX
+        (text_width, text_height), _ = cv2.getTextSize(label_text, font, 0.8, 2)
+        padding = 10
+        box_x1, box_y1 = padding, padding
+        box_x2 = box_x1 + text_width + padding * 2
+        box_y2 = box_y1 + text_height + padding * 2
+        overlay = annotated_frame.copy()
+        cv2.rectangle(overlay, (box_x1, box_y1), (box_x2, box_y2), (0, 0, 0), -1)
+        cv2.addWeighted(overlay, 0.6, annotated_frame, 0.4, 0, annotated_frame)
+        cv2.putText(annotated_frame, label_text, (box_x1 + padding, box_y1 + text_height + padding),
+                    font, 0.8, (255, 100, 100), 2)
+
+        if form_quality:
+            quality_text, quality_color = "⚠ Needs Improvement", (0, 165, 255)
+            quality_y = box_y2 + padding + text_height
+            (quality_width, quality_height), _ = cv2.getTextSize(quality_text, font, 0.6, 1)
+            quality_box_x2 = box_x1 + quality_width + padding * 2
+            quality_box_y2 = quality_y + quality_height + padding
+            overlay = annotated_frame.copy()
+            cv2.rectangle(overlay, (box_x1, box_y2 + padding), (quality_box_x2, quality_box_y2), (0, 0, 0), -1)
+            cv2.addWeighted(overlay, 0.6, annotated_frame, 0.4, 0, annotated_frame)
+            cv2.putText(annotated_frame, quality_text, (box_x1 + padding, quality_y + quality_height),
+                        font, 0.6, quality_color, 1)
+
+            issue_text = f"Fix: {form_quality.issues[0].issue_type.replace('_', ' ').title()}"
+            issue_y = quality_box_y2 + padding + quality_height
+            (issue_width, issue_height), _ = cv2.getTextSize(issue_text, font, 0.5, 1)
+            issue_box_x2 = box_x1 + issue_width + padding * 2
+            issue_box_y2 = issue_y + issue_height + padding
+            overlay = annotated_frame.copy()
+            cv2.rectangle(overlay, (box_x1, quality_box_y2 + padding), (issue_box_x2, issue_box_y2), (0, 0, 0), -1)
+            cv2.addWeighted(overlay, 0.6, annotated_frame, 0.4, 0, annotated_frame)
+            cv2.putText(annotated_frame, issue_text, (box_x1 + padding, issue_y + issue_height),
+                        font, 0.5, quality_color, 1)
+
+    return annotated_frame
+
+
+class TestCachedAnnotationRenderer:
+    """Test cached overlays against the original drawing code"""
+
+    @pytest.fixture
+    def frame(self):
+        rng = np.random.default_rng(0)
+        return rng.integers(0, 255, size=(360, 640, 3), dtype=np.uint8)
+
+    @pytest.fixture
+    def court_info(self):
+        return {
+            "lines": {
+                "horizontal": [[10, 300, 630, 305], [50, 200, 600, 202], [0, 100, 100, 100]],
+                "vertical": [[20, 10, 22, 350], [600, 0, 605, 340]],
+                "diagonal": [[100, 100, 300, 250], [-20, 50, 120, 200]],
+            }
+        }
+
+    @pytest.fixture
+    def hoop_info(self):
+        return {"center": (320.0, 60.0), "bbox": (300, 45, 340, 75)}
+
+    @pytest.fixture
+    def form_quality(self):
+        return FormQualityAssessment(
+            overall_score=0.55,
+            quality_rating="needs_improvement",
+            issues=[FormQualityIssue(
+                issue_type="elbow_angle", severity="moderate",
+                description="Elbow flared", recommendation="Wall drill"
+            )],
+            strengths=[]
+        )
+
+    def test_matches_legacy_drawing(self, frame, court_info, hoop_info, form_quality):
+        """Cached sprites and ROI blends match the original code (up to rounding on glyph edges)"""
+        renderer = CachedAnnotationRenderer()
+        expected = _legacy_overlays(frame, court_info, hoop_info, "two_point_shot", 0.87, form_quality)
+
+        result = renderer.render(
+            frame, [], None, None, court_info, hoop_info,
+            current_action="two_point_shot", action_confidence=0.87, form_quality=form_quality
+        )
+
+        diff = np.abs(result.astype(np.int16) - expected.astype(np.int16))
+        assert diff.max() <= 1
+
+    def test_in_place_and_copy(self, frame, hoop_info):
+        """in_place draws on the given frame, otherwise the input is untouched"""
+        renderer = CachedAnnotationRenderer()
+        original = frame.copy()
+
+        copied = renderer.render(frame, [], None, hoop_info=hoop_info)
+        assert copied is not frame
+        assert np.array_equal(frame, original)
+
+        same = renderer.render(frame, [], None, hoop_info=hoop_info, in_place=True)
+        assert same is frame
+        assert np.array_equal(same, copied)
+
+    def test_overlays_cached_per_state(self, frame, court_info, hoop_info):
+        """Court/hoop sprites are rebuilt only when the detection state changes"""
+        renderer = CachedAnnotationRenderer()
+        renderer.render(frame, [], None, court_info=court_info, hoop_info=hoop_info)
+        court_sprite = renderer._court_sprite
+        hoop_sprite = renderer._hoop_sprite
+
+        renderer.render(frame, [], None, court_info=court_info, hoop_info=hoop_info)
+        assert renderer._court_sprite is court_sprite
+        assert renderer._hoop_sprite is hoop_sprite
+
+        renderer.render(frame, [], None, court_info=dict(court_info), hoop_info=hoop_info)
+        assert renderer._court_sprite is not court_sprite
+        assert renderer._hoop_sprite is hoop_sprite
+
+    def test_renderer_can_be_disabled(self, frame, hoop_info):
+        """The 'none' renderer leaves frames untouched"""
+        renderer = create_annotation_renderer("none")
+        assert isinstance(renderer, NullAnnotationRenderer)
+        assert not renderer.enabled
+
+        result = renderer.render(frame, [{"bbox": [0, 0, 10, 10], "confidence": 0.9, "class": "player"}],
+                                 None, hoop_info=hoop_info, current_action="dribbling")
+        assert result is frame
+
+    def test_default_renderer_is_cached(self):
+        assert isinstance(create_annotation_renderer("cached"), CachedAnnotationRenderer)
+        assert isinstance(create_annotation_renderer("unknown"), CachedAnnotationRenderer)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,148 @@
+"""
+Unit tests for the batching outbox writer
+"""
+
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from app.services.batch_writer import BatchWriter
+
+
+class FakeTable:
+    """Records multi-row inserts; can be switched offline or made to reject rows"""
+
+    def __init__(self):
+        self.batches = []
+        self.online = True
+        self.rejected = set()
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def insert(self, rows):
+        with self.lock:
+            self.calls += 1
+            if not self.online:
+                raise ConnectionError("backend unreachable")
+            if any(row["n"] in self.rejected for row in rows):
+                raise ValueError("invalid row")
+            self.batches.append(rows)
+
+    @property
+    def rows(self):
+        return [row for batch in self.batches for row in batch]
+
+
+class TestBatchWriter:
+    """Test size/time triggers, spill + replay and durability"""
+
+    @pytest.fixture
+    def table(self):
+        return FakeTable()
+
+    def test_coalesces_by_size_and_time(self, tmp_path, table):
+        writer = BatchWriter(table.insert, str(tmp_path / "history.db"), batch_size=5, max_delay=0.2)
+        for i in range(12):
+            writer.write({"n": i})
+        # Two full batches go out right away; the remainder waits for max_delay
+        deadline = time.monotonic() + 2.0
+        while len(table.batches) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert [len(batch) for batch in table.batches] == [5, 5]
+
+        assert writer.flush(2.0)
+        assert [len(batch) for batch in table.batches] == [5, 5, 2]
+        assert [row["n"] for row in table.rows] == list(range(12))
+        assert writer.stats()["written"] == 12
+        writer.close()
+
+    def test_spills_and_replays(self, tmp_path, table):
+        table.online = False
+        writer = BatchWriter(table.insert, str(tmp_path / "history.db"), batch_size=2, max_delay=0.0,
+                             retry_delay=0.05)
+        for i in range(5):
+            writer.write({"n": i})
+        time.sleep(0.2)
+        stats = writer.stats()
+        assert stats["failures"] >= 1 and "unreachable" in stats["last_error"]
+        assert writer.depth() == 5
+
+        table.online = True
+        assert writer.flush(3.0)
+        assert [row["n"] for row in table.rows] == list(range(5))
+        assert writer.stats()["failures"] == 0
+        writer.close()
+
+    def test_bad_row_is_isolated(self, tmp_path, table):
+        table.rejected = {5}
+        db_path = str(tmp_path / "history.db")
+        writer = BatchWriter(table.insert, db_path, batch_size=8, max_delay=0.0,
+                             retry_delay=60.0, max_attempts=3)
+        for i in range(8):
+            writer.write({"n": i})
+        deadline = time.monotonic() + 2.0
+        while len(table.rows) < 7 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        # Everything but the bad row is written; only it accrues an attempt and backs off
+        assert sorted(row["n"] for row in table.rows) == [0, 1, 2, 3, 4, 6, 7]
+        stats = writer.stats()
+        assert stats["failures"] == 0 and "invalid row" in stats["last_error"]
+        assert writer.depth() == 1
+        with sqlite3.connect(db_path) as conn:
+            attempts, retry_at = conn.execute("SELECT attempts, retry_at FROM outbox").fetchone()
+        assert attempts == 1 and retry_at > time.time() + 30
+
+        # Rows written later aren't held back by it
+        writer.write({"n": 8})
+        deadline = time.monotonic() + 2.0
+        while len(table.rows) < 8 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert table.rows[-1] == {"n": 8}
+        assert writer.depth() == 1
+        writer.close(timeout=0.1)
+
+    def test_outage_backs_off_whole_batch(self, tmp_path, table):
+        table.online = False
+        writer = BatchWriter(table.insert, str(tmp_path / "history.db"), batch_size=4, max_delay=0.0,
+                             retry_delay=60.0)
+        for i in range(4):
+            writer.write({"n": i})
+        time.sleep(0.2)
+        # The batch, both halves and each row alone (7 requests), then one writer-wide back-off
+        assert table.calls == 7
+        assert writer.stats()["failures"] == 1
+        writer.close(timeout=0.1)
+
+    def test_upgrades_old_outbox(self, tmp_path, table):
+        db_path = str(tmp_path / "history.db")
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("CREATE TABLE outbox (id INTEGER PRIMARY KEY AUTOINCREMENT, row TEXT NOT NULL, "
+                         "queued_at REAL NOT NULL, attempts INTEGER NOT NULL DEFAULT 0)")
+            conn.execute("INSERT INTO outbox (row, queued_at) VALUES ('{\"n\": 1}', 0)")
+        writer = BatchWriter(table.insert, db_path, batch_size=10, max_delay=0.0)
+        assert writer.flush(2.0)
+        assert table.rows == [{"n": 1}]
+        writer.close()
+
+    def test_backlog_survives_restart(self, tmp_path, table):
+        table.online = False
+        db_path = str(tmp_path / "history.db")
+        writer = BatchWriter(table.insert, db_path, batch_size=10, max_delay=60.0)
+        writer.write({"n": 1})
+        writer.close(timeout=0.1)
+
+        table.online = True
+        written = []
+        restarted = BatchWriter(table.insert, db_path, batch_size=10, max_delay=0.0,
+                                on_written=lambda: written.append(True))
+        assert restarted.flush(2.0)
+        assert table.rows == [{"n": 1}]
+        assert written
+        restarted.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,65 @@
+"""
+Unit tests for the binary WebSocket protocol
+"""
+
+import struct
+
+import pytest
+import numpy as np
+import cv2
+
+from app.api.binary_protocol import (
+    BINARY_SUBPROTOCOL, MSG_FRAME, MSG_RESULT, ProtocolError,
+    pack_message, unpack_message, wants_binary
+)
+
+
+class _FakeWebSocket:
+    def __init__(self, subprotocols):
+        self.scope = {"subprotocols": subprotocols}
+
+
+class TestBinaryProtocol:
+    """Test message framing"""
+
+    @pytest.fixture
+    def jpeg(self):
+        frame = np.zeros((48, 64, 3), dtype=np.uint8)
+        cv2.rectangle(frame, (10, 10), (40, 30), (0, 255, 0), -1)
+        _, buffer = cv2.imencode(".jpg", frame)
+        return buffer.tobytes()
+
+    def test_round_trip(self, jpeg):
+        meta = {"action": {"label": "dribbling", "confidence": 0.8}}
+        msg_type, decoded_meta, payload = unpack_message(pack_message(MSG_RESULT, meta, jpeg))
+        assert msg_type == MSG_RESULT
+        assert decoded_meta == meta
+        assert bytes(payload) == jpeg
+
+    def test_bare_jpeg_is_a_frame(self, jpeg):
+        msg_type, meta, payload = unpack_message(jpeg)
+        assert msg_type == MSG_FRAME
+        assert meta == {}
+        assert cv2.imdecode(np.frombuffer(payload, np.uint8), cv2.IMREAD_COLOR).shape == (48, 64, 3)
+
+    def test_meta_only_message(self):
+        msg_type, meta, payload = unpack_message(pack_message(MSG_RESULT, {"a": 1}))
+        assert meta == {"a": 1}
+        assert len(payload) == 0
+
+    def test_malformed_messages_rejected(self):
+        with pytest.raises(ProtocolError):
+            unpack_message(b"\x01")
+        with pytest.raises(ProtocolError):
+            unpack_message(struct.pack("!BBI", 9, MSG_FRAME, 0))
+        with pytest.raises(ProtocolError):
+            unpack_message(struct.pack("!BBI", 1, MSG_FRAME, 100) + b"{}")
+
+    def test_subprotocol_negotiation(self):
+        assert wants_binary(_FakeWebSocket([BINARY_SUBPROTOCOL]))
+        assert not wants_binary(_FakeWebSocket([]))
+        assert not wants_binary(_FakeWebSocket(None))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
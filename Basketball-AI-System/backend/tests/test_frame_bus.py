@@ -0,0 +1,132 @@
+"""
+Unit tests for the video-stream frame bus
+"""
+
+import asyncio
+from collections import deque
+
+import pytest
+
+from app.services.frame_bus import InProcessFrameBus, RedisFrameBus
+
+
+class FakeRedis:
+    """Local stand-in for the redis.asyncio publish/pubsub API (shared "server")"""
+
+    def __init__(self, channels=None):
+        self.channels = channels if channels is not None else {}
+
+    def client(self):
+        return FakeRedis(self.channels)
+
+    async def publish(self, channel, data):
+        receivers = self.channels.get(channel, set())
+        for pubsub in receivers:
+            pubsub.queue.append({"type": "message", "channel": channel.encode(), "data": data})
+        return len(receivers)
+
+    async def pubsub_numsub(self, *channels):
+        return [(c.encode(), len(self.channels.get(c, ()))) for c in channels]
+
+    def pubsub(self):
+        return FakePubSub(self.channels)
+
+
+class FakePubSub:
+    def __init__(self, channels):
+        self.channels = channels
+        self.queue = deque()
+
+    async def subscribe(self, channel):
+        self.channels.setdefault(channel, set()).add(self)
+
+    async def unsubscribe(self, channel):
+        self.channels.get(channel, set()).discard(self)
+
+    async def get_message(self, ignore_subscribe_messages=True, timeout=1.0):
+        if self.queue:
+            return self.queue.popleft()
+        await asyncio.sleep(0.001)
+        return None
+
+    async def aclose(self):
+        for receivers in self.channels.values():
+            receivers.discard(self)
+
+
+async def _drain(subscription, count):
+    return [await asyncio.wait_for(subscription.get(), 1.0) for _ in range(count)]
+
+
+class TestInProcessFrameBus:
+    """Test fan-out and bounded per-subscriber buffers"""
+
+    def test_fan_out_and_bounded_buffers(self):
+        async def run():
+            bus = InProcessFrameBus(buffer_size=4)
+            assert not await bus.has_subscribers("v1")
+            fast = await bus.subscribe("v1")
+            slow = await bus.subscribe("v1")
+            other = await bus.subscribe("v2")
+            assert await bus.has_subscribers("v1")
+
+            for i in range(10):
+                assert await bus.publish("v1", bytes([i])) == 2
+                # Only the fast subscriber keeps up
+                assert await fast.get() == bytes([i])
+
+            assert await _drain(slow, 4) == [bytes([i]) for i in range(6, 10)]
+            assert slow.dropped == 6 and fast.dropped == 0
+            assert other._buffer == deque()
+
+            await slow.close()
+            assert await slow.get() is None
+            assert await bus.publish("v1", b"x") == 1
+            await bus.close()
+            assert not await bus.has_subscribers("v1")
+
+        asyncio.run(run())
+
+
+class TestRedisFrameBus:
+    """Test cross-worker delivery through a Redis stand-in"""
+
+    def test_worker_to_socket_holder(self):
+        async def run():
+            server = FakeRedis()
+            analysis_worker = RedisFrameBus(server.client(), buffer_size=4)
+            socket_worker = RedisFrameBus(server.client(), buffer_size=4)
+
+            subscription = await socket_worker.subscribe("video-1")
+            assert await analysis_worker.has_subscribers("video-1")
+            assert not await analysis_worker.has_subscribers("video-2")
+
+            assert await analysis_worker.publish("video-1", b"frame-1") == 1
+            assert await analysis_worker.publish("video-2", b"nobody") == 0
+            assert await _drain(subscription, 1) == [b"frame-1"]
+
+            await subscription.close()
+            assert not await analysis_worker.has_subscribers("video-1")
+            await socket_worker.close()
+            await analysis_worker.close()
+
+        asyncio.run(run())
+
+    def test_slow_holder_keeps_latest(self):
+        async def run():
+            server = FakeRedis()
+            bus = RedisFrameBus(server.client(), buffer_size=2)
+            subscription = await bus.subscribe("v")
+            for i in range(5):
+                await server.publish("bako:video-stream:v", bytes([i]))
+            # Let the reader task fan everything out before consuming
+            await asyncio.sleep(0.05)
+            assert await _drain(subscription, 2) == [bytes([3]), bytes([4])]
+            assert subscription.dropped == 3
+            await bus.close()
+
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
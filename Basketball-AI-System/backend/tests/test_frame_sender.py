@@ -0,0 +1,88 @@
+"""
+Unit tests for the decoupled latest-frame sender
+"""
+
+import asyncio
+
+import cv2
+import numpy as np
+import pytest
+
+from app.services.frame_sender import LatestFrameSender
+
+
+def _frame(value: int) -> np.ndarray:
+    frame = np.zeros((120, 160, 3), dtype=np.uint8)
+    frame[:, :value] = 255
+    return frame
+
+
+class TestLatestFrameSender:
+    """Test mailbox semantics, decoupling and rate/quality adaptation"""
+
+    def test_offer_never_waits_for_slow_client(self):
+        sent = []
+
+        async def slow_send(jpeg: bytes):
+            await asyncio.sleep(0.05)
+            sent.append(jpeg)
+
+        async def run():
+            sender = LatestFrameSender(slow_send, max_fps=100)
+            sender.start()
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            for i in range(50):
+                sender.offer(_frame(i))
+                await asyncio.sleep(0)
+            offering = loop.time() - started
+            await asyncio.sleep(0.2)
+            await sender.close()
+            return sender, offering
+
+        sender, offering = asyncio.run(run())
+        assert offering < 0.05
+        assert 1 <= sender.sent < 50
+        assert sender.replaced > 0
+        assert sender.offered == 50
+        assert all(jpeg[:2] == b"\xff\xd8" for jpeg in sent)
+
+    def test_latest_frame_wins(self):
+        sent = []
+
+        async def send(jpeg: bytes):
+            sent.append(jpeg)
+
+        async def run():
+            sender = LatestFrameSender(send, max_fps=100)
+            # Offered before the task runs: only the last one is delivered
+            for i in range(5):
+                sender.offer(_frame(20 * i))
+            sender.start()
+            await asyncio.sleep(0.1)
+            await sender.close()
+            return sender
+
+        sender = asyncio.run(run())
+        assert sender.sent == 1 and sender.replaced == 4
+        decoded = cv2.imdecode(np.frombuffer(sent[0], np.uint8), cv2.IMREAD_COLOR)
+        assert decoded[:, 70].mean() > 200 and decoded[:, 90].mean() < 50
+
+    def test_adapts_to_client_throughput(self):
+        sender = LatestFrameSender(lambda jpeg: None, max_fps=10, min_fps=2)
+
+        # 40 KB frames over a 100 KB/s link need 0.4s each
+        for _ in range(5):
+            sender.record_delivery(40_000, 0.4)
+        assert sender.quality == sender.min_quality
+        assert sender.interval == pytest.approx(0.48, rel=0.05)
+
+        # Fast link: quality and rate recover
+        for _ in range(30):
+            sender.record_delivery(40_000, 0.001)
+        assert sender.quality == sender.max_quality
+        assert sender.interval == pytest.approx(sender.min_interval)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
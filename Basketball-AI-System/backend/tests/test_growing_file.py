@@ -0,0 +1,72 @@
+"""
+Unit tests for serving videos that are still being encoded
+"""
+
+import os
+import asyncio
+
+import pytest
+
+from app.services.growing_file import parse_byte_range, read_file_range, tail_growing_file
+from app.services.video_encoder import ENCODING_SUFFIX
+
+
+async def _collect(chunks):
+    return b"".join([chunk async for chunk in chunks])
+
+
+class TestGrowingFile:
+    """Test range parsing against the bytes written so far, range reads and tailing"""
+
+    def test_parse_byte_range(self):
+        assert parse_byte_range("bytes=0-99", 1000) == (0, 99)
+        assert parse_byte_range("bytes=500-", 1000) == (500, 999)
+        # Clamped to what's written; the rest isn't known yet
+        assert parse_byte_range("bytes=900-5000", 1000) == (900, 999)
+        assert parse_byte_range("bytes=-100", 1000) == (900, 999)
+        assert parse_byte_range("bytes=-5000", 1000) == (0, 999)
+
+    def test_unsupported_ranges_are_ignored(self):
+        for header in ("bytes=0-1,5-6", "items=0-1", "bytes=abc", "bytes=5-2", "bytes=-", "bytes=1"):
+            assert parse_byte_range(header, 1000) is None
+
+    def test_unsatisfiable_ranges(self):
+        with pytest.raises(ValueError):
+            parse_byte_range("bytes=1000-", 1000)
+        with pytest.raises(ValueError):
+            parse_byte_range("bytes=-10", 0)
+        with pytest.raises(ValueError):
+            parse_byte_range("bytes=-0", 1000)
+
+    def test_read_file_range(self, tmp_path):
+        path = tmp_path / "video.mp4"
+        data = os.urandom(3000)
+        path.write_bytes(data)
+        assert asyncio.run(_collect(read_file_range(str(path), 100, 2099, chunk_size=512))) == data[100:2100]
+        assert asyncio.run(_collect(read_file_range(str(path), 2900, 5000))) == data[2900:]
+
+    def test_tail_until_encoding_ends(self, tmp_path):
+        path = tmp_path / "video.mp4"
+        marker = str(path) + ENCODING_SUFFIX
+        with open(marker, "w") as f:
+            f.write(str(os.getpid()))
+        path.write_bytes(b"first")
+
+        async def run():
+            async def grow():
+                await asyncio.sleep(0.05)
+                with open(path, "ab") as f:
+                    f.write(b"-second")
+                await asyncio.sleep(0.05)
+                os.remove(marker)
+
+            writer = asyncio.create_task(grow())
+            data = await _collect(tail_growing_file(str(path), poll_interval=0.01))
+            await writer
+            return data
+
+        assert asyncio.run(run()) == b"first-second"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
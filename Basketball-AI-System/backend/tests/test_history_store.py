@@ -0,0 +1,97 @@
+"""
+Unit tests for the local SQLite history store
+"""
+
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services.history_store import HistoryStore, make_cursor, parse_cursor
+
+
+class TestHistoryStore:
+    """Test appends, newest-first reads, retention and legacy import"""
+
+    @pytest.fixture
+    def store(self, tmp_path):
+        store = HistoryStore(str(tmp_path / "history.db"), max_records=3)
+        yield store
+        store.close()
+
+    def test_newest_first_with_count_retention(self, store):
+        for i in range(5):
+            store.append({"action": "shooting", "metrics": {"form_score": i}})
+
+        records = store.recent(10)
+        assert store.count() == 3
+        assert [r["metrics"]["form_score"] for r in records] == [4, 3, 2]
+        assert records[0]["id"] > records[1]["id"]
+        assert "created_at" not in records[0]  # Stored as given; the column gets a default
+        assert len(store.recent(2)) == 2
+
+    def test_summaries_keyset_pages(self, tmp_path):
+        store = HistoryStore(str(tmp_path / "history.db"), max_records=0)
+        start = datetime(2026, 1, 1)
+        for i in range(5):
+            store.append({"action": f"a{i}", "metrics": {"form_score": i}, "raw_result": {"big": "x" * 100},
+                          "created_at": (start + timedelta(minutes=i)).isoformat()})
+
+        first = store.summaries(limit=2)
+        assert [r["action"] for r in first] == ["a4", "a3"]
+        assert set(first[0]) == {"id", "created_at", "action", "metrics"}
+        assert first[0]["metrics"] == {"form_score": 4}
+
+        second = store.summaries(limit=2, before=first[-1]["created_at"])
+        third = store.summaries(limit=2, before=second[-1]["created_at"])
+        assert [r["action"] for r in second + third] == ["a2", "a1", "a0"]
+        store.close()
+
+    def test_summaries_cursor_keeps_timestamp_ties(self, tmp_path):
+        store = HistoryStore(str(tmp_path / "history.db"), max_records=0)
+        same = datetime(2026, 1, 1).isoformat()
+        for i in range(5):
+            store.append({"action": f"a{i}", "created_at": same})
+
+        pages, before = [], None
+        while True:
+            page = store.summaries(limit=2, before=before)
+            if not page:
+                break
+            pages.append([r["action"] for r in page])
+            before = make_cursor(page[-1]["created_at"], page[-1]["id"])
+        assert pages == [["a4", "a3"], ["a2", "a1"], ["a0"]]
+        store.close()
+
+    def test_parse_cursor(self):
+        assert parse_cursor(make_cursor("2026-01-01T00:00:00+00:00", "ab-12")) == ("2026-01-01T00:00:00+00:00", "ab-12")
+        assert parse_cursor("2026-01-01T00:00:00") == ("2026-01-01T00:00:00", None)
+
+    def test_age_retention(self, tmp_path):
+        store = HistoryStore(str(tmp_path / "history.db"), max_records=0, max_age_days=7)
+        old = (datetime.now() - timedelta(days=30)).isoformat()
+        store.append({"action": "dribbling", "created_at": old})
+        store.append({"action": "shooting", "created_at": datetime.now().isoformat()})
+        assert [r["action"] for r in store.recent()] == ["shooting"]
+        store.close()
+
+    def test_imports_legacy_json_once(self, tmp_path):
+        legacy = tmp_path / "history.json"
+        legacy.write_text(json.dumps([{"action": "newest"}, {"action": "older"}, "junk"]))
+        db_path = str(tmp_path / "history.db")
+
+        store = HistoryStore(db_path, legacy_json_path=str(legacy))
+        assert [r["action"] for r in store.recent()] == ["newest", "older"]
+        store.close()
+        assert not legacy.exists()
+        assert os.path.exists(str(legacy) + ".migrated")
+
+        # Reopening doesn't import again
+        store = HistoryStore(db_path, legacy_json_path=str(legacy))
+        assert store.count() == 2
+        store.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,103 @@
+"""
+Unit tests for the priority inference scheduler
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from app.services.inference_scheduler import InferenceScheduler, InlineInference, PRIORITY_BATCH, PRIORITY_LIVE
+
+
+class TestInferenceScheduler:
+    """Test priority, per-session fairness and queue-wait stats"""
+
+    @pytest.fixture
+    def scheduler(self):
+        scheduler = InferenceScheduler(max_live_burst=3)
+        yield scheduler
+        scheduler.shutdown()
+
+    def _block(self, scheduler):
+        """Occupy the inference thread until the returned event is set"""
+        release = threading.Event()
+        started = threading.Event()
+
+        def hold():
+            started.set()
+            release.wait(2.0)
+
+        future = scheduler.submit(hold, priority=PRIORITY_BATCH, session_id="blocker")
+        started.wait(1.0)
+        return release, future
+
+    def test_live_first_with_round_robin_sessions(self, scheduler):
+        release, blocker = self._block(scheduler)
+        order = []
+        futures = []
+        for i in range(3):
+            futures.append(scheduler.submit(order.append, f"upload-{i}", priority=PRIORITY_BATCH, session_id="upload"))
+        for i in range(2):
+            futures.append(scheduler.submit(order.append, f"a{i}", priority=PRIORITY_LIVE, session_id="cam-a"))
+        futures.append(scheduler.submit(order.append, "b0", priority=PRIORITY_LIVE, session_id="cam-b"))
+        assert scheduler.queued(PRIORITY_LIVE) == 3
+
+        release.set()
+        for future in [blocker] + futures:
+            future.result(2.0)
+
+        # Live before batch; cam-b isn't stuck behind both of cam-a's windows
+        assert order == ["a0", "b0", "a1", "upload-0", "upload-1", "upload-2"]
+
+    def test_batch_not_starved(self, scheduler):
+        release, blocker = self._block(scheduler)
+        order = []
+        futures = [scheduler.submit(order.append, "upload", priority=PRIORITY_BATCH, session_id="upload")]
+        futures += [scheduler.submit(order.append, f"live-{i}", priority=PRIORITY_LIVE, session_id="cam")
+                    for i in range(5)]
+        release.set()
+        for future in [blocker] + futures:
+            future.result(2.0)
+        assert order.index("upload") == 3
+
+    def test_async_run_errors_and_stats(self, scheduler):
+        def fail():
+            raise ValueError("model error")
+
+        async def run():
+            assert await scheduler.run(lambda x, y=0: x + y, 1, y=2, priority=PRIORITY_LIVE, session_id="s") == 3
+            with pytest.raises(ValueError):
+                await scheduler.run(fail, priority=PRIORITY_BATCH)
+
+        asyncio.run(run())
+        stats = scheduler.stats()
+        assert stats[PRIORITY_LIVE]["completed"] == 1
+        assert stats[PRIORITY_BATCH]["completed"] == 1
+        assert stats[PRIORITY_LIVE]["queued"] == 0
+        assert stats[PRIORITY_LIVE]["avg_wait_ms"] >= 0
+
+    def test_unknown_priority(self, scheduler):
+        with pytest.raises(ValueError):
+            scheduler.submit(print, priority="urgent")
+
+
+class TestInlineInference:
+    """Test the shard workers' in-place runner"""
+
+    def test_runs_on_the_calling_thread(self):
+        inference = InlineInference()
+
+        async def run():
+            assert await inference.run(lambda x, y=0: x + y, 1, y=2, priority=PRIORITY_LIVE, session_id="s") == 3
+            assert await inference.run(threading.get_ident) == threading.get_ident()
+            with pytest.raises(ValueError):
+                await inference.run(print, priority="urgent")
+
+        asyncio.run(run())
+        assert inference.stats() == {}
+        inference.shutdown()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
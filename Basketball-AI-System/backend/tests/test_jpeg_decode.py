@@ -0,0 +1,57 @@
+"""
+Unit tests for reduced-resolution JPEG decoding
+"""
+
+import cv2
+import numpy as np
+import pytest
+
+from app.services.jpeg_decode import choose_reduction, decode_jpeg, jpeg_dimensions
+
+
+def _jpeg(width: int, height: int, progressive: bool = False) -> bytes:
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+    cv2.rectangle(frame, (width // 4, height // 4), (width // 2, height // 2), (0, 200, 0), -1)
+    params = [cv2.IMWRITE_JPEG_QUALITY, 80]
+    if progressive:
+        params += [cv2.IMWRITE_JPEG_PROGRESSIVE, 1]
+    _, buffer = cv2.imencode(".jpg", frame, params)
+    return buffer.tobytes()
+
+
+class TestJpegDecode:
+    """Test header parsing, scale selection and reduced decodes"""
+
+    def test_dimensions_from_header(self):
+        assert jpeg_dimensions(_jpeg(1920, 1080)) == (1920, 1080)
+        assert jpeg_dimensions(_jpeg(640, 480, progressive=True)) == (640, 480)
+        _, png = cv2.imencode(".png", np.zeros((8, 8, 3), np.uint8))
+        assert jpeg_dimensions(png.tobytes()) is None
+        assert jpeg_dimensions(b"\xff\xd8") is None
+
+    def test_choose_reduction(self):
+        assert choose_reduction(1920, 1080, 640) == 2
+        assert choose_reduction(3840, 2160, 640) == 4
+        assert choose_reduction(640, 480, 640) == 1
+        assert choose_reduction(1920, 1080, 0) == 1
+        assert choose_reduction(1080, 1920, 240) == 8  # Portrait: long side is the height
+
+    def test_reduced_decode_matches_resized_full_decode(self):
+        data = _jpeg(1920, 1080)
+        reduced, factor = decode_jpeg(data, min_long_side=640)
+        full, full_factor = decode_jpeg(data)
+
+        assert (factor, full_factor) == (2, 1)
+        assert reduced.shape == (540, 960, 3)
+        assert full.shape == (1080, 1920, 3)
+        resized = cv2.resize(full, (960, 540), interpolation=cv2.INTER_AREA)
+        assert np.abs(reduced.astype(int) - resized.astype(int)).mean() < 3
+
+    def test_non_jpeg_is_decoded_in_full(self):
+        _, png = cv2.imencode(".png", np.zeros((720, 1280, 3), np.uint8))
+        frame, factor = decode_jpeg(png.tobytes(), min_long_side=320)
+        assert factor == 1 and frame.shape == (720, 1280, 3)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,52 @@
+"""
+Unit tests for the live per-frame result cache
+"""
+
+import pytest
+
+from app.services.live_frame_cache import LiveFrameCache
+
+
+class TestLiveFrameCache:
+    """Test that overlapping windows reuse per-frame results"""
+
+    @pytest.fixture
+    def cache(self):
+        return LiveFrameCache(max_entries=32)
+
+    def test_each_frame_computed_once_across_windows(self, cache):
+        calls = []
+
+        def analyze(seq):
+            calls.append(seq)
+            return {"seq": seq}
+
+        window, stride = 16, 8
+        for start in range(0, 64 - window + 1, stride):
+            ids = list(range(start, start + window))
+            cache.prune(ids[0])
+            results = [cache.get_or_compute(i, lambda i=i: analyze(i)) for i in ids]
+            assert [r["seq"] for r in results] == ids
+
+        assert sorted(calls) == list(range(64))
+        assert cache.hit_rate == pytest.approx(48 / 112)
+
+    def test_missing_detection_is_cached(self, cache):
+        calls = []
+        cache.get_or_compute(0, lambda: calls.append(0))
+        assert cache.get_or_compute(0, lambda: calls.append(0)) is None
+        assert calls == [0]
+
+    def test_prune_and_bounded_size(self, cache):
+        for i in range(40):
+            cache.get_or_compute(i, lambda: i)
+        assert len(cache) == 32
+        assert 7 not in cache
+
+        cache.prune(30)
+        assert len(cache) == 10
+        assert 29 not in cache and 30 in cache
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,80 @@
+"""
+Unit tests for latest-wins live frame scheduling
+"""
+
+import time
+
+import pytest
+
+from app.services.live_scheduler import LiveFrame, LiveFrameScheduler
+
+
+def _push(scheduler, start, count, received_at=None):
+    for i in range(start, start + count):
+        scheduler.push(LiveFrame(i, b"jpeg", received_at if received_at is not None else time.monotonic()))
+
+
+class TestLiveFrameScheduler:
+    """Test window scheduling, frame dropping and backpressure hints"""
+
+    @pytest.fixture
+    def scheduler(self):
+        return LiveFrameScheduler(window_size=16, stride=8, target_lag_ms=500, hint_interval_s=0)
+
+    def test_windows_slide_by_stride(self, scheduler):
+        _push(scheduler, 0, 15)
+        assert not scheduler.ready
+        _push(scheduler, 15, 1)
+        assert scheduler.ready
+        assert [f.frame_id for f in scheduler.take_window()] == list(range(16))
+
+        _push(scheduler, 16, 7)
+        assert not scheduler.ready
+        _push(scheduler, 23, 1)
+        assert [f.frame_id for f in scheduler.take_window()] == list(range(8, 24))
+        assert scheduler.dropped == 0
+
+    def test_latest_frames_win_under_load(self, scheduler):
+        _push(scheduler, 0, 16)
+        scheduler.take_window()
+
+        # Analysis fell behind: 40 frames arrived before the next window
+        _push(scheduler, 16, 40)
+        window = scheduler.take_window()
+        assert [f.frame_id for f in window] == list(range(40, 56))
+        assert scheduler.dropped == 24
+        assert scheduler.received == 56
+
+    def test_backpressure_hint_and_recovery(self, scheduler):
+        _push(scheduler, 0, 16, received_at=time.monotonic() - 2.0)
+        window = scheduler.take_window()
+        timing = scheduler.record_result(window, processing_ms=1600)
+        assert timing["frame_id"] == 15
+        assert timing["server_lag_ms"] >= 2000
+
+        hint = scheduler.backpressure_hint()
+        assert hint["status"] == "reduce"
+        assert hint["suggested_interval_ms"] == 200
+        assert "suggested_max_width" not in hint
+
+        # Session recovers
+        for start in (16, 24, 32, 40, 48, 56, 64, 72, 80, 88):
+            _push(scheduler, start, 8)
+            scheduler.record_result(scheduler.take_window(), processing_ms=50)
+        recovered = None
+        while True:
+            hint = scheduler.backpressure_hint()
+            if hint is None:
+                break
+            recovered = hint
+        assert recovered["status"] == "ok"
+        assert scheduler.backpressure_hint() is None
+
+    def test_no_hint_when_keeping_up(self, scheduler):
+        _push(scheduler, 0, 16)
+        scheduler.record_result(scheduler.take_window(), processing_ms=20)
+        assert scheduler.backpressure_hint() is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,120 @@
+"""
+Unit tests for overlay track recording (analysis-only mode)
+"""
+
+import pytest
+import numpy as np
+
+from app.services.overlay_track import (
+    OverlayTrackWriter, OverlayTrackReader, is_valid_video_id, track_path, merge_overlay_tracks
+)
+from app.core.schemas import FormQualityAssessment, FormQualityIssue
+
+
+class TestOverlayTrack:
+    """Test writing and reading back overlay tracks"""
+
+    @pytest.fixture
+    def path(self, tmp_path):
+        return str(tmp_path / "tracks" / "vid.jsonl.gz")
+
+    @pytest.fixture
+    def form_quality(self):
+        return FormQualityAssessment(
+            overall_score=0.55,
+            quality_rating="needs_improvement",
+            issues=[FormQualityIssue(
+                issue_type="elbow_angle", severity="moderate",
+                description="Elbow flared", recommendation="Wall drill"
+            )],
+            strengths=[]
+        )
+
+    def test_round_trip(self, path, form_quality):
+        court_info = {"lines": {"horizontal": [[10, 300, 630, 305]], "vertical": [], "diagonal": []}}
+        hoop_info = {"center": (320.0, 60.0), "bbox": (300, 45, 340, 75)}
+        landmarks = np.random.default_rng(0).random((33, 4), dtype=np.float32)
+
+        with OverlayTrackWriter(path, "vid", 30.0, 640, 360, source="vid.mp4") as writer:
+            for i in range(3):
+                writer.set_court(i, court_info)
+                writer.set_hoop(i, hoop_info)
+                writer.set_action(i, "jump_shot" if i else None, 0.9 if i else 0.0, form_quality if i else None)
+                writer.add_frame(
+                    i,
+                    [{"bbox": [1, 2, 3, 4], "confidence": 0.95, "class": "player"}],
+                    landmarks if i != 1 else None,
+                    [{"bbox": [5, 6, 7, 8], "confidence": 0.5, "class": "basketball",
+                      "predicted": True, "shot_zone": "paint"}]
+                )
+
+        reader = OverlayTrackReader(path)
+        assert reader.header["source"] == "vid.mp4"
+        assert reader.header["fps"] == 30.0
+
+        frames = list(reader)
+        assert [f.index for f in frames] == [0, 1, 2]
+        assert [f.timestamp for f in frames] == [0.0, 0.033, 0.067]
+        assert frames[0].action is None and frames[0].form_quality is None
+        assert frames[2].action == "jump_shot"
+        assert frames[2].form_quality.quality_rating == "needs_improvement"
+        assert frames[2].form_quality.issues[0].issue_type == "elbow_angle"
+        assert frames[0].court_info is frames[2].court_info
+        assert frames[0].hoop_info["center"] == [320.0, 60.0]
+        assert frames[0].detections[0]["bbox"] == [1, 2, 3, 4]
+        assert frames[0].basketball_detections[0]["predicted"] is True
+        assert frames[1].landmarks is None
+        np.testing.assert_allclose(frames[2].landmarks, landmarks, atol=1e-4)
+
+    def test_state_written_only_on_change(self, path):
+        hoop_info = {"center": (1.0, 2.0), "bbox": (0, 0, 2, 4)}
+        with OverlayTrackWriter(path, "vid", 30.0, 64, 36) as writer:
+            for i in range(5):
+                writer.set_hoop(i, hoop_info)
+                writer.set_action(i, "dribbling", 0.8, None)
+                writer.add_frame(i, [], None)
+
+        import gzip
+        with gzip.open(path, "rt") as f:
+            kinds = [line.split('"k":"')[1].split('"')[0] for line in f]
+        assert kinds.count("hoop") == 1
+        assert kinds.count("action") == 1
+        assert kinds.count("frame") == 5
+
+    def test_abort_discards_partial_track(self, path):
+        with pytest.raises(RuntimeError):
+            with OverlayTrackWriter(path, "vid", 30.0, 64, 36) as writer:
+                writer.add_frame(0, [], None)
+                raise RuntimeError("boom")
+        with pytest.raises(FileNotFoundError):
+            OverlayTrackReader(path)
+
+    def test_merge_shard_tracks(self, tmp_path):
+        hoop_info = {"center": (1.0, 2.0), "bbox": (0, 0, 2, 4)}
+        paths = [str(tmp_path / f"part{i}.jsonl.gz") for i in range(2)]
+        for shard, path in enumerate(paths):
+            with OverlayTrackWriter(path, "vid", 30.0, 64, 36, source="vid.mp4") as writer:
+                for i in range(shard * 3, shard * 3 + 3):
+                    writer.set_hoop(i, hoop_info)
+                    writer.set_action(i, f"action{shard}", 0.8, None)
+                    writer.add_frame(i, [], None)
+
+        merged = str(tmp_path / "merged.jsonl.gz")
+        merge_overlay_tracks(paths, merged)
+        reader = OverlayTrackReader(merged)
+        assert reader.header["source"] == "vid.mp4"
+        frames = list(reader)
+        assert [f.index for f in frames] == list(range(6))
+        assert [f.action for f in frames] == ["action0"] * 3 + ["action1"] * 3
+        assert frames[5].hoop_info["center"] == [1.0, 2.0]
+
+    def test_video_id_validation(self):
+        assert is_valid_video_id("3f2a-uuid_1")
+        assert not is_valid_video_id("../etc/passwd")
+        assert not is_valid_video_id("")
+        with pytest.raises(ValueError):
+            track_path("a/b")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
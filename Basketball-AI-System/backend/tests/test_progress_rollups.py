@@ -0,0 +1,72 @@
+"""
+Unit tests for incremental progress rollups
+"""
+
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.services.progress_rollups import ProgressRollups
+
+
+class TestProgressRollups:
+    """Test bucketed means, percentiles, trend slopes and bounded summaries"""
+
+    @pytest.fixture
+    def rollups(self, tmp_path):
+        rollups = ProgressRollups(str(tmp_path / "history.db"))
+        yield rollups
+        rollups.close()
+
+    def test_all_time_stats_match_numpy(self, rollups):
+        rng = np.random.default_rng(0)
+        start = datetime(2026, 3, 2, 12)
+        scores = rng.uniform(0.3, 0.9, 200)
+        for i, score in enumerate(scores):
+            rollups.record("p1", "layup", {"form_score": float(score), "jump_height": 0.5},
+                           (start + timedelta(hours=6 * i)).isoformat())
+
+        stats = rollups.summary("p1", "layup", today=date(2026, 4, 20))["metrics"]["form_score"]
+        assert stats["count"] == 200
+        assert stats["mean"] == pytest.approx(scores.mean(), abs=1e-4)
+        assert stats["std"] == pytest.approx(scores.std(), abs=1e-3)
+        for p in (25, 50, 75, 90):
+            assert stats[f"p{p}"] == pytest.approx(np.percentile(scores, p), abs=0.02)
+
+    def test_trend_and_buckets(self, rollups):
+        # One session a day, form improving 0.01 per day
+        start = datetime(2026, 3, 2, 18)  # A Monday
+        for day in range(14):
+            rollups.record("p1", "free_throw", {"form_score": 0.5 + 0.01 * day},
+                           (start + timedelta(days=day)).isoformat())
+        rollups.record("p1", "dribbling", {"form_score": 0.4}, start.isoformat())
+        rollups.record("p2", "free_throw", {"form_score": 0.9}, start.isoformat())
+
+        summary = rollups.summary("p1", "free_throw", days=7, weeks=12, today=date(2026, 3, 15))
+        assert summary["metrics"]["form_score"]["trend_per_week"] == pytest.approx(0.07, abs=1e-6)
+        assert [b["bucket"] for b in summary["daily"]] == [f"2026-03-{d:02d}" for d in range(9, 16)]
+        assert [b["bucket"] for b in summary["weekly"]] == ["2026-03-02", "2026-03-09"]
+        assert summary["weekly"][0]["count"] == 7
+        assert summary["weekly"][0]["metrics"]["form_score"]["mean"] == pytest.approx(0.53)
+
+        combined = rollups.summary("p1", today=date(2026, 3, 15))
+        assert combined["action"] == "all"
+        assert combined["metrics"]["form_score"]["count"] == 15
+        assert rollups.summary("p2", today=date(2026, 3, 15))["metrics"]["form_score"]["count"] == 1
+
+    def test_skips_missing_metrics_and_rebuilds(self, rollups):
+        rollups.record(None, "passing", None)
+        rollups.record(None, "passing", {"form_score": float("nan"), "elbow_angle": 90})
+        assert rollups.is_empty()
+
+        folded = rollups.rebuild([{"action": "passing", "metrics": {"pose_stability": 0.8},
+                                   "created_at": "2026-03-02T10:00:00+00:00"}])
+        assert folded == 1
+        summary = rollups.summary(today=date(2026, 3, 3))
+        assert summary["player_id"] == "default"
+        assert summary["metrics"]["pose_stability"]["p50"] == pytest.approx(0.8)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
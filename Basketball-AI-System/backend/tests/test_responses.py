@@ -0,0 +1,110 @@
+"""
+Tests for analysis response views, field selection and encoding
+"""
+
+import gzip
+import json
+
+import pytest
+from starlette.requests import Request
+
+from app.core.config import settings
+from app.core.responses import analysis_payload, dumps, json_response, parse_view
+from app.core.schemas import (
+    ActionClassification, ActionProbabilities, FormQualityAssessment, FormQualityIssue,
+    IndividualActionAnalysis, PerformanceMetrics, TimelineSegment, VideoAnalysisResult,
+)
+
+
+def _request(accept_encoding: str = "") -> Request:
+    headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers, "query_string": b""})
+
+
+@pytest.fixture
+def result():
+    probabilities = ActionProbabilities(jump_shot=0.8, free_throw=0.1, layup=0.05, idle=0.05)
+    action = ActionClassification(label="jump_shot", confidence=0.8, probabilities=probabilities)
+    metrics = PerformanceMetrics(jump_height=0.4, movement_speed=1.2, form_score=0.7, reaction_time=0.3,
+                                 pose_stability=0.8, energy_efficiency=0.6)
+    issue = FormQualityIssue(issue_type="elbow_angle", severity="minor", description="Elbow flares out",
+                             recommendation="Wall shooting drill")
+    form = FormQualityAssessment(overall_score=0.7, quality_rating="good", issues=[issue] * 3)
+    segments = [
+        TimelineSegment(start_time=i, end_time=i + 1, action=action, metrics=metrics, form_quality=form)
+        for i in range(200)
+    ]
+    analysis = IndividualActionAnalysis(
+        action_type="jump_shot", action_label="Jump Shot", confidence=0.8, occurrence_count=200,
+        total_duration=200.0, metrics=metrics, form_quality=form, skill_level="intermediate",
+        is_valid_skill=True, segments=segments, segment_indices=list(range(200)),
+    )
+    return VideoAnalysisResult(video_id="abc", duration=200.0, actions=[analysis], timeline=segments,
+                               keypoints=[[0.5] * 132] * 50, action=action, metrics=metrics)
+
+
+class TestViews:
+    """Views trim the payload without dropping what clients rely on"""
+
+    def test_full_keeps_everything(self, result):
+        payload = analysis_payload(result, "full")
+        assert len(payload["actions"][0]["segments"]) == 200
+        assert payload["annotated_video_url"] is None
+
+    def test_compact_drops_embedded_segments_and_nulls(self, result):
+        payload = analysis_payload(result, "compact")
+        assert "segments" not in payload["actions"][0]
+        assert payload["actions"][0]["segment_indices"] == list(range(200))
+        assert len(payload["timeline"]) == 200
+        assert len(payload["timeline"][0]["form_quality"]["issues"]) == 3
+        assert "annotated_video_url" not in payload
+        # Legacy mirror fields stay for older clients
+        assert payload["action"]["label"] == "jump_shot"
+        assert len(dumps(payload)) * 2 < len(dumps(analysis_payload(result, "full")))
+
+    def test_summary_drops_timeline_and_keypoints(self, result):
+        payload = analysis_payload(result, "summary")
+        assert "timeline" not in payload and "keypoints" not in payload
+        assert payload["actions"][0]["action_label"] == "Jump Shot"
+
+    def test_compact_drops_long_timelines(self, result, monkeypatch):
+        monkeypatch.setattr(settings, "TIMELINE_MAX_SEGMENTS", 100)
+        payload = analysis_payload(result, "compact")
+        assert "timeline" not in payload
+        assert "segment_indices" not in payload["actions"][0]
+        assert len(analysis_payload(result, "full")["timeline"]) == 200
+
+    def test_field_selection(self, result):
+        payload = analysis_payload(result, "compact", parse_view("compact", "duration, actions"))
+        assert set(payload) == {"video_id", "duration", "actions"}
+
+    def test_invalid_options(self):
+        with pytest.raises(ValueError):
+            parse_view("tiny")
+        with pytest.raises(ValueError):
+            parse_view("compact", "duration,nope")
+        assert parse_view("full", "") is None
+
+
+class TestEncoding:
+    """Encoded bodies match the standard library and compress when accepted"""
+
+    def test_dumps_round_trip(self, result):
+        payload = analysis_payload(result, "full")
+        assert json.loads(dumps(payload)) == json.loads(result.model_dump_json())
+
+    def test_gzip_when_accepted(self, result):
+        payload = analysis_payload(result, "compact")
+        response = json_response(payload, _request("gzip, deflate"))
+        assert response.headers["content-encoding"] == "gzip"
+        assert json.loads(gzip.decompress(response.body)) == json.loads(dumps(payload))
+
+        plain = json_response(payload, _request())
+        assert "content-encoding" not in plain.headers
+
+        small = json_response({"ok": True}, _request("gzip"))
+        assert "content-encoding" not in small.headers
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,113 @@
+"""
+Unit tests for upload-dir quota and eviction
+"""
+
+import os
+import time
+
+import pytest
+
+from app.services.storage_manager import InsufficientStorageError, StorageManager
+
+
+def _write(root, name, size, age=0.0):
+    path = os.path.join(root, name)
+    with open(path, "wb") as f:
+        f.write(b"\0" * size)
+    stamp = time.time() - age
+    os.utime(path, (stamp, stamp))
+    return path
+
+
+class TestStorageManager:
+    """Test TTL, LRU order, offload preference, protection, reservations and usage"""
+
+    @pytest.fixture
+    def root(self, tmp_path):
+        return str(tmp_path / "uploads")
+
+    def test_quota_evicts_offloaded_then_lru(self, root):
+        offloaded = {"processed_b.mp4"}
+        manager = StorageManager(root, quota_bytes=1000, grace_seconds=60,
+                                 is_offloaded=lambda name: name in offloaded)
+        _write(root, "a.mp4", 300, age=500)
+        _write(root, "processed_a.mp4", 300, age=400)
+        _write(root, "processed_b.mp4", 300, age=100)
+        _write(root, "fresh.mp4", 50)  # Inside the grace period
+
+        manager.ensure_space(300)
+        # Offloaded copy goes first even though it's the most recently used
+        assert sorted(os.listdir(root)) == ["a.mp4", "fresh.mp4", "processed_a.mp4"]
+
+        manager.ensure_space(500)
+        # Then annotated outputs before inputs
+        assert sorted(os.listdir(root)) == ["a.mp4", "fresh.mp4"]
+        assert manager.usage()["evicted_files"] == 2
+
+    def test_ttl_touch_and_busy(self, root):
+        busy = set()
+        manager = StorageManager(root, ttl_seconds=1000, grace_seconds=0,
+                                 is_busy=lambda path: os.path.basename(path) in busy)
+        _write(root, "old.mp4", 10, age=5000)
+        _write(root, "served.mp4", 10, age=5000)
+        _write(root, "processed_encoding.mp4", 10, age=5000)
+        busy.add("processed_encoding.mp4")
+
+        manager.usage()  # Index the files (last access = mtime)
+        manager.touch("served.mp4")
+
+        assert manager.sweep() == 1
+        assert sorted(os.listdir(root)) == ["processed_encoding.mp4", "served.mp4"]
+
+    def test_insufficient_space_and_usage(self, root):
+        manager = StorageManager(root, quota_bytes=1000, grace_seconds=600)
+        path = _write(root, "in_progress.mp4", 800)
+        manager.register(path, owner="video-1")
+        with pytest.raises(InsufficientStorageError):
+            manager.ensure_space(500)
+        assert os.path.exists(path)
+
+        usage = manager.usage()
+        assert usage["used_bytes"] == 800
+        assert usage["by_kind"] == {"upload": {"files": 1, "bytes": 800}}
+        assert usage["disk_free_bytes"] > 0
+
+    def test_pinned_files_survive_eviction(self, root):
+        manager = StorageManager(root, quota_bytes=1000, ttl_seconds=100, grace_seconds=0)
+        upload = _write(root, "upload.mp4", 400, age=5000)  # Past the TTL and the grace period
+        _write(root, "old.mp4", 400, age=5000)
+
+        with manager.reserve(0, pin=[upload]):
+            manager.ensure_space(500)
+            assert sorted(os.listdir(root)) == ["upload.mp4"]
+            with pytest.raises(InsufficientStorageError):
+                manager.ensure_space(700)
+            assert os.path.exists(upload)
+
+        assert manager.sweep() == 1
+        assert os.listdir(root) == []
+
+    def test_reservations_hold_space_until_released(self, root):
+        manager = StorageManager(root, quota_bytes=1000, grace_seconds=600)
+        first = manager.reserve(600)
+        # A second concurrent request can't count on the same free space
+        with pytest.raises(InsufficientStorageError):
+            manager.reserve(600)
+        assert manager.usage()["reserved_bytes"] == 600
+
+        # The request's own files count towards its reservation, not on top of it
+        first.pin(os.path.join(root, "upload.mp4"))
+        _write(root, "upload.mp4", 250)
+        usage = manager.usage()
+        assert usage["used_bytes"] == 250 and usage["reserved_bytes"] == 350
+        with pytest.raises(InsufficientStorageError):
+            manager.reserve(600)
+
+        first.release()
+        first.release()
+        assert manager.usage()["reserved_bytes"] == 0
+        manager.reserve(600).release()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
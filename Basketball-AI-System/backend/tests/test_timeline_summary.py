@@ -0,0 +1,127 @@
+"""
+Tests for per-window timeline storage and downsampled summaries
+"""
+
+import json
+import time
+
+import numpy as np
+import pytest
+
+from app.core.schemas import (
+    ActionClassification, ActionProbabilities, PerformanceMetrics, TimelineSegment, TimelineSummary,
+)
+from app.services import timeline_summary
+from app.services.storage_manager import StorageManager
+from app.services.timeline_summary import lttb, minmax, summarize_timeline, timeline_columns
+
+PROBABILITIES = ActionProbabilities(jump_shot=0.5, free_throw=0.2, layup=0.2, idle=0.1)
+
+
+def _segment(start: float, label: str, form_score: float) -> TimelineSegment:
+    metrics = PerformanceMetrics(jump_height=0.3, movement_speed=1.0, form_score=form_score, reaction_time=0.2,
+                                 pose_stability=0.8, energy_efficiency=0.7)
+    return TimelineSegment(start_time=start, end_time=start + 0.53, metrics=metrics,
+                           action=ActionClassification(label=label, confidence=0.8, probabilities=PROBABILITIES))
+
+
+@pytest.fixture
+def hour_of_windows():
+    """An hour at 30fps with an 8-frame stride: mostly idle, a shot every ~20s"""
+    step = 8 / 30
+    segments = []
+    for i in range(int(3600 / step)):
+        label = "jump_shot" if i % 75 in (0, 1) else "idle"
+        segments.append(_segment(i * step, label, 0.5 + 0.4 * np.sin(i / 50)))
+    return timeline_columns(segments)
+
+
+class TestDownsampling:
+    """LTTB and min/max keep the endpoints and the shape of the line"""
+
+    def test_lttb_keeps_endpoints_and_spike(self):
+        x = np.arange(1000, dtype=float)
+        y = np.zeros(1000)
+        y[437] = 5.0
+        keep = lttb(x, y, 50)
+        assert len(keep) == 50
+        assert keep[0] == 0 and keep[-1] == 999
+        assert 437 in keep
+        assert np.all(np.diff(keep) > 0)
+
+    def test_minmax_keeps_extremes(self):
+        y = np.sin(np.linspace(0, 20, 5000))
+        y[1234] = -3.0
+        keep = minmax(y, 100)
+        assert len(keep) <= 100
+        assert 1234 in keep and int(np.argmax(y)) in keep
+
+    def test_small_inputs_are_untouched(self):
+        assert list(lttb(np.arange(5.0), np.arange(5.0), 10)) == [0, 1, 2, 3, 4]
+        assert list(minmax(np.arange(5.0), 10)) == [0, 1, 2, 3, 4]
+
+
+class TestSummaries:
+    """Summaries stay within the point budget however long the video is"""
+
+    def test_budget_bounds_an_hour(self, hour_of_windows):
+        summary = summarize_timeline(hour_of_windows, points=300)
+        assert summary["windows"] == len(hour_of_windows["start"])
+        assert summary["resolution"] == "lttb"
+        assert len(summary["runs"]) <= 300
+        assert all(len(line["t"]) == 300 for line in summary["series"].values())
+        # Every bin is mostly idle, but the shots still show up in the mix
+        assert all("jump_shot" in run["mix"] for run in summary["runs"])
+        assert len(json.dumps(summary)) < 150_000
+        TimelineSummary(**summary)
+
+    def test_full_resolution_and_zoom(self, hour_of_windows):
+        full = summarize_timeline(hour_of_windows, points=0, series=["form_score"])
+        assert full["resolution"] == "full"
+        assert len(full["series"]["form_score"]["t"]) == full["windows"]
+        assert full["runs"][0] == {"start_time": 0.0, "end_time": 0.797, "label": "jump_shot", "confidence": 0.8}
+
+        zoomed = summarize_timeline(hour_of_windows, points=300, method="minmax", start=60, end=90)
+        assert zoomed["resolution"] == "full"
+        assert zoomed["windows"] < 300
+        assert all("mix" not in run for run in zoomed["runs"])
+
+    def test_invalid_options(self, hour_of_windows):
+        with pytest.raises(ValueError):
+            summarize_timeline(hour_of_windows, method="average")
+        with pytest.raises(ValueError):
+            summarize_timeline(hour_of_windows, series=["shoe_size"])
+
+    @pytest.fixture
+    def store(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(timeline_summary, "TIMELINES_DIR", str(tmp_path))
+        storage = StorageManager(str(tmp_path), quota_bytes=4096, grace_seconds=0)
+        monkeypatch.setattr(timeline_summary, "_timeline_storage", storage)
+        return storage
+
+    def test_store_round_trip(self, store):
+        segments = [_segment(i * 0.27, "layup", 0.6) for i in range(20)]
+        timeline_summary.save_timeline("vid-1", segments)
+        columns = timeline_summary.load_timeline("vid-1")
+        assert list(columns["labels"]) == ["layup"]
+        assert np.allclose(columns["form_score"], 0.6)
+        assert timeline_summary.load_timeline("missing") is None
+        assert store.usage()["files"] == 1
+
+    def test_stored_timelines_are_evicted(self, store, tmp_path):
+        # ~1.7KB each: two fit in the 4KB quota, the least recently read goes
+        rng = np.random.default_rng(0)
+        for video_id in ("vid-1", "vid-2", "vid-3"):
+            timeline_summary.save_columns(video_id, {"start": rng.random(80), "end": rng.random(80)})
+            if video_id == "vid-2":
+                time.sleep(0.01)
+                assert timeline_summary.load_timeline("vid-1") is not None
+        assert store._index["vid-3.npz"].owner == "vid-3"
+        assert timeline_summary.load_timeline("vid-2") is None
+        assert timeline_summary.load_timeline("vid-1") is not None
+        assert timeline_summary.load_timeline("vid-3") is not None
+        assert store.usage()["used_bytes"] <= 4096
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,197 @@
+"""
+Unit tests for the background upload queue
+"""
+
+import os
+import threading
+
+import pytest
+
+from app.services.upload_queue import StorageBackend, UploadQueue
+
+
+class FakeS3(StorageBackend):
+    """In-memory stand-in for an S3-compatible server (MinIO) with multipart uploads"""
+
+    supports_multipart = True
+
+    def __init__(self, buckets=("videos",)):
+        self.buckets = set(buckets)
+        self.objects = {}
+        self.uploads = {}
+        self.bucket_checks = 0
+        self.part_calls = []
+        self.fail_parts = set()  # Part numbers that fail once
+        self.fail_puts = 0  # put_file calls that fail before one succeeds
+        self.lock = threading.Lock()
+
+    def bucket_exists(self, bucket):
+        self.bucket_checks += 1
+        return bucket in self.buckets
+
+    def put_file(self, bucket, key, path, content_type):
+        if self.fail_puts:
+            self.fail_puts -= 1
+            raise ConnectionError("connection reset")
+        with open(path, "rb") as f:
+            self.objects[(bucket, key)] = (f.read(), content_type)
+
+    def public_url(self, bucket, key):
+        return f"http://minio.local/{bucket}/{key}"
+
+    def create_multipart(self, bucket, key, content_type):
+        upload_id = f"upload-{len(self.uploads)}"
+        self.uploads[upload_id] = {"content_type": content_type, "parts": {}}
+        return upload_id
+
+    def upload_part(self, bucket, key, upload_id, part_number, data):
+        with self.lock:
+            self.part_calls.append(part_number)
+            if part_number in self.fail_parts:
+                self.fail_parts.discard(part_number)
+                raise ConnectionError(f"part {part_number} timed out")
+            self.uploads[upload_id]["parts"][part_number] = data
+        return f"etag-{part_number}"
+
+    def complete_multipart(self, bucket, key, upload_id, parts):
+        stored = self.uploads.pop(upload_id)
+        assert [number for number, _ in parts] == sorted(stored["parts"])
+        self.objects[(bucket, key)] = (b"".join(stored["parts"][n] for n, _ in parts), stored["content_type"])
+
+    def abort_multipart(self, bucket, key, upload_id):
+        self.uploads.pop(upload_id, None)
+
+
+class TestUploadQueue:
+    """Test multipart resume, retries, bucket caching and persistence"""
+
+    @pytest.fixture
+    def video(self, tmp_path):
+        path = tmp_path / "processed_abc.mp4"
+        path.write_bytes(os.urandom(10 * 1024 + 123))
+        return path
+
+    def _queue(self, backend, tmp_path, **kwargs):
+        kwargs.setdefault("part_size", 1024)
+        kwargs.setdefault("base_delay", 0.01)
+        return UploadQueue(backend, str(tmp_path / "uploads.db"), **kwargs)
+
+    def test_parallel_multipart_resumes_failed_parts(self, tmp_path, video):
+        backend = FakeS3()
+        backend.fail_parts = {3, 7}
+        queue = self._queue(backend, tmp_path)
+        queue.start()
+
+        url = queue.enqueue(str(video), delete_after=True)
+        assert queue.wait_idle(5.0)
+
+        assert url == "http://minio.local/videos/processed_abc.mp4"
+        assert queue.uploaded_url("processed_abc.mp4") == url
+        data, content_type = backend.objects[("videos", "processed_abc.mp4")]
+        assert content_type == "video/mp4"
+        assert len(data) == 10 * 1024 + 123
+        # 11 parts; only the two failed ones were sent again
+        assert sorted(backend.part_calls) == sorted(list(range(1, 12)) + [3, 7])
+        assert queue.job("processed_abc.mp4")["attempts"] == 2  # Both failures in the first attempt
+        assert not video.exists()
+        queue.close()
+
+    def test_retries_then_fails(self, tmp_path, video):
+        backend = FakeS3()
+        backend.supports_multipart = False
+        backend.fail_puts = 10
+        queue = self._queue(backend, tmp_path, max_attempts=3)
+        queue.start()
+        queue.enqueue(str(video), delete_after=True)
+        assert queue.wait_idle(5.0)
+
+        job = queue.job("processed_abc.mp4")
+        assert job["state"] == "failed" and job["attempts"] == 3
+        assert "connection reset" in job["error"]
+        assert video.exists()  # Kept for a manual retry
+        assert queue.stats() == {"failed": 1}
+        queue.close()
+
+    def test_bucket_check_is_cached(self, tmp_path, video):
+        backend = FakeS3()
+        backend.supports_multipart = False
+        queue = self._queue(backend, tmp_path)
+        queue.start()
+        for i in range(3):
+            queue.enqueue(str(video), key=f"clip-{i}.mp4")
+        assert queue.wait_idle(5.0)
+        assert backend.bucket_checks == 1
+        assert len(backend.objects) == 3
+        queue.close()
+
+    def test_pending_jobs_survive_restart(self, tmp_path, video):
+        backend = FakeS3(buckets=())
+        queue = self._queue(backend, tmp_path, base_delay=60.0)
+        queue.start()
+        queue.enqueue(str(video))
+        queue.close()
+        assert backend.objects == {}
+
+        backend.buckets.add("videos")
+        restarted = self._queue(backend, tmp_path)
+        with restarted._lock:
+            restarted._conn.execute("UPDATE upload_jobs SET next_attempt_at = 0")
+        restarted.start()
+        assert restarted.wait_idle(5.0)
+        assert restarted.uploaded_url("processed_abc.mp4")
+        assert ("videos", "processed_abc.mp4") in backend.objects
+        restarted.close()
+
+
+class TestS3StorageBackend:
+    """Run the queue against boto3's real S3 API surface, served in-process by moto"""
+
+    ENDPOINT = "minio.test:9000"
+
+    @pytest.fixture
+    def s3(self, monkeypatch):
+        moto = pytest.importorskip("moto")
+        monkeypatch.setenv("MOTO_S3_CUSTOM_ENDPOINTS", f"http://{self.ENDPOINT}")
+        with moto.mock_aws():
+            from app.services.upload_queue import S3StorageBackend
+
+            backend = S3StorageBackend(self.ENDPOINT, "minio", "minio-secret", secure=False)
+            backend.client.create_bucket(Bucket="videos")
+            yield backend
+
+    def test_bucket_exists(self, s3):
+        assert s3.bucket_exists("videos")
+        assert not s3.bucket_exists("missing")
+
+    def test_multipart_upload(self, s3, tmp_path):
+        data = os.urandom(11 * 1024 * 1024 + 7)  # Two 5 MiB parts (S3's minimum) and a short last one
+        path = tmp_path / "processed_big.mp4"
+        path.write_bytes(data)
+        queue = UploadQueue(s3, str(tmp_path / "uploads.db"), part_size=5 * 1024 * 1024, base_delay=0.01)
+        queue.start()
+        queue.enqueue(str(path))
+        assert queue.wait_idle(30.0)
+
+        assert queue.uploaded_url("processed_big.mp4") == f"http://{self.ENDPOINT}/videos/processed_big.mp4"
+        obj = s3.client.get_object(Bucket="videos", Key="processed_big.mp4")
+        assert obj["Body"].read() == data
+        assert obj["ContentType"] == "video/mp4"
+        assert s3.client.list_multipart_uploads(Bucket="videos").get("Uploads", []) == []
+        queue.close()
+
+    def test_abort_multipart(self, s3):
+        upload_id = s3.create_multipart("videos", "clip.mp4", "video/mp4")
+        s3.upload_part("videos", "clip.mp4", upload_id, 1, b"x" * 1024)
+        s3.abort_multipart("videos", "clip.mp4", upload_id)
+        assert s3.client.list_multipart_uploads(Bucket="videos").get("Uploads", []) == []
+
+    def test_put_file(self, s3, tmp_path):
+        path = tmp_path / "thumb.jpg"
+        path.write_bytes(b"jpeg")
+        s3.put_file("videos", "thumb.jpg", str(path), "image/jpeg")
+        obj = s3.client.get_object(Bucket="videos", Key="thumb.jpg")
+        assert obj["Body"].read() == b"jpeg" and obj["ContentType"] == "image/jpeg"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
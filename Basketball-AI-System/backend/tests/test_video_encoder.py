@@ -0,0 +1,221 @@
+"""
+Unit tests for the streaming video encoder
+"""
+
+import os
+import stat
+import asyncio
+import subprocess
+
+import pytest
+import numpy as np
+import cv2
+
+from app.services.video_encoder import (
+    ENCODING_SUFFIX, EncoderCapabilities, FFmpegPipeEncoder, OpenCVVideoEncoder,
+    build_ffmpeg_command, build_remux_command, is_encoding, is_encoding_file, open_video_encoder,
+    probe_encoder_capabilities
+)
+
+
+def _frames(count, width=64, height=48):
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 255, size=(height, width, 3), dtype=np.uint8) for _ in range(count)]
+
+
+class TestFFmpegCommand:
+    """Test the single-pass ffmpeg invocation"""
+
+    def test_raw_pipe_input_and_browser_output(self):
+        cmd = build_ffmpeg_command("ffmpeg", "libx264", "out.mp4", 30, 640, 360)
+        assert cmd[cmd.index("-i") + 1] == "pipe:0"
+        assert cmd[cmd.index("-pix_fmt") + 1] == "bgr24"
+        assert cmd[cmd.index("-s") + 1] == "640x360"
+        assert cmd[cmd.index("-preset") + 1] == "fast"
+        assert "+faststart" in cmd
+        assert "yuv420p" in cmd
+        assert "-c:a" not in cmd
+        assert cmd[-1] == "out.mp4"
+
+    def test_fragmented_output(self):
+        cmd = build_ffmpeg_command("ffmpeg", "libx264", "out.mp4", 30, 640, 360, fragmented=True)
+        assert cmd[cmd.index("-movflags") + 1] == "+frag_keyframe+empty_moov+default_base_moof"
+        assert cmd[cmd.index("-g") + 1] == "60"
+        assert "+faststart" not in cmd
+
+    def test_remux_to_faststart(self):
+        cmd = build_remux_command("ffmpeg", "out.mp4", "out.mp4.remux")
+        assert cmd[cmd.index("-i") + 1] == "out.mp4"
+        assert cmd[cmd.index("-c") + 1] == "copy"
+        assert cmd[cmd.index("-movflags") + 1] == "+faststart"
+        assert cmd[-1] == "out.mp4.remux"
+
+    def test_audio_copied_from_mp4_source(self):
+        cmd = build_ffmpeg_command("ffmpeg", "libx264", "out.mp4", 30, 640, 360, audio_source="in.mp4")
+        assert cmd.count("-i") == 2
+        assert "1:a:0?" in cmd
+        assert cmd[cmd.index("-c:a") + 1] == "copy"
+
+    def test_audio_transcoded_when_container_incompatible(self):
+        cmd = build_ffmpeg_command("ffmpeg", "libx264", "out.mp4", 30, 640, 360, audio_source="in.webm")
+        assert cmd[cmd.index("-c:a") + 1] == "aac"
+
+
+class TestEncoders:
+    """Test encoder behaviour with a stand-in ffmpeg and the OpenCV fallback"""
+
+    @pytest.fixture
+    def fake_ffmpeg(self, tmp_path):
+        """Script that copies stdin (or a remuxed -i file) to the output path (last argument), logging calls"""
+        script = tmp_path / "ffmpeg"
+        script.write_text(
+            '#!/bin/sh\necho "$@" >> "$0.log"\nsrc=; prev=\n'
+            'for last; do [ "$prev" = "-i" ] && src="$last"; prev="$last"; done\n'
+            'if [ "$src" = "pipe:0" ]; then cat > "$last"; else cp "$src" "$last"; fi\n'
+        )
+        script.chmod(script.stat().st_mode | stat.S_IEXEC)
+        return str(script)
+
+    def test_pipe_encoder_streams_all_frames(self, tmp_path, fake_ffmpeg):
+        output_path = str(tmp_path / "out.mp4")
+        capabilities = EncoderCapabilities(ffmpeg_path=fake_ffmpeg, h264_encoder="libx264")
+        frames = _frames(10)
+
+        encoder = open_video_encoder(output_path, 30, 64, 48, capabilities=capabilities)
+        assert isinstance(encoder, FFmpegPipeEncoder)
+        for frame in frames:
+            encoder.write(frame)
+        assert encoder.close()
+
+        data = np.fromfile(output_path, dtype=np.uint8)
+        assert np.array_equal(data, np.concatenate([f.reshape(-1) for f in frames]))
+        assert not os.path.exists(output_path + ".part")
+
+    def test_write_async_keeps_event_loop_running(self, tmp_path):
+        # ffmpeg that only starts reading after a while: the 64-frame queue fills up
+        slow = tmp_path / "ffmpeg"
+        slow.write_text('#!/bin/sh\nsleep 0.5\nfor last; do :; done\ncat > "$last"\n')
+        slow.chmod(slow.stat().st_mode | stat.S_IEXEC)
+        output_path = str(tmp_path / "out.mp4")
+        capabilities = EncoderCapabilities(ffmpeg_path=str(slow), h264_encoder="libx264")
+        frames = _frames(100)
+
+        async def run():
+            ticks = 0
+            done = asyncio.Event()
+
+            async def ticker():
+                nonlocal ticks
+                while not done.is_set():
+                    ticks += 1
+                    await asyncio.sleep(0.01)
+
+            tick_task = asyncio.create_task(ticker())
+            encoder = FFmpegPipeEncoder(output_path, 30, 64, 48, capabilities)
+            for frame in frames:
+                await encoder.write_async(frame)
+            ok = await asyncio.to_thread(encoder.close)
+            done.set()
+            await tick_task
+            return ok, ticks
+
+        ok, ticks = asyncio.run(run())
+        assert ok
+        assert ticks >= 10  # The loop kept running while the writer waited on ffmpeg
+        data = np.fromfile(output_path, dtype=np.uint8)
+        assert np.array_equal(data, np.concatenate([f.reshape(-1) for f in frames]))
+
+    def test_pipe_encoder_failure_leaves_no_output(self, tmp_path):
+        failing = tmp_path / "ffmpeg"
+        failing.write_text("#!/bin/sh\nexit 1\n")
+        failing.chmod(failing.stat().st_mode | stat.S_IEXEC)
+        output_path = str(tmp_path / "out.mp4")
+        capabilities = EncoderCapabilities(ffmpeg_path=str(failing), h264_encoder="libx264")
+
+        encoder = FFmpegPipeEncoder(output_path, 30, 64, 48, capabilities)
+        for frame in _frames(200):
+            encoder.write(frame)
+        assert not encoder.close()
+        assert not os.path.exists(output_path)
+
+    def test_abort_discards_output(self, tmp_path, fake_ffmpeg):
+        output_path = str(tmp_path / "out.mp4")
+        capabilities = EncoderCapabilities(ffmpeg_path=fake_ffmpeg, h264_encoder="libx264")
+        with pytest.raises(RuntimeError):
+            with open_video_encoder(output_path, 30, 64, 48, capabilities=capabilities) as encoder:
+                encoder.write(_frames(1)[0])
+                raise RuntimeError("analysis failed")
+        assert not os.path.exists(output_path)
+        assert not os.path.exists(output_path + ".part")
+
+    def test_fragmented_output_is_readable_while_encoding(self, tmp_path, fake_ffmpeg):
+        output_path = str(tmp_path / "out.mp4")
+        capabilities = EncoderCapabilities(ffmpeg_path=fake_ffmpeg, h264_encoder="libx264")
+
+        encoder = open_video_encoder(output_path, 30, 64, 48, capabilities=capabilities, fragmented=True)
+        assert encoder.progressive
+        assert is_encoding(output_path)
+        # Shared with the other worker processes through a marker on disk
+        assert os.path.exists(output_path + ENCODING_SUFFIX)
+        assert is_encoding_file(output_path + ENCODING_SUFFIX)
+        for frame in _frames(3):
+            encoder.write(frame)
+        assert encoder.close()
+
+        assert not is_encoding(output_path)
+        assert not os.path.exists(output_path + ENCODING_SUFFIX)
+        assert os.path.getsize(output_path) == 3 * 64 * 48 * 3
+        # Remuxed in place into a faststart MP4
+        with open(fake_ffmpeg + ".log") as f:
+            calls = f.read().splitlines()
+        assert len(calls) == 2 and "+faststart" in calls[1]
+        assert not os.path.exists(output_path + ".remux")
+
+    def test_stale_encoding_marker_is_ignored(self, tmp_path):
+        output_path = str(tmp_path / "out.mp4")
+        proc = subprocess.Popen(["true"])
+        proc.wait()
+        # Left behind by a worker that died mid-encode
+        with open(output_path + ENCODING_SUFFIX, "w") as f:
+            f.write(str(proc.pid))
+        assert not is_encoding(output_path)
+        with open(output_path + ENCODING_SUFFIX, "w") as f:
+            f.write(str(os.getpid()))
+        assert is_encoding(output_path)
+
+    def test_failed_remux_keeps_fragmented_output(self, tmp_path):
+        script = tmp_path / "ffmpeg"
+        # Encodes from the pipe, fails any other invocation
+        script.write_text('#!/bin/sh\nfor last; do :; done\ncase "$*" in *pipe:0*) cat > "$last";; *) exit 1;; esac\n')
+        script.chmod(script.stat().st_mode | stat.S_IEXEC)
+        output_path = str(tmp_path / "out.mp4")
+        capabilities = EncoderCapabilities(ffmpeg_path=str(script), h264_encoder="libx264")
+
+        encoder = open_video_encoder(output_path, 30, 64, 48, capabilities=capabilities, fragmented=True)
+        for frame in _frames(2):
+            encoder.write(frame)
+        assert encoder.close()
+        assert os.path.getsize(output_path) == 2 * 64 * 48 * 3
+        assert not os.path.exists(output_path + ".remux")
+
+    def test_opencv_fallback_without_ffmpeg(self, tmp_path):
+        output_path = str(tmp_path / "out.mp4")
+        capabilities = EncoderCapabilities(opencv_fourcc="mp4v", opencv_codec_name="MPEG-4 Part 2")
+
+        encoder = open_video_encoder(output_path, 30, 64, 48, capabilities=capabilities, fragmented=True)
+        assert isinstance(encoder, OpenCVVideoEncoder)
+        assert not encoder.progressive
+        for frame in _frames(5):
+            encoder.write(frame)
+        assert encoder.close()
+
+        cap = cv2.VideoCapture(output_path)
+        assert int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) == 5
+        cap.release()
+
+    def test_capabilities_probed_once(self):
+        assert probe_encoder_capabilities() is probe_encoder_capabilities()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,68 @@
+"""
+Tests for time-shard planning of long videos
+"""
+
+import pytest
+
+from app.services.video_shards import Shard, plan_shards
+
+
+def _grid_windows(total_frames, window_size, stride):
+    """End frames of the windows a single pass produces"""
+    return list(range(window_size - 1, total_frames, stride))
+
+
+def _shard_windows(shard, total_frames, stride):
+    """End frames of the windows a shard produces (warm-up included)"""
+    until = total_frames if shard.decode_until is None else min(shard.decode_until, total_frames)
+    return list(range(shard.decode_from + shard.window_size - 1, until, stride))
+
+
+class TestPlanShards:
+    """Every window and frame is owned by exactly one shard"""
+
+    @pytest.mark.parametrize("total_frames,shards,keyframe", [
+        (10_000, 4, None),
+        (10_000, 3, lambda frame: frame - frame % 250),
+        (9_001, 7, lambda frame: max(0, frame - 37)),
+    ])
+    def test_windows_owned_once(self, total_frames, shards, keyframe):
+        plan = plan_shards(total_frames, shards, window_size=16, stride=8, keyframe=keyframe)
+        assert len(plan) == shards
+
+        owned = []
+        for shard in plan:
+            windows = _shard_windows(shard, total_frames, stride=8)
+            owned.extend(end for end in windows if shard.owns_window(end))
+        assert owned == _grid_windows(total_frames, 16, 8)
+
+        frames = [f for shard in plan for f in range(total_frames) if shard.owns_frame(f)]
+        assert frames == list(range(total_frames))
+
+    def test_shards_start_on_grid_after_keyframe(self):
+        plan = plan_shards(10_000, 4, window_size=16, stride=8, keyframe=lambda frame: frame - frame % 250 + 3)
+        for shard in plan[1:]:
+            assert shard.decode_from % 8 == 0
+            assert 0 <= shard.decode_from - (shard.decode_from // 250 * 250 + 3) < 8
+            assert shard.start - shard.decode_from >= 16
+
+    def test_short_video_is_one_shard(self):
+        plan = plan_shards(100, 4, window_size=16, stride=8, min_shard_frames=60)
+        assert len(plan) == 1
+        assert (plan[0].decode_from, plan[0].start, plan[0].stop) == (0, 0, None)
+
+    def test_shards_too_close_are_merged(self):
+        # Every boundary snaps back to the same keyframe
+        plan = plan_shards(10_000, 4, window_size=16, stride=8, keyframe=lambda frame: 0)
+        assert len(plan) == 1
+
+    def test_shard_bounds(self):
+        shard = Shard(1, decode_from=96, start=112, stop=200, window_size=16)
+        assert shard.decode_until == 215
+        assert shard.owns_frame(112) and not shard.owns_frame(111) and not shard.owns_frame(200)
+        assert shard.owns_window(127) and not shard.owns_window(119)
+        assert shard.owns_window(214) and not shard.owns_window(215)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
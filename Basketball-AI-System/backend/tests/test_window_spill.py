@@ -0,0 +1,101 @@
+"""
+Tests for the on-disk per-window spill
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from app.core.schemas import (
+    ActionClassification, ActionProbabilities, FormQualityAssessment, FormQualityIssue,
+    PerformanceMetrics, TimelineSegment,
+)
+from app.services.timeline_summary import summarize_timeline, timeline_columns
+from app.services.window_spill import WindowSpill
+
+
+def _segment(i: int) -> TimelineSegment:
+    label = ("idle", "jump_shot", "layup")[i % 3]
+    metrics = PerformanceMetrics(jump_height=0.1 * i, movement_speed=1.0, form_score=0.5, reaction_time=0.2,
+                                 pose_stability=0.8, energy_efficiency=0.7,
+                                 elbow_angle=90.0 + i if i % 2 else None, release_frame=i if i % 4 == 0 else None)
+    form = None
+    if label != "idle":
+        form = FormQualityAssessment(overall_score=0.6, quality_rating="needs_improvement", strengths=["balance"],
+                                     issues=[FormQualityIssue(issue_type="elbow_angle", severity="minor",
+                                                              description="Elbow out", recommendation="Drill")])
+    return TimelineSegment(
+        start_time=i * 0.27, end_time=i * 0.27 + 0.53, metrics=metrics, form_quality=form,
+        action=ActionClassification(label=label, confidence=0.7, probabilities=ActionProbabilities(
+            jump_shot=0.7, free_throw=0.1, layup=0.1, idle=0.1)),
+    )
+
+
+@pytest.fixture
+def spill(tmp_path):
+    spill = WindowSpill(str(tmp_path), chunk_size=16)
+    yield spill
+    spill.close()
+
+
+class TestWindowSpill:
+    """Windows and keypoints come back exactly as written, across chunks"""
+
+    def test_segments_round_trip(self, spill):
+        segments = [_segment(i) for i in range(50)]
+        for segment in segments:
+            spill.append(segment)
+        assert len(spill) == 50
+        # Only the partial chunk is buffered in memory
+        assert len(spill._windows) == 50 % 16
+        assert [s.model_dump() for s in spill.iter_segments()] == [s.model_dump() for s in segments]
+
+    def test_columns_match_in_memory_summary(self, spill):
+        segments = [_segment(i) for i in range(50)]
+        for segment in segments:
+            spill.append(segment)
+        columns = spill.columns()
+        expected = timeline_columns(segments)
+        assert list(columns["labels"]) == list(expected["labels"])
+        assert np.array_equal(columns["label"], expected["label"])
+        assert summarize_timeline(columns, points=10) == summarize_timeline(expected, points=10)
+
+    def test_keypoints_round_trip(self, spill):
+        pose = np.random.default_rng(0).random((33, 3))
+        for frame in range(300):
+            spill.add_keypoints(frame, pose.tolist() if frame % 2 else [])
+        frames = list(spill.iter_keypoints())
+        assert [frame for frame, _ in frames] == list(range(300))
+        assert np.isnan(frames[0][1]).all()
+        assert np.allclose(frames[1][1], pose, atol=1e-3)
+
+    def test_close_removes_files(self, tmp_path):
+        spill = WindowSpill(str(tmp_path), chunk_size=4)
+        for i in range(10):
+            spill.append(_segment(i))
+        spill.flush()
+        assert os.listdir(spill.path)
+        spill.close()
+        assert not os.path.exists(spill.path)
+
+    def test_adopt_appends_other_spill(self, spill, tmp_path):
+        segments = [_segment(i) for i in range(60)]
+        for segment in segments[:20]:
+            spill.append(segment)
+        other = WindowSpill(str(tmp_path), chunk_size=16)
+        for segment in segments[20:]:
+            other.append(segment)
+        other.add_keypoints(0, [])
+        other.flush()
+
+        spill.adopt(other.path)
+        assert len(spill) == 60
+        assert not os.listdir(other.path)
+        assert [s.model_dump() for s in spill.iter_segments()] == [s.model_dump() for s in segments]
+        assert [frame for frame, _ in spill.iter_keypoints()] == [0]
+        other.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -1,9 +1,10 @@
 import { motion } from 'framer-motion';
 import { Clock, AlertCircle, CheckCircle2 } from 'lucide-react';
-import type { TimelineSegment } from '../types';
+import type { TimelineRun, TimelineSegment } from '../types';
 
 interface ActionTimelineProps {
-  timeline: TimelineSegment[];
+  timeline?: TimelineSegment[];
+  runs?: TimelineRun[]; // Bounded label runs; preferred for the bar when present
   totalDuration?: number;
 }
 
@@ -41,12 +42,15 @@ const ACTION_EMOJIS: Record<string, string> = {
   idle: '🧍',
 };
 
-export default function ActionTimeline({ timeline, totalDuration }: ActionTimelineProps) {
-  if (!timeline || timeline.length === 0) {
+export default function ActionTimeline({ timeline = [], runs, totalDuration }: ActionTimelineProps) {
+  const bar: TimelineRun[] = runs && runs.length > 0
+    ? runs
+    : timeline.map(s => ({ start_time: s.start_time, end_time: s.end_time, label: s.action.label, confidence: s.action.confidence }));
+  if (bar.length === 0) {
     return null;
   }
 
-  const maxDuration = totalDuration || Math.max(...timeline.map(s => s.end_time));
+  const maxDuration = totalDuration || Math.max(...bar.map(s => s.end_time));
 
   const formatTime = (seconds: number) => {
     const mins = Math.floor(seconds / 60);
@@ -93,17 +97,19 @@ export default function ActionTimeline({ timeline, totalDuration }: ActionTimeli
           </p>
         </div>
         <div className="text-sm text-gray-500 dark:text-gray-400">
-          {timeline.length} {timeline.length === 1 ? 'segment' : 'segments'}
+          {timeline.length > 0
+            ? `${timeline.length} ${timeline.length === 1 ? 'segment' : 'segments'}`
+            : `${bar.length} ${bar.length === 1 ? 'run' : 'runs'}`}
         </div>
       </div>
 
       {/* Timeline Bar */}
       <div className="mb-6">
         <div className="relative h-12 bg-gray-100 dark:bg-gray-700 rounded-lg overflow-hidden">
-          {timeline.map((segment, index) => {
+          {bar.map((segment, index) => {
             const left = (segment.start_time / maxDuration) * 100;
             const width = ((segment.end_time - segment.start_time) / maxDuration) * 100;
-            const actionLabel = segment.action.label.toLowerCase();
+            const actionLabel = segment.label.toLowerCase();
             const color = ACTION_COLORS[actionLabel] || 'bg-gray-500';
             
             return (
@@ -111,10 +117,10 @@ export default function ActionTimeline({ timeline, totalDuration }: ActionTimeli
                 key={index}
                 initial={{ width: 0 }}
                 animate={{ width: `${width}%` }}
-                transition={{ delay: index * 0.1, duration: 0.5 }}
+                transition={{ delay: Math.min(index * 0.1, 1), duration: 0.5 }}
                 className={`absolute h-full ${color} opacity-80 hover:opacity-100 transition-opacity`}
                 style={{ left: `${left}%` }}
-                title={`${segment.action.label} (${formatTime(segment.start_time)} - ${formatTime(segment.end_time)})`}
+                title={`${segment.label} (${formatTime(segment.start_time)} - ${formatTime(segment.end_time)})`}
               />
             );
           })}
@@ -0,0 +1,247 @@
+import { useEffect, useRef, useState } from 'react';
+import { Loader2 } from 'lucide-react';
+import { drawSkeleton } from '../utils/poseDrawing';
+
+interface OverlayVideoPlayerProps {
+  videoUrl: string;   // Original, unannotated video
+  overlayUrl: string; // Overlay track (JSON lines, one record per line)
+}
+
+// Decoded overlay state for one video frame
+interface OverlayFrame {
+  t: number;
+  players: number[][];  // [x1, y1, x2, y2, conf]
+  balls: (number | string | null)[][]; // [x1, y1, x2, y2, conf, predicted, zone]
+  landmarks?: number[]; // 33 x [x, y, z, visibility], normalized
+  court?: { lines: Record<string, number[][]> };
+  hoop?: { center: number[]; bbox: number[] };
+  action?: [string | null, number, [string, number, string | null] | null];
+}
+
+const QUALITY_BADGES: Record<string, [string, string]> = {
+  excellent: ['✓ Excellent Form', '#00ff00'],
+  good: ['✓ Good Form', '#00ffff'],
+  needs_improvement: ['⚠ Needs Improvement', '#ffa500'],
+  poor: ['✗ Poor Form', '#ff0000'],
+};
+
+function parseOverlayTrack(text: string): { fps: number; frames: OverlayFrame[] } {
+  let fps = 30;
+  let court: OverlayFrame['court'];
+  let hoop: OverlayFrame['hoop'];
+  let action: OverlayFrame['action'];
+  const frames: OverlayFrame[] = [];
+
+  for (const line of text.split('\n')) {
+    if (!line) continue;
+    const record = JSON.parse(line);
+    switch (record.k) {
+      case 'header':
+        fps = record.fps || 30;
+        break;
+      case 'court':
+        court = record.v;
+        break;
+      case 'hoop':
+        hoop = record.v;
+        break;
+      case 'action':
+        action = record.v;
+        break;
+      case 'frame':
+        frames[record.f] = {
+          t: record.t ?? record.f / fps,
+          players: record.p || [],
+          balls: record.b || [],
+          landmarks: record.l,
+          court,
+          hoop,
+          action,
+        };
+        break;
+    }
+  }
+  return { fps, frames };
+}
+
+function drawOverlay(ctx: CanvasRenderingContext2D, frame: OverlayFrame, width: number, height: number) {
+  ctx.lineWidth = 2;
+  ctx.font = '16px sans-serif';
+
+  if (frame.court) {
+    const colors: Record<string, string> = { horizontal: '#ffff00', vertical: '#00ffff', diagonal: '#00ff00' };
+    for (const [kind, lines] of Object.entries(frame.court.lines)) {
+      ctx.strokeStyle = colors[kind] || '#00ff00';
+      for (const [x1, y1, x2, y2] of lines) {
+        ctx.beginPath();
+        ctx.moveTo(x1, y1);
+        ctx.lineTo(x2, y2);
+        ctx.stroke();
+      }
+    }
+  }
+
+  if (frame.hoop) {
+    const [cx, cy] = frame.hoop.center;
+    const [x1, y1, x2, y2] = frame.hoop.bbox;
+    const radius = Math.max(x2 - x1, y2 - y1) / 2;
+    ctx.strokeStyle = ctx.fillStyle = '#ffff00';
+    ctx.lineWidth = 3;
+    ctx.beginPath();
+    ctx.arc(cx, cy, radius, 0, 2 * Math.PI);
+    ctx.stroke();
+    ctx.fillText('HOOP', cx - 20, cy - radius - 10);
+    ctx.lineWidth = 2;
+  }
+
+  ctx.strokeStyle = ctx.fillStyle = '#00ff00';
+  for (const [x1, y1, x2, y2, conf] of frame.players) {
+    ctx.strokeRect(x1, y1, x2 - x1, y2 - y1);
+    ctx.fillText(`Player ${conf.toFixed(2)}`, x1, y1 - 10);
+  }
+
+  for (const [x1, y1, x2, y2, , predicted] of frame.balls as number[][]) {
+    ctx.strokeStyle = predicted ? '#ffa500' : '#ff8c00';
+    ctx.beginPath();
+    ctx.arc((x1 + x2) / 2, (y1 + y2) / 2, Math.max(x2 - x1, y2 - y1) / 2, 0, 2 * Math.PI);
+    ctx.stroke();
+  }
+
+  if (frame.landmarks) {
+    drawSkeleton(ctx, frame.landmarks, width, height);
+  }
+
+  const [label, confidence, form] = frame.action || [null, 0, null];
+  if (label) {
+    let text = label.replace(/_/g, ' ').replace(/\b\w/g, (c) => c.toUpperCase());
+    if (confidence > 0) text += ` (${Math.round(confidence * 100)}%)`;
+    ctx.font = 'bold 22px sans-serif';
+    const boxWidth = ctx.measureText(text).width + 20;
+    ctx.fillStyle = 'rgba(0, 0, 0, 0.6)';
+    ctx.fillRect(10, 10, boxWidth, 40);
+    ctx.fillStyle = '#6464ff';
+    ctx.fillText(text, 20, 38);
+
+    if (form) {
+      const [rating, , topIssue] = form;
+      const [badge, color] = QUALITY_BADGES[rating] || QUALITY_BADGES.needs_improvement;
+      const lines = [badge];
+      if (topIssue) lines.push(`Fix: ${topIssue.replace(/_/g, ' ')}`);
+      ctx.font = '16px sans-serif';
+      lines.forEach((line, i) => {
+        const y = 60 + i * 30;
+        ctx.fillStyle = 'rgba(0, 0, 0, 0.6)';
+        ctx.fillRect(10, y, ctx.measureText(line).width + 20, 26);
+        ctx.fillStyle = color;
+        ctx.fillText(line, 20, y + 19);
+      });
+    }
+  }
+}
+
+/**
+ * Plays the original video and draws the server's overlay track on a canvas
+ * (boxes, pose skeleton, ball, court/hoop, action label, form rating)
+ */
+export default function OverlayVideoPlayer({ videoUrl, overlayUrl }: OverlayVideoPlayerProps) {
+  const videoRef = useRef<HTMLVideoElement>(null);
+  const canvasRef = useRef<HTMLCanvasElement>(null);
+  const trackRef = useRef<{ fps: number; frames: OverlayFrame[] } | null>(null);
+  const [loading, setLoading] = useState(true);
+  const [error, setError] = useState<string | null>(null);
+
+  useEffect(() => {
+    let cancelled = false;
+    setLoading(true);
+    setError(null);
+
+    fetch(overlayUrl)
+      .then((response) => {
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        return response.text();
+      })
+      .then((text) => {
+        if (!cancelled) trackRef.current = parseOverlayTrack(text);
+      })
+      .catch((err) => {
+        console.error('Failed to load overlay track:', err);
+        if (!cancelled) setError('Overlay unavailable - showing the original video');
+      })
+      .finally(() => {
+        if (!cancelled) setLoading(false);
+      });
+
+    return () => {
+      cancelled = true;
+    };
+  }, [overlayUrl]);
+
+  useEffect(() => {
+    const video = videoRef.current;
+    const canvas = canvasRef.current;
+    if (!video || !canvas) return;
+
+    let handle = 0;
+    const useFrameCallback = 'requestVideoFrameCallback' in video;
+
+    const render = (mediaTime?: number) => {
+      const track = trackRef.current;
+      const ctx = canvas.getContext('2d');
+      if (ctx && track && video.videoWidth) {
+        if (canvas.width !== video.videoWidth || canvas.height !== video.videoHeight) {
+          canvas.width = video.videoWidth;
+          canvas.height = video.videoHeight;
+        }
+        ctx.clearRect(0, 0, canvas.width, canvas.height);
+        const time = mediaTime ?? video.currentTime;
+        const frame = track.frames[Math.floor(time * track.fps + 1e-3)];
+        if (frame) drawOverlay(ctx, frame, canvas.width, canvas.height);
+      }
+      schedule();
+    };
+
+    const schedule = () => {
+      if (useFrameCallback) {
+        handle = (video as any).requestVideoFrameCallback((_: number, meta: { mediaTime: number }) => render(meta.mediaTime));
+      } else {
+        handle = requestAnimationFrame(() => render());
+      }
+    };
+
+    const redraw = () => render();
+    video.addEventListener('seeked', redraw);
+    video.addEventListener('loadeddata', redraw);
+    schedule();
+
+    return () => {
+      video.removeEventListener('seeked', redraw);
+      video.removeEventListener('loadeddata', redraw);
+      if (useFrameCallback) {
+        (video as any).cancelVideoFrameCallback(handle);
+      } else {
+        cancelAnimationFrame(handle);
+      }
+    };
+  }, [videoUrl]);
+
+  return (
+    <div className="relative rounded-lg overflow-hidden bg-black" style={{ aspectRatio: '16/9' }}>
+      <video ref={videoRef} src={videoUrl} controls playsInline preload="metadata" className="w-full h-full" />
+      <canvas
+        ref={canvasRef}
+        className="absolute inset-0 w-full h-full object-contain pointer-events-none"
+      />
+      {loading && (
+        <div className="absolute top-2 right-2 flex items-center gap-2 bg-black/70 rounded px-2 py-1 text-xs text-white">
+          <Loader2 className="w-3 h-3 animate-spin" />
+          Loading overlay...
+        </div>
+      )}
+      {error && (
+        <div className="absolute top-2 right-2 bg-black/70 rounded px-2 py-1 text-xs text-yellow-400">
+          {error}
+        </div>
+      )}
+    </div>
+  );
+}
@@ -1,24 +1,49 @@
 import { motion } from 'framer-motion';
 import { LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer } from 'recharts';
 import { TrendingUp, Calendar } from 'lucide-react';
-import type { HistoricalData } from '../types';
+import type { HistoricalData, ProgressSummary } from '../types';
 
 interface ProgressChartProps {
   data: HistoricalData[];
+  progress?: ProgressSummary | null; // Server rollups (GET /api/progress); used instead of raw sessions when present
 }
 
-export default function ProgressChart({ data }: ProgressChartProps) {
-  // Prepare data for chart
-  const chartData = data.map((item) => ({
-    date: new Date(item.date).toLocaleDateString('en-US', { month: 'short', day: 'numeric' }),
-    jump: item.metrics.jump_height,
-    speed: item.metrics.movement_speed,
-    form: item.metrics.form_score,
-    stability: item.metrics.pose_stability,
-  }));
+const ROLLUP_KEYS = {
+  jump: 'jump_height',
+  speed: 'movement_speed',
+  form: 'form_score',
+  stability: 'pose_stability',
+} as const;
 
-  // Calculate trends
-  const calculateTrend = (key: keyof typeof chartData[0]) => {
+export default function ProgressChart({ data, progress }: ProgressChartProps) {
+  const useRollups = !!progress && progress.daily.length > 0;
+
+  // Prepare data for chart: daily means from the rollups, else one point per session
+  const chartData = useRollups
+    ? progress!.daily.map((bucket) => ({
+        date: new Date(`${bucket.bucket}T00:00:00`).toLocaleDateString('en-US', { month: 'short', day: 'numeric' }),
+        jump: bucket.metrics.jump_height?.mean ?? 0,
+        speed: bucket.metrics.movement_speed?.mean ?? 0,
+        form: bucket.metrics.form_score?.mean ?? 0,
+        stability: bucket.metrics.pose_stability?.mean ?? 0,
+      }))
+    : data.map((item) => ({
+        date: new Date(item.date).toLocaleDateString('en-US', { month: 'short', day: 'numeric' }),
+        jump: item.metrics.jump_height,
+        speed: item.metrics.movement_speed,
+        form: item.metrics.form_score,
+        stability: item.metrics.pose_stability,
+      }));
+  const sessionCount = useRollups
+    ? progress!.daily.reduce((sum, bucket) => sum + bucket.count, 0)
+    : data.length;
+
+  // Calculate trends: weekly trend relative to the mean (rollups) or first-to-last change (sessions)
+  const calculateTrend = (key: keyof typeof ROLLUP_KEYS) => {
+    if (useRollups) {
+      const rollup = progress!.metrics[ROLLUP_KEYS[key]];
+      return rollup && rollup.mean ? (rollup.trend_per_week / Math.abs(rollup.mean)) * 100 : 0;
+    }
     if (chartData.length < 2) return 0;
     const first = chartData[0][key] as number;
     const last = chartData[chartData.length - 1][key] as number;
@@ -45,7 +70,7 @@ export default function ProgressChart({ data }: ProgressChartProps) {
           </h3>
           <div className="flex items-center space-x-2 text-sm text-gray-600 dark:text-gray-400">
             <Calendar className="w-4 h-4" />
-            <span>Last {data.length} sessions</span>
+            <span>Last {sessionCount} sessions</span>
           </div>
         </div>
         <p className="text-sm text-gray-600 dark:text-gray-400">
@@ -86,7 +111,7 @@ export default function ProgressChart({ data }: ProgressChartProps) {
               <div className={`flex items-center space-x-1 mt-2 text-xs font-semibold ${isPositive ? 'text-green-600 dark:text-green-400' : 'text-red-600 dark:text-red-400'
                 }`}>
                 <TrendingUp className={`w-3 h-3 ${!isPositive && 'rotate-180'}`} />
-                <span>{Math.abs(trend).toFixed(1)}%</span>
+                <span>{Math.abs(trend).toFixed(1)}%{useRollups && ' / week'}</span>
               </div>
             </motion.div>
           );
@@ -180,7 +205,8 @@ export default function ProgressChart({ data }: ProgressChartProps) {
                   </span>
                   <span>
                     Your <strong>{key}</strong> has {isPositive ? 'improved' : 'decreased'} by{' '}
-                    <strong>{Math.abs(value).toFixed(1)}%</strong> over the last {data.length} sessions
+                    <strong>{Math.abs(value).toFixed(1)}%</strong>{' '}
+                    {useRollups ? 'per week' : `over the last ${data.length} sessions`}
                   </span>
                 </li>
               );
@@ -1,6 +1,9 @@
 import { useEffect, useRef, useState } from 'react';
 import { Video, X, Loader2 } from 'lucide-react';
 import { getWebSocketUrl } from '../utils/websocket';
+import { BINARY_SUBPROTOCOL, MSG_CONTROL, MSG_FRAME, unpackMessage } from '../utils/binaryProtocol';
+
+const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000';
 
 interface RealTimeVisualizationProps {
   videoId: string | null;
@@ -15,11 +18,16 @@ export default function RealTimeVisualization({
 }: RealTimeVisualizationProps) {
   const canvasRef = useRef<HTMLCanvasElement>(null);
   const wsRef = useRef<WebSocket | null>(null);
+  const progressiveUrlRef = useRef<string | null>(null);
   const [isConnected, setIsConnected] = useState(false);
   const [frameCount, setFrameCount] = useState(0);
   const [error, setError] = useState<string | null>(null);
+  // Annotated video served while it is still being encoded (fragmented MP4)
+  const [progressiveUrl, setProgressiveUrl] = useState<string | null>(null);
 
   useEffect(() => {
+    setProgressiveUrl(null);
+
     if (!videoId) {
       // Close connection if no video ID
       if (wsRef.current) {
@@ -35,6 +43,27 @@ export default function RealTimeVisualization({
 
     // Connect to WebSocket with dynamic URL
     const wsUrl = getWebSocketUrl(`/ws/video-stream/${videoId}`);
+
+    const drawFrame = (src: string, onDone?: () => void) => {
+      const img = new Image();
+      img.onload = () => {
+        if (canvasRef.current) {
+          const ctx = canvasRef.current.getContext('2d');
+          if (ctx) {
+            // Set canvas size to match image
+            canvasRef.current.width = img.width;
+            canvasRef.current.height = img.height;
+
+            // Draw image
+            ctx.drawImage(img, 0, 0);
+            setFrameCount(prev => prev + 1);
+          }
+        }
+        onDone?.();
+      };
+      img.onerror = () => onDone?.();
+      img.src = src;
+    };
     
     // Only connect if we're processing or if we don't have an existing connection
     if (wsRef.current && wsRef.current.readyState === WebSocket.OPEN) {
@@ -42,7 +71,8 @@ export default function RealTimeVisualization({
       return;
     }
     
-    const ws = new WebSocket(wsUrl);
+    const ws = new WebSocket(wsUrl, [BINARY_SUBPROTOCOL]);
+    ws.binaryType = 'arraybuffer';
 
     ws.onopen = () => {
       console.log('✅ Connected to video stream WebSocket');
@@ -52,26 +82,32 @@ export default function RealTimeVisualization({
 
     ws.onmessage = (event) => {
       try {
-        const data = JSON.parse(event.data);
+        let data: any;
+        if (event.data instanceof ArrayBuffer) {
+          // Binary protocol: JPEG payload, no base64
+          const message = unpackMessage(event.data);
+          if (message.type === MSG_CONTROL) {
+            data = message.meta;
+          } else if (message.type === MSG_FRAME && !progressiveUrlRef.current) {
+            const blobUrl = URL.createObjectURL(new Blob([message.payload], { type: 'image/jpeg' }));
+            drawFrame(blobUrl, () => URL.revokeObjectURL(blobUrl));
+            return;
+          } else {
+            return;
+          }
+        } else {
+          data = JSON.parse(event.data);
+        }
 
-        if (data.type === 'frame' && data.data) {
+        if (data.type === 'video_ready' && data.url) {
+          // Real video with audio is playable now - prefer it over the JPEG preview
+          setProgressiveUrl(data.url.startsWith('http') ? data.url : `${API_BASE_URL}${data.url}`);
+          return;
+        }
+
+        if (data.type === 'frame' && data.data && !progressiveUrlRef.current) {
           // Decode base64 image
-          const img = new Image();
-          img.onload = () => {
-            if (canvasRef.current) {
-              const ctx = canvasRef.current.getContext('2d');
-              if (ctx) {
-                // Set canvas size to match image
-                canvasRef.current.width = img.width;
-                canvasRef.current.height = img.height;
-
-                // Draw image
-                ctx.drawImage(img, 0, 0);
-                setFrameCount(prev => prev + 1);
-              }
-            }
-          };
-          img.src = `data:image/${data.format || 'jpeg'};base64,${data.data}`;
+          drawFrame(`data:image/${data.format || 'jpeg'};base64,${data.data}`);
         }
       } catch (err) {
         console.error('Error processing frame:', err);
@@ -98,6 +134,10 @@ export default function RealTimeVisualization({
     };
   }, [videoId, isProcessing]);
 
+  useEffect(() => {
+    progressiveUrlRef.current = progressiveUrl;
+  }, [progressiveUrl]);
+
   if (!videoId) {
     return null;
   }
@@ -137,9 +177,20 @@ export default function RealTimeVisualization({
         <canvas
           ref={canvasRef}
           className="w-full h-full object-contain"
-          style={{ display: 'block' }}
+          style={{ display: progressiveUrl ? 'none' : 'block' }}
         />
 
+        {progressiveUrl && (
+          <video
+            src={progressiveUrl}
+            className="absolute inset-0 w-full h-full object-contain"
+            autoPlay
+            muted
+            controls
+            playsInline
+          />
+        )}
+
         {/* Placeholder when no frames received */}
         {!isConnected && !error && (
           <div className="absolute inset-0 flex flex-col items-center justify-center text-gray-500">
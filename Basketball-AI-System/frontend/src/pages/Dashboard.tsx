@@ -7,9 +7,10 @@ import RadarChart from '../components/RadarChart';
 import RecommendationCard from '../components/RecommendationCard';
 import ProgressChart from '../components/ProgressChart';
 import RealTimeVisualization from '../components/RealTimeVisualization';
+import OverlayVideoPlayer from '../components/OverlayVideoPlayer';
 import BakoLogo from '../components/BakoLogo';
-import { analyzeVideo, getHistory } from '../services/api';
-import type { VideoAnalysisResult, UploadProgress, HistoricalData } from '../types';
+import { analyzeVideo, getHistory, getProgress } from '../services/api';
+import type { VideoAnalysisResult, UploadProgress, HistoricalData, ProgressSummary } from '../types';
 import { Link } from 'react-router-dom';
 import jsPDF from 'jspdf';
 import confetti from 'canvas-confetti';
@@ -35,6 +36,7 @@ export default function Dashboard() {
   const [analysisResult, setAnalysisResult] = useState<VideoAnalysisResult | null>(null);
   const [error, setError] = useState<string>('');
   const [historicalData, setHistoricalData] = useState<HistoricalData[]>([]);
+  const [progress, setProgress] = useState<ProgressSummary | null>(null);
   const [, setIsLoadingHistory] = useState(false);
   const [currentVideoId, setCurrentVideoId] = useState<string | null>(null);
   const [showVisualization, setShowVisualization] = useState(false);
@@ -52,8 +54,9 @@ export default function Dashboard() {
   const loadHistoricalData = async () => {
     try {
       setIsLoadingHistory(true);
-      const history = await getHistory();
+      const [history, rollups] = await Promise.all([getHistory(), getProgress()]);
       setHistoricalData(history);
+      setProgress(rollups);
     } catch (err) {
       console.error('Failed to load history:', err);
       // If history endpoint is not implemented, use empty array
@@ -442,6 +445,27 @@ export default function Dashboard() {
                 return null;
               })()}
               
+              {/* Original video + client-side overlay (analysis-only runs) */}
+              {(() => {
+                if (analysisResult.annotated_video_url) return null;
+                const videoUrl = getVideoUrl(analysisResult.source_video_url);
+                const overlayUrl = getVideoUrl(analysisResult.overlay_url);
+                if (!videoUrl || !overlayUrl) return null;
+
+                return (
+                  <motion.div
+                    initial={{ opacity: 0, y: 20 }}
+                    animate={{ opacity: 1, y: 0 }}
+                    className="bg-white dark:bg-gray-800 rounded-lg shadow-lg p-6"
+                  >
+                    <h2 className="text-xl font-bold text-gray-900 dark:text-white mb-4">
+                      AI-Annotated Video
+                    </h2>
+                    <OverlayVideoPlayer videoUrl={videoUrl} overlayUrl={overlayUrl} />
+                  </motion.div>
+                );
+              })()}
+
               {/* Annotated Video Playback */}
               {(() => {
                 const videoUrl = getVideoUrl(analysisResult.annotated_video_url);
@@ -610,10 +634,11 @@ export default function Dashboard() {
               )}
 
               {/* Action Timeline - All Actions Detected */}
-              {analysisResult.timeline && analysisResult.timeline.length > 0 ? (
+              {(analysisResult.timeline && analysisResult.timeline.length > 0) || analysisResult.timeline_summary?.runs.length ? (
                 <ActionTimeline 
                   timeline={analysisResult.timeline}
-                  totalDuration={Math.max(...analysisResult.timeline.map(s => s.end_time))}
+                  runs={analysisResult.timeline_summary?.runs}
+                  totalDuration={analysisResult.timeline_summary?.end_time}
                 />
               ) : analysisResult.action ? (
                 <motion.div
@@ -641,7 +666,7 @@ export default function Dashboard() {
 
               {/* Progress Chart */}
               {historicalData.length > 0 ? (
-                <ProgressChart data={historicalData} />
+                <ProgressChart data={historicalData} progress={progress} />
               ) : (
                 <motion.div
                   initial={{ opacity: 0 }}
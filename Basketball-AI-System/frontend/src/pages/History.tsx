@@ -2,12 +2,13 @@ import { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
 import { ArrowLeft, Calendar, Activity } from 'lucide-react';
 import { motion } from 'framer-motion';
-import { getHistory } from '../services/api';
-import type { HistoricalData } from '../types';
+import { getHistory, getProgress } from '../services/api';
+import type { HistoricalData, ProgressSummary } from '../types';
 import ProgressChart from '../components/ProgressChart';
 
 export default function History() {
     const [history, setHistory] = useState<HistoricalData[]>([]);
+    const [progress, setProgress] = useState<ProgressSummary | null>(null);
     const [isLoading, setIsLoading] = useState(true);
     const [error, setError] = useState<string>('');
 
@@ -18,8 +19,9 @@ export default function History() {
     const loadHistory = async () => {
         try {
             setIsLoading(true);
-            const data = await getHistory();
+            const [data, rollups] = await Promise.all([getHistory(), getProgress()]);
             setHistory(data);
+            setProgress(rollups);
         } catch (err) {
             console.error('Failed to load history:', err);
             setError('Failed to load analysis history');
@@ -88,7 +90,7 @@ export default function History() {
                     <div className="space-y-8">
                         {/* Progress Chart */}
                         {history.length >= 2 && (
-                            <ProgressChart data={history} />
+                            <ProgressChart data={history} progress={progress} />
                         )}
 
                         {/* History List */}
@@ -3,6 +3,8 @@ import { Camera, Video, Activity, AlertCircle, ArrowLeft } from 'lucide-react';
 import { Link } from 'react-router-dom';
 import BakoLogo from '../components/BakoLogo';
 import { getWebSocketUrl } from '../utils/websocket';
+import { BINARY_SUBPROTOCOL, MSG_CHUNK, MSG_CONTROL, MSG_FRAME, MSG_RESULT, packMessage, unpackMessage } from '../utils/binaryProtocol';
+import { drawSkeleton } from '../utils/poseDrawing';
 
 interface AnalysisResult {
     action: {
@@ -15,13 +17,44 @@ interface AnalysisResult {
         form_score: number;
         pose_stability: number;
     };
-    annotated_frame?: string;
+    annotated_frame?: string;      // Base64 JPEG (JSON protocol)
+    annotated_frame_url?: string;  // Object URL of the JPEG (binary protocol)
+    // Keypoint-only mode: drawn here over the camera preview (normalized coordinates)
+    pose?: {
+        bbox: number[];       // [x1, y1, x2, y2]
+        landmarks: number[];  // 33 x [x, y, z, visibility]
+    } | null;
+}
+
+const DEFAULT_SEND_INTERVAL = 100; // Send frame every 100ms (10 fps to backend)
+
+// Continuous stream ingest: containers the server can decode incrementally
+const STREAM_MIME_TYPES = ['video/webm;codecs=vp8', 'video/webm', 'video/mp4'];
+const STREAM_TIMESLICE_MS = 100;
+
+function streamMimeType(): string | null {
+    if (typeof MediaRecorder === 'undefined') return null;
+    return STREAM_MIME_TYPES.find((type) => MediaRecorder.isTypeSupported(type)) ?? null;
+}
+
+interface BackpressureHint {
+    type: 'backpressure';
+    status: 'reduce' | 'ok';
+    lag_ms: number;
+    suggested_interval_ms?: number;
+    suggested_max_width?: number;
 }
 
 const LiveAnalysis: React.FC = () => {
     const videoRef = useRef<HTMLVideoElement>(null);
     const canvasRef = useRef<HTMLCanvasElement>(null);
+    const overlayRef = useRef<HTMLCanvasElement>(null);
     const wsRef = useRef<WebSocket | null>(null);
+    const recorderRef = useRef<MediaRecorder | null>(null);
+    const frameUrlRef = useRef<string | null>(null);
+    // Adjusted by the server's backpressure hints
+    const sendIntervalRef = useRef(DEFAULT_SEND_INTERVAL);
+    const maxWidthRef = useRef<number | null>(null);
     const [isStreaming, setIsStreaming] = useState(false);
     const [error, setError] = useState<string | null>(null);
     const [result, setResult] = useState<AnalysisResult | null>(null);
@@ -33,6 +66,27 @@ const LiveAnalysis: React.FC = () => {
         };
     }, []);
 
+    // Keypoint-only mode: draw the player box and skeleton over the live preview
+    useEffect(() => {
+        const canvas = overlayRef.current;
+        const video = videoRef.current;
+        if (!canvas || !video) return;
+        const ctx = canvas.getContext('2d');
+        if (!ctx) return;
+
+        canvas.width = video.videoWidth || canvas.clientWidth;
+        canvas.height = video.videoHeight || canvas.clientHeight;
+        ctx.clearRect(0, 0, canvas.width, canvas.height);
+
+        const pose = result?.pose;
+        if (!pose) return;
+        const [x1, y1, x2, y2] = pose.bbox;
+        ctx.lineWidth = 2;
+        ctx.strokeStyle = '#00ff00';
+        ctx.strokeRect(x1 * canvas.width, y1 * canvas.height, (x2 - x1) * canvas.width, (y2 - y1) * canvas.height);
+        drawSkeleton(ctx, pose.landmarks, canvas.width, canvas.height);
+    }, [result]);
+
     const startStream = async () => {
         try {
             const stream = await navigator.mediaDevices.getUserMedia({
@@ -64,27 +118,86 @@ const LiveAnalysis: React.FC = () => {
             videoRef.current.srcObject = null;
         }
 
+        if (recorderRef.current) {
+            recorderRef.current.stop();
+            recorderRef.current = null;
+        }
+
         if (wsRef.current) {
             wsRef.current.close();
             wsRef.current = null;
         }
 
+        if (frameUrlRef.current) {
+            URL.revokeObjectURL(frameUrlRef.current);
+            frameUrlRef.current = null;
+        }
+
         setIsStreaming(false);
         setResult(null);
     };
 
     const connectWebSocket = () => {
-        const wsUrl = getWebSocketUrl('/ws/analyze');
-        const ws = new WebSocket(wsUrl);
+        // Keypoint-only: the server returns box + landmarks and we draw them ourselves
+        const wsUrl = getWebSocketUrl('/ws/analyze?mode=keypoints');
+        // Offer the binary protocol; servers without it fall back to JSON (ws.protocol === '')
+        const ws = new WebSocket(wsUrl, [BINARY_SUBPROTOCOL]);
+        ws.binaryType = 'arraybuffer';
 
         ws.onopen = () => {
-            console.log('Connected to analysis server');
-            startSendingFrames();
+            console.log(`Connected to analysis server (${ws.protocol === BINARY_SUBPROTOCOL ? 'binary' : 'json'} mode)`);
+            // Prefer one compressed camera stream over per-frame JPEGs (binary protocol only)
+            if (ws.protocol !== BINARY_SUBPROTOCOL || !startStreamingVideo(ws)) {
+                startSendingFrames();
+            }
+        };
+
+        const applyBackpressure = (hint: BackpressureHint) => {
+            if (hint.status === 'reduce') {
+                // Never send faster than the server can analyze
+                sendIntervalRef.current = Math.max(DEFAULT_SEND_INTERVAL, hint.suggested_interval_ms ?? sendIntervalRef.current * 1.5);
+                if (hint.suggested_max_width) maxWidthRef.current = hint.suggested_max_width;
+            } else {
+                sendIntervalRef.current = DEFAULT_SEND_INTERVAL;
+                maxWidthRef.current = null;
+            }
+            console.log(`Backpressure (${hint.status}): lag ${hint.lag_ms}ms, sending every ${sendIntervalRef.current}ms`);
         };
 
         ws.onmessage = (event) => {
             try {
+                if (event.data instanceof ArrayBuffer) {
+                    const message = unpackMessage(event.data);
+                    if (message.type === MSG_CONTROL) {
+                        if (message.meta.type === 'backpressure') applyBackpressure(message.meta as BackpressureHint);
+                        if (message.meta.type === 'error' && recorderRef.current) {
+                            // Server can't decode the stream: fall back to JPEG frames
+                            console.warn(message.meta.message);
+                            recorderRef.current.stop();
+                            recorderRef.current = null;
+                            startSendingFrames();
+                        }
+                        return;
+                    }
+                    if (message.type !== MSG_RESULT) return;
+
+                    let frameUrl: string | undefined;
+                    if (message.payload.byteLength) {
+                        frameUrl = URL.createObjectURL(new Blob([message.payload], { type: 'image/jpeg' }));
+                    }
+                    if (frameUrlRef.current) URL.revokeObjectURL(frameUrlRef.current);
+                    frameUrlRef.current = frameUrl ?? null;
+
+                    setResult({ ...(message.meta as AnalysisResult), annotated_frame_url: frameUrl });
+                    setError(null);
+                    return;
+                }
+
                 const data = JSON.parse(event.data);
+                if (data.type === 'backpressure') {
+                    applyBackpressure(data);
+                    return;
+                }
                 setResult(data);
                 setError(null); // Clear any previous errors
             } catch (err) {
@@ -108,6 +221,49 @@ const LiveAnalysis: React.FC = () => {
         wsRef.current = ws;
     };
 
+    const startStreamingVideo = (ws: WebSocket): boolean => {
+        const mimeType = streamMimeType();
+        const stream = videoRef.current?.srcObject as MediaStream | null;
+        if (!mimeType || !stream) return false;
+
+        // The server decodes frames itself and samples them at its analysis rate
+        const recorder = new MediaRecorder(stream, { mimeType, videoBitsPerSecond: 1_000_000 });
+        const startTs = Date.now();
+        let first = true;
+        // Chunks must reach the server in order: serialize the async blob reads
+        let sendChain = Promise.resolve();
+        recorder.ondataavailable = (event) => {
+            if (!event.data.size) return;
+            const blob = event.data;
+            sendChain = sendChain.then(async () => {
+                const chunk = new Uint8Array(await blob.arrayBuffer());
+                if (ws.readyState !== WebSocket.OPEN) return;
+                ws.send(packMessage(MSG_CHUNK, first ? { mime: mimeType, start_ts: startTs } : {}, chunk));
+                first = false;
+            });
+        };
+        recorder.start(STREAM_TIMESLICE_MS);
+        recorderRef.current = recorder;
+        console.log(`Streaming camera as ${mimeType}`);
+
+        // FPS display follows the local preview
+        let frameCount = 0;
+        let lastTime = Date.now();
+        const countFrames = () => {
+            if (recorderRef.current !== recorder) return;
+            frameCount++;
+            const now = Date.now();
+            if (now - lastTime >= 1000) {
+                setFps(frameCount);
+                frameCount = 0;
+                lastTime = now;
+            }
+            requestAnimationFrame(countFrames);
+        };
+        countFrames();
+        return true;
+    };
+
     const startSendingFrames = () => {
         if (!videoRef.current || !canvasRef.current || !wsRef.current) return;
 
@@ -115,7 +271,6 @@ const LiveAnalysis: React.FC = () => {
         let lastTime = Date.now();
         let frameCount = 0;
         let lastSentTime = 0;
-        const SEND_INTERVAL = 100; // Send frame every 100ms (10 fps to backend)
 
         const sendFrame = () => {
             if (!isStreaming || !wsRef.current || wsRef.current.readyState !== WebSocket.OPEN) return;
@@ -123,21 +278,37 @@ const LiveAnalysis: React.FC = () => {
             if (videoRef.current && ctx && canvasRef.current) {
                 const now = Date.now();
                 
-                // Draw video frame to canvas
-                canvasRef.current.width = videoRef.current.videoWidth;
-                canvasRef.current.height = videoRef.current.videoHeight;
-                ctx.drawImage(videoRef.current, 0, 0);
-
-                // Only send frame if enough time has passed (throttle to 10 fps)
-                if (now - lastSentTime >= SEND_INTERVAL) {
+                // Draw video frame to canvas (downscaled if the server asked for smaller frames)
+                const { videoWidth, videoHeight } = videoRef.current;
+                const scale = maxWidthRef.current ? Math.min(1, maxWidthRef.current / videoWidth) : 1;
+                canvasRef.current.width = Math.round(videoWidth * scale);
+                canvasRef.current.height = Math.round(videoHeight * scale);
+                ctx.drawImage(videoRef.current, 0, 0, canvasRef.current.width, canvasRef.current.height);
+
+                // Only send frame if enough time has passed (throttled, see backpressure)
+                if (now - lastSentTime >= sendIntervalRef.current) {
                     try {
-                        // Convert to base64
-                        const dataUrl = canvasRef.current.toDataURL('image/jpeg', 0.7);
-
-                        // Send to server
-                        if (wsRef.current.readyState === WebSocket.OPEN) {
-                            wsRef.current.send(dataUrl);
+                        const ws = wsRef.current;
+                        if (ws.protocol === BINARY_SUBPROTOCOL) {
+                            // Binary mode: raw JPEG bytes, no base64; capture time is echoed back for lag tracking
+                            const capturedAt = now;
+                            canvasRef.current.toBlob(async (blob) => {
+                                if (!blob) return;
+                                const jpeg = new Uint8Array(await blob.arrayBuffer());
+                                if (ws.readyState === WebSocket.OPEN) {
+                                    ws.send(packMessage(MSG_FRAME, { ts: capturedAt }, jpeg));
+                                }
+                            }, 'image/jpeg', 0.7);
                             lastSentTime = now;
+                        } else {
+                            // Convert to base64
+                            const dataUrl = canvasRef.current.toDataURL('image/jpeg', 0.7);
+
+                            // Send to server
+                            if (ws.readyState === WebSocket.OPEN) {
+                                ws.send(dataUrl);
+                                lastSentTime = now;
+                            }
                         }
                     } catch (err) {
                         console.error('Error sending frame:', err);
@@ -198,15 +369,21 @@ const LiveAnalysis: React.FC = () => {
 
                         <video
                             ref={videoRef}
-                            className={`w-full h-full object-cover ${result?.annotated_frame ? 'hidden' : ''}`}
+                            className={`w-full h-full object-cover ${result?.annotated_frame || result?.annotated_frame_url ? 'hidden' : ''}`}
                             playsInline
                             muted
                         />
 
+                        {/* Client-drawn pose (keypoint-only mode) */}
+                        <canvas
+                            ref={overlayRef}
+                            className="w-full h-full object-cover absolute inset-0 pointer-events-none"
+                        />
+
                         {/* Annotated Frame Overlay */}
-                        {result?.annotated_frame && (
+                        {(result?.annotated_frame || result?.annotated_frame_url) && (
                             <img
-                                src={`data:image/jpeg;base64,${result.annotated_frame}`}
+                                src={result.annotated_frame_url ?? `data:image/jpeg;base64,${result.annotated_frame}`}
                                 className="w-full h-full object-cover absolute inset-0"
                                 alt="Analysis Overlay"
                             />
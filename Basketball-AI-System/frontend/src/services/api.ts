@@ -1,5 +1,5 @@
 import axios from 'axios';
-import type { VideoAnalysisResult, UploadProgress, HistoricalData } from '../types';
+import type { VideoAnalysisResult, UploadProgress, HistoricalData, ProgressSummary, TimelineSummary } from '../types';
 
 // API base URL - adjust based on environment
 const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000';
@@ -18,13 +18,22 @@ const api = axios.create({
 export async function analyzeVideo(
   file: File,
   onProgress?: (progress: UploadProgress) => void,
-  videoId?: string
+  videoId?: string,
+  annotate: boolean = true,
+  playerId?: string
 ): Promise<VideoAnalysisResult> {
   const formData = new FormData();
   formData.append('video', file);
   if (videoId) {
     formData.append('video_id', videoId);
   }
+  if (!annotate) {
+    // Metrics only - render the annotated video later with renderAnnotatedVideo()
+    formData.append('annotate', 'false');
+  }
+  if (playerId) {
+    formData.append('player_id', playerId);
+  }
 
   try {
     // Upload progress callback
@@ -107,6 +116,18 @@ export async function analyzeVideo(
   }
 }
 
+/**
+ * Render the annotated video for an analysis run made with annotate=false
+ */
+export async function renderAnnotatedVideo(videoId: string): Promise<string> {
+  const response = await api.post<{ video_id: string; annotated_video_url: string }>(
+    `/api/videos/${videoId}/render`,
+    null,
+    { timeout: 600000 } // Rendering re-reads the whole video
+  );
+  return response.data.annotated_video_url;
+}
+
 /**
  * Get analysis results by ID
  */
@@ -116,12 +137,13 @@ export async function getAnalysisResult(videoId: string): Promise<VideoAnalysisR
 }
 
 /**
- * Get historical analysis data
+ * Get historical analysis data, newest first.
+ * Pass the last item's `cursor` as `before` to fetch the next page.
  */
-export async function getHistory(limit: number = 10): Promise<HistoricalData[]> {
+export async function getHistory(limit: number = 10, before?: string): Promise<HistoricalData[]> {
   try {
     const response = await api.get<HistoricalData[]>('/api/history', {
-      params: { limit },
+      params: before ? { limit, before } : { limit },
       timeout: 15000, // 15 second timeout for history endpoint
     });
     return response.data;
@@ -147,6 +169,51 @@ export async function getHistory(limit: number = 10): Promise<HistoricalData[]>
   }
 }
 
+/**
+ * Get precomputed progress rollups (constant-size, independent of history length)
+ */
+export async function getProgress(
+  playerId?: string,
+  action?: string,
+  days: number = 30,
+  weeks: number = 12
+): Promise<ProgressSummary | null> {
+  try {
+    const response = await api.get<ProgressSummary>('/api/progress', {
+      params: { player_id: playerId, action, days, weeks },
+    });
+    return response.data;
+  } catch (error) {
+    console.error('Get progress error:', error);
+    return null;
+  }
+}
+
+/**
+ * Per-window timeline of an analysis, downsampled to a point budget
+ * (points = 0 for full resolution; start/end in seconds to zoom in)
+ */
+export async function getTimeline(
+  videoId: string,
+  options: { points?: number; method?: 'lttb' | 'minmax'; start?: number; end?: number; series?: string[] } = {}
+): Promise<TimelineSummary | null> {
+  try {
+    const response = await api.get<TimelineSummary>(`/api/timelines/${videoId}`, {
+      params: {
+        points: options.points,
+        method: options.method,
+        start: options.start,
+        end: options.end,
+        series: options.series?.join(','),
+      },
+    });
+    return response.data;
+  } catch (error) {
+    console.error('Get timeline error:', error);
+    return null;
+  }
+}
+
 /**
  * Health check
  */
@@ -86,6 +86,24 @@ export interface TimelineSegment {
   form_quality?: FormQualityAssessment;
 }
 
+// Bounded per-window timeline summary (full resolution: GET /api/timelines/{video_id})
+export interface TimelineRun {
+  start_time: number;
+  end_time: number;
+  label: string;
+  confidence: number;
+  mix?: Record<string, number>; // Share of each label when time bins were merged
+}
+
+export interface TimelineSummary {
+  start_time: number;
+  end_time: number;
+  windows: number;
+  resolution: 'full' | 'lttb' | 'minmax';
+  runs: TimelineRun[];
+  series: Record<string, { t: number[]; v: number[] }>;
+}
+
 export interface VideoAnalysisResult {
   video_id: string;
   action: {
@@ -95,9 +113,14 @@ export interface VideoAnalysisResult {
   };
   metrics: PerformanceMetrics;
   recommendations: Recommendation[];
-  timeline?: TimelineSegment[];
+  timeline?: TimelineSegment[]; // Left out of compact responses for very long videos
+  timeline_summary?: TimelineSummary;
+  timeline_url?: string;
   keypoints?: number[][][]; // For visualization
   annotated_video_url?: string;
+  render_url?: string; // Set when analyzed with annotate=false
+  overlay_url?: string; // Overlay track for client-side drawing (annotate=false)
+  source_video_url?: string; // Original video the overlay is drawn on
   timestamp: string;
 }
 
@@ -109,7 +132,36 @@ export interface UploadProgress {
 
 export interface HistoricalData {
   date: string;
+  cursor?: string;  // Pass as `before` to getHistory for the next page
   metrics: PerformanceMetrics;
   action: string;
 }
 
+// Server-side rollups from GET /api/progress
+export interface MetricRollup {
+  count: number;
+  mean: number;
+  std: number;
+  min: number;
+  max: number;
+  trend_per_week: number;
+  p25?: number;
+  p50?: number;
+  p75?: number;
+  p90?: number;
+}
+
+export interface ProgressBucket {
+  bucket: string; // Day, or Monday of the week (YYYY-MM-DD)
+  count: number;
+  metrics: Record<string, { mean: number; min: number; max: number }>;
+}
+
+export interface ProgressSummary {
+  player_id: string;
+  action: string;
+  metrics: Record<string, MetricRollup>;
+  daily: ProgressBucket[];
+  weekly: ProgressBucket[];
+}
+
@@ -0,0 +1,56 @@
+/**
+ * Binary WebSocket framing (mirrors backend app/api/binary_protocol.py)
+ *
+ * [version: u8][type: u8][metaLength: u32 BE][meta JSON][payload bytes]
+ */
+
+export const BINARY_SUBPROTOCOL = 'bako.binary.v1';
+const PROTOCOL_VERSION = 1;
+const HEADER_SIZE = 6;
+
+export const MSG_FRAME = 1;
+export const MSG_RESULT = 2;
+export const MSG_CONTROL = 3;
+export const MSG_CHUNK = 4; // MediaRecorder chunk (continuous WebM/fMP4 stream)
+
+export interface BinaryMessage {
+  type: number;
+  meta: Record<string, any>;
+  payload: Uint8Array;
+}
+
+const encoder = new TextEncoder();
+const decoder = new TextDecoder();
+
+/**
+ * Build a binary message
+ */
+export function packMessage(type: number, meta: Record<string, any> = {}, payload?: Uint8Array): Uint8Array {
+  const metaBytes = encoder.encode(JSON.stringify(meta));
+  const payloadLength = payload ? payload.byteLength : 0;
+  const message = new Uint8Array(HEADER_SIZE + metaBytes.byteLength + payloadLength);
+  const view = new DataView(message.buffer);
+  view.setUint8(0, PROTOCOL_VERSION);
+  view.setUint8(1, type);
+  view.setUint32(2, metaBytes.byteLength);
+  message.set(metaBytes, HEADER_SIZE);
+  if (payload) {
+    message.set(payload, HEADER_SIZE + metaBytes.byteLength);
+  }
+  return message;
+}
+
+/**
+ * Parse a binary message received with ws.binaryType = 'arraybuffer'
+ */
+export function unpackMessage(buffer: ArrayBuffer): BinaryMessage {
+  const view = new DataView(buffer);
+  if (buffer.byteLength < HEADER_SIZE || view.getUint8(0) !== PROTOCOL_VERSION) {
+    throw new Error('Unsupported binary message');
+  }
+  const type = view.getUint8(1);
+  const metaLength = view.getUint32(2);
+  const metaEnd = HEADER_SIZE + metaLength;
+  const meta = metaLength ? JSON.parse(decoder.decode(new Uint8Array(buffer, HEADER_SIZE, metaLength))) : {};
+  return { type, meta, payload: new Uint8Array(buffer, metaEnd) };
+}
@@ -0,0 +1,34 @@
+/**
+ * Client-side pose drawing shared by the overlay player and live analysis
+ */
+
+// MediaPipe pose skeleton (same connections the server draws)
+export const POSE_CONNECTIONS: [number, number][] = [
+  [0, 1], [1, 2], [2, 3], [3, 7], [0, 4], [4, 5], [5, 6], [6, 8], [9, 10],
+  [11, 12], [11, 13], [13, 15], [15, 17], [15, 19], [15, 21], [17, 19],
+  [12, 14], [14, 16], [16, 18], [16, 20], [16, 22], [18, 20],
+  [11, 23], [12, 24], [23, 24], [23, 25], [24, 26], [25, 27], [26, 28],
+  [27, 29], [28, 30], [29, 31], [30, 32], [27, 31], [28, 32],
+];
+
+/**
+ * Draw a pose skeleton from flattened, normalized landmarks
+ * (33 x [x, y, z, visibility]) onto a width x height canvas area
+ */
+export function drawSkeleton(ctx: CanvasRenderingContext2D, lm: number[], width: number, height: number) {
+  ctx.strokeStyle = '#ffffff';
+  for (const [a, b] of POSE_CONNECTIONS) {
+    if (lm[a * 4 + 3] < 0.5 || lm[b * 4 + 3] < 0.5) continue;
+    ctx.beginPath();
+    ctx.moveTo(lm[a * 4] * width, lm[a * 4 + 1] * height);
+    ctx.lineTo(lm[b * 4] * width, lm[b * 4 + 1] * height);
+    ctx.stroke();
+  }
+  ctx.fillStyle = '#ff0000';
+  for (let i = 0; i < lm.length; i += 4) {
+    if (lm[i + 3] < 0.5) continue;
+    ctx.beginPath();
+    ctx.arc(lm[i] * width, lm[i + 1] * height, 3, 0, 2 * Math.PI);
+    ctx.fill();
+  }
+}